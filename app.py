@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, render_template, session, send_from_directory, url_for
+from flask import Flask, request, jsonify, render_template, session, send_file, send_from_directory, url_for, Response, stream_with_context
 import subprocess
 import os
 import sys
@@ -7,51 +7,228 @@ import wave
 import uuid
 import time
 import threading
+import queue
+import atexit
 import shlex
 import logging
 import requests
 from datetime import datetime
-from project_manager import ProjectManager
-from github_connector import GitHubConnector
+from project_manager import ProjectManager, DEFAULT_CHUNK_SIZE, DEFAULT_LINE_WINDOW
+from project_watcher import ProjectWatcher
+from ollama_pool import OllamaPool, HEALTH_CHECK_INTERVAL
+from chat_manager import ConversationManager, DEFAULT_HISTORY_LIMIT, DEFAULT_TOKEN_BUDGET
+from embedding_index import EmbeddingIndex, DEFAULT_EMBEDDING_MODEL, DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_LINES, DEFAULT_CHUNK_OVERLAP
+from metrics import REGISTRY, SUBPROCESS_STARTED, track_subprocess
+from tracing import Tracer, traced, DEFAULT_BUFFER_SIZE
+from app_logging import setup_logging
+from http_cache import setup_http_cache, DEFAULT_STATIC_MAX_AGE
+from event_bus import EventBus, HEARTBEAT_INTERVAL
+from chart_renderer import ChartRenderer, build_assets
+from inference_history import InferenceHistory, DEFAULT_RETENTION_DAYS, DEFAULT_POINTS, MAX_POINTS
+from diagnostic import create_runner, run_diagnostic, DEFAULT_BUDGET
+from github_connector import GitHubConnector, GITHUB_API_URL, GITHUB_REMOTE_BASE, DEFAULT_CLONE_DEPTH, DEFAULT_CLONE_FILTER, DEFAULT_CACHE_TTL
 
+logger = logging.getLogger(__name__)
+
+# Répertoire de l'application
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Répertoire des données écrites par l'application (statistiques, configurations
+# Ollama et GitHub, projets, logs) : APP_DATA_DIR permet de les isoler (benchmarks)
+DATA_DIR = os.environ.get('APP_DATA_DIR', APP_DIR)
+
+def load_app_config():
+    """Charge la configuration de l'application (config.json)"""
+    config_path = os.path.join(APP_DIR, "config.json")
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Configuration config.json non chargée: %s", e)
+        return {}
+
+APP_CONFIG = load_app_config()
+
+# Configuration des logs : écriture en arrière-plan avec rotation (config.json: logging)
+setup_logging(APP_CONFIG.get("logging"), os.path.join(DATA_DIR, APP_CONFIG.get("paths", {}).get("logs", "logs")))
 
 # Initialisation des gestionnaires
-project_manager = ProjectManager()
-github_connector = GitHubConnector(projects_dir=project_manager.projects_dir)
-
-# Configuration des logs
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
+project_manager = ProjectManager(projects_dir=os.path.join(DATA_DIR, "projects"),
+                                 deduplicate=os.environ.get('PROJECTS_DEDUP', 'false').lower() == 'true')
+
+# Synchronisation des projets avec GitHub (config.json: github)
+GITHUB_CONFIG = APP_CONFIG.get("github", {})
+github_connector = GitHubConnector(
+    projects_dir=project_manager.projects_dir,
+    config_path=os.path.join(DATA_DIR, "github_config.json"),
+    api_url=os.environ.get('GITHUB_API_URL', GITHUB_CONFIG.get("api_url", GITHUB_API_URL)),
+    remote_base=os.environ.get('GITHUB_REMOTE_BASE', GITHUB_CONFIG.get("remote_base", GITHUB_REMOTE_BASE)),
+    depth=GITHUB_CONFIG.get("clone_depth", DEFAULT_CLONE_DEPTH),
+    clone_filter=GITHUB_CONFIG.get("clone_filter", DEFAULT_CLONE_FILTER),
+    cache_ttl=GITHUB_CONFIG.get("cache_ttl", DEFAULT_CACHE_TTL),
+    # Dépôts locaux (chemin ou file://) acceptés par l'API : aucun par défaut
+    local_roots=GITHUB_CONFIG.get("local_roots", [])
 )
-logger = logging.getLogger(__name__)
+# Connexion et liste des dépôts récupérées dès le démarrage (page GitHub sans attente)
+github_connector.warm_cache()
+
+# Surveillance des modifications externes des projets (shell, git, éditeurs)
+project_watcher = ProjectWatcher(project_manager.projects_dir)
+if os.environ.get('PROJECTS_WATCHER', 'true').lower() == 'true' and project_watcher.start():
+    project_manager.attach_watcher(project_watcher)
+
+SERVER_CONFIG = APP_CONFIG.get("server", {})
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'cle_secrete_pour_votre_application'
-app.config['TEMPLATES_AUTO_RELOAD'] = True  # Rechargement automatique des templates
+# Rechargement des templates uniquement avec le serveur de développement en mode debug
+# (None : comportement de Flask, qui suit app.debug) ; les templates compilés sont
+# conservés en cache avec un serveur de production (serve.py, gunicorn)
+app.config['TEMPLATES_AUTO_RELOAD'] = None if SERVER_CONFIG.get('templates_auto_reload', True) else False
+# Compression gzip, ETags des réponses JSON et URLs versionnées des fichiers statiques
+setup_http_cache(app, SERVER_CONFIG)
 
 # Constantes pour la connexion à Ollama
 OLLAMA_API_BASE = "http://localhost:11434/api"
 REQUEST_TIMEOUT = 5  # Délai d'attente pour les requêtes HTTP
 
+INFERENCE_CONFIG = APP_CONFIG.get("inference", {})
+OLLAMA_CONFIG = APP_CONFIG.get("ollama", {})
+
+def get_ollama_backends():
+    """
+    Liste des serveurs Ollama : variable OLLAMA_BACKENDS (URLs séparées par des
+    virgules), sinon OLLAMA_HOST/OLLAMA_PORT, sinon ollama.backends de config.json.
+    """
+    backends = os.environ.get('OLLAMA_BACKENDS')
+    if backends:
+        return [url.strip() for url in backends.split(',') if url.strip()]
+    if os.environ.get('OLLAMA_HOST'):
+        return [f"http://{os.environ['OLLAMA_HOST']}:{os.environ.get('OLLAMA_PORT', '11434')}/api"]
+    if OLLAMA_CONFIG.get('backends'):
+        return OLLAMA_CONFIG['backends']
+    return [OLLAMA_CONFIG.get('api_base', OLLAMA_API_BASE)]
+
+# Serveurs Ollama : vérification de l'état et répartition des inférences
+ollama_pool = OllamaPool(
+    get_ollama_backends(),
+    health_interval=OLLAMA_CONFIG.get('health_check_interval', HEALTH_CHECK_INTERVAL)
+)
+ollama_pool.start()
+# Les opérations de gestion des modèles visent le premier serveur
+OLLAMA_API_BASE = ollama_pool.primary
+
+# Vérifications de /api/diagnostic (exécutées en parallèle, résultats en cache)
+MAX_DIAGNOSTIC_BUDGET = 30
+diagnostic_runner = create_runner(
+    api_base=OLLAMA_API_BASE,
+    config_path=os.path.join(DATA_DIR, "ollama_config.json"),
+    request=ollama_pool.request,
+    base_dir=APP_DIR
+)
+
+# Conversations de l'API /api/chat, conservées côté serveur
+conversation_manager = ConversationManager(
+    history_limit=INFERENCE_CONFIG.get("history_limit", DEFAULT_HISTORY_LIMIT),
+    token_budget=INFERENCE_CONFIG.get("history_token_budget", DEFAULT_TOKEN_BUDGET)
+)
+
+# Recherche sémantique dans les documents des projets (config.json: embeddings)
+EMBEDDINGS_CONFIG = APP_CONFIG.get("embeddings", {})
+# Nombre de passages ajoutés à une conversation liée à un projet
+DEFAULT_CONTEXT_CHUNKS = 4
+embedding_index = EmbeddingIndex(
+    project_manager.projects_dir,
+    ollama_pool.request,
+    model=os.environ.get('EMBEDDING_MODEL', EMBEDDINGS_CONFIG.get("model", DEFAULT_EMBEDDING_MODEL)),
+    batch_size=EMBEDDINGS_CONFIG.get("batch_size", DEFAULT_BATCH_SIZE),
+    chunk_lines=EMBEDDINGS_CONFIG.get("chunk_lines", DEFAULT_CHUNK_LINES),
+    chunk_overlap=EMBEDDINGS_CONFIG.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
+)
+if project_watcher.running:
+    embedding_index.attach_watcher(project_watcher)
+project_manager.attach_index(embedding_index)
+
+# Métriques des requêtes HTTP de l'application
+HTTP_REQUESTS = REGISTRY.counter(
+    'app_http_requests_total', "Nombre de requêtes HTTP traitées", ('method', 'route', 'status'))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'app_http_request_duration_seconds', "Durée de traitement des requêtes HTTP", ('method', 'route'))
+
+# Traçage des requêtes (désactivé par défaut)
+tracer = Tracer(
+    enabled=os.environ.get('TRACING_ENABLED', 'false').lower() == 'true',
+    buffer_size=int(os.environ.get('TRACING_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)),
+    export_path=os.environ.get('TRACING_EXPORT') or None
+)
+
+@app.before_request
+def start_request_timer():
+    request.environ['app.start_time'] = time.perf_counter()
+    if tracer.enabled and request.endpoint not in ('metrics_endpoint', 'debug_traces', 'debug_trace', 'static', 'api_events'):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request.environ['app.trace'] = tracer.start_trace(f"{request.method} {route}", path=request.path)
+
+@app.after_request
+def record_request_metrics(response):
+    start = request.environ.get('app.start_time')
+    if start is not None:
+        # Étiqueter par motif de route et non par URL, pour borner le nombre de séries
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, route=route)
+    request.environ['app.status'] = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_trace(error=None):
+    # Après l'envoi de la réponse, y compris pour les réponses en streaming
+    root = request.environ.pop('app.trace', None)
+    if root is not None:
+        if error is not None:
+            root.error = f"{type(error).__name__}: {error}"
+        tracer.finish_trace(root, status=request.environ.get('app.status', 500))
+
+def collect_app_metrics():
+    """Valeurs instantanées exposées par /metrics (files d'attente, caches, serveurs)"""
+    backends = ollama_pool.status()
+    families = [
+        ('ollama_backend_up', 'gauge', "Serveur Ollama disponible (1) ou non (0)",
+         [({'backend': b['url']}, int(b['healthy'])) for b in backends]),
+        ('ollama_backend_outstanding_requests', 'gauge', "Requêtes en cours par serveur Ollama",
+         [({'backend': b['url']}, b['outstanding']) for b in backends]),
+        ('project_files_cache_hits_total', 'counter', "Listes de fichiers servies depuis le cache",
+         [({}, project_manager.files_cache_hits)]),
+        ('project_files_cache_misses_total', 'counter', "Listes de fichiers relues sur le disque",
+         [({}, project_manager.files_cache_misses)]),
+        ('chat_conversations', 'gauge', "Conversations conservées en mémoire",
+         [({}, conversation_manager.count())]),
+        ('project_watcher_queue_depth', 'gauge', "Événements de fichiers en attente",
+         [({}, project_watcher.queue_depth)])
+    ]
+    return families
+
+REGISTRY.register_collector(collect_app_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métriques de l'application au format Prometheus"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@traced('check_ollama_running')
 def check_ollama_running(retries=1):
     """Vérifie si Ollama est en cours d'exécution avec support de retry"""
     for attempt in range(retries):
         try:
-            response = requests.get(f"{OLLAMA_API_BASE}/tags", timeout=REQUEST_TIMEOUT)
+            response = ollama_pool.request('GET', '/tags', timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
                 return True
-            logger.warning(f"Tentative {attempt+1}/{retries}: Ollama répond mais avec le code {response.status_code}")
+            logger.warning("Tentative %s/%s: Ollama répond mais avec le code %s", attempt + 1, retries, response.status_code)
         except requests.exceptions.ConnectionError:
-            logger.warning(f"Tentative {attempt+1}/{retries}: Impossible de se connecter à Ollama")
+            logger.warning("Tentative %s/%s: Impossible de se connecter à Ollama", attempt + 1, retries)
         except requests.exceptions.Timeout:
-            logger.warning(f"Tentative {attempt+1}/{retries}: Timeout lors de la connexion à Ollama")
+            logger.warning("Tentative %s/%s: Timeout lors de la connexion à Ollama", attempt + 1, retries)
         except Exception as e:
-            logger.warning(f"Tentative {attempt+1}/{retries}: Erreur lors de la connexion à Ollama: {e}")
+            logger.warning("Tentative %s/%s: Erreur lors de la connexion à Ollama: %s", attempt + 1, retries, e)
         
         if attempt < retries - 1:
             time.sleep(1)  # Attendre avant de réessayer
@@ -65,17 +242,11 @@ def check_dependencies():
     Détecte les modèles disponibles et configure le premier comme modèle par défaut
     """
     # Vérifier si les dossiers nécessaires existent
-    os.makedirs('stats', exist_ok=True)
+    os.makedirs(os.path.join(DATA_DIR, 'stats'), exist_ok=True)
     os.makedirs(os.path.join('static', 'img'), exist_ok=True)
     
-    # Vérifier si le fichier de statistiques existe
-    stats_file = os.path.join('stats', 'inference_stats.json')
-    if not os.path.exists(stats_file):
-        with open(stats_file, 'w') as f:
-            json.dump([], f)
-    
     # Vérifier la configuration Ollama
-    config_file = 'ollama_config.json'
+    config_file = os.path.join(DATA_DIR, 'ollama_config.json')
     
     try:
         # Essayer de détecter si Ollama est en cours d'exécution
@@ -97,10 +268,10 @@ def check_dependencies():
                 models_data = response.json()
                 local_models = models_data.get("models", [])
             else:
-                logger.warning(f"Impossible de récupérer la liste des modèles: Code {response.status_code}")
+                logger.warning("Impossible de récupérer la liste des modèles: Code %s", response.status_code)
                 local_models = []
         except Exception as e:
-            logger.warning(f"Erreur lors de la récupération des modèles: {e}")
+            logger.warning("Erreur lors de la récupération des modèles: %s", e)
             local_models = []
         
         # Déterminer le modèle par défaut
@@ -109,7 +280,7 @@ def check_dependencies():
         if local_models:
             # Utiliser le premier modèle disponible comme modèle par défaut
             default_model = local_models[0]["name"]
-            logger.info(f"Modèle disponible trouvé: {default_model}")
+            logger.info("Modèle disponible trouvé: %s", default_model)
         else:
             logger.warning("Aucun modèle disponible trouvé.")
         
@@ -125,22 +296,22 @@ def check_dependencies():
                         model_exists = any(model["name"] == existing_config["default_model"] for model in local_models)
                         if not model_exists and local_models:
                             # Le modèle précédemment défini n'existe plus
-                            logger.warning(f"Le modèle par défaut précédent '{existing_config['default_model']}' n'est plus disponible.")
+                            logger.warning("Le modèle par défaut précédent '%s' n'est plus disponible.", existing_config['default_model'])
                             existing_config["default_model"] = default_model
             except json.JSONDecodeError:
-                logger.error(f"Fichier de configuration corrompu: {config_file}, création d'un nouveau.")
+                logger.error("Fichier de configuration corrompu: %s, création d'un nouveau.", config_file)
                 existing_config = {"default_model": default_model}
             except Exception as e:
-                logger.error(f"Erreur lors de la lecture de la configuration: {e}")
+                logger.error("Erreur lors de la lecture de la configuration: %s", e)
                 existing_config = {"default_model": default_model}
         
         # Écrire la configuration mise à jour
         with open(config_file, 'w') as f:
             json.dump(existing_config, f, indent=2)
-            logger.info(f"Configuration mise à jour: modèle par défaut = {existing_config['default_model']}")
+            logger.info("Configuration mise à jour: modèle par défaut = %s", existing_config['default_model'])
     
     except Exception as e:
-        logger.error(f"Erreur lors de la vérification des modèles Ollama: {e}")
+        logger.error("Erreur lors de la vérification des modèles Ollama: %s", e)
         # Créer un fichier de configuration minimal en cas d'erreur
         if not os.path.exists(config_file):
             with open(config_file, 'w') as f:
@@ -165,16 +336,17 @@ def execute_command():
     command = request.json.get('command')
     try:
         # Log la commande pour débugger
-        logger.info(f"Exécution de la commande: {command}")
+        logger.info("Exécution de la commande: %s", command)
         
-        result = subprocess.run(command, shell=True, text=True, capture_output=True)
+        with track_subprocess('execute'):
+            result = subprocess.run(command, shell=True, text=True, capture_output=True)
         return jsonify({
             'stdout': result.stdout,
             'stderr': result.stderr,
             'returncode': result.returncode
         })
     except Exception as e:
-        logger.error(f"Erreur lors de l'exécution de la commande: {str(e)}")
+        logger.error("Erreur lors de l'exécution de la commande: %s", e)
         return jsonify({'error': str(e)})
 
 @app.route('/execute_interactive', methods=['POST'])
@@ -184,8 +356,8 @@ def execute_interactive():
     
     try:
         # Débugger les commandes interactives
-        logger.info(f"Commande interactive: {command}")
-        logger.info(f"Input: {input_text}")
+        logger.info("Commande interactive: %s", command)
+        logger.debug("Input: %s", input_text)
         
         # Pour SSH, essayons une approche différente
         if command.startswith('ssh '):
@@ -221,7 +393,8 @@ def execute_interactive():
         )
         
         # Si une entrée est fournie, l'envoyer au processus
-        stdout, stderr = process.communicate(input=input_text + '\n' if input_text else None, timeout=15)
+        with track_subprocess('execute_interactive'):
+            stdout, stderr = process.communicate(input=input_text + '\n' if input_text else None, timeout=15)
         
         return jsonify({
             'stdout': stdout,
@@ -232,7 +405,7 @@ def execute_interactive():
         process.kill()
         return jsonify({'error': 'Commande interrompue (timeout)'})
     except Exception as e:
-        logger.error(f"Erreur pendant l'exécution interactive: {str(e)}")
+        logger.error("Erreur pendant l'exécution interactive: %s", e)
         return jsonify({'error': str(e)})
 
 @app.route('/api/models')
@@ -254,21 +427,21 @@ def api_models():
                         "default": default_model
                     })
                 else:
-                    logger.error(f"Erreur HTTP: {response.status_code}")
+                    logger.error("Erreur HTTP: %s", response.status_code)
                     if attempt == 2:  # C'est la dernière tentative
                         return jsonify({
                             "error": f"Erreur {response.status_code} lors de la récupération des modèles",
                             "models": []
                         })
             except requests.exceptions.ConnectionError:
-                logger.error(f"Tentative {attempt+1}/3: Impossible de se connecter à Ollama")
+                logger.error("Tentative %s/3: Impossible de se connecter à Ollama", attempt + 1)
                 if attempt == 2:  # C'est la dernière tentative
                     return jsonify({
                         "error": "Impossible de se connecter à Ollama sur localhost:11434. Vérifiez que le service est en cours d'exécution.",
                         "models": []
                     })
             except requests.exceptions.Timeout:
-                logger.error(f"Tentative {attempt+1}/3: Timeout lors de la connexion à Ollama")
+                logger.error("Tentative %s/3: Timeout lors de la connexion à Ollama", attempt + 1)
                 if attempt == 2:  # C'est la dernière tentative
                     return jsonify({
                         "error": "Timeout lors de la connexion à Ollama",
@@ -279,7 +452,7 @@ def api_models():
             if attempt < 2:
                 time.sleep(1 * (attempt + 1))
     except Exception as e:
-        logger.error(f"Exception lors de la récupération des modèles: {str(e)}")
+        logger.error("Exception lors de la récupération des modèles: %s", e)
         return jsonify({
             "error": f"Erreur inattendue: {str(e)}",
             "models": []
@@ -287,7 +460,7 @@ def api_models():
 
 def get_current_model_name():
     """Utilitaire pour récupérer le nom du modèle courant à partir du fichier de configuration"""
-    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+    config_path = os.path.join(DATA_DIR, "ollama_config.json")
     default_model = "none"
     
     try:
@@ -297,7 +470,7 @@ def get_current_model_name():
                 return config.get("default_model", default_model)
         return default_model
     except Exception as e:
-        logger.error(f"Erreur lors de la lecture du modèle actuel: {e}")
+        logger.error("Erreur lors de la lecture du modèle actuel: %s", e)
         return default_model
 
 @app.route('/api/current-model')
@@ -317,10 +490,10 @@ def api_current_model():
                     if not model_exists and models:
                         # Le modèle n'existe plus mais il y a d'autres modèles
                         new_default = models[0]["name"]
-                        logger.info(f"Le modèle {current_model} n'existe plus. Utilisation de {new_default}")
+                        logger.info("Le modèle %s n'existe plus. Utilisation de %s", current_model, new_default)
                         
                         # Mettre à jour la configuration
-                        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+                        config_path = os.path.join(DATA_DIR, "ollama_config.json")
                         if os.path.exists(config_path):
                             with open(config_path, "r") as f:
                                 config = json.load(f)
@@ -332,14 +505,14 @@ def api_current_model():
                         
                         current_model = new_default
         except Exception as e:
-            logger.warning(f"Erreur lors de la vérification du modèle actuel: {e}")
+            logger.warning("Erreur lors de la vérification du modèle actuel: %s", e)
         
         return jsonify({
             "current": current_model,
             "isDefault": True
         })
     except Exception as e:
-        logger.error(f"Exception lors de la récupération du modèle actuel: {str(e)}")
+        logger.error("Exception lors de la récupération du modèle actuel: %s", e)
         return jsonify({
             "error": f"Erreur: {str(e)}",
             "current": "none"
@@ -366,25 +539,23 @@ def api_download_model():
             data = {"name": model}
             
             # Cette requête peut prendre du temps, donc on augmente le timeout
-            response = requests.post(url, headers=headers, data=json.dumps(data), timeout=30)
+            # (attente maximale entre deux lignes d'avancement d'Ollama)
+            response = requests.post(url, headers=headers, data=json.dumps(data), timeout=30, stream=True)
             
             if response.status_code == 200:
-                # Mettre à jour le modèle par défaut
-                config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
-                if os.path.exists(config_path):
-                    with open(config_path, "r") as f:
-                        config = json.load(f)
-                    
-                    # Si c'est le premier modèle ou si le modèle par défaut n'est pas valide
-                    current = config.get("default_model", "none")
-                    if current == "none" or current == "aucun_modele_disponible":
-                        config["default_model"] = model
-                        
-                        with open(config_path, "w") as f:
-                            json.dump(config, f, indent=2)
-                        
-                        logger.info(f"Modèle {model} défini comme modèle par défaut")
+                # Avancement publié sur le canal d'événements (sujet pull)
+                progress = PullProgress(model)
+                error = None
+                for line in response.iter_lines():
+                    error = progress.feed(line)
+                    if error:
+                        break
+                progress.finish(error)
+                if error:
+                    return jsonify({'success': False, 'error': f"Erreur lors du téléchargement: {error}"})
                 
+                set_default_model_if_missing(model)
+                notify_models_changed()
                 return jsonify({'success': True, 'message': f"Modèle {model} téléchargé avec succès"})
             else:
                 error_msg = f"Erreur lors du téléchargement via l'API: {response.status_code}"
@@ -396,28 +567,47 @@ def api_download_model():
             logger.warning("Timeout lors du téléchargement via l'API. Tentative via manage-models.py")
             return run_model_manager_pull(model)
         except Exception as e:
-            logger.error(f"Erreur lors du téléchargement via l'API: {e}")
+            logger.error("Erreur lors du téléchargement via l'API: %s", e)
             return run_model_manager_pull(model)
     except Exception as e:
-        logger.error(f"Exception lors du téléchargement du modèle {model}: {str(e)}")
+        logger.error("Exception lors du téléchargement du modèle %s: %s", model, e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
+def set_default_model_if_missing(model):
+    """Définit le modèle téléchargé comme modèle par défaut si aucun modèle valide n'est configuré"""
+    config_path = os.path.join(DATA_DIR, "ollama_config.json")
+    if os.path.exists(config_path):
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        
+        # Si c'est le premier modèle ou si le modèle par défaut n'est pas valide
+        current = config.get("default_model", "none")
+        if current == "none" or current == "aucun_modele_disponible":
+            config["default_model"] = model
+            
+            with open(config_path, "w") as f:
+                json.dump(config, f, indent=2)
+            
+            logger.info("Modèle %s défini comme modèle par défaut", model)
+
 def run_model_manager_pull(model):
     """Fonction auxiliaire pour essayer le téléchargement via le script manage-models.py"""
     try:
-        result = subprocess.run(
-            ['python', 'manage-models.py', 'pull', model],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with track_subprocess('manage-models'):
+            result = subprocess.run(
+                ['python', 'manage-models.py', 'pull', model],
+                capture_output=True,
+                text=True,
+                check=True
+            )
         
+        notify_models_changed()
         return jsonify({'success': True, 'message': f"Modèle {model} téléchargé avec succès"})
     except subprocess.CalledProcessError as e:
-        logger.error(f"Erreur lors du téléchargement du modèle {model}: {e.stderr}")
+        logger.error("Erreur lors du téléchargement du modèle %s: %s", model, e.stderr)
         return jsonify({'success': False, 'error': f"Erreur: {e.stderr}"})
     except Exception as e:
-        logger.error(f"Exception lors du téléchargement du modèle {model}: {str(e)}")
+        logger.error("Exception lors du téléchargement du modèle %s: %s", model, e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
 @app.route('/api/delete-model', methods=['POST'])
@@ -455,7 +645,7 @@ def api_delete_model():
                                 new_default = models[0]["name"]
                                 
                                 # Mettre à jour la configuration
-                                config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+                                config_path = os.path.join(DATA_DIR, "ollama_config.json")
                                 if os.path.exists(config_path):
                                     with open(config_path, "r") as f:
                                         config = json.load(f)
@@ -465,10 +655,10 @@ def api_delete_model():
                                     with open(config_path, "w") as f:
                                         json.dump(config, f, indent=2)
                                     
-                                    logger.info(f"Modèle par défaut mis à jour: {new_default}")
+                                    logger.info("Modèle par défaut mis à jour: %s", new_default)
                             else:
                                 # Aucun modèle disponible
-                                config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+                                config_path = os.path.join(DATA_DIR, "ollama_config.json")
                                 if os.path.exists(config_path):
                                     with open(config_path, "r") as f:
                                         config = json.load(f)
@@ -478,8 +668,9 @@ def api_delete_model():
                                     with open(config_path, "w") as f:
                                         json.dump(config, f, indent=2)
                     except Exception as e:
-                        logger.error(f"Erreur lors de la mise à jour du modèle par défaut: {e}")
+                        logger.error("Erreur lors de la mise à jour du modèle par défaut: %s", e)
                 
+                notify_models_changed()
                 return jsonify({'success': True, 'message': f"Modèle {model} supprimé avec succès"})
             else:
                 error_msg = f"Erreur lors de la suppression via l'API: {response.status_code}"
@@ -488,28 +679,30 @@ def api_delete_model():
                 # Essayer avec manage-models.py comme fallback
                 return run_model_manager_delete(model)
         except Exception as e:
-            logger.error(f"Erreur lors de la suppression via l'API: {e}")
+            logger.error("Erreur lors de la suppression via l'API: %s", e)
             return run_model_manager_delete(model)
     except Exception as e:
-        logger.error(f"Exception lors de la suppression du modèle {model}: {str(e)}")
+        logger.error("Exception lors de la suppression du modèle %s: %s", model, e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
 def run_model_manager_delete(model):
     """Fonction auxiliaire pour essayer la suppression via le script manage-models.py"""
     try:
-        result = subprocess.run(
-            ['python', 'manage-models.py', 'delete', model],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with track_subprocess('manage-models'):
+            result = subprocess.run(
+                ['python', 'manage-models.py', 'delete', model],
+                capture_output=True,
+                text=True,
+                check=True
+            )
         
+        notify_models_changed()
         return jsonify({'success': True, 'message': f"Modèle {model} supprimé avec succès"})
     except subprocess.CalledProcessError as e:
-        logger.error(f"Erreur lors de la suppression du modèle {model}: {e.stderr}")
+        logger.error("Erreur lors de la suppression du modèle %s: %s", model, e.stderr)
         return jsonify({'success': False, 'error': f"Erreur: {e.stderr}"})
     except Exception as e:
-        logger.error(f"Exception lors de la suppression du modèle {model}: {str(e)}")
+        logger.error("Exception lors de la suppression du modèle %s: %s", model, e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
 @app.route('/api/set-default-model', methods=['POST'])
@@ -540,10 +733,10 @@ def api_set_default_model():
                         'error': f"Le modèle {model} n'existe pas. Téléchargez-le d'abord."
                     })
         except Exception as e:
-            logger.warning(f"Impossible de vérifier si le modèle existe: {e}")
+            logger.warning("Impossible de vérifier si le modèle existe: %s", e)
         
         # Mettre à jour la configuration
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+        config_path = os.path.join(DATA_DIR, "ollama_config.json")
         config = {}
         
         if os.path.exists(config_path):
@@ -551,9 +744,9 @@ def api_set_default_model():
                 with open(config_path, "r") as f:
                     config = json.load(f)
             except json.JSONDecodeError:
-                logger.error(f"Fichier de configuration corrompu: {config_path}")
+                logger.error("Fichier de configuration corrompu: %s", config_path)
             except Exception as e:
-                logger.error(f"Erreur lors de la lecture de la configuration: {e}")
+                logger.error("Erreur lors de la lecture de la configuration: %s", e)
         
         # Mettre à jour le modèle par défaut
         config["default_model"] = model
@@ -562,12 +755,13 @@ def api_set_default_model():
             with open(config_path, "w") as f:
                 json.dump(config, f, indent=2)
             
+            notify_models_changed()
             return jsonify({'success': True, 'message': f"Modèle {model} défini comme modèle par défaut"})
         except Exception as e:
-            logger.error(f"Erreur lors de l'écriture de la configuration: {e}")
+            logger.error("Erreur lors de l'écriture de la configuration: %s", e)
             return jsonify({'success': False, 'error': f"Erreur lors de l'écriture de la configuration: {e}"})
     except Exception as e:
-        logger.error(f"Exception lors de la définition du modèle par défaut {model}: {str(e)}")
+        logger.error("Exception lors de la définition du modèle par défaut %s: %s", model, e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
 @app.route('/api/test-model', methods=['POST'])
@@ -595,11 +789,10 @@ def api_test_model():
         
         # Essayer d'utiliser directement l'API Ollama
         try:
-            url = f"{OLLAMA_API_BASE}/generate"
-            headers = {"Content-Type": "application/json"}
             request_data = {
                 "model": model,
                 "prompt": prompt,
+                "stream": False,
                 "options": {
                     "temperature": float(temperature),
                     "max_tokens": int(max_tokens)
@@ -607,7 +800,7 @@ def api_test_model():
             }
             
             # Cette requête peut prendre du temps
-            response = requests.post(url, headers=headers, json=request_data, timeout=60)
+            response = ollama_pool.request('POST', '/generate', model=model, json=request_data, timeout=60)
             
             if response.status_code == 200:
                 result = response.json()
@@ -638,72 +831,220 @@ def api_test_model():
             logger.warning("Timeout lors de l'appel à l'API. Tentative via run-inference.py")
             return run_inference_script(model, prompt, temperature, max_tokens)
         except Exception as e:
-            logger.error(f"Erreur lors de l'appel à l'API: {e}")
+            logger.error("Erreur lors de l'appel à l'API: %s", e)
             return run_inference_script(model, prompt, temperature, max_tokens)
     except Exception as e:
-        logger.error(f"Exception lors du test du modèle {model}: {str(e)}")
+        logger.error("Exception lors du test du modèle %s: %s", model, e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
-def run_inference_script(model, prompt, temperature, max_tokens):
-    """Fonction auxiliaire pour exécuter l'inférence via le script run-inference.py"""
-    try:
-        # Construire la commande avec les options
-        command = [
-            'python', 'run-inference.py',
-            '--no-stream',  # Pour éviter les problèmes avec le streaming dans l'API
-            '--model', model,
-            '--temperature', str(temperature),
-            '--max-tokens', str(max_tokens),
-            prompt
-        ]
-        
-        result = subprocess.run(
-            command,
-            capture_output=True,
+# Délai maximal d'une inférence via run-inference.py (en secondes)
+INFERENCE_SCRIPT_TIMEOUT = 60
+INFERENCE_SCRIPT = os.path.join(APP_DIR, 'run-inference.py')
+# Processus run-inference.py --worker maintenus actifs
+INFERENCE_WORKERS = max(int(os.environ.get('INFERENCE_WORKERS', 2)), 1)
+
+class InferenceWorker:
+    """
+    Processus run-inference.py maintenu actif (mode --worker).
+    
+    Les requêtes et les résultats sont échangés en JSON, une ligne par
+    message : le processus n'est démarré qu'une fois et garde ses imports et
+    ses connexions entre les inférences. Les requêtes sont traitées l'une
+    après l'autre ; l'attente du processus compte dans le délai de la
+    requête. En cas de timeout, le processus est arrêté puis relancé à la
+    requête suivante.
+    """
+    
+    def __init__(self, script=INFERENCE_SCRIPT):
+        self.script = script
+        self._process = None
+        self._responses = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+    
+    def _start(self):
+        """Démarre le processus et le thread de lecture de ses réponses"""
+        SUBPROCESS_STARTED.inc(command='run-inference-worker')
+        self._process = subprocess.Popen(
+            [sys.executable, self.script, '--worker'],
+            env={**os.environ, 'OLLAMA_API_BASE': ollama_pool.primary},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
             text=True,
-            timeout=60  # Timeout de 60 secondes
+            encoding='utf-8',
+            bufsize=1
         )
+        self._responses = queue.Queue()
+        threading.Thread(
+            target=self._read_loop,
+            args=(self._process, self._responses),
+            name='inference-worker-reader',
+            daemon=True
+        ).start()
+        logger.info("Processus d'inférence démarré (pid %s)", self._process.pid)
+    
+    @staticmethod
+    def _read_loop(process, responses):
+        """Transmet chaque ligne de réponse du processus à la file"""
+        for line in process.stdout:
+            responses.put(line)
+        responses.put(None)
+    
+    def stop(self):
+        """Arrête le processus"""
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+        self._process = None
+    
+    def infer(self, model, prompt, temperature, max_tokens, timeout=INFERENCE_SCRIPT_TIMEOUT):
+        """
+        Exécute une inférence dans le processus.
         
-        if result.returncode != 0:
-            error_text = result.stderr or result.stdout
-            logger.error(f"Erreur lors de l'exécution de run-inference.py: {error_text}")
+        Returns:
+            dict: Résultat JSON de run-inference.py
+            
+        Raises:
+            subprocess.TimeoutExpired: Si l'inférence dépasse le délai
+            RuntimeError: Si le processus s'est arrêté
+        """
+        deadline = time.monotonic() + timeout
+        if not self._lock.acquire(timeout=timeout):
+            raise subprocess.TimeoutExpired(self.script, timeout)
+        try:
+            if not self._process or self._process.poll() is not None:
+                self._start()
             
-            if "localhost:11434" in error_text or "connection refused" in error_text.lower():
+            self._next_id += 1
+            request_id = self._next_id
+            message = {
+                'id': request_id,
+                'model': model,
+                'prompt': prompt,
+                'temperature': float(temperature),
+                'max_tokens': int(max_tokens)
+            }
+            try:
+                self._process.stdin.write(json.dumps(message, ensure_ascii=False) + "\n")
+                self._process.stdin.flush()
+            except OSError as e:
+                self.stop()
+                raise RuntimeError(f"Processus d'inférence indisponible: {e}")
+            
+            while True:
+                try:
+                    line = self._responses.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    self.stop()
+                    raise subprocess.TimeoutExpired(self.script, timeout)
+                
+                if line is None:
+                    self.stop()
+                    raise RuntimeError("Le processus d'inférence s'est arrêté")
+                
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                if result.get('id') == request_id:
+                    return result
+        finally:
+            self._lock.release()
+
+class InferenceWorkerPool:
+    """
+    Quelques processus InferenceWorker : une requête est confiée au premier
+    processus libre, et l'attente d'un processus libre compte dans son délai.
+    """
+    
+    def __init__(self, size=INFERENCE_WORKERS, script=INFERENCE_SCRIPT):
+        self.script = script
+        self.workers = [InferenceWorker(script) for _ in range(size)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+    
+    def stop(self):
+        """Arrête les processus"""
+        for worker in self.workers:
+            worker.stop()
+    
+    def infer(self, model, prompt, temperature, max_tokens, timeout=INFERENCE_SCRIPT_TIMEOUT):
+        """
+        Exécute une inférence dans le premier processus libre.
+        
+        Returns:
+            dict: Résultat JSON de run-inference.py
+            
+        Raises:
+            subprocess.TimeoutExpired: Si l'attente et l'inférence dépassent le délai
+            RuntimeError: Si le processus s'est arrêté
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise subprocess.TimeoutExpired(self.script, timeout)
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.script, timeout)
+            return worker.infer(model, prompt, temperature, max_tokens, timeout=remaining)
+        finally:
+            self._idle.put(worker)
+
+inference_worker = InferenceWorkerPool() if os.environ.get('INFERENCE_WORKER', 'true').lower() == 'true' else None
+if inference_worker:
+    atexit.register(inference_worker.stop)
+
+@traced('run_inference_script')
+def run_inference_script(model, prompt, temperature, max_tokens):
+    """Fonction auxiliaire pour exécuter l'inférence via le script run-inference.py"""
+    try:
+        if inference_worker:
+            with track_subprocess('run-inference-worker', spawn=False):
+                result = inference_worker.infer(model, prompt, temperature, max_tokens)
+        else:
+            # Exécution ponctuelle avec une sortie JSON unique
+            command = [
+                sys.executable, INFERENCE_SCRIPT,
+                '--json',
+                '--model', model,
+                '--temperature', str(temperature),
+                '--max-tokens', str(max_tokens),
+                prompt
+            ]
+            with track_subprocess('run-inference'):
+                completed = subprocess.run(
+                    command,
+                    env={**os.environ, 'OLLAMA_API_BASE': ollama_pool.primary},
+                    capture_output=True,
+                    text=True,
+                    timeout=INFERENCE_SCRIPT_TIMEOUT
+                )
+            try:
+                result = json.loads(completed.stdout)
+            except ValueError:
+                error_text = completed.stderr or completed.stdout
+                logger.error("Erreur lors de l'exécution de run-inference.py: %s", error_text)
+                return jsonify({'success': False, 'error': error_text})
+        
+        if not result.get('success'):
+            logger.error("Erreur lors de l'exécution de run-inference.py: %s", result.get('error'))
+            if result.get('error_type') == 'connection':
                 return jsonify({
                     'success': False,
                     'error': "Impossible de se connecter à Ollama. Vérifiez que le service est en cours d'exécution."
                 })
-            elif "not found" in error_text.lower() and model in error_text:
+            elif result.get('error_type') == 'not_found':
                 return jsonify({
                     'success': False,
                     'error': f"Modèle '{model}' non trouvé. Téléchargez-le d'abord."
                 })
             else:
-                return jsonify({'success': False, 'error': error_text})
-        
-        # Extraire le texte généré en ignorant les lignes de log/info
-        output_lines = result.stdout.splitlines()
-        generated_text = ""
-        recording = False
+                return jsonify({'success': False, 'error': result.get('error')})
         
-        for line in output_lines:
-            # Ignorer les lignes d'info
-            if "Modèle sélectionné" in line or "Exécution de l'inférence" in line or "Chargement du modèle" in line:
-                continue
-            # Chercher la ligne "Texte généré:" qui indique le début du texte généré
-            elif "Texte généré:" in line:
-                recording = True
-                continue
-            # Ignorer les autres lignes d'info
-            elif "Inférence terminée" in line or "GPU détecté" in line or "Utilisation mémoire" in line:
-                continue
-            # Capturer le texte généré
-            elif recording:
-                generated_text += line + "\n"
-        
-        # Si rien n'a été capturé mais qu'il y a une sortie, prendre toute la sortie
-        if not generated_text.strip() and result.stdout.strip():
-            generated_text = result.stdout.strip()
+        generated_text = result.get('response', '')
         
         # Enregistrer cette inférence dans les statistiques
         save_inference_stats(model, prompt, max_tokens, generated_text)
@@ -712,116 +1053,287 @@ def run_inference_script(model, prompt, temperature, max_tokens):
             'success': True,
             'response': generated_text,
             'model': model,
-            'tokens': len(generated_text.split())  # Estimation grossière des tokens
+            'tokens': result.get('eval_tokens') or len(generated_text.split()),
+            'duration': result.get('total_duration')
         })
     except subprocess.TimeoutExpired:
-        logger.error(f"Timeout lors de l'exécution de run-inference.py")
+        logger.error("Timeout lors de l'exécution de run-inference.py")
         return jsonify({'success': False, 'error': "Timeout lors de l'inférence. L'opération a pris trop de temps."})
     except Exception as e:
-        logger.error(f"Exception lors de l'exécution de run-inference.py: {str(e)}")
+        logger.error("Exception lors de l'exécution de run-inference.py: %s", e)
         return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
 
-def save_inference_stats(model, prompt, max_tokens, output):
-    """Enregistre les statistiques d'inférence pour analyse ultérieure"""
-    stats_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stats")
+def get_chat_default_model():
+    """
+    Modèle utilisé par défaut pour les conversations.
     
-    # Créer le répertoire stats s'il n'existe pas
-    if not os.path.exists(stats_dir):
-        os.makedirs(stats_dir)
+    Le modèle choisi dans l'interface (ollama_config.json) est prioritaire ;
+    inference.default_model de config.json ne sert que s'il n'y en a pas.
+    """
+    current_model = get_current_model_name()
+    if current_model not in ("none", "aucun_modele_disponible"):
+        return current_model
+    return INFERENCE_CONFIG.get('default_model') or current_model
+
+def get_chat_conversation(data, conversation_id):
+    """
+    Conversation visée par une requête /api/chat, créée si nécessaire.
     
-    # Enregistrer l'inférence dans le fichier de statistiques
-    stats_file = os.path.join(stats_dir, "inference_stats.json")
+    Args:
+        data (dict): Corps de la requête
+        conversation_id (str): Identifiant fourni ou conservé en session
+        
+    Returns:
+        Conversation: Conversation à poursuivre
+    """
+    if data.get('new'):
+        conversation_id = None
+    model = data.get('model') or get_chat_default_model()
+    return conversation_manager.get(conversation_id, create=True, model=model, system=data.get('system'))
+
+def retrieve_project_context(project_id, query, k=None):
+    """
+    Passages d'un projet proches d'un message, pour enrichir une conversation.
     
-    stats = []
-    if os.path.exists(stats_file):
-        try:
-            with open(stats_file, "r") as f:
-                stats = json.load(f)
-        except:
-            stats = []
+    Args:
+        project_id (str): ID du projet
+        query (str): Message de l'utilisateur
+        k (int): Nombre de passages (config.json: embeddings.context_chunks)
+        
+    Returns:
+        list: Passages trouvés (vide si le projet n'est pas indexé)
+    """
+    k = k or EMBEDDINGS_CONFIG.get("context_chunks", DEFAULT_CONTEXT_CHUNKS)
+    return embedding_index.search(project_id, query, k=k) or []
+
+def format_project_context(passages):
+    """Message système présentant les passages retrouvés dans le projet"""
+    parts = ["Extraits des documents du projet, à utiliser s'ils sont utiles pour répondre :"]
+    for passage in passages:
+        parts.append(f"--- {passage['document']} (lignes {passage['start_line']}-{passage['end_line']})\n{passage['text']}")
+    return "\n\n".join(parts)
+
+def build_chat_request(conversation, data, context=None):
+    """
+    Ajoute le message de l'utilisateur à la conversation et construit la requête /chat.
     
-    # Mesurer le temps d'exécution approximatif (car nous n'avons pas le temps réel)
-    execution_time = 0.5  # Valeur par défaut
+    Le verrou de la conversation doit être acquis ; l'appelant enregistre
+    l'historique avec conversation_manager.snapshot avant l'appel et le
+    restaure si l'appel à Ollama échoue (l'ajout du message peut avoir
+    tronqué l'historique). Les passages du
+    projet sont placés juste avant le dernier message sans être conservés
+    dans l'historique, pour ne pas modifier le début de la conversation.
     
-    # Ajouter la nouvelle inférence
-    stats.append({
-        "timestamp": time.time(),
-        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "model": model,
-        "prompt": prompt[:200] + ("..." if len(prompt) > 200 else ""),  # Tronquer les prompts longs
-        "max_tokens": max_tokens,
-        "output_length": len(output.split()),
-        "execution_time": execution_time
-    })
+    Args:
+        conversation (Conversation): Conversation
+        data (dict): Corps de la requête
+        context (list): Passages de retrieve_project_context (optionnel)
+    
+    Returns:
+        dict: Corps de la requête à envoyer à Ollama
+    """
+    conversation.model = data.get('model') or conversation.model or get_chat_default_model()
+    conversation_manager.add_message(conversation, 'user', data['message'])
     
-    # Limiter à 100 dernières inférences
-    if len(stats) > 100:
-        stats = stats[-100:]
+    messages = conversation_manager.build_messages(conversation)
+    if context:
+        messages.insert(len(messages) - 1, {'role': 'system', 'content': format_project_context(context)})
     
-    # Enregistrer les statistiques
-    with open(stats_file, "w") as f:
-        json.dump(stats, f, indent=2)
+    return {
+        "model": conversation.model,
+        "messages": messages,
+        "stream": False,
+        # Garder le modèle (et son cache de prompt) chargé entre deux tours
+        "keep_alive": data.get('keep_alive', '10m'),
+        "options": {
+            "temperature": float(data.get('temperature', INFERENCE_CONFIG.get('default_temperature', 0.7))),
+            "num_predict": int(data.get('max_tokens', INFERENCE_CONFIG.get('default_max_tokens', 500)))
+        }
+    }
 
-@app.route('/api/stats/inference-history')
-def api_inference_history():
-    """API pour récupérer l'historique des inférences"""
-    stats_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stats", "inference_stats.json")
+def finish_chat_turn(conversation, data, request_data, result, context=None):
+    """
+    Enregistre la réponse d'Ollama dans la conversation et les statistiques.
+    
+    Returns:
+        dict: Réponse de l'API /api/chat
+    """
+    reply = result.get('message', {}).get('content', '')
+    conversation_manager.add_message(conversation, 'assistant', reply)
+    conversation_manager.record_usage(conversation, result)
+    
+    save_inference_stats(conversation.model, data['message'], request_data['options']['num_predict'], reply)
+    
+    return {
+        'success': True,
+        'conversation_id': conversation.id,
+        'response': reply,
+        'model': conversation.model,
+        'prompt_tokens': result.get('prompt_eval_count', 0),
+        'tokens': result.get('eval_count', 0),
+        'history_messages': len(conversation.messages),
+        'history_tokens': conversation.total_tokens(),
+        'sources': [
+            {key: passage[key] for key in ('document', 'start_line', 'end_line', 'score')}
+            for passage in context or []
+        ]
+    }
+
+@app.route('/api/chat', methods=['POST'])
+def api_chat():
+    """
+    API de conversation multi-tours via l'API /chat d'Ollama.
+    
+    L'historique est conservé côté serveur, associé à la session (ou à
+    l'identifiant conversation_id fourni) : seul le nouveau message est envoyé
+    par le client. Avec project_id, les passages du projet les plus proches du
+    message sont joints à la requête (voir /api/projects/<id>/index).
+    """
+    data = request.json
+    if not data:
+        return jsonify({'success': False, 'error': 'Données JSON manquantes'})
     
-    if not os.path.exists(stats_file):
-        return jsonify({"history": []})
+    if not data.get('message'):
+        return jsonify({'success': False, 'error': 'Message manquant'})
     
+    conversation = get_chat_conversation(data, data.get('conversation_id') or session.get('chat_id'))
+    session['chat_id'] = conversation.id
+    context = retrieve_project_context(data['project_id'], data['message']) if data.get('project_id') else None
+    
+    with conversation.lock:
+        snapshot = conversation_manager.snapshot(conversation)
+        request_data = build_chat_request(conversation, data, context)
+        
+        try:
+            response = ollama_pool.request(
+                'POST',
+                '/chat',
+                model=conversation.model,
+                json=request_data,
+                timeout=INFERENCE_CONFIG.get('request_timeout', 120)
+            )
+            if response.status_code == 404:
+                conversation_manager.restore(conversation, snapshot)
+                return jsonify({
+                    'success': False,
+                    'error': f"Modèle '{conversation.model}' non trouvé. Téléchargez-le d'abord."
+                })
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.ConnectionError:
+            conversation_manager.restore(conversation, snapshot)
+            return jsonify({
+                'success': False,
+                'error': "Impossible de se connecter à Ollama. Vérifiez que le service est en cours d'exécution."
+            })
+        except Exception as e:
+            conversation_manager.restore(conversation, snapshot)
+            logger.error("Erreur lors de l'appel à l'API chat: %s", e)
+            return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
+        
+        return jsonify(finish_chat_turn(conversation, data, request_data, result, context))
+
+@app.route('/api/chat', methods=['GET'])
+def api_chat_history():
+    """API pour obtenir l'historique de la conversation courante"""
+    conversation_id = request.args.get('conversation_id') or session.get('chat_id')
+    conversation = conversation_manager.get(conversation_id)
+    if not conversation:
+        return jsonify({'success': False, 'error': 'Conversation introuvable'})
+    return jsonify({'success': True, 'conversation': conversation.to_dict()})
+
+@app.route('/api/chat', methods=['DELETE'])
+def api_chat_reset():
+    """API pour supprimer la conversation courante"""
+    conversation_id = request.args.get('conversation_id') or session.get('chat_id')
+    deleted = conversation_manager.delete(conversation_id) if conversation_id else False
+    if conversation_id == session.get('chat_id'):
+        session.pop('chat_id', None)
+    return jsonify({'success': True, 'deleted': deleted})
+
+# Historique des inférences en colonnes NumPy (config.json: stats)
+STATS_CONFIG = APP_CONFIG.get("stats", {})
+inference_history = InferenceHistory(
+    os.path.join(DATA_DIR, "stats", "history"),
+    retention_days=STATS_CONFIG.get("history_retention_days", DEFAULT_RETENTION_DAYS))
+
+def import_inference_stats():
+    """Importe une fois dans l'historique les statistiques de l'ancien fichier stats/inference_stats.json"""
+    stats_file = os.path.join(DATA_DIR, "stats", "inference_stats.json")
+    if not os.path.exists(stats_file) or len(inference_history):
+        return
     try:
         with open(stats_file, "r") as f:
             stats = json.load(f)
-        
-        # Trier par timestamp décroissant (plus récent d'abord)
-        stats.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-        
-        return jsonify({"history": stats})
+        if stats:
+            count = inference_history.extend(stats)
+            os.replace(stats_file, stats_file.replace(".json", ".imported.json"))
+            logger.info("%s inférences importées depuis %s", count, stats_file)
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération de l'historique d'inférence: {str(e)}")
+        logger.error("Erreur lors de l'import des statistiques d'inférence: %s", e)
+
+import_inference_stats()
+
+@traced('save_inference_stats')
+def save_inference_stats(model, prompt, max_tokens, output):
+    """Enregistre les statistiques d'inférence pour analyse ultérieure"""
+    # Mesurer le temps d'exécution approximatif (car nous n'avons pas le temps réel)
+    execution_time = 0.5  # Valeur par défaut
+    
+    try:
+        inference_history.append(model, prompt, max_tokens, len(output.split()), execution_time)
+    except Exception as e:
+        logger.error("Erreur lors de l'enregistrement des statistiques d'inférence: %s", e)
+        return
+    # Graphiques redessinés en arrière-plan
+    chart_renderer.invalidate()
+
+@app.route('/api/stats/inference-history')
+def api_inference_history():
+    """
+    API pour récupérer l'historique des inférences.
+
+    Renvoie les dernières inférences (limit, 100 par défaut), les totaux et,
+    si start, end ou points est indiqué, une série régulière sur la période
+    (dates en secondes depuis l'epoch). Le filtre model s'applique aux trois.
+    """
+    model = request.args.get('model') or None
+    if model == 'all':
+        model = None
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_POINTS)), 0), MAX_POINTS)
+        totals = [m for m in inference_history.summary() if model is None or m['name'] == model]
+        count = sum(m['count'] for m in totals)
+        total_tokens = sum(m['total_tokens'] for m in totals)
+        total_time = sum(m['total_time'] for m in totals)
+        result = {
+            "history": inference_history.recent(limit, model),
+            "summary": {
+                "count": count,
+                "avg_tokens": total_tokens / count if count else 0,
+                "avg_time": total_time / count if count else 0
+            }
+        }
+        if any(name in request.args for name in ('start', 'end', 'points')):
+            result["series"] = inference_history.series(
+                start=request.args.get('start', type=float),
+                end=request.args.get('end', type=float),
+                points=request.args.get('points', DEFAULT_POINTS, type=int),
+                model=model)
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e), "history": []}), 400
+    except Exception as e:
+        logger.error("Erreur lors de la récupération de l'historique d'inférence: %s", e)
         return jsonify({"error": str(e), "history": []})
 
 @app.route('/api/stats/model-usage')
 def api_model_usage():
     """API pour récupérer les statistiques d'utilisation des modèles"""
-    stats_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stats", "inference_stats.json")
-    
-    if not os.path.exists(stats_file):
-        return jsonify({"models": []})
-    
     try:
-        with open(stats_file, "r") as f:
-            stats = json.load(f)
-        
-        # Calculer les statistiques par modèle
-        model_stats = {}
-        for entry in stats:
-            model = entry.get("model")
-            if model not in model_stats:
-                model_stats[model] = {
-                    "name": model,
-                    "count": 0,
-                    "total_tokens": 0,
-                    "total_time": 0
-                }
-            
-            model_stats[model]["count"] += 1
-            model_stats[model]["total_tokens"] += entry.get("output_length", 0)
-            model_stats[model]["total_time"] += entry.get("execution_time", 0)
-        
-        # Convertir en liste pour le JSON
-        models_list = list(model_stats.values())
-        
-        # Ajouter des statistiques moyennes
-        for model in models_list:
-            if model["count"] > 0:
-                model["avg_tokens"] = model["total_tokens"] / model["count"]
-                model["avg_time"] = model["total_time"] / model["count"]
-        
-        return jsonify({"models": models_list})
+        return jsonify({"models": inference_history.summary()})
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération des statistiques d'utilisation: {str(e)}")
+        logger.error("Erreur lors de la récupération des statistiques d'utilisation: %s", e)
         return jsonify({"error": str(e), "models": []})
 
 @app.route('/api/stats/performance')
@@ -874,20 +1386,51 @@ def api_performance():
     
     return jsonify(performance_data)
 
-@app.route('/api/gpu-info')
-def api_gpu_info():
-    """API pour obtenir les informations sur tous les GPU disponibles"""
+@app.route('/api/ollama/backends')
+def api_ollama_backends():
+    """API pour obtenir l'état des serveurs Ollama"""
+    if request.args.get('refresh'):
+        ollama_pool.check_all()
+    return jsonify({'success': True, 'backends': ollama_pool.status()})
+
+@app.route('/debug/traces')
+def debug_traces():
+    """Traces des requêtes récentes (TRACING_ENABLED=true)"""
+    limit = request.args.get('limit', 50, type=int)
+    min_duration = request.args.get('min_ms', 0, type=float)
+    return jsonify({
+        'success': True,
+        'enabled': tracer.enabled,
+        'traces': tracer.recent(limit, min_duration)
+    })
+
+@app.route('/debug/traces/<trace_id>')
+def debug_trace(trace_id):
+    """Détail d'une trace"""
+    trace = tracer.get(trace_id)
+    if not trace:
+        return jsonify({'success': False, 'error': 'Trace introuvable'}), 404
+    return jsonify({'success': True, 'trace': trace})
+
+def read_gpu_info():
+    """
+    Informations sur tous les GPU disponibles (nvidia-smi).
+
+    Returns:
+        dict: gpus (index, name, utilization, memory_used, memory_total) et error en cas d'échec
+    """
     try:
-        result = subprocess.run(
-            ["nvidia-smi", "--query-gpu=index,name,utilization.gpu,memory.used,memory.total", "--format=csv,noheader,nounits"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        with track_subprocess('nvidia-smi'):
+            result = subprocess.run(
+                ["nvidia-smi", "--query-gpu=index,name,utilization.gpu,memory.used,memory.total", "--format=csv,noheader,nounits"],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
         
         if result.returncode != 0:
             logger.warning("Erreur lors de l'exécution de nvidia-smi")
-            return jsonify({"error": "Impossible d'exécuter nvidia-smi", "gpus": []})
+            return {"error": "Impossible d'exécuter nvidia-smi", "gpus": []}
         
         gpu_lines = result.stdout.strip().split('\n')
         gpus = []
@@ -903,169 +1446,613 @@ def api_gpu_info():
                     "memory_total": parts[4]
                 })
         
-        return jsonify({"gpus": gpus})
+        return {"gpus": gpus}
     except subprocess.TimeoutExpired:
         logger.error("Timeout lors de l'exécution de nvidia-smi")
-        return jsonify({"error": "Timeout lors de l'exécution de nvidia-smi", "gpus": []})
+        return {"error": "Timeout lors de l'exécution de nvidia-smi", "gpus": []}
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération des informations GPU: {str(e)}")
-        return jsonify({"error": str(e), "gpus": []})
+        logger.error("Erreur lors de la récupération des informations GPU: %s", e)
+        return {"error": str(e), "gpus": []}
+
+@app.route('/api/gpu-info')
+def api_gpu_info():
+    """API pour obtenir les informations sur tous les GPU disponibles"""
+    return jsonify(read_gpu_info())
+
+# Canal d'événements poussés aux pages (config.json: events)
+EVENTS_CONFIG = APP_CONFIG.get("events", {})
+# Au-delà, les modifications d'un projet sont résumées par « projet à relire »
+MAX_EVENT_CHANGES = 100
+event_bus = EventBus()
+REGISTRY.register_collector(event_bus.collect_metrics)
+# Avec gunicorn ou waitress, chaque connexion /api/events occupe un thread
+# (0 : pas de limite) ; asgi.py sert ce flux depuis la boucle asyncio
+EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', EVENTS_CONFIG.get('max_wsgi_streams', 4)))
+event_streams = threading.BoundedSemaphore(EVENTS_MAX_STREAMS) if EVENTS_MAX_STREAMS > 0 else None
+
+def read_models():
+    """
+    Modèles installés et modèle par défaut (sujet models du canal d'événements).
+
+    Returns:
+        dict: models, default et error si Ollama ne répond pas
+    """
+    try:
+        response = requests.get(f"{OLLAMA_API_BASE}/tags", timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return {"error": f"Erreur {response.status_code} lors de la récupération des modèles",
+                    "models": [], "default": get_current_model_name()}
+        return {"models": response.json().get("models", []), "default": get_current_model_name()}
+    except requests.exceptions.ConnectionError:
+        return {"error": "Impossible de se connecter à Ollama sur localhost:11434. Vérifiez que le service est en cours d'exécution.",
+                "models": [], "default": get_current_model_name()}
+    except requests.exceptions.Timeout:
+        return {"error": "Timeout lors de la connexion à Ollama", "models": [], "default": get_current_model_name()}
+
+event_bus.add_sampler('gpu', read_gpu_info, EVENTS_CONFIG.get('gpu_interval', 30))
+event_bus.add_sampler('models', read_models, EVENTS_CONFIG.get('models_interval', 30))
+event_bus.add_sampler('default_model', lambda: {'current': get_current_model_name()},
+                      EVENTS_CONFIG.get('default_model_interval', 5))
+
+def notify_models_changed():
+    """Relit sans attendre la liste des modèles et le modèle par défaut pour les pages abonnées"""
+    event_bus.refresh('models', 'default_model')
+
+class PullProgress:
+    """Publie l'avancement d'un téléchargement de modèle (sujet pull)"""
+
+    def __init__(self, model):
+        self.model = model
+        self._reported = None
+
+    def feed(self, line):
+        """
+        Traite une ligne JSON de la réponse de /api/pull d'Ollama.
+
+        Returns:
+            str: Message d'erreur renvoyé par Ollama, ou None
+        """
+        if not line:
+            return None
+        try:
+            status = json.loads(line)
+        except ValueError:
+            return None
+        if status.get('error'):
+            return status['error']
+
+        total, completed = status.get('total'), status.get('completed')
+        percent = int(100 * completed / total) if total and completed is not None else None
+        # Au plus un événement par étape et par point de pourcentage
+        if (status.get('status'), percent) != self._reported:
+            self._reported = (status.get('status'), percent)
+            event_bus.publish('pull', {'model': self.model, 'status': status.get('status'),
+                                       'percent': percent, 'done': False})
+        return None
+
+    def finish(self, error=None):
+        """Publie la fin du téléchargement"""
+        event_bus.publish('pull', {'model': self.model, 'status': 'error' if error else 'success',
+                                   'percent': None if error else 100, 'done': True, 'error': error})
+
+def publish_project_changes(project_id, changes):
+    """Publie les modifications d'un projet détectées par la surveillance (sujet projects)"""
+    if changes is not None and len(changes) > MAX_EVENT_CHANGES:
+        changes = None
+    event_bus.publish('projects', {'project_id': project_id, 'changes': changes})
+
+if project_watcher.running:
+    project_watcher.subscribe(publish_project_changes)
+github_connector.subscribe_jobs(lambda job: event_bus.publish('jobs', job))
+
+@app.route('/api/events')
+def api_events():
+    """
+    Flux d'événements du serveur (text/event-stream).
+
+    topics : sujets suivis, séparés par des virgules (tous par défaut) ;
+    l'en-tête Last-Event-ID (ou last_event_id) permet de reprendre après une
+    reconnexion. Au-delà de max_wsgi_streams connexions, la route répond 503
+    et les pages reviennent à l'interrogation périodique.
+    """
+    if event_streams is not None and not event_streams.acquire(blocking=False):
+        return jsonify({'success': False, 'error': "Trop de connexions au flux d'événements"}), 503
+
+    topics = [topic for topic in request.args.get('topics', '').split(',') if topic] or None
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscription = event_bus.subscribe(topics, last_event_id)
+    response = Response(
+        event_bus.stream(subscription, EVENTS_CONFIG.get('heartbeat', HEARTBEAT_INTERVAL)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Aussi quand le flux est abandonné avant d'avoir commencé
+    response.call_on_close(subscription.close)
+    if event_streams is not None:
+        response.call_on_close(event_streams.release)
+    return response
 
 @app.route('/api/diagnostic')
 def api_diagnostic():
-    """API pour effectuer un diagnostic complet de l'application"""
-    diagnosis = {
-        "timestamp": time.time(),
-        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "app_status": "ok",
-        "ollama": {
-            "installed": False,
-            "running": False,
-            "version": "unknown",
-            "models": []
-        },
-        "configuration": {
-            "default_model": "unknown",
-            "config_file_exists": False
-        },
-        "environment": {
-            "python_version": sys.version,
-            "platform": sys.platform,
-            "cuda_available": False,
-            "gpu_info": []
-        }
-    }
+    """
+    API pour effectuer un diagnostic complet de l'application.
     
-    # Vérifier si Ollama est installé
+    Les vérifications s'exécutent en parallèle sous un budget de temps
+    (budget, en secondes) et leurs résultats sont réutilisés quelques
+    secondes ; refresh=1 force une nouvelle exécution.
+    """
+    budget = min(request.args.get('budget', DEFAULT_BUDGET, type=float), MAX_DIAGNOSTIC_BUDGET)
+    report = run_diagnostic(diagnostic_runner, budget=budget, use_cache=request.args.get('refresh') != '1')
+    return jsonify(report)
+
+@app.route('/api/projects', methods=['GET'])
+def api_projects():
+    """API pour obtenir la liste des projets"""
     try:
-        which_result = subprocess.run(["which", "ollama"], capture_output=True, text=True)
-        if which_result.returncode == 0:
-            diagnosis["ollama"]["installed"] = True
-            diagnosis["ollama"]["path"] = which_result.stdout.strip()
-            
-            # Vérifier la version
-            try:
-                version_result = subprocess.run(["ollama", "--version"], capture_output=True, text=True)
-                if version_result.returncode == 0:
-                    diagnosis["ollama"]["version"] = version_result.stdout.strip()
-            except Exception as e:
-                logger.error(f"Erreur lors de la vérification de la version d'Ollama: {e}")
+        return jsonify({'success': True, 'projects': project_manager.get_projects()})
     except Exception as e:
-        logger.error(f"Erreur lors de la vérification de l'installation d'Ollama: {e}")
+        logger.error("Erreur lors de la récupération des projets: %s", e)
+        return jsonify({'success': False, 'error': f"Erreur: {str(e)}", 'projects': []})
+
+@app.route('/api/projects/<project_id>/files')
+def api_project_files(project_id):
+    """API pour obtenir la liste des fichiers d'un projet"""
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé', 'files': []}), 404
     
-    # Vérifier si Ollama est en cours d'exécution
-    diagnosis["ollama"]["running"] = check_ollama_running(retries=2)
+    return jsonify({'success': True, 'files': project_manager.get_project_files(project_id)})
+
+@app.route('/api/projects/<project_id>/index', methods=['GET'])
+def api_project_index_status(project_id):
+    """API pour obtenir l'état de l'index de recherche d'un projet"""
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
     
-    # Vérifier les modèles disponibles
-    if diagnosis["ollama"]["running"]:
-        try:
-            response = requests.get(f"{OLLAMA_API_BASE}/tags", timeout=REQUEST_TIMEOUT)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                diagnosis["ollama"]["models"] = [
-                    {
-                        "name": model.get("name", "unknown"),
-                        "size_mb": model.get("size", 0) // (1024 * 1024),
-                        "modified": model.get("modified", "unknown")
-                    }
-                    for model in models
-                ]
-        except Exception as e:
-            logger.error(f"Erreur lors de la récupération des modèles: {e}")
+    return jsonify({'success': True, 'index': embedding_index.status(project_id)})
+
+@app.route('/api/projects/<project_id>/index', methods=['POST'])
+def api_project_index_build(project_id):
+    """
+    API pour construire ou mettre à jour l'index de recherche d'un projet.
     
-    # Vérifier la configuration
-    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
-    diagnosis["configuration"]["config_file_exists"] = os.path.exists(config_path)
+    La mise à jour est faite en arrière-plan lorsque la surveillance des
+    projets est active (suivre l'avancement avec GET), immédiatement sinon
+    ou avec wait=1.
+    """
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
     
-    if diagnosis["configuration"]["config_file_exists"]:
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                diagnosis["configuration"]["default_model"] = config.get("default_model", "unknown")
-        except Exception as e:
-            logger.error(f"Erreur lors de la lecture de la configuration: {e}")
-            diagnosis["configuration"]["error"] = str(e)
+    if request.args.get('wait') != '1' and embedding_index.schedule_update(project_id):
+        return jsonify({'success': True, 'scheduled': True, 'index': embedding_index.status(project_id)})
+    
+    result = embedding_index.update_project(project_id)
+    if result is None:
+        error = embedding_index.status(project_id).get('error') or "Erreur lors de l'indexation"
+        return jsonify({
+            'success': False,
+            'error': f"{error} (modèle d'embeddings: {embedding_index.model}, téléchargez-le avec 'ollama pull {embedding_index.model}')"
+        })
+    return jsonify({'success': True, 'scheduled': False, 'result': result, 'index': embedding_index.status(project_id)})
+
+@app.route('/api/projects/<project_id>/index', methods=['DELETE'])
+def api_project_index_delete(project_id):
+    """API pour supprimer l'index de recherche d'un projet"""
+    return jsonify({'success': True, 'deleted': embedding_index.drop(project_id)})
+
+@app.route('/api/projects/<project_id>/search')
+def api_project_search(project_id):
+    """API de recherche sémantique dans les documents d'un projet (q, k)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'Requête manquante', 'results': []})
+    
+    start = time.perf_counter()
+    results = embedding_index.search(project_id, query, k=min(request.args.get('k', 5, type=int), 50))
+    if results is None:
+        error = embedding_index.status(project_id).get('error') or "Projet non indexé"
+        return jsonify({'success': False, 'error': error, 'results': []})
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+    })
+
+@app.route('/project/<project_id>/document/<path:document_path>')
+def document_editor(project_id, document_path):
+    """Page d'édition d'un document (paginée pour les documents volumineux)"""
+    document = project_manager.get_document(project_id, document_path)
+    if not document:
+        return render_template('error-pages.html'), 404
+    
+    page = None
+    if document['large']:
+        # Document volumineux : seule la première fenêtre de lignes (bornée en octets) est envoyée à l'éditeur
+        page = project_manager.read_document_lines(project_id, document_path, 0, DEFAULT_LINE_WINDOW)
+        content = page.pop('content') if page else ""
+    else:
+        content = project_manager.get_document_content(project_id, document_path) or ""
+    
+    return render_template('document_editor.html', project_id=project_id, document=document, content=content,
+                           partial=page)
+
+@app.route('/api/projects/<project_id>/documents/<path:document_path>', methods=['GET'])
+def api_get_document(project_id, document_path):
+    """
+    API pour récupérer un document et son contenu.
+    
+    Les documents volumineux sont renvoyés par page : soit par plage d'octets
+    (paramètres offset et length), soit par fenêtre de lignes (paramètres
+    start_line et lines).
+    """
+    document = project_manager.get_document(project_id, document_path)
+    if not document:
+        return jsonify({'success': False, 'error': 'Document non trouvé'}), 404
     
-    # Vérifier l'environnement
-    diagnosis["environment"]["cuda_available"] = False
     try:
-        import torch
-        diagnosis["environment"]["cuda_available"] = torch.cuda.is_available()
-        if diagnosis["environment"]["cuda_available"]:
-            diagnosis["environment"]["cuda_version"] = torch.version.cuda
-            diagnosis["environment"]["gpu_name"] = torch.cuda.get_device_name(0)
+        if 'start_line' in request.args or 'lines' in request.args:
+            page = project_manager.read_document_lines(
+                project_id, document_path,
+                request.args.get('start_line', 0, type=int),
+                request.args.get('lines', DEFAULT_LINE_WINDOW, type=int)
+            )
+        elif 'offset' in request.args or 'length' in request.args or document['large']:
+            page = project_manager.read_document_range(
+                project_id, document_path,
+                request.args.get('offset', 0, type=int),
+                request.args.get('length', DEFAULT_CHUNK_SIZE, type=int)
+            )
+        else:
+            content = project_manager.get_document_content(project_id, document_path)
+            if content is None:
+                return jsonify({'success': False, 'error': 'Impossible de lire le document'})
+            return jsonify({'success': True, 'document': document, 'content': content, 'paginated': False})
+        
+        if page is None:
+            return jsonify({'success': False, 'error': 'Impossible de lire le document'})
+        
+        return jsonify({
+            'success': True,
+            'document': document,
+            'content': page.pop('content'),
+            'paginated': True,
+            'page': page
+        })
     except Exception as e:
-        logger.error(f"Erreur lors de la vérification de CUDA: {e}")
+        logger.error("Erreur lors de la lecture du document %s pour %s: %s", document_path, project_id, e)
+        return jsonify({'success': False, 'error': f"Erreur: {str(e)}"})
+
+@app.route('/api/projects/<project_id>/documents/<path:document_path>/raw')
+def api_get_document_raw(project_id, document_path):
+    """API pour télécharger le contenu brut d'un document en streaming"""
+    chunks = project_manager.iter_document_chunks(project_id, document_path)
+    if chunks is None:
+        return jsonify({'success': False, 'error': 'Document non trouvé'}), 404
+    
+    document = project_manager.get_document(project_id, document_path)
+    headers = {}
+    if document:
+        headers['Content-Length'] = str(document['size'])
+    
+    return Response(stream_with_context(chunks), mimetype='application/octet-stream', headers=headers)
+
+@app.route('/api/projects/<project_id>/export')
+def api_export_project(project_id):
+    """
+    API pour télécharger un projet sous forme d'archive générée en streaming.
     
-    # Vérifier les GPU
+    Paramètres: format ('zip' ou 'tar.gz') et types (liste de types de
+    fichiers séparés par des virgules, par exemple 'code,markdown').
+    """
+    archive_format = request.args.get('format', 'zip')
+    types = request.args.get('types')
+    file_types = [t.strip() for t in types.split(',') if t.strip()] if types else None
+    
+    if archive_format not in ('zip', 'tar.gz'):
+        return jsonify({'success': False, 'error': f"Format d'archive non pris en charge: {archive_format}"}), 400
+    
+    chunks = project_manager.export_project(project_id, archive_format, file_types)
+    if chunks is None:
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
+    
+    mimetype = 'application/zip' if archive_format == 'zip' else 'application/gzip'
+    headers = {'Content-Disposition': f'attachment; filename="{project_id}.{archive_format}"'}
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@app.route('/api/projects/<project_id>/import-archive', methods=['POST'])
+def api_import_archive(project_id):
+    """
+    API pour importer une archive (zip ou tar.gz) dans un projet.
+    
+    L'archive est envoyée soit comme corps brut de la requête, soit comme
+    fichier 'file' d'un formulaire multipart. Elle est extraite au fil de la
+    lecture, sans être chargée en mémoire.
+    """
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
+    
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'success': False, 'error': 'Aucun fichier fourni'}), 400
+        stream = upload.stream
+        filename = upload.filename or ''
+    else:
+        stream = request.stream
+        filename = ''
+    
+    # Déterminer le format à partir du paramètre, du nom de fichier ou du type MIME
+    archive_format = request.args.get('format')
+    if not archive_format:
+        if filename.endswith(('.tar.gz', '.tgz')) or request.mimetype in ('application/gzip', 'application/x-gzip'):
+            archive_format = 'tar.gz'
+        else:
+            archive_format = 'zip'
+    
+    types = request.args.get('types')
+    file_types = [t.strip() for t in types.split(',') if t.strip()] if types else None
+    
+    extracted = project_manager.import_archive(project_id, stream, archive_format, file_types)
+    if extracted is None:
+        return jsonify({'success': False, 'error': "Erreur lors de l'importation de l'archive"})
+    
+    return jsonify({'success': True, 'files': extracted, 'count': len(extracted)})
+
+@app.route('/api/github/config', methods=['GET'])
+def api_github_config():
+    """API pour savoir si des identifiants GitHub sont configurés"""
+    return jsonify({'success': True, 'configured': github_connector.configured, 'username': github_connector.username})
+
+@app.route('/api/github/config', methods=['POST'])
+def api_github_save_config():
+    """API pour enregistrer les identifiants GitHub (username, token)"""
+    data = request.get_json(silent=True) or {}
+    token = (data.get('token') or '').strip()
+    if not token:
+        return jsonify({'success': False, 'error': "Token d'accès manquant"}), 400
+    
+    if not github_connector.save_credentials((data.get('username') or '').strip() or None, token):
+        return jsonify({'success': False, 'error': "Erreur lors de l'enregistrement des identifiants"})
+    github_connector.warm_cache()
+    return jsonify({'success': True})
+
+@app.route('/api/github/config', methods=['DELETE'])
+def api_github_delete_config():
+    """API pour oublier les identifiants GitHub"""
+    github_connector.clear_credentials()
+    return jsonify({'success': True})
+
+@app.route('/api/github/test-connection')
+def api_github_test_connection():
+    """API pour vérifier la connexion à GitHub (résultat en cache, refresh=1 pour revérifier)"""
+    if not github_connector.configured:
+        return jsonify({'success': False, 'error': 'GitHub non configuré'})
+    
+    user = github_connector.test_connection(refresh=request.args.get('refresh') == '1')
+    if not user:
+        return jsonify({'success': False, 'error': 'Connexion à GitHub impossible'})
+    return jsonify({'success': True, 'user': user})
+
+@app.route('/api/github/repositories', methods=['GET'])
+def api_github_repositories():
+    """
+    API pour lister les dépôts GitHub de l'utilisateur.
+    
+    La liste vient du cache, mis à jour en arrière-plan (refresh=1 pour le
+    forcer) ; cache.repositories.complete est faux tant que toutes les pages
+    n'ont pas été reçues.
+    """
+    repositories = github_connector.list_repositories(refresh=request.args.get('refresh') == '1')
+    cache = github_connector.cache_status()
+    if repositories is None:
+        error = cache['repositories']['error'] or 'Impossible de récupérer les dépôts GitHub'
+        return jsonify({'success': False, 'error': error, 'repositories': [], 'cache': cache})
+    return jsonify({'success': True, 'repositories': repositories, 'cache': cache})
+
+@app.route('/api/github/repositories', methods=['POST'])
+def api_github_create_repository():
+    """API pour créer un dépôt GitHub (name, description, private)"""
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'success': False, 'error': 'Nom du dépôt manquant'}), 400
+    
+    repository = github_connector.create_repository(name, data.get('description', ''), data.get('private', True))
+    if not repository:
+        return jsonify({'success': False, 'error': 'Erreur lors de la création du dépôt'})
+    return jsonify({'success': True, 'repository': repository})
+
+def github_job_response(job, wait, **extra):
+    """Réponse d'une opération git : état de la tâche, attendue jusqu'à la fin si wait"""
+    if wait:
+        job = github_connector.wait_job(job['id'])
+    if job['status'] == 'failed':
+        return jsonify({'success': False, 'error': job['error'], 'job': job})
+    return jsonify({'success': True, 'job': job, 'result': job['result'], **extra})
+
+def clone_into_project(project_id, source, branch=None, depth=None, progress=None):
+    """Clone un dépôt dans un nouveau projet, supprimé si le clonage échoue"""
     try:
-        result = subprocess.run(
-            ["nvidia-smi", "--query-gpu=index,name,utilization.gpu,memory.used,memory.total", "--format=csv,noheader,nounits"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.returncode == 0:
-            gpu_lines = result.stdout.strip().split('\n')
-            for line in gpu_lines:
-                parts = [part.strip() for part in line.split(',')]
-                if len(parts) >= 5:
-                    diagnosis["environment"]["gpu_info"].append({
-                        "index": parts[0],
-                        "name": parts[1],
-                        "utilization": parts[2],
-                        "memory_used": parts[3],
-                        "memory_total": parts[4]
-                    })
+        return github_connector.clone(project_id, source, branch=branch, depth=depth, progress=progress)
+    except Exception:
+        project_manager.delete_project(project_id)
+        raise
+
+@app.route('/api/github/clone', methods=['POST'])
+def api_github_clone():
+    """
+    API pour importer un dépôt dans un nouveau projet.
+    
+    repo_full_name accepte owner/repo, une URL git ou le chemin d'un dépôt
+    local situé dans github.local_roots. Le projet est créé immédiatement et le clonage (superficiel et
+    partiel) se poursuit en arrière-plan : suivre l'avancement avec
+    /api/github/jobs/<id>, ou passer wait=true pour attendre la fin.
+    """
+    data = request.get_json(silent=True) or {}
+    source = (data.get('repo_full_name') or data.get('url') or '').strip()
+    if not source:
+        return jsonify({'success': False, 'error': 'Dépôt manquant'}), 400
+    
+    name = data.get('name') or os.path.basename(source.rstrip('/')).removesuffix('.git')
+    project = project_manager.create_project(name, data.get('description', f"Importé depuis {source}"))
+    if not project:
+        return jsonify({'success': False, 'error': 'Erreur lors de la création du projet'})
+    project_manager.update_project(project['id'], {'github_repo': source})
+    
+    job = github_connector.start_job(
+        'clone', project['id'], clone_into_project, project['id'], source,
+        branch=data.get('branch'), depth=data.get('depth')
+    )
+    return github_job_response(job, data.get('wait', False), project=project)
+
+@app.route('/api/github/projects/<project_id>/link', methods=['POST'])
+def api_github_link(project_id):
+    """API pour lier un projet à un dépôt (repo_full_name)"""
+    data = request.get_json(silent=True) or {}
+    source = (data.get('repo_full_name') or '').strip()
+    if not source:
+        return jsonify({'success': False, 'error': 'Dépôt manquant'}), 400
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
+    
+    try:
+        result = github_connector.link(project_id, source)
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération des informations GPU: {e}")
-    
-    return jsonify(diagnosis)
-
-@app.route('/static/img/<path:filename>')
-def static_images(filename):
-    """Route pour servir les images statiques"""
-    if filename == "chart-placeholder.png":
-        # Générer une image placeholder si elle n'existe pas
-        placeholder_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "img")
-        if not os.path.exists(placeholder_dir):
-            os.makedirs(placeholder_dir)
-        
-        placeholder_path = os.path.join(placeholder_dir, "chart-placeholder.png")
-        
-        if not os.path.exists(placeholder_path):
-            # Créer une image placeholder simple avec PIL
-            try:
-                from PIL import Image, ImageDraw
-                
-                img = Image.new('RGB', (500, 300), color=(30, 41, 59))
-                d = ImageDraw.Draw(img)
-                
-                # Dessiner des lignes de graphique aléatoires
-                import random
-                
-                # Grille
-                for i in range(0, 500, 50):
-                    d.line([(i, 0), (i, 300)], fill=(52, 65, 87), width=1)
-                for i in range(0, 300, 50):
-                    d.line([(0, i), (500, i)], fill=(52, 65, 87), width=1)
-                
-                # Ligne de graphique fictive
-                points = [(i, random.randint(150, 250)) for i in range(0, 500, 50)]
-                for i in range(len(points) - 1):
-                    d.line([points[i], points[i+1]], fill=(14, 165, 233), width=3)
-                
-                img.save(placeholder_path)
-            except Exception as e:
-                logger.error(f"Erreur lors de la création de l'image placeholder: {e}")
-                return "Image non disponible", 404
+        logger.error("Erreur lors de la liaison du projet %s à %s: %s", project_id, source, e)
+        return jsonify({'success': False, 'error': str(e)})
+    project_manager.update_project(project_id, {'github_repo': source})
+    return jsonify({'success': True, 'result': result})
+
+@app.route('/api/github/projects/<project_id>/pull', methods=['POST'])
+def api_github_pull(project_id):
+    """API pour récupérer les nouveaux commits d'un projet lié (wait=false pour ne pas attendre)"""
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    job = github_connector.start_job('pull', project_id, github_connector.pull, project_id)
+    return github_job_response(job, data.get('wait', True))
+
+@app.route('/api/github/projects/<project_id>/push', methods=['POST'])
+def api_github_push(project_id):
+    """API pour valider et envoyer les modifications d'un projet lié (message)"""
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
     
-    return send_from_directory('static/img', filename)
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip() or "Mise à jour depuis Assistant IA"
+    job = github_connector.start_job('push', project_id, github_connector.push, project_id, message)
+    return github_job_response(job, data.get('wait', True))
+
+@app.route('/api/github/projects/<project_id>/status')
+def api_github_status(project_id):
+    """API pour obtenir l'état git d'un projet et ses opérations récentes"""
+    if not project_manager.get_project(project_id):
+        return jsonify({'success': False, 'error': 'Projet non trouvé'}), 404
+    
+    return jsonify({
+        'success': True,
+        'status': github_connector.status(project_id),
+        'jobs': github_connector.list_jobs(project_id)
+    })
+
+@app.route('/api/github/jobs/<job_id>')
+def api_github_job(job_id):
+    """API pour suivre l'avancement d'une opération git (étape, pourcentage)"""
+    job = github_connector.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Opération inconnue'}), 404
+    return jsonify({'success': True, 'job': job})
+
+def load_chart_stats():
+    """
+    Statistiques d'inférence affichées par les graphiques.
+
+    Returns:
+        dict: Totaux par modèle sur tout l'historique (models) et dernières
+              inférences (recent), vides si l'historique est illisible
+    """
+    try:
+        return {'models': inference_history.summary(), 'recent': inference_history.recent(DEFAULT_POINTS)}
+    except Exception as e:
+        logger.error("Erreur lors de la lecture des statistiques d'inférence: %s", e)
+        return {'models': [], 'recent': []}
+
+def chart_url(name, version=None):
+    """URL d'un graphique des statistiques, versionnée dès qu'il est dessiné"""
+    if version is None:
+        chart = chart_renderer.get(name)
+        version = chart['version'] if chart else None
+    url = url_for('api_stats_chart', name=name)
+    return f"{url}?v={version}" if version else url
+
+def publish_charts(versions):
+    """Publie les URLs des graphiques redessinés (sujet charts)"""
+    event_bus.publish('charts', {
+        'charts': {name: {'version': version, 'url': f"/api/stats/charts/{name}.png?v={version}"}
+                   for name, version in versions.items()}
+    }, retain=True)
+
+# Images fixes (image d'attente, favicon) générées une fois, puis servies comme fichiers statiques
+build_assets(os.path.join(app.static_folder, 'img'))
+# Graphiques des statistiques dessinés en arrière-plan à chaque changement des données
+chart_renderer = ChartRenderer(
+    os.path.join(DATA_DIR, "stats", "charts"),
+    load_chart_stats, on_render=publish_charts)
+chart_renderer.start()
+app.add_template_global(chart_url)
+
+@app.route('/api/stats/charts')
+def api_stats_charts():
+    """API pour récupérer les versions et URLs des graphiques des statistiques"""
+    versions = chart_renderer.status()
+    return jsonify({
+        'success': True,
+        'available': chart_renderer.available,
+        'charts': {name: {'version': versions.get(name), 'url': chart_url(name, versions.get(name))}
+                   for name in chart_renderer.charts}
+    })
+
+@app.route('/api/stats/charts/<name>.png')
+def api_stats_chart(name):
+    """
+    Image d'un graphique des statistiques.
+
+    L'URL versionnée (?v=<version>) est mise en cache sans revalidation ;
+    sans version, ou avec une version périmée, le graphique courant est
+    servi avec revalidation (ETag). Avant le premier rendu, l'image
+    d'attente est servie à sa place.
+    """
+    if name not in chart_renderer.charts:
+        return jsonify({'success': False, 'error': 'Graphique inconnu'}), 404
+
+    chart = chart_renderer.get(name)
+    if chart is None or not os.path.exists(chart['path']):
+        response = send_from_directory(os.path.join(app.static_folder, 'img'), 'chart-placeholder.png',
+                                       max_age=0)
+        response.cache_control.no_cache = True
+        return response
+
+    response = send_file(chart['path'], mimetype='image/png', etag=chart['version'],
+                         last_modified=chart['rendered_at'], conditional=True)
+    if request.args.get('v') == chart['version']:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = SERVER_CONFIG.get('static_max_age', DEFAULT_STATIC_MAX_AGE)
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
 
 # Exécuter la vérification des dépendances au démarrage
 with app.app_context():
     check_dependencies()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Serveur de développement ; en production, utilisez serve.py
+    app.run(
+        host=SERVER_CONFIG.get('host', '0.0.0.0'),
+        port=int(os.environ.get('PORT', SERVER_CONFIG.get('port', 5000))),
+        debug=os.environ.get('FLASK_DEBUG', str(SERVER_CONFIG.get('debug', True))).lower() in ('1', 'true'),
+        threaded=True
+    )
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Configuration des logs de l'application.
+
+Les enregistrements sont placés dans une file par un QueueHandler puis
+écrits par un thread (QueueListener) dans un fichier à rotation par taille
+et sur la console : les requêtes n'attendent jamais le disque. Le niveau est
+appliqué sur le logger racine, si bien que les messages filtrés ne sont
+même pas construits, à condition de passer les valeurs en arguments
+(logger.info("... %s", valeur)) plutôt que dans une f-string. Le message
+des autres est construit au moment de l'appel (les arguments modifiés
+ensuite sont journalisés dans leur état d'alors) ; sa mise en forme et son
+écriture sont faites par le thread d'écriture.
+
+Paramètres (config.json, section "logging") : level, format,
+file_rotation_size, file_backup_count ; les variables d'environnement
+LOG_LEVEL, ENABLE_FILE_LOGGING, MAX_LOG_SIZE_MB et LOG_BACKUP_COUNT sont
+prioritaires.
+"""
+import os
+import copy
+import queue
+import atexit
+import logging
+import logging.handlers
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_ROTATION_SIZE = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+# Taille maximale de la file des enregistrements en attente d'écriture
+LOG_QUEUE_SIZE = 10000
+# Mise en forme des traces d'exception avant leur passage dans la file
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler qui abandonne les enregistrements si la file est pleine plutôt que de bloquer"""
+
+    def prepare(self, record):
+        """
+        Fige le message (msg % args) et la trace de l'exception, comme le
+        QueueHandler standard, pour que le thread d'écriture ne voie pas
+        des arguments modifiés entre-temps. La mise en forme (date, format)
+        reste faite par le thread d'écriture.
+        """
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+def setup_logging(config=None, log_dir="logs", log_name="app.log"):
+    """
+    Configure le logger racine avec une écriture asynchrone.
+
+    Args:
+        config (dict): Section "logging" de config.json
+        log_dir (str): Répertoire des fichiers de logs
+        log_name (str): Nom du fichier de logs
+
+    Returns:
+        logging.handlers.QueueListener: Thread d'écriture (arrêté automatiquement à la sortie)
+    """
+    config = config or {}
+    level_name = os.environ.get('LOG_LEVEL', config.get('level', 'INFO')).upper()
+    level = getattr(logging, level_name, logging.INFO)
+    formatter = logging.Formatter(config.get('format', DEFAULT_FORMAT))
+
+    handlers = []
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    handlers.append(console)
+
+    if os.environ.get('ENABLE_FILE_LOGGING', 'true').lower() == 'true':
+        max_bytes = config.get('file_rotation_size', DEFAULT_ROTATION_SIZE)
+        if os.environ.get('MAX_LOG_SIZE_MB'):
+            max_bytes = int(float(os.environ['MAX_LOG_SIZE_MB']) * 1024 * 1024)
+        backup_count = int(os.environ.get('LOG_BACKUP_COUNT', config.get('file_backup_count', DEFAULT_BACKUP_COUNT)))
+
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, log_name),
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding='utf-8',
+                delay=True
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            logging.getLogger(__name__).warning("Logs sur fichier désactivés: %s", e)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
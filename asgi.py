@@ -0,0 +1,410 @@
+"""
+Point d'entrée ASGI : routes d'inférence asynchrones et application Flask.
+
+    python serve.py --server uvicorn
+    uvicorn asgi:application --port 5000
+
+Les routes qui attendent Ollama (POST /api/test-model, /api/download-model
+et /api/chat) sont servies par la boucle asyncio avec un client httpx : une
+génération ou un téléchargement en cours n'occupe aucun thread, si bien
+qu'un seul processus peut en suivre des centaines. Le flux d'événements
+/api/events est servi de la même façon. Toutes les autres routes
+sont transmises sans modification à l'application Flask, exécutée dans un
+pool de threads (a2wsgi). Les réponses, la session (cookie signé de Flask),
+les métriques et les traces sont identiques à celles des routes Flask.
+"""
+import os
+import time
+import asyncio
+import logging
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+
+from app import (
+    app as flask_app, ollama_pool, tracer, INFERENCE_CONFIG, REQUEST_TIMEOUT,
+    HTTP_REQUESTS, HTTP_REQUEST_DURATION, conversation_manager, get_chat_conversation, build_chat_request,
+    finish_chat_turn, retrieve_project_context, save_inference_stats, set_default_model_if_missing,
+    run_inference_script, run_model_manager_pull, event_bus, EVENTS_CONFIG, PullProgress, notify_models_changed
+)
+from event_bus import HEARTBEAT_INTERVAL, RETRY_DELAY_MS
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Connexions simultanées maximales vers les serveurs Ollama
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 1000))
+# Threads exécutant les autres routes de l'application Flask
+WSGI_THREADS = int(os.environ.get('WEB_THREADS', 8))
+# Un téléchargement de modèle n'a pas de durée maximale
+PULL_TIMEOUT = httpx.Timeout(REQUEST_TIMEOUT, read=None)
+# Attente entre deux tentatives d'acquisition du verrou d'une conversation
+CONVERSATION_LOCK_POLL = 0.05
+
+OLLAMA_NOT_RUNNING = "Ollama n'est pas en cours d'exécution. Démarrez le service avec 'ollama serve'."
+
+_client = None
+
+def get_client():
+    """Client HTTP partagé par les routes asynchrones (créé dans la boucle courante)"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=64),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, pool=None)
+        )
+    return _client
+
+async def close_client():
+    """Ferme le client HTTP partagé"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def call_flask(function, *args):
+    """
+    Exécute dans un thread une fonction de app.py qui renvoie une réponse jsonify().
+
+    Returns:
+        dict: Contenu JSON de la réponse
+    """
+    def run():
+        with flask_app.app_context():
+            return function(*args).get_json()
+    return await asyncio.to_thread(run)
+
+async def check_ollama_running(retries=1):
+    """Vérifie si Ollama est en cours d'exécution avec support de retry"""
+    with span('check_ollama_running'):
+        for attempt in range(retries):
+            try:
+                response = await ollama_pool.arequest(get_client(), 'GET', '/tags', timeout=REQUEST_TIMEOUT)
+                if response.status_code == 200:
+                    return True
+                logger.warning("Tentative %s/%s: Ollama répond mais avec le code %s", attempt + 1, retries, response.status_code)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                logger.warning("Tentative %s/%s: Impossible de se connecter à Ollama", attempt + 1, retries)
+            except httpx.TimeoutException:
+                logger.warning("Tentative %s/%s: Timeout lors de la connexion à Ollama", attempt + 1, retries)
+            except Exception as e:
+                logger.warning("Tentative %s/%s: Erreur lors de la connexion à Ollama: %s", attempt + 1, retries, e)
+
+            if attempt < retries - 1:
+                await asyncio.sleep(1)
+
+        return False
+
+async def test_model(data, session):
+    """Version asynchrone de /api/test-model"""
+    if not data:
+        return {'success': False, 'error': 'Données JSON manquantes'}
+
+    model = data.get('model')
+    prompt = data.get('prompt')
+    temperature = data.get('temperature', 0.7)
+    max_tokens = data.get('max_tokens', 500)
+
+    if not model or not prompt:
+        return {'success': False, 'error': 'Modèle ou prompt manquant'}
+
+    try:
+        if not await check_ollama_running(retries=3):
+            return {'success': False, 'error': OLLAMA_NOT_RUNNING}
+
+        try:
+            request_data = {
+                "model": model,
+                "prompt": prompt,
+                "stream": False,
+                "options": {
+                    "temperature": float(temperature),
+                    "max_tokens": int(max_tokens)
+                }
+            }
+            response = await ollama_pool.arequest(
+                get_client(), 'POST', '/generate', model=model, json=request_data, timeout=60)
+
+            if response.status_code == 200:
+                generated_text = response.json().get("response", "")
+                await asyncio.to_thread(save_inference_stats, model, prompt, max_tokens, generated_text)
+                return {
+                    'success': True,
+                    'response': generated_text,
+                    'model': model,
+                    'tokens': len(generated_text.split())  # Estimation grossière des tokens
+                }
+
+            logger.error("Erreur lors de l'appel à l'API: Code %s", response.status_code)
+            if "not found" in response.text.lower():
+                return {'success': False, 'error': f"Modèle '{model}' non trouvé. Téléchargez-le d'abord."}
+
+            # Essayer avec le script run-inference.py comme fallback
+            return await call_flask(run_inference_script, model, prompt, temperature, max_tokens)
+        except httpx.TimeoutException:
+            logger.warning("Timeout lors de l'appel à l'API. Tentative via run-inference.py")
+            return await call_flask(run_inference_script, model, prompt, temperature, max_tokens)
+        except Exception as e:
+            logger.error("Erreur lors de l'appel à l'API: %s", e)
+            return await call_flask(run_inference_script, model, prompt, temperature, max_tokens)
+    except Exception as e:
+        logger.error("Exception lors du test du modèle %s: %s", model, e)
+        return {'success': False, 'error': f"Erreur: {str(e)}"}
+
+async def download_model(data, session):
+    """Version asynchrone de /api/download-model, sans délai maximal pour le téléchargement"""
+    model = (data or {}).get('model')
+    if not model:
+        return {'success': False, 'error': 'Nom de modèle non fourni'}
+
+    try:
+        if not await check_ollama_running(retries=3):
+            return {'success': False, 'error': OLLAMA_NOT_RUNNING}
+
+        try:
+            # Les opérations de gestion des modèles visent le premier serveur ;
+            # l'avancement est publié sur le canal d'événements (sujet pull)
+            async with get_client().stream(
+                'POST',
+                f"{ollama_pool.primary}/pull",
+                json={"name": model},
+                timeout=PULL_TIMEOUT
+            ) as response:
+                if response.status_code == 200:
+                    progress = PullProgress(model)
+                    error = None
+                    async for line in response.aiter_lines():
+                        error = progress.feed(line)
+                        if error:
+                            break
+                    progress.finish(error)
+                    if error:
+                        return {'success': False, 'error': f"Erreur lors du téléchargement: {error}"}
+
+                    await asyncio.to_thread(set_default_model_if_missing, model)
+                    notify_models_changed()
+                    return {'success': True, 'message': f"Modèle {model} téléchargé avec succès"}
+
+            logger.error("Erreur lors du téléchargement via l'API: %s", response.status_code)
+        except Exception as e:
+            logger.error("Erreur lors du téléchargement via l'API: %s", e)
+
+        # Essayer avec manage-models.py comme fallback
+        return await call_flask(run_model_manager_pull, model)
+    except Exception as e:
+        logger.error("Exception lors du téléchargement du modèle %s: %s", model, e)
+        return {'success': False, 'error': f"Erreur: {str(e)}"}
+
+async def chat(data, session):
+    """Version asynchrone de POST /api/chat"""
+    if not data:
+        return {'success': False, 'error': 'Données JSON manquantes'}
+
+    if not data.get('message'):
+        return {'success': False, 'error': 'Message manquant'}
+
+    conversation = get_chat_conversation(data, data.get('conversation_id') or session.get('chat_id'))
+    session['chat_id'] = conversation.id
+    context = None
+    if data.get('project_id'):
+        context = await asyncio.to_thread(retrieve_project_context, data['project_id'], data['message'])
+
+    # Les tours d'une même conversation restent séquentiels, sans bloquer la boucle
+    while not conversation.lock.acquire(blocking=False):
+        await asyncio.sleep(CONVERSATION_LOCK_POLL)
+    try:
+        snapshot = conversation_manager.snapshot(conversation)
+        request_data = build_chat_request(conversation, data, context)
+
+        try:
+            response = await ollama_pool.arequest(
+                get_client(),
+                'POST',
+                '/chat',
+                model=conversation.model,
+                json=request_data,
+                timeout=INFERENCE_CONFIG.get('request_timeout', 120)
+            )
+            if response.status_code == 404:
+                conversation_manager.restore(conversation, snapshot)
+                return {
+                    'success': False,
+                    'error': f"Modèle '{conversation.model}' non trouvé. Téléchargez-le d'abord."
+                }
+            response.raise_for_status()
+            result = response.json()
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            conversation_manager.restore(conversation, snapshot)
+            return {
+                'success': False,
+                'error': "Impossible de se connecter à Ollama. Vérifiez que le service est en cours d'exécution."
+            }
+        except Exception as e:
+            conversation_manager.restore(conversation, snapshot)
+            logger.error("Erreur lors de l'appel à l'API chat: %s", e)
+            return {'success': False, 'error': f"Erreur: {str(e)}"}
+
+        return await asyncio.to_thread(finish_chat_turn, conversation, data, request_data, result, context)
+    finally:
+        conversation.lock.release()
+
+# Routes servies par la boucle asyncio : (méthode, chemin) -> gestionnaire
+ASYNC_ROUTES = {
+    ('POST', '/api/test-model'): test_model,
+    ('POST', '/api/download-model'): download_model,
+    ('POST', '/api/chat'): chat
+}
+
+def load_session(headers):
+    """Lit la session Flask (cookie signé) des en-têtes de la requête"""
+    cookies = SimpleCookie(headers.get(b'cookie', b'').decode('latin-1'))
+    name = flask_app.config['SESSION_COOKIE_NAME']
+    if name not in cookies:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        return dict(serializer.loads(cookies[name].value, max_age=max_age))
+    except BadSignature:
+        return {}
+
+def session_cookie(data):
+    """En-tête Set-Cookie de la session Flask, avec les options de configuration de l'application"""
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    config = flask_app.config
+    parts = [
+        f"{config['SESSION_COOKIE_NAME']}={serializer.dumps(data)}",
+        f"Path={config['SESSION_COOKIE_PATH'] or config['APPLICATION_ROOT'] or '/'}"
+    ]
+    if config['SESSION_COOKIE_DOMAIN']:
+        parts.append(f"Domain={config['SESSION_COOKIE_DOMAIN']}")
+    if config['SESSION_COOKIE_HTTPONLY']:
+        parts.append("HttpOnly")
+    if config['SESSION_COOKIE_SECURE']:
+        parts.append("Secure")
+    if config['SESSION_COOKIE_SAMESITE']:
+        parts.append(f"SameSite={config['SESSION_COOKIE_SAMESITE']}")
+    return "; ".join(parts).encode('latin-1')
+
+async def read_json(receive):
+    """Lit le corps JSON de la requête (None s'il est absent ou invalide)"""
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        return flask_app.json.loads(body) if body else None
+    except ValueError:
+        return None
+
+async def handle_async_route(handler, scope, receive, send):
+    """Exécute une route asynchrone et envoie sa réponse JSON"""
+    method, path = scope['method'], scope['path']
+    start = time.perf_counter()
+    root = tracer.start_trace(f"{method} {path}", path=path)
+    status = 500
+
+    try:
+        headers = dict(scope['headers'])
+        session = load_session(headers)
+        chat_id = session.get('chat_id')
+
+        payload = await handler(await read_json(receive), session)
+        status = 200
+
+        response_headers = [(b'content-type', b'application/json')]
+        if session.get('chat_id') != chat_id:
+            response_headers.append((b'set-cookie', session_cookie(session)))
+        body = flask_app.json.dumps(payload, separators=(',', ':')).encode('utf-8') + b"\n"
+        response_headers.append((b'content-length', str(len(body)).encode()))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': body})
+    except Exception as e:
+        if root is not None:
+            root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        HTTP_REQUESTS.inc(method=method, route=path, status=str(status))
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=method, route=path)
+        tracer.finish_trace(root, status=status)
+
+async def wait_disconnect(receive):
+    """Attend la déconnexion du client"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def stream_events(scope, receive, send):
+    """Version asynchrone de /api/events : un abonnement par connexion, sans thread"""
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    headers = dict(scope['headers'])
+    topics = [topic for value in query.get('topics', []) for topic in value.split(',') if topic] or None
+    last_event_id = headers.get(b'last-event-id', b'').decode('latin-1') or query.get('last_event_id', [None])[0]
+    heartbeat = EVENTS_CONFIG.get('heartbeat', HEARTBEAT_INTERVAL)
+
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    subscription = event_bus.subscribe(topics, last_event_id,
+                                       notify=lambda: loop.call_soon_threadsafe(ready.set))
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+        await send({'type': 'http.response.body', 'body': f"retry: {RETRY_DELAY_MS}\n\n".encode(), 'more_body': True})
+        while not disconnect.done():
+            ready.clear()
+            events = subscription.drain()
+            if events:
+                body = "".join(event.encode() for event in events)
+            else:
+                waiter = asyncio.ensure_future(ready.wait())
+                done, _ = await asyncio.wait({waiter, disconnect}, timeout=heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if done:
+                    continue
+                body = ": ping\n\n"
+            await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+    finally:
+        disconnect.cancel()
+        subscription.close()
+        HTTP_REQUESTS.inc(method='GET', route=scope['path'], status='200')
+
+async def lifespan(receive, send):
+    """Démarrage et arrêt du serveur ASGI : ouverture et fermeture du client HTTP"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            get_client()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+wsgi_application = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+async def application(scope, receive, send):
+    """Application ASGI : routes asynchrones, puis application Flask pour le reste"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+        if handler is not None:
+            await handle_async_route(handler, scope, receive, send)
+            return
+        if (scope['method'], scope['path']) == ('GET', '/api/events'):
+            await stream_events(scope, receive, send)
+            return
+
+    await wsgi_application(scope, receive, send)
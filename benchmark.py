@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Banc de mesure des performances de l'API HTTP.
+
+L'application est démarrée dans ce processus (serveur WSGI multi-thread de
+Werkzeug) face à un faux serveur Ollama local, puis chaque scénario est
+exécuté avec le niveau de concurrence demandé. Les données de l'application
+(statistiques, projets, configurations) sont placées dans un répertoire
+temporaire, supprimé à la fin du benchmark. Le débit et les percentiles
+de latence sont affichés puis enregistrés en JSON pour comparer deux
+versions du code.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --concurrency 1 8 32 --requests 500 --token-rate 200
+    python benchmark.py --scenarios chat test-model --output avant.json
+    python benchmark.py --compare avant.json
+
+Le faux serveur Ollama peut aussi être lancé seul :
+    python benchmark.py --fake-ollama-only --fake-port 11434
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import atexit
+import socket
+import tempfile
+import argparse
+import platform
+import threading
+import subprocess
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from metrics import percentile
+
+# Répertoire des résultats par défaut
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+# Scénarios : méthode, route et corps JSON
+SCENARIOS = {
+    "index": ("GET", "/", None),
+    "models": ("GET", "/api/models", None),
+    "projects": ("GET", "/api/projects", None),
+    "inference-history": ("GET", "/api/stats/inference-history", None),
+    "metrics": ("GET", "/metrics", None),
+    "test-model": ("POST", "/api/test-model", {"model": "llama3", "prompt": "Bonjour", "max_tokens": 32}),
+    "chat": ("POST", "/api/chat", {"model": "llama3", "message": "Bonjour", "max_tokens": 32})
+}
+DEFAULT_SCENARIOS = ["models", "projects", "test-model", "chat", "metrics"]
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Émule les routes d'Ollama utilisées par l'application"""
+
+    protocol_version = "HTTP/1.1"
+    models = ["llama3", "mistral"]
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, l'accusé de
+        # réception différé ajoute ~40 ms par réponse (Ollama désactive aussi Nagle)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.endswith("/tags"):
+            self._send_json({"models": [{"name": name, "size": 4 * 1024 ** 3} for name in self.models]})
+        elif self.path.endswith("/ps"):
+            self._send_json({"models": [{"name": self.models[0]}]})
+        elif self.path.endswith("/version"):
+            self._send_json({"version": "0.0.0-benchmark"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+
+        if self.path.endswith("/generate") or self.path.endswith("/chat"):
+            self._generate(body, chat=self.path.endswith("/chat"))
+        elif self.path.endswith("/embed"):
+            self._send_json({"model": body.get("model"), "embeddings": [self._embedding(text) for text in body.get("input", [])]})
+        elif self.path.endswith("/pull"):
+            self._pull(body)
+        elif self.path.endswith("/delete"):
+            self._send_json({})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _generate(self, body, chat):
+        model = body.get("model")
+        if model not in self.models:
+            self._send_json({"error": f"model '{model}' not found"}, 404)
+            return
+
+        options = body.get("options") or {}
+        tokens = min(int(options.get("num_predict") or options.get("max_tokens") or self.server.tokens), self.server.tokens)
+        delay = 1 / self.server.token_rate if self.server.token_rate > 0 else 0
+        stats = {
+            "done": True,
+            "prompt_eval_count": 12,
+            "eval_count": tokens,
+            "eval_duration": int(tokens * delay * 1e9),
+            "total_duration": int((tokens * delay + self.server.first_token_delay) * 1e9)
+        }
+
+        time.sleep(self.server.first_token_delay)
+        words = [f"mot{i} " for i in range(tokens)]
+
+        if body.get("stream", True):
+            self._start_stream()
+            for word in words:
+                time.sleep(delay)
+                if chat:
+                    self._send_chunk({"message": {"role": "assistant", "content": word}, "done": False})
+                else:
+                    self._send_chunk({"response": word, "done": False})
+            final = dict(stats, **({"message": {"role": "assistant", "content": ""}} if chat else {"response": ""}))
+            self._send_chunk(final)
+            self._end_stream()
+        else:
+            time.sleep(delay * tokens)
+            text = "".join(words)
+            if chat:
+                self._send_json(dict(stats, message={"role": "assistant", "content": text}))
+            else:
+                self._send_json(dict(stats, response=text, context=[1, 2, 3]))
+
+    @staticmethod
+    def _embedding(text, dimension=256):
+        """Vecteur déterministe (mots hachés) : des textes proches ont des vecteurs proches"""
+        vector = [0.0] * dimension
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % dimension] += 1.0
+        return vector
+
+    def _pull(self, body):
+        if not body.get("stream", True):
+            self._send_json({"status": "success"})
+            return
+        self._start_stream()
+        total = 100
+        for completed in range(0, total + 1, 20):
+            time.sleep(0.01)
+            self._send_chunk({"status": "downloading", "total": total, "completed": completed})
+        self._send_chunk({"status": "success"})
+        self._end_stream()
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Serveur du faux Ollama, avec une file de connexions adaptée aux fortes concurrences"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+def start_fake_ollama(port=0, token_rate=100.0, tokens=32, first_token_delay=0.02):
+    """
+    Démarre le faux serveur Ollama dans un thread.
+
+    Args:
+        port (int): Port d'écoute (0 pour un port libre)
+        token_rate (float): Tokens générés par seconde (0 pour aucune attente)
+        tokens (int): Nombre maximal de tokens par génération
+        first_token_delay (float): Délai avant le premier token (chargement du prompt)
+
+    Returns:
+        FakeOllamaServer: Serveur démarré
+    """
+    server = FakeOllamaServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.token_rate = token_rate
+    server.tokens = tokens
+    server.first_token_delay = first_token_delay
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+def start_app(ollama_url):
+    """
+    Importe et démarre l'application sur un port libre, avec ses données dans
+    un répertoire temporaire.
+
+    Returns:
+        tuple: (serveur WSGI, URL de base)
+    """
+    data_dir = tempfile.mkdtemp(prefix="benchmark-app-")
+    atexit.register(shutil.rmtree, data_dir, ignore_errors=True)
+    os.environ["APP_DATA_DIR"] = data_dir
+    # Pas d'appel à l'API GitHub au démarrage (identifiants lus dans APP_DATA_DIR)
+    os.environ.pop("GITHUB_TOKEN", None)
+    os.environ["OLLAMA_BACKENDS"] = ollama_url
+    os.environ.setdefault("PROJECTS_WATCHER", "false")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import logging
+    from werkzeug.serving import make_server
+    import app as flask_app
+
+    # Le journal des requêtes de Werkzeug fausserait les mesures
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.port}"
+
+def run_scenario(base_url, name, concurrency, total_requests, warmup=5):
+    """
+    Exécute un scénario avec un nombre fixe de requêtes.
+
+    Chaque thread utilise sa propre session HTTP (et donc sa propre
+    conversation pour le scénario chat).
+
+    Returns:
+        dict: Débit, latences et erreurs
+    """
+    method, path, payload = SCENARIOS[name]
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def call():
+        start = time.perf_counter()
+        try:
+            response = session().request(method, base_url + path, json=payload, timeout=120)
+            ok = response.status_code < 400
+            if ok and response.headers.get("Content-Type", "").startswith("application/json"):
+                ok = response.json().get("success", True) is not False
+        except requests.exceptions.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Préchauffage : connexions, imports paresseux, caches
+        list(executor.map(lambda _: call(), range(min(warmup, total_requests))))
+
+        start = time.perf_counter()
+        results = list(executor.map(lambda _: call(), range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "scenario": name,
+        "method": method,
+        "path": path,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "elapsed": round(elapsed, 4),
+        "throughput": round(total_requests / elapsed, 2) if elapsed > 0 else 0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p90": round(percentile(latencies, 90) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0
+        }
+    }
+
+def git_revision():
+    """Révision git courante (ou None)"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_results(results, previous=None):
+    """Affiche les résultats, avec l'écart par rapport à une mesure précédente"""
+    reference = {}
+    if previous:
+        reference = {(r["scenario"], r["concurrency"]): r for r in previous.get("results", [])}
+
+    print(f"\n{'Scénario':<20} {'Conc.':>5} {'Req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'Erreurs':>8}")
+    print("-" * 75)
+    for result in results:
+        line = (f"{result['scenario']:<20} {result['concurrency']:>5} {result['throughput']:>9.1f} "
+                f"{result['latency_ms']['p50']:>9.1f} {result['latency_ms']['p90']:>9.1f} "
+                f"{result['latency_ms']['p99']:>9.1f} {result['errors']:>8}")
+        old = reference.get((result["scenario"], result["concurrency"]))
+        if old and old["throughput"]:
+            change = (result["throughput"] - old["throughput"]) / old["throughput"] * 100
+            line += f"   débit {change:+.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure des performances de l'API HTTP face à un faux serveur Ollama")
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS, choices=sorted(SCENARIOS),
+                        help="Scénarios à exécuter")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8], help="Niveaux de concurrence")
+    parser.add_argument("--requests", type=int, default=200, help="Nombre de requêtes par scénario et niveau")
+    parser.add_argument("--token-rate", type=float, default=100.0, help="Tokens générés par seconde par le faux Ollama (0 = instantané)")
+    parser.add_argument("--tokens", type=int, default=32, help="Nombre maximal de tokens par génération")
+    parser.add_argument("--first-token-delay", type=float, default=0.02, help="Délai avant le premier token (s)")
+    parser.add_argument("--url", help="Mesurer une instance déjà démarrée au lieu de démarrer l'application")
+    parser.add_argument("--output", help="Fichier JSON des résultats (benchmarks/<date>-<révision>.json par défaut)")
+    parser.add_argument("--compare", help="Résultats précédents à comparer")
+    parser.add_argument("--fake-ollama-only", action="store_true", help="Démarrer uniquement le faux serveur Ollama")
+    parser.add_argument("--fake-port", type=int, default=0, help="Port du faux serveur Ollama")
+    args = parser.parse_args()
+
+    fake = start_fake_ollama(args.fake_port, args.token_rate, args.tokens, args.first_token_delay)
+    ollama_url = f"http://127.0.0.1:{fake.server_address[1]}/api"
+
+    if args.fake_ollama_only:
+        print(f"Faux serveur Ollama: {ollama_url} (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        _, base_url = start_app(ollama_url)
+    print(f"Application: {base_url}  |  Faux Ollama: {ollama_url}  |  {args.token_rate:g} tokens/s")
+
+    results = []
+    for name in args.scenarios:
+        for concurrency in args.concurrency:
+            result = run_scenario(base_url, name, concurrency, args.requests)
+            results.append(result)
+            print(f"  {name} x{concurrency}: {result['throughput']:.1f} req/s, p90 {result['latency_ms']['p90']:.1f} ms")
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    print_results(results, previous)
+
+    revision = git_revision()
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "hostname": socket.gethostname(),
+        "parameters": {
+            "requests": args.requests,
+            "token_rate": args.token_rate,
+            "tokens": args.tokens,
+            "first_token_delay": args.first_token_delay,
+            "url": args.url
+        },
+        "results": results
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{revision or 'local'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats enregistrés dans {output}")
+
+if __name__ == "__main__":
+    main()
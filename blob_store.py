@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Stockage dédupliqué (adressé par contenu) des fichiers de projets.
+
+Chaque contenu est stocké une seule fois sous projects/.blobs/<xx>/<clé>,
+la clé étant l'empreinte SHA-256 du contenu, suivie des permissions du
+fichier lorsqu'elles diffèrent de la lecture seule (<sha256>-555 pour un
+script exécutable). Les fichiers des projets sont des liens physiques vers
+ces blobs : importer une arborescence déjà connue ne coûte donc que le
+hachage des fichiers.
+
+Les blobs sont en lecture seule : une écriture sur place (redirection >>,
+éditeur, chmod) ne peut pas modifier en silence le contenu partagé par les
+autres projets. Un blob dont la taille ou la date a changé est vérifié
+avant d'être réutilisé, et retiré du stockage si son contenu ne correspond
+plus à son empreinte (python blob_store.py verify vérifie tous les blobs).
+Le nombre de références d'un blob est son nombre de liens physiques moins
+un ; les copies reflink, qui ont leur propre inode, ne sont donc pas
+utilisées.
+
+Usage:
+    python blob_store.py stats
+    python blob_store.py gc
+    python blob_store.py verify
+"""
+import os
+import stat
+import shutil
+import hashlib
+import tempfile
+import threading
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Nom du répertoire des blobs dans le répertoire des projets
+BLOBS_DIR_NAME = ".blobs"
+# Taille des blocs lus pour le hachage
+HASH_CHUNK_SIZE = 1024 * 1024
+# Permissions par défaut des blobs (lecture seule), absentes de leur clé
+BLOB_MODE = 0o444
+
+def blob_mode(file_mode):
+    """Permissions du blob d'un fichier : celles du fichier, sans droit d'écriture"""
+    return (file_mode & 0o555) | 0o400
+
+def blob_key(digest, mode=BLOB_MODE):
+    """Clé d'un blob : empreinte du contenu, suivie des permissions si elles ne sont pas celles par défaut"""
+    return digest if mode == BLOB_MODE else f"{digest}-{mode:03o}"
+
+def split_key(key):
+    """
+    Empreinte et permissions d'un blob à partir de sa clé.
+
+    Returns:
+        tuple: (empreinte SHA-256, permissions)
+    """
+    digest, _, mode = key.partition('-')
+    return digest, int(mode, 8) if mode else BLOB_MODE
+
+class BlobStore:
+    """
+    Stockage de blobs adressés par leur empreinte SHA-256.
+
+    Les projets référencent les blobs par liens physiques : les fichiers liés
+    partagent leurs dates et permissions (celles du fichier d'origine, sans
+    droit d'écriture). Un même contenu avec d'autres permissions (script
+    exécutable) est un autre blob. Les écritures dans un fichier lié doivent
+    remplacer le fichier (écriture dans un fichier temporaire puis renommage)
+    et non le modifier sur place.
+    """
+
+    def __init__(self, projects_dir):
+        """
+        Initialise le stockage de blobs.
+
+        Args:
+            projects_dir (str): Chemin vers le répertoire des projets
+        """
+        self.root = os.path.join(projects_dir, BLOBS_DIR_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        # Blobs connus : inode -> clé, clé -> (taille, date) à leur création
+        self._inodes = None
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def hash_file(self, path):
+        """
+        Calcule l'empreinte SHA-256 d'un fichier.
+
+        Args:
+            path (str): Chemin du fichier
+
+        Returns:
+            str: Empreinte hexadécimale
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def blob_path(self, key):
+        """
+        Chemin du blob correspondant à une clé.
+
+        Args:
+            key (str): Clé du blob (voir blob_key)
+
+        Returns:
+            str: Chemin du blob
+        """
+        return os.path.join(self.root, key[:2], key)
+
+    def store(self, source_path, digest=None):
+        """
+        Ajoute le contenu d'un fichier, avec ses permissions, au stockage s'il n'y est pas déjà.
+
+        Args:
+            source_path (str): Chemin du fichier source
+            digest (str): Empreinte déjà calculée (optionnel)
+
+        Returns:
+            str: Clé du blob
+        """
+        mode = blob_mode(os.stat(source_path).st_mode)
+        key = blob_key(digest or self.hash_file(source_path), mode)
+        blob_path = self.blob_path(key)
+
+        if os.path.exists(blob_path) and not self._check(key):
+            self._quarantine(key)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.blob.', dir=os.path.dirname(blob_path))
+            os.close(fd)
+            try:
+                shutil.copyfile(source_path, tmp_path)
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, blob_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._remember(key, os.stat(blob_path))
+
+        return key
+
+    def link_into(self, source_path, target_path):
+        """
+        Place le contenu d'un fichier à un chemin cible en le dédupliquant.
+
+        Le contenu est haché, stocké si nécessaire, puis le fichier cible est
+        créé comme lien physique du blob. Si le lien est impossible (autre
+        système de fichiers par exemple), le fichier est simplement copié.
+
+        Args:
+            source_path (str): Chemin du fichier source
+            target_path (str): Chemin du fichier cible
+
+        Returns:
+            str: Clé du blob ou None si le fichier a été copié
+        """
+        try:
+            key = self.store(source_path)
+            self._replace_with_link(self.blob_path(key), target_path)
+            return key
+        except OSError as e:
+            logger.warning("Déduplication impossible pour %s, copie simple: %s", source_path, e)
+            shutil.copy2(source_path, target_path)
+            return None
+
+    def deduplicate(self, path):
+        """
+        Remplace un fichier existant par un lien vers le blob de son contenu.
+
+        Args:
+            path (str): Chemin du fichier
+
+        Returns:
+            str: Clé du blob ou None si le fichier n'a pas pu être dédupliqué
+        """
+        try:
+            digest = self.hash_file(path)
+            blob_path = self.blob_path(blob_key(digest, blob_mode(os.stat(path).st_mode)))
+            if os.path.exists(blob_path) and os.path.samefile(blob_path, path):
+                return os.path.basename(blob_path)
+
+            key = self.store(path, digest)
+            self._replace_with_link(self.blob_path(key), path)
+            return key
+        except OSError as e:
+            logger.warning("Déduplication impossible pour %s: %s", path, e)
+            return None
+
+    def ref_count(self, digest):
+        """
+        Nombre de fichiers de projets référençant un blob.
+
+        Args:
+            digest (str): Clé du blob
+
+        Returns:
+            int: Nombre de références (0 si le blob n'existe pas)
+        """
+        try:
+            return os.stat(self.blob_path(digest)).st_nlink - 1
+        except OSError:
+            return 0
+
+    def release(self, digest):
+        """
+        Supprime un blob s'il n'est plus référencé.
+
+        Args:
+            digest (str): Clé du blob
+
+        Returns:
+            bool: True si le blob a été supprimé
+        """
+        if digest and self.ref_count(digest) == 0 and os.path.exists(self.blob_path(digest)):
+            self._forget(digest, os.stat(self.blob_path(digest)))
+            os.remove(self.blob_path(digest))
+            return True
+        return False
+
+    def digest_of(self, path):
+        """
+        Clé du blob auquel un fichier est lié physiquement.
+
+        La clé est retrouvée par l'inode du fichier, sans relire son contenu
+        (sauf pour un blob créé par un autre processus).
+
+        Args:
+            path (str): Chemin du fichier
+
+        Returns:
+            str: Clé ou None si le fichier n'est pas lié à un blob
+        """
+        try:
+            file_stat = os.stat(path)
+            if file_stat.st_nlink < 2:
+                return None
+            key = self._index().get((file_stat.st_dev, file_stat.st_ino))
+            if key:
+                return key
+            key = blob_key(self.hash_file(path), blob_mode(file_stat.st_mode))
+            blob_path = self.blob_path(key)
+            if os.path.exists(blob_path) and os.path.samefile(blob_path, path):
+                self._remember(key, os.stat(blob_path))
+                return key
+        except OSError:
+            pass
+        return None
+
+    def referenced_digests(self, directory):
+        """
+        Blobs liés physiquement aux fichiers d'un répertoire (avant sa suppression).
+
+        Args:
+            directory (str): Répertoire d'un projet
+
+        Returns:
+            set: Clés des blobs référencés
+        """
+        inodes = self._index()
+        digests = set()
+        for root, dirs, filenames in os.walk(directory):
+            for filename in filenames:
+                try:
+                    file_stat = os.lstat(os.path.join(root, filename))
+                except OSError:
+                    continue
+                if stat.S_ISREG(file_stat.st_mode) and file_stat.st_nlink > 1:
+                    digest = inodes.get((file_stat.st_dev, file_stat.st_ino))
+                    if digest:
+                        digests.add(digest)
+        return digests
+
+    def verify(self):
+        """
+        Vérifie le contenu et les permissions de tous les blobs.
+
+        Les blobs dont le contenu ne correspond plus à l'empreinte sont retirés
+        du stockage (les fichiers des projets qui y sont liés gardent leur
+        contenu) ; les permissions modifiées sont remises à celles de la clé.
+
+        Returns:
+            dict: Nombre de blobs vérifiés, corrompus et dont les permissions ont été corrigées
+        """
+        checked = corrupted = fixed_modes = 0
+        for entry in self._iter_blobs():
+            key = os.path.basename(entry)
+            digest, mode = split_key(key)
+            checked += 1
+            try:
+                if self.hash_file(entry) != digest:
+                    self._quarantine(key)
+                    corrupted += 1
+                    continue
+                blob_stat = os.stat(entry)
+                if blob_stat.st_mode & 0o777 != mode:
+                    os.chmod(entry, mode)
+                    fixed_modes += 1
+                self._remember(key, os.stat(entry))
+            except OSError as e:
+                logger.warning("Impossible de vérifier le blob %s: %s", entry, e)
+
+        logger.info("Vérification des blobs: %s vérifié(s), %s corrompu(s)", checked, corrupted)
+        return {"checked": checked, "corrupted": corrupted, "fixed_modes": fixed_modes}
+
+    def collect_garbage(self):
+        """
+        Supprime les blobs qui ne sont plus référencés par aucun projet.
+
+        Returns:
+            dict: Nombre de blobs supprimés et d'octets libérés
+        """
+        removed = 0
+        freed = 0
+        for entry in self._iter_blobs():
+            try:
+                blob_stat = os.stat(entry)
+                if blob_stat.st_nlink <= 1:
+                    self._forget(os.path.basename(entry), blob_stat)
+                    os.remove(entry)
+                    removed += 1
+                    freed += blob_stat.st_size
+            except OSError as e:
+                logger.warning("Impossible de supprimer le blob %s: %s", entry, e)
+
+        logger.info("Nettoyage des blobs: %s supprimé(s), %s octets libérés", removed, freed)
+        return {"removed": removed, "freed_bytes": freed}
+
+    def stats(self):
+        """
+        Statistiques du stockage.
+
+        Returns:
+            dict: Nombre de blobs, taille stockée et taille économisée
+        """
+        blobs = 0
+        stored = 0
+        saved = 0
+        for entry in self._iter_blobs():
+            blob_stat = os.stat(entry)
+            blobs += 1
+            stored += blob_stat.st_size
+            # Chaque référence au-delà de la première est un octet économisé
+            saved += blob_stat.st_size * max(blob_stat.st_nlink - 2, 0)
+
+        return {"blobs": blobs, "stored_bytes": stored, "saved_bytes": saved}
+
+    def _iter_blobs(self):
+        """Parcourt les chemins de tous les blobs"""
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not name.startswith('.'):
+                    yield os.path.join(prefix_dir, name)
+
+    def _index(self):
+        """Index inode -> clé des blobs, construit au premier appel (sans hachage)"""
+        with self._lock:
+            if self._inodes is None:
+                self._inodes = {}
+                for entry in self._iter_blobs():
+                    try:
+                        blob_stat = os.stat(entry)
+                    except OSError:
+                        continue
+                    digest = os.path.basename(entry)
+                    self._inodes[(blob_stat.st_dev, blob_stat.st_ino)] = digest
+                    self._signatures[digest] = (blob_stat.st_size, blob_stat.st_mtime_ns)
+            return self._inodes
+
+    def _remember(self, digest, blob_stat):
+        """Enregistre l'inode et l'état (taille, date) d'un blob vérifié"""
+        inodes = self._index()
+        with self._lock:
+            inodes[(blob_stat.st_dev, blob_stat.st_ino)] = digest
+            self._signatures[digest] = (blob_stat.st_size, blob_stat.st_mtime_ns)
+
+    def _forget(self, digest, blob_stat):
+        """Retire un blob de l'index"""
+        with self._lock:
+            if self._inodes is not None:
+                self._inodes.pop((blob_stat.st_dev, blob_stat.st_ino), None)
+            self._signatures.pop(digest, None)
+
+    def _check(self, key):
+        """
+        Vérifie un blob existant avant de le réutiliser.
+
+        Le contenu n'est relu que si la taille ou la date du blob a changé
+        depuis qu'il est connu (écriture sur place à travers un lien).
+
+        Returns:
+            bool: True si le contenu correspond à l'empreinte
+        """
+        digest, mode = split_key(key)
+        blob_path = self.blob_path(key)
+        blob_stat = os.stat(blob_path)
+        self._index()
+        if self._signatures.get(key) != (blob_stat.st_size, blob_stat.st_mtime_ns):
+            if self.hash_file(blob_path) != digest:
+                return False
+            self._remember(key, blob_stat)
+        if blob_stat.st_mode & 0o777 != mode:
+            os.chmod(blob_path, mode)
+        return True
+
+    def _quarantine(self, digest):
+        """
+        Retire du stockage un blob dont le contenu ne correspond plus à son empreinte.
+
+        Les fichiers qui y sont liés conservent leur contenu ; le blob est
+        renommé (.<empreinte>.corrupt) pour être examiné, et sera recréé au
+        prochain import de ce contenu.
+        """
+        blob_path = self.blob_path(digest)
+        blob_stat = os.stat(blob_path)
+        logger.error("Blob %s modifié sur place (%s fichier(s) lié(s)), retiré du stockage", digest, blob_stat.st_nlink - 1)
+        self._forget(digest, blob_stat)
+        os.replace(blob_path, os.path.join(os.path.dirname(blob_path), f".{digest}.corrupt"))
+
+    def _replace_with_link(self, blob_path, target_path):
+        """Crée atomiquement un lien physique vers un blob au chemin cible"""
+        target_dir = os.path.dirname(target_path) or '.'
+        tmp_path = os.path.join(target_dir, f".{os.path.basename(target_path)}.{os.getpid()}.link")
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        os.link(blob_path, tmp_path)
+        try:
+            os.replace(tmp_path, target_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestion du stockage dédupliqué des projets")
+    parser.add_argument("--projects-dir", default="projects", help="Répertoire des projets")
+    subparsers = parser.add_subparsers(dest="command", help="Commande à exécuter")
+    subparsers.add_parser("gc", help="Supprimer les blobs non référencés")
+    subparsers.add_parser("stats", help="Afficher les statistiques du stockage")
+    subparsers.add_parser("verify", help="Vérifier le contenu et les permissions des blobs")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    store = BlobStore(args.projects_dir)
+    if args.command == "gc":
+        result = store.collect_garbage()
+        print(f"{result['removed']} blob(s) supprimé(s), {result['freed_bytes'] / (1024 * 1024):.1f} MB libérés")
+    elif args.command == "stats":
+        result = store.stats()
+        print(f"Blobs: {result['blobs']}")
+        print(f"Taille stockée: {result['stored_bytes'] / (1024 * 1024):.1f} MB")
+        print(f"Espace économisé: {result['saved_bytes'] / (1024 * 1024):.1f} MB")
+    elif args.command == "verify":
+        result = store.verify()
+        print(f"{result['checked']} blob(s) vérifié(s), {result['corrupted']} corrompu(s), "
+              f"{result['fixed_modes']} permission(s) corrigée(s)")
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Images des statistiques : images fixes et graphiques.
+
+- build_assets() génère les images fixes manquantes de static/img (image
+  d'attente des graphiques, favicon) à la construction de l'image Docker
+  (python chart_renderer.py --build-assets) ou au démarrage de
+  l'application. Aucune image n'est dessinée pendant une requête : ces
+  fichiers sont servis comme les autres fichiers statiques.
+- ChartRenderer dessine les graphiques des statistiques d'inférence dans un
+  thread. Chaque graphique a une version, empreinte des seules données qu'il
+  affiche : il n'est redessiné que lorsqu'elles changent, et son URL
+  versionnée peut être conservée par les navigateurs sans revalidation.
+
+Pillow est optionnel : sans lui, l'image d'attente livrée avec
+l'application remplace les graphiques.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import unicodedata
+from functools import lru_cache
+import logging
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Dimensions des graphiques (et de l'image d'attente)
+CHART_SIZE = (500, 300)
+# Attente avant de redessiner, pour regrouper les inférences rapprochées (en secondes)
+CHART_DEBOUNCE = 2.0
+# Nombre de modèles affichés, les suivants étant regroupés
+MAX_CHART_MODELS = 8
+# Nombre d'inférences affichées sur la courbe des réponses
+TIMELINE_POINTS = 100
+# Longueur des versions des graphiques
+VERSION_LENGTH = 12
+# À incrémenter quand le dessin change, pour invalider les graphiques déjà rendus
+STYLE_VERSION = 1
+
+# Couleurs du thème sombre de l'interface
+BACKGROUND = (30, 41, 59)
+GRID = (52, 65, 87)
+ACCENT = (14, 165, 233)
+TEXT = (226, 232, 240)
+MARGIN = (40, 30, 15, 40)  # gauche, haut, droite, bas
+# Largeur maximale d'une barre de l'histogramme
+MAX_BAR_WIDTH = 60
+# Police des libellés, remplacée par la police intégrée de Pillow si elle est absente
+FONT_NAME = 'DejaVuSans.ttf'
+FONT_SIZE = 11
+
+CHART_RENDERS = REGISTRY.counter(
+    'chart_renders_total', "Graphiques dessinés par le rendu en arrière-plan", ('chart',))
+CHART_RENDER_DURATION = REGISTRY.histogram(
+    'chart_render_duration_seconds', "Durée du dessin d'un graphique", ('chart',))
+
+def save_image(image, path, format):
+    """Enregistre une image sans qu'un lecteur puisse voir un fichier incomplet"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, format=format)
+    os.replace(tmp_path, path)
+
+@lru_cache(maxsize=1)
+def chart_font():
+    """Police des libellés (None : police intégrée de Pillow, limitée à l'ASCII)"""
+    try:
+        return ImageFont.truetype(FONT_NAME, FONT_SIZE)
+    except OSError:
+        return None
+
+def label(draw, position, text, anchor='la'):
+    """Écrit un libellé, sans les accents si la police intégrée est utilisée"""
+    font = chart_font()
+    if font is None:
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+        font = ImageFont.load_default()
+    x, y = position
+    width = draw.textlength(text, font=font)
+    if anchor[0] == 'm':
+        x -= width / 2
+    draw.text((x, y), text, fill=TEXT, font=font)
+
+def text_width(draw, text):
+    """Largeur approximative d'un libellé"""
+    return draw.textlength(text, font=chart_font() or ImageFont.load_default())
+
+def new_chart(title=None):
+    """Fond, grille et titre d'un graphique"""
+    image = Image.new('RGB', CHART_SIZE, color=BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    width, height = CHART_SIZE
+    for x in range(0, width, 50):
+        draw.line([(x, 0), (x, height)], fill=GRID, width=1)
+    for y in range(0, height, 50):
+        draw.line([(0, y), (width, y)], fill=GRID, width=1)
+    if title:
+        label(draw, (MARGIN[0], 10), title)
+    return image, draw
+
+def draw_placeholder():
+    """Image d'attente : grille et courbe fictive (identique d'une génération à l'autre)"""
+    image, draw = new_chart()
+    heights = [200, 170, 215, 180, 160, 230, 190, 175, 210, 165]
+    points = [(i * 50 + 25, y) for i, y in enumerate(heights)]
+    draw.line(points, fill=ACCENT, width=3)
+    return image
+
+def draw_favicon():
+    """Icône de l'application : trois barres sur fond arrondi"""
+    image = Image.new('RGBA', (32, 32), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle([0, 0, 31, 31], radius=7, fill=BACKGROUND)
+    for i, top in enumerate((18, 10, 14)):
+        draw.rectangle([6 + i * 7, top, 10 + i * 7, 25], fill=ACCENT)
+    return image
+
+# Images fixes de static/img : nom -> (fonction de dessin, format)
+ASSETS = {
+    'chart-placeholder.png': (draw_placeholder, 'PNG'),
+    'favicon.ico': (draw_favicon, 'ICO')
+}
+
+def build_assets(img_dir, force=False):
+    """
+    Génère les images fixes manquantes.
+
+    Args:
+        img_dir (str): Répertoire static/img
+        force (bool): Regénérer aussi les images existantes
+
+    Returns:
+        list: Fichiers générés
+    """
+    if not PIL_AVAILABLE:
+        logger.warning("Pillow n'est pas installé, images fixes non générées")
+        return []
+
+    generated = []
+    for name, (draw, format) in ASSETS.items():
+        path = os.path.join(img_dir, name)
+        if os.path.exists(path) and not force:
+            continue
+        try:
+            save_image(draw(), path, format)
+            generated.append(path)
+        except Exception as e:
+            logger.error("Erreur lors de la génération de %s: %s", name, e)
+    return generated
+
+# Graphiques : préparation des données affichées, puis dessin
+
+def model_usage_series(stats):
+    """Nombre d'inférences par modèle sur tout l'historique, les plus utilisés en premier"""
+    counts = {}
+    for row in stats.get('models', []):
+        model = row.get('name') or 'inconnu'
+        counts[model] = counts.get(model, 0) + row.get('count', 0)
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    if len(ordered) > MAX_CHART_MODELS:
+        others = sum(count for _, count in ordered[MAX_CHART_MODELS - 1:])
+        ordered = ordered[:MAX_CHART_MODELS - 1] + [('autres', others)]
+    return [[model, count] for model, count in ordered]
+
+def draw_model_usage(series):
+    """Histogramme des inférences par modèle"""
+    image, draw = new_chart("Inférences par modèle")
+    left, top, right, bottom = MARGIN
+    width, height = CHART_SIZE
+    if not series:
+        label(draw, (left, height // 2), "Aucune inférence enregistrée")
+        return image
+
+    peak = max(count for _, count in series)
+    slot = (width - left - right) / len(series)
+    bar = min(MAX_BAR_WIDTH, slot * 0.7)
+    for i, (model, count) in enumerate(series):
+        center = left + (i + 0.5) * slot
+        y0 = height - bottom - (height - top - bottom - 15) * count / peak
+        draw.rectangle([center - bar / 2, y0, center + bar / 2, height - bottom], fill=ACCENT)
+        label(draw, (center, y0 - 14), str(count), anchor='ma')
+        name = model
+        while len(name) > 1 and text_width(draw, name) > slot - 4:
+            name = name[:-2] + "."
+        label(draw, (center, height - bottom + 8), name, anchor='ma')
+    return image
+
+def output_length_series(stats):
+    """Longueur des dernières réponses (en mots), de la plus ancienne à la plus récente"""
+    ordered = sorted(stats.get('recent', []), key=lambda record: record.get('timestamp', 0))
+    return [record.get('output_length', 0) for record in ordered[-TIMELINE_POINTS:]]
+
+def draw_output_length(values):
+    """Courbe de la longueur des dernières réponses"""
+    image, draw = new_chart("Longueur des réponses (mots)")
+    left, top, right, bottom = MARGIN
+    width, height = CHART_SIZE
+    if not values:
+        label(draw, (left, height // 2), "Aucune inférence enregistrée")
+        return image
+
+    peak = max(values) or 1
+    step = (width - left - right) / max(1, len(values) - 1)
+    points = [(left + i * step, height - bottom - (height - top - bottom - 15) * value / peak)
+              for i, value in enumerate(values)]
+    if len(points) > 1:
+        draw.line(points, fill=ACCENT, width=2)
+    for x, y in points[-1:]:
+        draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=ACCENT)
+    label(draw, (left, height - bottom + 8), f"{len(values)} dernières inférences, max {peak}")
+    return image
+
+# Graphiques disponibles : nom -> (préparation des données, dessin)
+CHARTS = {
+    'model-usage': (model_usage_series, draw_model_usage),
+    'output-length': (output_length_series, draw_output_length)
+}
+
+def chart_version(series):
+    """Version d'un graphique : empreinte des données affichées et du style de dessin"""
+    payload = json.dumps([STYLE_VERSION, series], separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:VERSION_LENGTH]
+
+class ChartRenderer:
+    """
+    Rendu des graphiques des statistiques en arrière-plan.
+
+    invalidate() signale que les statistiques ont changé ; le thread de
+    rendu relit alors les données après CHART_DEBOUNCE secondes et ne
+    redessine que les graphiques dont la version a changé. Les deux
+    dernières versions de chaque graphique sont conservées sur le disque,
+    pour les requêtes en cours pendant un nouveau rendu.
+    """
+
+    def __init__(self, output_dir, load_stats, charts=None, debounce=CHART_DEBOUNCE, on_render=None):
+        """
+        Initialise le rendu.
+
+        Args:
+            output_dir (str): Répertoire des graphiques dessinés
+            load_stats (callable): Fonction qui renvoie les statistiques d'inférence (dict : models,
+                totaux par modèle de InferenceHistory.summary() ; recent, dernières inférences)
+            charts (dict): Graphiques (nom -> (préparation, dessin)), CHARTS par défaut
+            debounce (float): Attente avant de redessiner en secondes
+            on_render (callable): Fonction appelée avec status() après chaque rendu
+        """
+        self.output_dir = output_dir
+        self.load_stats = load_stats
+        self.charts = dict(charts or CHARTS)
+        self.debounce = debounce
+        self.on_render = on_render
+        self._rendered = {}
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        """Indique si les graphiques peuvent être dessinés (Pillow installé)"""
+        return PIL_AVAILABLE
+
+    def start(self):
+        """
+        Démarre le thread de rendu (premier rendu immédiat).
+
+        Returns:
+            bool: True si le rendu a démarré, False sinon
+        """
+        if not PIL_AVAILABLE:
+            logger.warning("Pillow n'est pas installé, graphiques des statistiques désactivés")
+            return False
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chart-renderer", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        """Arrête le thread de rendu"""
+        self._stopping.set()
+        self._dirty.set()
+
+    def invalidate(self):
+        """Signale que les statistiques ont changé"""
+        self._dirty.set()
+
+    def get(self, name):
+        """
+        Dernier rendu d'un graphique.
+
+        Returns:
+            dict: version, path, rendered_at ou None si le graphique n'est pas encore dessiné
+        """
+        with self._lock:
+            chart = self._rendered.get(name)
+            return dict(chart) if chart else None
+
+    def status(self):
+        """Versions des graphiques dessinés (nom -> version)"""
+        with self._lock:
+            return {name: chart['version'] for name, chart in self._rendered.items()}
+
+    def render(self):
+        """
+        Dessine les graphiques dont les données ont changé.
+
+        Returns:
+            list: Noms des graphiques dont la version a changé
+        """
+        with self._render_lock:
+            stats = self.load_stats()
+            changed = []
+            for name, (prepare, draw) in self.charts.items():
+                try:
+                    series = prepare(stats)
+                    version = chart_version(series)
+                    current = self.get(name)
+                    if current and current['version'] == version:
+                        continue
+
+                    path = os.path.join(self.output_dir, f"{name}-{version}.png")
+                    # Rendu d'une exécution précédente, avec les mêmes données
+                    if not os.path.exists(path):
+                        with CHART_RENDER_DURATION.time(chart=name):
+                            save_image(draw(series), path, 'PNG')
+                        CHART_RENDERS.inc(chart=name)
+
+                    with self._lock:
+                        self._rendered[name] = {'version': version, 'path': path, 'rendered_at': time.time()}
+                    self._prune(name, keep={path, current['path'] if current else path})
+                    changed.append(name)
+                except Exception as e:
+                    logger.error("Erreur lors du rendu du graphique %s: %s", name, e)
+
+        if changed and self.on_render:
+            self.on_render(self.status())
+        return changed
+
+    def _prune(self, name, keep):
+        """Supprime les anciennes versions d'un graphique"""
+        prefix = f"{name}-"
+        for filename in os.listdir(self.output_dir):
+            path = os.path.join(self.output_dir, filename)
+            if filename.startswith(prefix) and len(filename) == len(prefix) + VERSION_LENGTH + 4 and path not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _run(self):
+        self._dirty.set()
+        while not self._stopping.is_set():
+            self._dirty.wait()
+            if self._stopping.wait(self.debounce):
+                return
+            self._dirty.clear()
+            try:
+                self.render()
+            except Exception as e:
+                logger.error("Erreur lors du rendu des graphiques: %s", e)
+
+def main():
+    parser = argparse.ArgumentParser(description="Images des statistiques")
+    parser.add_argument("--build-assets", action="store_true", help="Génère les images fixes de static/img")
+    parser.add_argument("--force", action="store_true", help="Regénère aussi les images existantes")
+    parser.add_argument("--img-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "img"),
+                        help="Répertoire des images fixes")
+    args = parser.parse_args()
+
+    if not args.build_assets:
+        parser.print_help()
+        return 1
+    if not PIL_AVAILABLE:
+        print("Pillow n'est pas installé (pip install pillow)")
+        return 1
+    for path in build_assets(args.img_dir, force=args.force):
+        print(path)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Conversations multi-tours côté serveur pour l'API /chat d'Ollama.
+
+Chaque conversation conserve ses messages et le nombre de tokens de chacun
+(estimé, puis corrigé avec les compteurs renvoyés par Ollama). L'historique
+envoyé est limité par history_limit (nombre de messages) et par un budget
+de tokens.
+
+Ollama réutilise le cache KV du préfixe commun avec la requête précédente :
+pour que l'évaluation du prompt ne porte que sur les nouveaux messages,
+l'historique n'est pas tronqué d'un message à chaque tour mais par blocs
+(jusqu'à la moitié du budget), ce qui garde le préfixe identique d'un tour
+à l'autre entre deux troncatures.
+"""
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de messages conservés par conversation (config.json: inference.history_limit)
+DEFAULT_HISTORY_LIMIT = 200
+# Budget de tokens de l'historique envoyé au modèle
+DEFAULT_TOKEN_BUDGET = 4096
+# Nombre maximal de conversations gardées en mémoire
+MAX_CONVERSATIONS = 500
+# Durée d'inactivité après laquelle une conversation est oubliée (en secondes)
+CONVERSATION_TTL = 6 * 3600
+
+def estimate_tokens(text):
+    """
+    Estimation grossière du nombre de tokens d'un texte (environ 4 caractères par token).
+
+    Args:
+        text (str): Texte à évaluer
+
+    Returns:
+        int: Nombre de tokens estimé
+    """
+    return max(len(text) // 4, 1) + 4
+
+class Conversation:
+    """Messages d'une conversation et compteurs associés"""
+
+    def __init__(self, conversation_id, model=None, system=None):
+        self.id = conversation_id
+        self.model = model
+        self.system = system
+        self.messages = []
+        self.lock = threading.Lock()
+        self.updated = time.time()
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+
+    def total_tokens(self):
+        """Nombre de tokens de l'historique conservé"""
+        return sum(message['tokens'] for message in self.messages)
+
+    def to_dict(self):
+        """Représentation JSON de la conversation"""
+        return {
+            'id': self.id,
+            'model': self.model,
+            'system': self.system,
+            'messages': [{'role': m['role'], 'content': m['content']} for m in self.messages],
+            'history_tokens': self.total_tokens(),
+            'prompt_tokens': self.prompt_tokens,
+            'eval_tokens': self.eval_tokens,
+            'updated': self.updated
+        }
+
+class ConversationManager:
+    """
+    Stockage en mémoire des conversations, indexées par identifiant.
+
+    Les conversations les moins récemment utilisées sont oubliées au-delà de
+    MAX_CONVERSATIONS ou après CONVERSATION_TTL secondes d'inactivité.
+    """
+
+    def __init__(self, history_limit=DEFAULT_HISTORY_LIMIT, token_budget=DEFAULT_TOKEN_BUDGET,
+                 max_conversations=MAX_CONVERSATIONS, ttl=CONVERSATION_TTL):
+        """
+        Initialise le gestionnaire de conversations.
+
+        Args:
+            history_limit (int): Nombre maximal de messages conservés par conversation
+            token_budget (int): Budget de tokens de l'historique envoyé au modèle
+            max_conversations (int): Nombre maximal de conversations en mémoire
+            ttl (float): Durée d'inactivité avant oubli d'une conversation
+        """
+        self.history_limit = max(int(history_limit), 2)
+        self.token_budget = max(int(token_budget), 1)
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id, create=False, model=None, system=None):
+        """
+        Récupère une conversation.
+
+        Args:
+            conversation_id (str): Identifiant (un nouvel identifiant est généré si None et create=True)
+            create (bool): Créer la conversation si elle n'existe pas
+            model (str): Modèle de la conversation créée
+            system (str): Message système de la conversation créée
+
+        Returns:
+            Conversation: Conversation ou None
+        """
+        with self._lock:
+            self._expire()
+            conversation = self._conversations.get(conversation_id) if conversation_id else None
+            if conversation:
+                self._conversations.move_to_end(conversation_id)
+                return conversation
+            if not create:
+                return None
+
+            conversation = Conversation(conversation_id or uuid.uuid4().hex, model, system)
+            self._conversations[conversation.id] = conversation
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+            return conversation
+
+    def count(self):
+        """Nombre de conversations en mémoire"""
+        return len(self._conversations)
+
+    def delete(self, conversation_id):
+        """
+        Supprime une conversation.
+
+        Returns:
+            bool: True si la conversation existait
+        """
+        with self._lock:
+            return self._conversations.pop(conversation_id, None) is not None
+
+    def add_message(self, conversation, role, content, tokens=None):
+        """
+        Ajoute un message à une conversation et applique les limites d'historique.
+
+        Args:
+            conversation (Conversation): Conversation
+            role (str): 'user' ou 'assistant'
+            content (str): Contenu du message
+            tokens (int): Nombre de tokens connu (estimé sinon)
+        """
+        conversation.messages.append({
+            'role': role,
+            'content': content,
+            'tokens': tokens or estimate_tokens(content)
+        })
+        conversation.updated = time.time()
+        self._truncate(conversation)
+
+    def snapshot(self, conversation):
+        """
+        Copie de l'historique, à restaurer si le tour en cours échoue.
+
+        add_message peut tronquer l'historique : retirer le message ajouté ne
+        suffit pas à retrouver les messages supprimés.
+
+        Args:
+            conversation (Conversation): Conversation
+
+        Returns:
+            tuple: Messages et date de dernière modification
+        """
+        return list(conversation.messages), conversation.updated
+
+    def restore(self, conversation, snapshot):
+        """
+        Rétablit l'historique enregistré par snapshot.
+
+        Args:
+            conversation (Conversation): Conversation
+            snapshot (tuple): Valeur renvoyée par snapshot
+        """
+        conversation.messages, conversation.updated = list(snapshot[0]), snapshot[1]
+
+    def build_messages(self, conversation):
+        """
+        Messages à envoyer à l'API /chat d'Ollama.
+
+        Args:
+            conversation (Conversation): Conversation
+
+        Returns:
+            list: Messages (rôle et contenu), précédés du message système éventuel
+        """
+        messages = []
+        if conversation.system:
+            messages.append({'role': 'system', 'content': conversation.system})
+        messages.extend({'role': m['role'], 'content': m['content']} for m in conversation.messages)
+        return messages
+
+    def record_usage(self, conversation, result):
+        """
+        Met à jour les compteurs à partir de la réponse d'Ollama.
+
+        Le nombre de tokens réellement générés remplace l'estimation du
+        dernier message de l'assistant.
+
+        Args:
+            conversation (Conversation): Conversation
+            result (dict): Réponse de l'API /chat
+        """
+        conversation.prompt_tokens += result.get('prompt_eval_count', 0) or 0
+        eval_count = result.get('eval_count') or 0
+        conversation.eval_tokens += eval_count
+        if eval_count and conversation.messages and conversation.messages[-1]['role'] == 'assistant':
+            conversation.messages[-1]['tokens'] = eval_count
+
+    def _truncate(self, conversation):
+        """
+        Supprime les plus anciens messages lorsque les limites sont dépassées.
+
+        La troncature descend sous la moitié des limites afin que les tours
+        suivants gardent le même préfixe (et le cache d'Ollama).
+        """
+        messages = conversation.messages
+        if len(messages) <= self.history_limit and conversation.total_tokens() <= self.token_budget:
+            return
+
+        max_messages = max(self.history_limit // 2, 2)
+        max_tokens = self.token_budget // 2
+        kept = []
+        total = 0
+        # Conserver les messages les plus récents ; toujours garder le dernier
+        for message in reversed(messages):
+            if kept and (len(kept) >= max_messages or total + message['tokens'] > max_tokens):
+                break
+            kept.append(message)
+            total += message['tokens']
+
+        kept.reverse()
+        # Ne pas commencer l'historique par une réponse de l'assistant
+        while len(kept) > 1 and kept[0]['role'] == 'assistant':
+            kept.pop(0)
+
+        logger.info("Conversation %s: historique tronqué de %s à %s messages", conversation.id, len(messages), len(kept))
+        conversation.messages = kept
+
+    def _expire(self):
+        """Oublie les conversations inactives (appelé avec le verrou)"""
+        limit = time.time() - self.ttl
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if conversation.updated >= limit:
+                break
+            del self._conversations[conversation_id]
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Diagnostic de l'installation : Ollama, configuration, dépendances Python,
+répertoires et GPU.
+
+Les vérifications sont enregistrées dans un DiagnosticRunner qui les exécute
+en parallèle, chacune dans son thread, sous une échéance globale : le
+diagnostic complet prend au plus le budget fixé (3 secondes par défaut)
+même si une commande ne répond pas ou si l'import de torch est lent. Une
+vérification non terminée à l'échéance est rapportée en « timeout » et
+n'est pas relancée tant qu'elle s'exécute encore. Chaque résultat indique sa
+durée, et le rapport est gardé en cache quelques secondes pour que les
+appels répétés (page web, CLI) ne relancent pas les commandes.
+
+Le même runner sert à la ligne de commande et à la route /api/diagnostic.
+
+Usage:
+    python diagnostic.py
+    python diagnostic.py --check ollama --check gpu
+    python diagnostic.py --json --budget 5
+    python diagnostic.py --start-ollama
+    python diagnostic.py --download-model llama3
+    python diagnostic.py --reset-config
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import threading
+import subprocess
+import importlib.util
+import argparse
+import logging
+
+import requests
+
+from metrics import track_subprocess
+
+logger = logging.getLogger(__name__)
+
+# Adresse de l'API Ollama utilisée par la ligne de commande
+OLLAMA_API_BASE = os.environ.get("OLLAMA_API_BASE", "http://localhost:11434/api")
+# Fichier de configuration de l'application
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+# Modèle par défaut d'une configuration réinitialisée
+DEFAULT_MODEL = "llama3"
+# Durée maximale d'un diagnostic complet (en secondes)
+DEFAULT_BUDGET = 3.0
+# Durée de validité des résultats en cache (en secondes)
+DEFAULT_CACHE_TTL = 10.0
+# Délai d'attente des requêtes vers Ollama
+REQUEST_TIMEOUT = 2
+# Modules requis par l'application (nom d'import, paquet)
+PYTHON_DEPENDENCIES = [
+    ("flask", "Flask"), ("requests", "requests"), ("numpy", "numpy"), ("git", "gitpython"),
+    ("watchdog", "watchdog"), ("PIL", "pillow"), ("dotenv", "python-dotenv"),
+]
+# Modules optionnels (serveurs de production, GPU)
+OPTIONAL_DEPENDENCIES = [
+    ("uvicorn", "uvicorn"), ("httpx", "httpx"), ("a2wsgi", "a2wsgi"),
+    ("gunicorn", "gunicorn"), ("waitress", "waitress"), ("torch", "torch"),
+]
+# Répertoires de l'application
+APP_DIRECTORIES = ["projects", "stats", "logs", "templates", "static"]
+
+def module_available(name):
+    """Indique si un module peut être importé, sans le charger"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ValueError:
+        # Module déjà chargé sans spécification (module créé dynamiquement)
+        return name in sys.modules
+
+class CheckTimeout(Exception):
+    """Le budget restant ne permet pas de terminer la vérification"""
+
+class DiagnosticContext:
+    """Informations transmises aux vérifications pendant une exécution"""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def remaining(self, limit=None):
+        """
+        Temps restant avant l'échéance, borné par limit.
+
+        Raises:
+            CheckTimeout: Si l'échéance est dépassée
+        """
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise CheckTimeout()
+        return min(remaining, limit) if limit else remaining
+
+    def run(self, command, limit=None):
+        """Exécute une commande avec un délai d'attente borné par l'échéance"""
+        try:
+            with track_subprocess(command[0]):
+                return subprocess.run(command, capture_output=True, text=True, timeout=self.remaining(limit))
+        except subprocess.TimeoutExpired:
+            raise CheckTimeout()
+
+class DiagnosticRunner:
+    """
+    Registre de vérifications exécutées en parallèle sous une échéance globale.
+
+    Une vérification est une fonction qui reçoit un DiagnosticContext et
+    renvoie un dictionnaire de détails ; la clé optionnelle "status"
+    (ok, warning, error) indique le résultat, ok par défaut. Une exception
+    donne le statut error.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, cache_ttl=DEFAULT_CACHE_TTL):
+        """
+        Initialise le registre.
+
+        Args:
+            budget (float): Durée maximale d'une exécution (en secondes)
+            cache_ttl (float): Durée de validité des résultats (0 : pas de cache)
+        """
+        self.budget = budget
+        self.cache_ttl = cache_ttl
+        self._checks = {}
+        self._cache = {}
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, func, group):
+        """
+        Enregistre une vérification.
+
+        Args:
+            name (str): Nom unique de la vérification
+            func (callable): Fonction appelée avec un DiagnosticContext
+            group (str): Groupe (ollama, config, python, gpu...) pour --check
+        """
+        self._checks[name] = (func, group)
+
+    def check(self, name, group):
+        """Décorateur équivalent à register"""
+        def decorator(func):
+            self.register(name, func, group)
+            return func
+        return decorator
+
+    @property
+    def groups(self):
+        """Groupes des vérifications enregistrées"""
+        return sorted({group for _, group in self._checks.values()})
+
+    def run(self, groups=None, budget=None, use_cache=True):
+        """
+        Exécute les vérifications (toutes ou celles des groupes indiqués).
+
+        Args:
+            groups (list): Groupes à vérifier, tous par défaut
+            budget (float): Durée maximale (self.budget par défaut)
+            use_cache (bool): Réutiliser des résultats de moins de cache_ttl secondes
+
+        Returns:
+            dict: Résultat par vérification : status, group, duration_ms, details ou error
+        """
+        names = [name for name, (_, group) in self._checks.items() if not groups or group in groups]
+        results = {}
+        pending = []
+        now = time.monotonic()
+        with self._lock:
+            for name in names:
+                cached = self._cache.get(name)
+                if use_cache and cached and now - cached[0] < self.cache_ttl:
+                    results[name] = dict(cached[1], cached=True)
+                else:
+                    pending.append(name)
+
+        deadline = now + (budget or self.budget)
+        threads = [self._start(name, deadline) for name in pending]
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        with self._lock:
+            for name in pending:
+                cached = self._cache.get(name)
+                if cached and cached[0] >= now:
+                    results[name] = dict(cached[1], cached=False)
+                else:
+                    results[name] = {
+                        "status": "timeout", "group": self._checks[name][1],
+                        "duration_ms": round((time.monotonic() - now) * 1000, 1),
+                        "error": "Vérification non terminée dans le budget"
+                    }
+        return {name: results[name] for name in names}
+
+    def _start(self, name, deadline):
+        """Lance une vérification dans un thread (ou rattache celle déjà en cours)"""
+        with self._lock:
+            thread = self._running.get(name)
+            if thread and thread.is_alive():
+                return thread
+            thread = threading.Thread(target=self._execute, args=(name, deadline), name=f"diagnostic-{name}", daemon=True)
+            self._running[name] = thread
+        thread.start()
+        return thread
+
+    def _execute(self, name, deadline):
+        """Exécute une vérification et enregistre son résultat"""
+        func, group = self._checks[name]
+        start = time.monotonic()
+        try:
+            details = func(DiagnosticContext(deadline)) or {}
+            status = details.pop("status", "ok")
+            result = {"status": status, "group": group, "details": details}
+        except CheckTimeout:
+            result = {"status": "timeout", "group": group, "error": "Vérification non terminée dans le budget"}
+        except Exception as e:
+            logger.error("Erreur lors de la vérification %s: %s", name, e)
+            result = {"status": "error", "group": group, "error": str(e)}
+        result["duration_ms"] = round((time.monotonic() - start) * 1000, 1)
+        with self._lock:
+            self._cache[name] = (time.monotonic(), result)
+            self._running.pop(name, None)
+
+def create_runner(api_base=OLLAMA_API_BASE, config_path=CONFIG_PATH, request=None,
+                  base_dir=None, budget=DEFAULT_BUDGET, cache_ttl=DEFAULT_CACHE_TTL):
+    """
+    Crée le registre des vérifications de l'application.
+
+    Args:
+        api_base (str): URL de l'API Ollama
+        config_path (str): Fichier ollama_config.json
+        request (callable): request(method, path, timeout=...) vers Ollama (requests par défaut)
+        base_dir (str): Répertoire de l'application (répertoire courant par défaut)
+        budget (float): Durée maximale d'un diagnostic
+        cache_ttl (float): Durée de validité des résultats
+
+    Returns:
+        DiagnosticRunner: Registre prêt à être exécuté
+    """
+    runner = DiagnosticRunner(budget=budget, cache_ttl=cache_ttl)
+    if request is None:
+        def request(method, path, timeout=None):
+            return requests.request(method, f"{api_base}{path}", timeout=timeout)
+
+    @runner.check("ollama_installed", "ollama")
+    def check_ollama_installed(ctx):
+        path = shutil.which("ollama")
+        if not path:
+            return {"status": "error", "installed": False}
+        result = ctx.run(["ollama", "--version"], limit=5)
+        version = (result.stdout.strip() or result.stderr.strip()) if result.returncode == 0 else "unknown"
+        return {"installed": True, "path": path, "version": version}
+
+    @runner.check("ollama_service", "ollama")
+    def check_ollama_service(ctx):
+        # Une seule requête /tags : état du service et modèles disponibles
+        try:
+            response = request("GET", "/tags", timeout=ctx.remaining(REQUEST_TIMEOUT))
+        except requests.Timeout:
+            raise CheckTimeout()
+        except requests.RequestException as e:
+            return {"status": "error", "running": False, "error": str(e), "models": []}
+        if response.status_code != 200:
+            return {"status": "error", "running": False, "error": f"HTTP {response.status_code}", "models": []}
+        models = [
+            {
+                "name": model.get("name", "unknown"),
+                "size_mb": model.get("size", 0) // (1024 * 1024),
+                "modified": model.get("modified_at", model.get("modified", "unknown"))
+            }
+            for model in response.json().get("models", [])
+        ]
+        return {"status": "ok" if models else "warning", "running": True, "models": models}
+
+    @runner.check("configuration", "config")
+    def check_configuration(ctx):
+        if not os.path.exists(config_path):
+            return {"status": "warning", "config_file_exists": False, "default_model": "unknown"}
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return {"config_file_exists": True, "default_model": config.get("default_model", "unknown")}
+
+    @runner.check("directories", "config")
+    def check_directories(ctx):
+        root = base_dir or os.getcwd()
+        missing = [name for name in APP_DIRECTORIES if not os.path.isdir(os.path.join(root, name))]
+        return {"status": "warning" if missing else "ok", "missing": missing}
+
+    @runner.check("python_dependencies", "python")
+    def check_python_dependencies(ctx):
+        # find_spec ne charge pas les modules : vérification instantanée
+        missing = [package for module, package in PYTHON_DEPENDENCIES if not module_available(module)]
+        optional = [package for module, package in OPTIONAL_DEPENDENCIES if not module_available(module)]
+        return {
+            "status": "error" if missing else "ok",
+            "python_version": sys.version,
+            "platform": sys.platform,
+            "machine": platform.machine(),
+            "missing": missing,
+            "missing_optional": optional
+        }
+
+    @runner.check("cuda", "gpu")
+    def check_cuda(ctx):
+        if not module_available("torch"):
+            return {"status": "warning", "cuda_available": False, "error": "torch non installé"}
+        import torch
+        if not torch.cuda.is_available():
+            return {"status": "warning", "cuda_available": False}
+        return {"cuda_available": True, "cuda_version": torch.version.cuda, "gpu_name": torch.cuda.get_device_name(0)}
+
+    @runner.check("nvidia_smi", "gpu")
+    def check_nvidia_smi(ctx):
+        if not shutil.which("nvidia-smi"):
+            return {"status": "warning", "gpu_info": [], "error": "nvidia-smi introuvable"}
+        result = ctx.run(
+            ["nvidia-smi", "--query-gpu=index,name,utilization.gpu,memory.used,memory.total", "--format=csv,noheader,nounits"],
+            limit=5
+        )
+        if result.returncode != 0:
+            return {"status": "error", "gpu_info": [], "error": result.stderr.strip()}
+        gpu_info = []
+        for line in result.stdout.strip().split('\n'):
+            parts = [part.strip() for part in line.split(',')]
+            if len(parts) >= 5:
+                gpu_info.append({
+                    "index": parts[0], "name": parts[1], "utilization": parts[2],
+                    "memory_used": parts[3], "memory_total": parts[4]
+                })
+        return {"gpu_info": gpu_info}
+
+    return runner
+
+def build_report(results, duration):
+    """
+    Rapport de diagnostic au format de /api/diagnostic.
+
+    Args:
+        results (dict): Résultats de DiagnosticRunner.run
+        duration (float): Durée de l'exécution (en secondes)
+
+    Returns:
+        dict: Sections ollama, configuration et environment, plus le détail des vérifications
+    """
+    def details(name):
+        return results.get(name, {}).get("details", {})
+
+    installed = details("ollama_installed")
+    service = details("ollama_service")
+    configuration = details("configuration")
+    python = details("python_dependencies")
+    cuda = details("cuda")
+
+    environment = {
+        "python_version": python.get("python_version", sys.version),
+        "platform": python.get("platform", sys.platform),
+        "cuda_available": cuda.get("cuda_available", False),
+        "gpu_info": details("nvidia_smi").get("gpu_info", [])
+    }
+    for key in ("cuda_version", "gpu_name"):
+        if key in cuda:
+            environment[key] = cuda[key]
+
+    failed = [name for name, result in results.items() if result["status"] in ("error", "timeout")]
+    return {
+        "timestamp": time.time(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "app_status": "ok",
+        "ollama": {
+            "installed": installed.get("installed", False),
+            "path": installed.get("path"),
+            "running": service.get("running", False),
+            "version": installed.get("version", "unknown"),
+            "models": service.get("models", [])
+        },
+        "configuration": {
+            "default_model": configuration.get("default_model", "unknown"),
+            "config_file_exists": configuration.get("config_file_exists", False)
+        },
+        "environment": environment,
+        "checks": results,
+        "failed_checks": failed,
+        "duration_ms": round(duration * 1000, 1)
+    }
+
+def run_diagnostic(runner, groups=None, budget=None, use_cache=True):
+    """Exécute les vérifications et construit le rapport"""
+    start = time.monotonic()
+    results = runner.run(groups=groups, budget=budget, use_cache=use_cache)
+    return build_report(results, time.monotonic() - start)
+
+def start_ollama(api_base=OLLAMA_API_BASE, wait=15):
+    """
+    Démarre « ollama serve » en arrière-plan et attend qu'il réponde.
+
+    Returns:
+        bool: True si le service répond
+    """
+    if not shutil.which("ollama"):
+        logger.error("Ollama n'est pas installé (https://ollama.com/download)")
+        return False
+    try:
+        requests.get(f"{api_base}/tags", timeout=REQUEST_TIMEOUT)
+        logger.info("Ollama est déjà en cours d'exécution")
+        return True
+    except requests.RequestException:
+        pass
+
+    subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{api_base}/tags", timeout=REQUEST_TIMEOUT).status_code == 200:
+                logger.info("Service Ollama démarré")
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    logger.error("Le service Ollama ne répond pas")
+    return False
+
+def download_model(model):
+    """
+    Télécharge un modèle avec « ollama pull » (progression affichée).
+
+    Returns:
+        bool: True si le téléchargement a réussi
+    """
+    try:
+        return subprocess.run(["ollama", "pull", model]).returncode == 0
+    except FileNotFoundError:
+        logger.error("Ollama n'est pas installé")
+        return False
+
+def reset_config(config_path=CONFIG_PATH, model=DEFAULT_MODEL):
+    """Réinitialise ollama_config.json avec le modèle par défaut"""
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump({"default_model": model}, f, indent=2)
+    logger.info("Configuration réinitialisée: %s (modèle par défaut: %s)", config_path, model)
+    return True
+
+STATUS_SYMBOLS = {"ok": "✓", "warning": "!", "error": "✗", "timeout": "⧗"}
+
+def print_report(report):
+    """Affiche le rapport de diagnostic"""
+    for name, result in report["checks"].items():
+        symbol = STATUS_SYMBOLS.get(result["status"], "?")
+        line = f"{symbol} {name:<20} {result['status']:<8} {result['duration_ms']:>8.1f} ms"
+        if result.get("error") or result.get("details", {}).get("error"):
+            line += f"  {result.get('error') or result['details']['error']}"
+        print(line)
+
+    ollama = report["ollama"]
+    print()
+    state = "en cours d'exécution" if ollama['running'] else "arrêté"
+    print(f"Ollama: {'installé' if ollama['installed'] else 'non installé'} ({ollama['version']}), "
+          f"{state}, {len(ollama['models'])} modèle(s)")
+    print(f"Modèle par défaut: {report['configuration']['default_model']}")
+    missing = report["checks"].get("python_dependencies", {}).get("details", {}).get("missing")
+    if missing:
+        print(f"Dépendances manquantes: {', '.join(missing)} (pip install -r requirements.txt)")
+    print(f"Diagnostic terminé en {report['duration_ms']:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Diagnostic de l'Assistant IA Ollama")
+    parser.add_argument("--check", action="append", help="Groupe à vérifier (ollama, config, python, gpu), répétable")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Durée maximale du diagnostic (secondes)")
+    parser.add_argument("--json", action="store_true", help="Afficher le rapport au format JSON")
+    parser.add_argument("--api-base", default=OLLAMA_API_BASE, help="URL de l'API Ollama")
+    parser.add_argument("--start-ollama", action="store_true", help="Démarrer le service Ollama")
+    parser.add_argument("--download-model", metavar="MODELE", help="Télécharger un modèle")
+    parser.add_argument("--reset-config", action="store_true", help="Réinitialiser ollama_config.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.start_ollama:
+        sys.exit(0 if start_ollama(args.api_base) else 1)
+    if args.download_model:
+        sys.exit(0 if download_model(args.download_model) else 1)
+    if args.reset_config:
+        sys.exit(0 if reset_config() else 1)
+
+    runner = create_runner(api_base=args.api_base, base_dir=os.path.dirname(os.path.abspath(__file__)))
+    unknown = set(args.check or []) - set(runner.groups)
+    if unknown:
+        parser.error(f"Groupe inconnu: {', '.join(sorted(unknown))} (groupes: {', '.join(runner.groups)})")
+
+    report = run_diagnostic(runner, groups=args.check, budget=args.budget, use_cache=False)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    sys.exit(1 if report["failed_checks"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Canal d'événements poussés aux navigateurs (Server-Sent Events).
+
+Chaque onglet ouvre une seule connexion /api/events et reçoit les
+événements des sujets qui l'intéressent : échantillons GPU (gpu), liste des
+modèles (models), modèle par défaut (default_model), avancement des
+téléchargements de modèles (pull), tâches GitHub (jobs) et modifications des
+projets (projects).
+
+Les valeurs obtenues par interrogation (GPU, modèles d'Ollama) sont lues par
+une source unique partagée par tous les clients. Une source ne tourne que
+tant qu'un client écoute son sujet, et ne publie que lorsque la valeur
+change : la charge du serveur suit le rythme des changements et non le
+nombre d'onglets ouverts.
+
+Les sujets d'état (publiés avec retain=True) conservent leur dernière
+valeur, envoyée à chaque nouvel abonné. Un client qui se reconnecte avec
+Last-Event-ID reçoit les événements manqués s'ils sont encore dans
+l'historique, sinon l'état courant de chaque sujet.
+"""
+import json
+import time
+import threading
+import logging
+from collections import deque, namedtuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'événements conservés pour les reconnexions (Last-Event-ID)
+EVENT_HISTORY_SIZE = 256
+# Événements en attente par abonné avant resynchronisation
+SUBSCRIBER_QUEUE_SIZE = 100
+# Intervalle des commentaires envoyés sur une connexion inactive (en secondes)
+HEARTBEAT_INTERVAL = 15
+# Délai de reconnexion indiqué aux navigateurs (en millisecondes)
+RETRY_DELAY_MS = 3000
+
+EVENTS_PUBLISHED = REGISTRY.counter(
+    'events_published_total', "Événements publiés sur le canal /api/events", ('topic',))
+EVENT_SUBSCRIBER_OVERFLOWS = REGISTRY.counter(
+    'event_subscriber_overflows_total', "Abonnés trop lents, resynchronisés avec l'état courant")
+
+class Event(namedtuple('Event', 'id topic data')):
+    """Événement publié sur un sujet"""
+
+    def encode(self):
+        """Événement au format text/event-stream"""
+        return f"id: {self.id}\nevent: {self.topic}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n"
+
+class Subscription:
+    """
+    Abonnement d'un client à un ensemble de sujets.
+
+    Les événements sont accumulés dans une file bornée ; un abonné qui ne la
+    vide pas assez vite est resynchronisé avec l'état courant des sujets au
+    lieu de bloquer la publication.
+    """
+
+    def __init__(self, bus, topics, max_pending=SUBSCRIBER_QUEUE_SIZE, notify=None):
+        """
+        Args:
+            bus (EventBus): Canal d'événements
+            topics (set): Sujets suivis (None : tous les sujets)
+            max_pending (int): Nombre maximal d'événements en attente
+            notify (callable): Fonction appelée (sans argument) à chaque nouvel événement,
+                               par exemple pour réveiller une boucle asyncio
+        """
+        self.bus = bus
+        self.topics = topics
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.closed = False
+        self._pending = deque()
+        self._notify = notify
+        self._cond = threading.Condition()
+
+    def wants(self, topic):
+        """Indique si l'abonnement suit un sujet"""
+        return self.topics is None or topic in self.topics
+
+    def _deliver(self, event):
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._pending.clear()
+                if not self.overflowed:
+                    EVENT_SUBSCRIBER_OVERFLOWS.inc()
+                self.overflowed = True
+            elif not self.overflowed:
+                self._pending.append(event)
+            self._cond.notify_all()
+        if self._notify:
+            self._notify()
+
+    def drain(self):
+        """
+        Événements en attente, sans attendre.
+
+        Returns:
+            list: Événements (état courant des sujets après un débordement)
+        """
+        with self._cond:
+            if self.overflowed:
+                self.overflowed = False
+                self._pending.clear()
+                return self.bus.snapshot(self.topics)
+            events = list(self._pending)
+            self._pending.clear()
+            return events
+
+    def get(self, timeout=None):
+        """
+        Attend des événements.
+
+        Args:
+            timeout (float): Attente maximale en secondes
+
+        Returns:
+            list: Événements reçus (vide si le délai est écoulé)
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self.overflowed or self.closed, timeout)
+        return self.drain()
+
+    def close(self):
+        """Met fin à l'abonnement"""
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+        self.bus.unsubscribe(self)
+
+class Sampler:
+    """Source qui lit périodiquement une valeur tant qu'un client écoute son sujet"""
+
+    def __init__(self, bus, topic, fetch, interval):
+        self.bus = bus
+        self.topic = topic
+        self.fetch = fetch
+        self.interval = interval
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Démarre la lecture (verrou du canal déjà pris)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"events-{self.topic}", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Relit la valeur sans attendre la fin de l'intervalle"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            with self.bus._lock:
+                if self.bus._stopping or not self.bus._listeners(self.topic):
+                    self._thread = None
+                    return
+            self._wake.clear()
+            try:
+                self.bus.publish(self.topic, self.fetch(), retain=True, only_if_changed=True)
+            except Exception as e:
+                logger.warning("Erreur lors de la lecture de %s: %s", self.topic, e)
+            self._wake.wait(self.interval)
+
+class EventBus:
+    """
+    Canal d'événements multiplexé par sujets.
+    """
+
+    def __init__(self, history_size=EVENT_HISTORY_SIZE, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        """
+        Initialise le canal.
+
+        Args:
+            history_size (int): Nombre d'événements conservés pour les reconnexions
+            queue_size (int): Événements en attente par abonné avant resynchronisation
+        """
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        # Identifiants croissants, y compris d'un démarrage à l'autre
+        self._next_id = int(time.time() * 1000)
+        self._history = deque(maxlen=history_size)
+        self._retained = {}
+        self._subscriptions = set()
+        self._samplers = {}
+        self._stopping = False
+
+    def publish(self, topic, data, retain=False, only_if_changed=False):
+        """
+        Publie un événement.
+
+        Args:
+            topic (str): Sujet
+            data: Contenu (sérialisable en JSON)
+            retain (bool): Conserver la valeur comme état courant du sujet
+            only_if_changed (bool): Ne rien publier si la valeur est celle de l'état courant
+
+        Returns:
+            Event: Événement publié ou None
+        """
+        with self._lock:
+            if only_if_changed and topic in self._retained and self._retained[topic].data == data:
+                return None
+            self._next_id += 1
+            event = Event(self._next_id, topic, data)
+            self._history.append(event)
+            if retain:
+                self._retained[topic] = event
+            subscriptions = [s for s in self._subscriptions if s.wants(topic)]
+
+        EVENTS_PUBLISHED.inc(topic=topic)
+        for subscription in subscriptions:
+            subscription._deliver(event)
+        return event
+
+    def snapshot(self, topics=None):
+        """
+        État courant des sujets.
+
+        Returns:
+            list: Derniers événements des sujets d'état, du plus ancien au plus récent
+        """
+        with self._lock:
+            events = [e for topic, e in self._retained.items() if topics is None or topic in topics]
+        return sorted(events, key=lambda e: e.id)
+
+    def subscribe(self, topics=None, last_event_id=None, notify=None):
+        """
+        Abonne un client.
+
+        Args:
+            topics (iterable): Sujets suivis (None : tous)
+            last_event_id (str): Dernier événement reçu avant une reconnexion
+            notify (callable): Fonction appelée à chaque nouvel événement
+
+        Returns:
+            Subscription: Abonnement, qui contient déjà l'état courant des sujets
+                          ou les événements manqués depuis last_event_id
+        """
+        topics = set(topics) if topics else None
+        subscription = Subscription(self, topics, self.queue_size, notify)
+        try:
+            last_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_id = None
+
+        with self._lock:
+            history = list(self._history)
+            if last_id is not None and history and history[0].id <= last_id + 1 and last_id <= history[-1].id:
+                initial = [e for e in history if e.id > last_id and subscription.wants(e.topic)]
+            else:
+                initial = sorted((e for e in self._retained.values() if subscription.wants(e.topic)),
+                                 key=lambda e: e.id)
+            subscription._pending.extend(initial[-self.queue_size:])
+            self._subscriptions.add(subscription)
+            for topic, sampler in self._samplers.items():
+                if subscription.wants(topic):
+                    sampler.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Retire un abonné (les sources sans abonnés s'arrêtent d'elles-mêmes)"""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _listeners(self, topic):
+        """Nombre d'abonnés d'un sujet (verrou déjà pris)"""
+        return sum(1 for s in self._subscriptions if s.wants(topic))
+
+    def subscriber_count(self, topic=None):
+        """Nombre d'abonnés, au total ou pour un sujet"""
+        with self._lock:
+            return len(self._subscriptions) if topic is None else self._listeners(topic)
+
+    def add_sampler(self, topic, fetch, interval):
+        """
+        Déclare une source lue périodiquement tant qu'un client écoute son sujet.
+
+        Args:
+            topic (str): Sujet
+            fetch (callable): Fonction qui renvoie la valeur courante
+            interval (float): Intervalle entre deux lectures en secondes
+        """
+        with self._lock:
+            sampler = self._samplers[topic] = Sampler(self, topic, fetch, interval)
+            if self._listeners(topic):
+                sampler.start()
+
+    def refresh(self, *topics):
+        """
+        Relit sans attendre les sources de sujets dont la valeur vient de changer.
+
+        Sans abonnés, la valeur conservée est oubliée : elle sera relue au
+        prochain abonnement.
+        """
+        with self._lock:
+            for topic in topics:
+                sampler = self._samplers.get(topic)
+                if sampler is None:
+                    continue
+                if sampler._thread is not None:
+                    sampler.wake()
+                else:
+                    self._retained.pop(topic, None)
+
+    def stream(self, subscription, heartbeat=HEARTBEAT_INTERVAL):
+        """
+        Réponse text/event-stream d'un abonnement (serveurs WSGI).
+
+        Yields:
+            str: Événements encodés, ou commentaire de maintien de la connexion
+        """
+        try:
+            yield f"retry: {RETRY_DELAY_MS}\n\n"
+            while not self._stopping and not subscription.closed:
+                events = subscription.get(timeout=heartbeat)
+                yield "".join(e.encode() for e in events) if events else ": ping\n\n"
+        finally:
+            subscription.close()
+
+    def stop(self):
+        """Ferme les abonnements et arrête les sources"""
+        with self._lock:
+            self._stopping = True
+            subscriptions = list(self._subscriptions)
+            samplers = list(self._samplers.values())
+        for sampler in samplers:
+            sampler.wake()
+        for subscription in subscriptions:
+            subscription.close()
+
+    def collect_metrics(self):
+        """Familles de métriques du canal (pour REGISTRY.register_collector)"""
+        with self._lock:
+            topics = sorted(set(self._samplers) | set(self._retained))
+            counts = [({'topic': topic}, self._listeners(topic)) for topic in topics]
+            total = len(self._subscriptions)
+        return [
+            ('event_subscribers', 'gauge', "Clients abonnés au canal /api/events", [({}, total)]),
+            ('event_topic_subscribers', 'gauge', "Clients abonnés par sujet", counts)
+        ]
@@ -0,0 +1,923 @@
+#!/usr/bin/env python3
+"""
+Connexion des projets à GitHub (ou à tout dépôt git distant).
+
+Les dépôts sont clonés avec GitPython en mode superficiel (--depth) et
+partiel (--filter=blob:none) : seul le dernier commit est récupéré et les
+contenus de fichiers sont téléchargés à la demande, ce qui permet d'importer
+rapidement de gros dépôts dans projects/. Les pulls suivants sont
+incrémentaux : git fetch ne transfère que les nouveaux commits à partir de
+la limite de l'historique superficiel.
+
+Les opérations git (clone, pull, push) s'exécutent dans des tâches en
+arrière-plan dont l'avancement (étape, pourcentage) est consultable pendant
+l'exécution. Le dépôt distant peut être un nom GitHub (owner/repo), une URL
+ou le chemin d'un dépôt nu local (un dépôt nu local accepte --filter avec
+git config uploadpack.allowFilter true), ce qui permet d'utiliser la
+fonctionnalité hors ligne. Les dépôts locaux (chemin ou file://) ne sont
+acceptés que dans les répertoires autorisés (local_roots et remote_base
+s'il est local) ; la ligne de commande les accepte tous.
+
+Le token d'accès personnel (variable GITHUB_TOKEN ou github_config.json)
+sert à l'API GitHub et à l'authentification HTTPS de git, uniquement vers
+github.com ou l'hôte de remote_base ; il n'est jamais écrit dans la
+configuration des dépôts clonés.
+
+L'état de la connexion et la liste des dépôts sont mis en cache (durée
+cache_ttl) : une valeur expirée est renvoyée immédiatement pendant que sa
+mise à jour se fait en arrière-plan, page par page. Les requêtes vers l'API
+sont conditionnelles (If-None-Match avec l'ETag de la réponse précédente) :
+une page inchangée est confirmée par un 304, sans corps ni consommation du
+quota de requêtes de GitHub.
+
+Usage:
+    python github_connector.py clone <projet> <owner/repo|url|chemin>
+    python github_connector.py pull <projet>
+    python github_connector.py push <projet> -m "message"
+"""
+import os
+import re
+import json
+import time
+import uuid
+import base64
+import shutil
+import threading
+import argparse
+import logging
+from pathlib import Path
+from urllib.parse import urlparse, urlencode
+from urllib.request import url2pathname
+
+import requests
+from git import Repo, RemoteProgress, GitCommandError
+from git.remote import PushInfo
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# API GitHub (modifiable pour GitHub Enterprise ou un serveur de test)
+GITHUB_API_URL = "https://api.github.com"
+# Adresse des dépôts désignés par owner/repo
+GITHUB_REMOTE_BASE = "https://github.com"
+# Hôtes qui reçoivent toujours le token (en plus de celui de remote_base)
+TOKEN_HOSTS = {("github.com", None)}
+# Protocoles acceptés pour les URLs de dépôts distants (file:// : voir local_roots)
+REMOTE_SCHEMES = {"https", "http", "ssh", "git"}
+# Dépôt désigné par owner/repo
+OWNER_REPO_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$')
+# Profondeur de l'historique récupéré au clonage (0 : historique complet)
+DEFAULT_CLONE_DEPTH = 1
+# Filtre du clonage partiel ("" : clonage complet)
+DEFAULT_CLONE_FILTER = "blob:none"
+# Délai d'attente des requêtes vers l'API GitHub (en secondes)
+API_TIMEOUT = 10
+# Durée de validité du cache de la connexion et des dépôts (en secondes)
+DEFAULT_CACHE_TTL = 300
+# Attente maximale de la première page des dépôts lorsque le cache est vide
+FIRST_PAGE_WAIT = 5
+# Nombre de tâches terminées conservées pour consultation
+MAX_FINISHED_JOBS = 100
+# Identité des commits si git n'en a pas de configurée
+DEFAULT_AUTHOR = ("Assistant IA", "assistant-ia@localhost")
+
+# Répertoire temporaire du clonage, dans le répertoire du projet
+CLONE_TMP_DIR = ".git-clone"
+
+# Étapes rapportées par git pendant les transferts
+PROGRESS_STAGES = {
+    RemoteProgress.COUNTING: "counting",
+    RemoteProgress.COMPRESSING: "compressing",
+    RemoteProgress.WRITING: "writing",
+    RemoteProgress.RECEIVING: "receiving",
+    RemoteProgress.RESOLVING: "resolving",
+    RemoteProgress.FINDING_SOURCES: "finding_sources",
+    RemoteProgress.CHECKING_OUT: "checking_out",
+}
+
+GITHUB_API_REQUESTS = REGISTRY.counter(
+    'github_api_requests_total', "Requêtes vers l'API GitHub (304 : réponse du cache confirmée)", ('endpoint', 'status'))
+
+class CacheEntry:
+    """Valeur de l'API GitHub mise en cache et état de sa mise à jour"""
+
+    def __init__(self):
+        self.value = None
+        self.fetched_at = 0
+        self.complete = False
+        self.refreshing = False
+        self.error = None
+        # Signalé dès qu'une valeur (ou une première page) est disponible, ou en cas d'erreur
+        self.ready = threading.Event()
+
+    def fresh(self, ttl):
+        """Indique si la valeur complète date de moins de ttl secondes"""
+        return self.complete and time.time() - self.fetched_at < ttl
+
+    def to_dict(self):
+        """Représentation JSON de l'état du cache"""
+        return {
+            'fetched_at': self.fetched_at or None,
+            'complete': self.complete,
+            'refreshing': self.refreshing,
+            'error': self.error
+        }
+
+class JobProgress(RemoteProgress):
+    """Reporte l'avancement d'une opération git dans l'état d'une tâche"""
+
+    def __init__(self, job, lock, notify=None):
+        super().__init__()
+        self.job = job
+        self.lock = lock
+        self.notify = notify
+        self._reported = None
+
+    def update(self, op_code, cur_count, max_count=None, message=''):
+        stage = PROGRESS_STAGES.get(op_code & self.OP_MASK, "working")
+        percent = round(100.0 * cur_count / max_count, 1) if max_count else None
+        with self.lock:
+            self.job['stage'] = stage
+            self.job['progress'] = percent
+            if message:
+                self.job['message'] = message.strip()
+        # Abonnés prévenus à chaque étape et à chaque point de pourcentage
+        reported = (stage, int(percent) if percent is not None else None)
+        if self.notify and reported != self._reported:
+            self._reported = reported
+            self.notify(self.job)
+
+class GitHubConnector:
+    """
+    Synchronisation des projets avec des dépôts git et accès à l'API GitHub.
+    """
+
+    def __init__(self, projects_dir="projects", token=None, username=None, config_path=None,
+                 api_url=GITHUB_API_URL, remote_base=GITHUB_REMOTE_BASE,
+                 depth=DEFAULT_CLONE_DEPTH, clone_filter=DEFAULT_CLONE_FILTER,
+                 cache_ttl=DEFAULT_CACHE_TTL, local_roots=None):
+        """
+        Initialise le connecteur.
+
+        Args:
+            projects_dir (str): Répertoire des projets
+            token (str): Token d'accès personnel (GITHUB_TOKEN ou config_path par défaut)
+            username (str): Nom d'utilisateur GitHub
+            config_path (str): Fichier des identifiants enregistrés (optionnel)
+            api_url (str): URL de l'API GitHub
+            remote_base (str): URL ou répertoire des dépôts désignés par owner/repo
+            depth (int): Profondeur des clonages (0 : historique complet)
+            clone_filter (str): Filtre des clonages partiels ("" : aucun)
+            cache_ttl (float): Durée de validité du cache de l'API GitHub
+            local_roots (list): Répertoires dont les dépôts locaux peuvent être clonés
+                                (remote_base, s'il est local, est toujours autorisé)
+        """
+        self.projects_dir = projects_dir
+        self.config_path = config_path
+        self.api_url = api_url.rstrip('/')
+        self.remote_base = remote_base.rstrip('/')
+        self.depth = depth
+        self.clone_filter = clone_filter
+        self.cache_ttl = cache_ttl
+        self.local_roots = [os.path.realpath(root) for root in (local_roots or [])]
+        base = urlparse(self.remote_base)
+        if base.scheme == "file":
+            self.local_roots.append(os.path.realpath(url2pathname(base.path)))
+        elif "://" not in self.remote_base:
+            self.local_roots.append(os.path.realpath(self.remote_base))
+
+        saved = self._load_credentials()
+        self.token = token or os.environ.get('GITHUB_TOKEN') or saved.get('token')
+        self.username = username or os.environ.get('GITHUB_USERNAME') or saved.get('username')
+
+        self.session = requests.Session()
+        # Réponses de l'API par URL (ETag, données, liens de pagination)
+        self._etags = {}
+        self._cache = {'user': CacheEntry(), 'repositories': CacheEntry()}
+        self._cache_lock = threading.Lock()
+        self._jobs = {}
+        self._events = {}
+        self._jobs_lock = threading.Lock()
+        self._job_subscribers = []
+
+    # Identifiants
+
+    def _load_credentials(self):
+        """Identifiants enregistrés par save_credentials"""
+        if not self.config_path or not os.path.exists(self.config_path):
+            return {}
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Identifiants GitHub non chargés: %s", e)
+            return {}
+
+    def save_credentials(self, username, token):
+        """
+        Enregistre les identifiants GitHub.
+
+        Args:
+            username (str): Nom d'utilisateur
+            token (str): Token d'accès personnel
+
+        Returns:
+            bool: True si les identifiants ont été enregistrés
+        """
+        self.username = username
+        self.token = token
+        self.invalidate_cache()
+        if not self.config_path:
+            return True
+        try:
+            # Fichier lisible uniquement par l'utilisateur courant
+            fd = os.open(self.config_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"username": username, "token": token}, f)
+            return True
+        except OSError as e:
+            logger.error("Erreur lors de l'enregistrement des identifiants GitHub: %s", e)
+            return False
+
+    def clear_credentials(self):
+        """Oublie les identifiants enregistrés"""
+        self.username = None
+        self.token = None
+        self.invalidate_cache()
+        if self.config_path and os.path.exists(self.config_path):
+            os.remove(self.config_path)
+
+    @property
+    def configured(self):
+        """Indique si un token est disponible"""
+        return bool(self.token)
+
+    # API GitHub
+
+    def _api(self, method, path, headers=None, **kwargs):
+        """Requête vers l'API GitHub (chemin relatif ou URL complète)"""
+        request_headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            request_headers["Authorization"] = f"Bearer {self.token}"
+        request_headers.update(headers or {})
+        url = path if path.startswith("http") else f"{self.api_url}{path}"
+        try:
+            response = self.session.request(method, url, headers=request_headers, timeout=API_TIMEOUT, **kwargs)
+        except requests.RequestException:
+            GITHUB_API_REQUESTS.inc(endpoint=urlparse(url).path, status='error')
+            raise
+        GITHUB_API_REQUESTS.inc(endpoint=urlparse(url).path, status=str(response.status_code))
+        return response
+
+    def _get_json(self, path, params=None):
+        """
+        GET conditionnel : la réponse précédente est réutilisée si le serveur répond 304.
+
+        Returns:
+            tuple: (données JSON, liens de pagination)
+        """
+        key = path + ("?" + urlencode(sorted(params.items())) if params else "")
+        cached = self._etags.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        response = self._api("GET", path, headers=headers, params=params)
+        if response.status_code == 304 and cached:
+            return cached[1], cached[2]
+        response.raise_for_status()
+
+        data = response.json()
+        links = {name: link["url"] for name, link in response.links.items()}
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etags[key] = (etag, data, links)
+        return data, links
+
+    def invalidate_cache(self):
+        """Oublie la connexion et les dépôts en cache (changement d'identifiants)"""
+        with self._cache_lock:
+            self._etags.clear()
+            self._cache = {'user': CacheEntry(), 'repositories': CacheEntry()}
+
+    def warm_cache(self):
+        """Lance en arrière-plan la récupération de la connexion et des dépôts"""
+        if self.configured:
+            self._start_refresh('user')
+            self._start_refresh('repositories')
+
+    def cache_status(self):
+        """État du cache de la connexion et des dépôts"""
+        with self._cache_lock:
+            status = {name: entry.to_dict() for name, entry in self._cache.items()}
+            value = self._cache['repositories'].value
+            status['repositories']['count'] = len(value) if value is not None else 0
+            return status
+
+    def _start_refresh(self, name):
+        """Met à jour une entrée du cache en arrière-plan (une seule mise à jour à la fois)"""
+        with self._cache_lock:
+            entry = self._cache[name]
+            if entry.refreshing:
+                return entry
+            entry.refreshing = True
+            if entry.value is None:
+                entry.ready.clear()
+        refresh = self._refresh_user if name == 'user' else self._refresh_repositories
+        threading.Thread(target=refresh, args=(entry,), name=f"github-cache-{name}", daemon=True).start()
+        return entry
+
+    def _cached(self, name, wait, refresh=False):
+        """
+        Valeur en cache, mise à jour en arrière-plan si elle a expiré.
+
+        Args:
+            name (str): Entrée du cache (user, repositories)
+            wait (float): Attente maximale si aucune valeur n'est encore disponible
+            refresh (bool): Forcer la mise à jour
+
+        Returns:
+            CacheEntry: Entrée du cache
+        """
+        with self._cache_lock:
+            entry = self._cache[name]
+        if refresh or not entry.fresh(self.cache_ttl):
+            entry = self._start_refresh(name)
+        if entry.value is None and not entry.complete:
+            entry.ready.wait(wait)
+        return entry
+
+    def _refresh_user(self, entry):
+        """Récupère l'utilisateur authentifié (None si le token est refusé)"""
+        try:
+            user, _ = self._get_json("/user")
+            value = {key: user.get(key) for key in ("login", "name", "avatar_url", "html_url")}
+            error = None
+        except requests.HTTPError as e:
+            logger.warning("Connexion GitHub refusée: HTTP %s", e.response.status_code)
+            value, error = None, f"HTTP {e.response.status_code}"
+        except requests.RequestException as e:
+            logger.error("Erreur lors de la connexion à GitHub: %s", e)
+            with self._cache_lock:
+                entry.error = str(e)
+                entry.refreshing = False
+            entry.ready.set()
+            return
+
+        with self._cache_lock:
+            entry.value = value
+            entry.error = error
+            entry.complete = True
+            entry.fetched_at = time.time()
+            entry.refreshing = False
+        entry.ready.set()
+
+    def _refresh_repositories(self, entry):
+        """
+        Récupère toutes les pages des dépôts.
+
+        Si aucune liste n'est encore en cache, chaque page est publiée dès
+        sa réception ; sinon, la liste précédente reste servie jusqu'à la
+        fin de la mise à jour.
+        """
+        repositories = []
+        path = "/user/repos"
+        params = {"per_page": 100, "sort": "updated"}
+        try:
+            while path:
+                page, links = self._get_json(path, params)
+                repositories.extend(self._repository_info(repo) for repo in page)
+                with self._cache_lock:
+                    if not entry.complete:
+                        entry.value = list(repositories)
+                entry.ready.set()
+                path, params = links.get("next"), None
+
+            with self._cache_lock:
+                entry.value = repositories
+                entry.error = None
+                entry.complete = True
+                entry.fetched_at = time.time()
+            logger.info("Dépôts GitHub mis en cache: %s", len(repositories))
+        except requests.RequestException as e:
+            logger.error("Erreur lors de la récupération des dépôts GitHub: %s", e)
+            with self._cache_lock:
+                entry.error = str(e)
+        finally:
+            with self._cache_lock:
+                entry.refreshing = False
+            entry.ready.set()
+
+    def test_connection(self, refresh=False):
+        """
+        Vérifie le token auprès de l'API GitHub (résultat mis en cache).
+
+        Args:
+            refresh (bool): Ignorer le cache
+
+        Returns:
+            dict: Utilisateur authentifié (login, name, avatar_url, html_url) ou None
+        """
+        if not self.configured:
+            return None
+        return self._cached('user', API_TIMEOUT, refresh).value
+
+    def list_repositories(self, refresh=False, wait=FIRST_PAGE_WAIT):
+        """
+        Liste les dépôts accessibles avec le token, depuis le cache.
+
+        Une liste expirée est renvoyée telle quelle pendant sa mise à jour ;
+        si aucune liste n'est en cache, seule la première page est attendue
+        (au plus wait secondes) et la liste se complète en arrière-plan
+        (voir cache_status).
+
+        Args:
+            refresh (bool): Forcer la mise à jour en arrière-plan
+            wait (float): Attente maximale de la première page
+
+        Returns:
+            list: Dépôts (voir _repository_info) ou None si aucun n'est disponible
+        """
+        if not self.configured:
+            return None
+        value = self._cached('repositories', wait, refresh).value
+        return list(value) if value is not None else None
+
+    def create_repository(self, name, description="", private=True):
+        """
+        Crée un dépôt pour l'utilisateur authentifié.
+
+        Args:
+            name (str): Nom du dépôt
+            description (str): Description
+            private (bool): Dépôt privé
+
+        Returns:
+            dict: Dépôt créé ou None en cas d'erreur
+        """
+        if not self.configured:
+            return None
+        try:
+            response = self._api("POST", "/user/repos", json={
+                "name": name, "description": description, "private": bool(private)
+            })
+            response.raise_for_status()
+            repository = self._repository_info(response.json())
+        except requests.RequestException as e:
+            logger.error("Erreur lors de la création du dépôt %s: %s", name, e)
+            return None
+
+        with self._cache_lock:
+            entry = self._cache['repositories']
+            if entry.value is not None:
+                entry.value = [repository] + entry.value
+        return repository
+
+    def _repository_info(self, repo):
+        """Champs d'un dépôt utilisés par l'interface"""
+        keys = ("name", "full_name", "description", "private", "default_branch",
+                "updated_at", "language", "clone_url", "html_url")
+        return {key: repo.get(key) for key in keys}
+
+    # Dépôts git
+
+    def resolve_remote(self, source):
+        """
+        URL git d'un dépôt distant.
+
+        Args:
+            source (str): owner/repo, URL (https, http, ssh, git, file) ou chemin d'un dépôt local
+
+        Returns:
+            str: URL utilisable par git
+
+        Raises:
+            ValueError: Protocole non autorisé, dépôt local hors des répertoires autorisés
+                        ou nom de dépôt invalide
+        """
+        if "://" in source:
+            parsed = urlparse(source)
+            scheme = parsed.scheme.lower()
+            if scheme == "file":
+                self._check_local(url2pathname(parsed.path))
+                return source
+            if scheme not in REMOTE_SCHEMES:
+                raise ValueError(f"Protocole non autorisé: {scheme}")
+            return source
+        if source.startswith("git@"):
+            return source
+
+        owner_repo = source.strip("/")
+        if os.path.isabs(source) or source.startswith((".", "~")) or not OWNER_REPO_PATTERN.match(owner_repo):
+            path = self._check_local(os.path.expanduser(source))
+            if not os.path.isdir(path):
+                raise ValueError(f"Dépôt invalide: {source}")
+            # file:// plutôt qu'un chemin : git ignore --depth pour les clones locaux
+            return Path(path).as_uri()
+
+        if not owner_repo.endswith(".git"):
+            owner_repo += ".git"
+        if "://" in self.remote_base:
+            return f"{self.remote_base}/{owner_repo}"
+        return Path(self.remote_base, owner_repo).resolve().as_uri()
+
+    def _check_local(self, path):
+        """
+        Vérifie qu'un dépôt local est dans un répertoire autorisé.
+
+        Returns:
+            str: Chemin absolu du dépôt
+        """
+        real = os.path.realpath(path)
+        for root in self.local_roots:
+            if os.path.commonpath([real, root]) == root:
+                return real
+        raise ValueError(f"Dépôt local non autorisé: {path}")
+
+    def _sends_token(self, url):
+        """Indique si le token peut être envoyé à un dépôt (HTTPS vers github.com ou l'hôte de remote_base)"""
+        parsed = urlparse(url)
+        if parsed.scheme.lower() != "https" or not parsed.hostname:
+            return False
+        hosts = set(TOKEN_HOSTS)
+        base = urlparse(self.remote_base)
+        if base.scheme.lower() == "https" and base.hostname:
+            hosts.add((base.hostname.lower(), base.port))
+        return (parsed.hostname.lower(), parsed.port) in hosts
+
+    def _git_env(self, url):
+        """Variables d'environnement de git : jamais d'invite, token pour HTTPS vers un hôte de confiance"""
+        env = {"GIT_TERMINAL_PROMPT": "0"}
+        if self.token and self._sends_token(url):
+            # En-tête passé par l'environnement pour ne pas l'écrire dans .git/config
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            env.update({
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "http.extraHeader",
+                "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+            })
+        return env
+
+    def _project_path(self, project_id):
+        """Répertoire d'un projet existant"""
+        project_path = os.path.join(self.projects_dir, project_id)
+        if not os.path.isdir(project_path):
+            raise ValueError(f"Projet {project_id} non trouvé")
+        return project_path
+
+    def _open(self, project_id):
+        """Dépôt git d'un projet"""
+        project_path = self._project_path(project_id)
+        if not os.path.isdir(os.path.join(project_path, ".git")):
+            raise ValueError(f"Le projet {project_id} n'est pas lié à un dépôt git")
+        return Repo(project_path)
+
+    def _exclude_metadata(self, repo):
+        """Les métadonnées du projet ne sont jamais versionnées"""
+        exclude_path = os.path.join(repo.git_dir, "info", "exclude")
+        os.makedirs(os.path.dirname(exclude_path), exist_ok=True)
+        content = ""
+        if os.path.exists(exclude_path):
+            with open(exclude_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        if "/metadata.json" not in content.splitlines():
+            with open(exclude_path, "a", encoding="utf-8") as f:
+                if content and not content.endswith("\n"):
+                    f.write("\n")
+                f.write("/metadata.json\n")
+
+    def _branch(self, repo):
+        """Branche courante (branche par défaut du dépôt distant si HEAD n'existe pas encore)"""
+        try:
+            return repo.active_branch.name
+        except TypeError:
+            # HEAD détachée
+            return None
+
+    def _commit(self, repo):
+        """Commit courant ou None si le dépôt est vide"""
+        return repo.head.commit.hexsha if repo.head.is_valid() else None
+
+    def clone(self, project_id, source, branch=None, depth=None, clone_filter=None, progress=None):
+        """
+        Clone un dépôt dans le répertoire d'un projet existant.
+
+        Le clonage est fait dans un répertoire temporaire du projet puis les
+        fichiers sont déplacés, les métadonnées du projet étant conservées.
+
+        Args:
+            project_id (str): ID du projet
+            source (str): Dépôt distant (voir resolve_remote)
+            branch (str): Branche à récupérer (branche par défaut du dépôt sinon)
+            depth (int): Profondeur de l'historique (self.depth par défaut, 0 : complet)
+            clone_filter (str): Filtre partiel (self.clone_filter par défaut, "" : aucun)
+            progress (RemoteProgress): Suivi de l'avancement
+
+        Returns:
+            dict: URL, branche, commit et caractère superficiel du clone
+        """
+        project_path = self._project_path(project_id)
+        if os.path.exists(os.path.join(project_path, ".git")):
+            raise ValueError(f"Le projet {project_id} est déjà lié à un dépôt git")
+
+        url = self.resolve_remote(source)
+        depth = self.depth if depth is None else depth
+        clone_filter = self.clone_filter if clone_filter is None else clone_filter
+
+        options = []
+        if depth:
+            options.append(f"--depth={int(depth)}")
+        if clone_filter:
+            options.append(f"--filter={clone_filter}")
+        kwargs = {"branch": branch} if branch else {}
+
+        tmp_path = os.path.join(project_path, CLONE_TMP_DIR)
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        start = time.time()
+        try:
+            repo = Repo.clone_from(url, tmp_path, progress=progress, env=self._git_env(url),
+                                   multi_options=options, **kwargs)
+            repo.close()
+            for name in os.listdir(tmp_path):
+                target = os.path.join(project_path, name)
+                if os.path.exists(target):
+                    logger.warning("%s existe déjà dans le projet %s, fichier du dépôt ignoré", name, project_id)
+                    continue
+                os.rename(os.path.join(tmp_path, name), target)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        repo = Repo(project_path)
+        self._exclude_metadata(repo)
+        logger.info("Dépôt %s cloné dans %s en %.2fs (%s)", url, project_id, time.time() - start, ' '.join(options))
+        return {
+            "remote": url,
+            "branch": self._branch(repo),
+            "commit": self._commit(repo),
+            "shallow": os.path.exists(os.path.join(repo.git_dir, "shallow")),
+        }
+
+    def link(self, project_id, source):
+        """
+        Lie un projet à un dépôt distant (initialise le dépôt git si besoin).
+
+        Args:
+            project_id (str): ID du projet
+            source (str): Dépôt distant (voir resolve_remote)
+
+        Returns:
+            dict: URL et branche du dépôt
+        """
+        project_path = self._project_path(project_id)
+        url = self.resolve_remote(source)
+        if os.path.isdir(os.path.join(project_path, ".git")):
+            repo = Repo(project_path)
+        else:
+            repo = Repo.init(project_path, initial_branch="main")
+
+        if "origin" in [remote.name for remote in repo.remotes]:
+            repo.remote("origin").set_url(url)
+        else:
+            repo.create_remote("origin", url)
+        self._exclude_metadata(repo)
+        logger.info("Projet %s lié à %s", project_id, url)
+        return {"remote": url, "branch": self._branch(repo)}
+
+    def pull(self, project_id, progress=None):
+        """
+        Récupère les nouveaux commits de la branche distante et les fusionne.
+
+        Le fetch est incrémental (y compris pour un clone superficiel) et
+        respecte le filtre partiel du clone. Les modifications locales non
+        validées sont mises de côté le temps de la fusion.
+
+        Args:
+            project_id (str): ID du projet
+            progress (RemoteProgress): Suivi de l'avancement
+
+        Returns:
+            dict: Branche, commits avant et après, fichiers modifiés
+        """
+        repo = self._open(project_id)
+        origin = repo.remote("origin")
+        branch = self._branch(repo)
+        before = self._commit(repo)
+
+        with repo.git.custom_environment(**self._git_env(origin.url)):
+            origin.fetch(branch or "HEAD", progress=progress)
+
+            if before is None:
+                # Dépôt lié mais sans commit local : adopter la branche distante
+                repo.git.checkout("-B", branch or "main", "FETCH_HEAD")
+            else:
+                try:
+                    repo.git.merge("FETCH_HEAD", "--no-edit", "--autostash")
+                except GitCommandError:
+                    if os.path.exists(os.path.join(repo.git_dir, "MERGE_HEAD")):
+                        repo.git.merge("--abort")
+                    raise
+
+        after = self._commit(repo)
+        changed = repo.git.diff("--name-only", before, after).splitlines() if before and before != after else []
+        logger.info("Pull de %s: %s -> %s (%s fichiers)", project_id, before, after, len(changed))
+        return {"branch": self._branch(repo), "before": before, "after": after,
+                "updated": before != after, "changed_files": changed}
+
+    def push(self, project_id, message, progress=None):
+        """
+        Valide toutes les modifications du projet et les envoie au dépôt distant.
+
+        Args:
+            project_id (str): ID du projet
+            message (str): Message du commit
+            progress (RemoteProgress): Suivi de l'avancement
+
+        Returns:
+            dict: Branche, commit envoyé et création ou non d'un commit
+        """
+        repo = self._open(project_id)
+        origin = repo.remote("origin")
+        branch = self._branch(repo) or "main"
+
+        repo.git.add(A=True)
+        committed = False
+        if not repo.head.is_valid() or repo.is_dirty(index=True, working_tree=False):
+            env = {}
+            reader = repo.config_reader()
+            if not reader.has_option("user", "name") or not reader.has_option("user", "email"):
+                name, email = self.username or DEFAULT_AUTHOR[0], DEFAULT_AUTHOR[1]
+                env = {"GIT_AUTHOR_NAME": name, "GIT_AUTHOR_EMAIL": email,
+                       "GIT_COMMITTER_NAME": name, "GIT_COMMITTER_EMAIL": email}
+            with repo.git.custom_environment(**env):
+                repo.git.commit("-m", message)
+            committed = True
+
+        with repo.git.custom_environment(**self._git_env(origin.url)):
+            results = origin.push(f"HEAD:refs/heads/{branch}", progress=progress)
+        for info in results:
+            if info.flags & (PushInfo.ERROR | PushInfo.REJECTED | PushInfo.REMOTE_REJECTED):
+                raise RuntimeError(f"Push refusé: {info.summary.strip()}")
+
+        commit = self._commit(repo)
+        logger.info("Push de %s vers %s (%s, %s)", project_id, origin.url, branch, commit)
+        return {"branch": branch, "commit": commit, "committed": committed}
+
+    def status(self, project_id):
+        """
+        État git d'un projet.
+
+        Returns:
+            dict: Dépôt distant, branche, commit, clone superficiel/partiel, modifications
+                  ou None si le projet n'est pas un dépôt git
+        """
+        try:
+            repo = self._open(project_id)
+        except ValueError:
+            return None
+        origin = next((remote for remote in repo.remotes if remote.name == "origin"), None)
+        return {
+            "remote": origin.url if origin else None,
+            "branch": self._branch(repo),
+            "commit": self._commit(repo),
+            "shallow": os.path.exists(os.path.join(repo.git_dir, "shallow")),
+            "partial": repo.config_reader().has_option('remote "origin"', "partialclonefilter"),
+            "dirty": repo.is_dirty(untracked_files=True),
+        }
+
+    # Tâches en arrière-plan
+
+    def subscribe_jobs(self, callback):
+        """
+        Abonne une fonction à l'avancement des tâches.
+
+        Args:
+            callback (callable): Fonction appelée avec l'état de la tâche (voir get_job)
+        """
+        self._job_subscribers.append(callback)
+
+    def _notify_job(self, job):
+        """Transmet l'état d'une tâche aux abonnés"""
+        with self._jobs_lock:
+            state = dict(job)
+        for callback in list(self._job_subscribers):
+            try:
+                callback(state)
+            except Exception as e:
+                logger.warning("Erreur lors de la notification de la tâche %s: %s", state['id'], e)
+
+    def start_job(self, kind, project_id, func, *args, **kwargs):
+        """
+        Exécute une opération dans un thread en suivant son avancement.
+
+        Args:
+            kind (str): Type d'opération (clone, pull, push...)
+            project_id (str): ID du projet concerné
+            func (callable): Opération, appelée avec progress=JobProgress en plus des arguments
+
+        Returns:
+            dict: État initial de la tâche (voir get_job)
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id, "kind": kind, "project_id": project_id, "status": "running",
+            "stage": None, "progress": None, "message": None, "result": None, "error": None,
+            "started_at": time.time(), "finished_at": None,
+        }
+        event = threading.Event()
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+            self._events[job_id] = event
+            self._prune_jobs()
+
+        def run():
+            try:
+                result = func(*args, progress=JobProgress(job, self._jobs_lock, self._notify_job), **kwargs)
+                with self._jobs_lock:
+                    job.update(status="completed", result=result, progress=100.0)
+            except Exception as e:
+                logger.error("Erreur lors de l'opération %s du projet %s: %s", kind, project_id, e)
+                with self._jobs_lock:
+                    job.update(status="failed", error=str(e))
+            finally:
+                with self._jobs_lock:
+                    job["finished_at"] = time.time()
+                self._notify_job(job)
+                event.set()
+
+        self._notify_job(job)
+        threading.Thread(target=run, name=f"github-{kind}-{job_id}", daemon=True).start()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id):
+        """
+        État d'une tâche.
+
+        Returns:
+            dict: id, kind, project_id, status (running, completed, failed), stage,
+                  progress (%), message, result, error, started_at, finished_at ou None
+        """
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, project_id=None):
+        """Tâches connues, les plus récentes en premier"""
+        with self._jobs_lock:
+            jobs = [dict(job) for job in self._jobs.values()
+                    if project_id is None or job["project_id"] == project_id]
+        return sorted(jobs, key=lambda job: job["started_at"], reverse=True)
+
+    def wait_job(self, job_id, timeout=None):
+        """
+        Attend la fin d'une tâche.
+
+        Returns:
+            dict: État de la tâche (status reste running si le délai est dépassé)
+        """
+        event = self._events.get(job_id)
+        if event:
+            event.wait(timeout)
+        return self.get_job(job_id)
+
+    def _prune_jobs(self):
+        """Oublie les tâches terminées les plus anciennes (verrou déjà pris)"""
+        finished = [job for job in self._jobs.values() if job["status"] != "running"]
+        for job in sorted(finished, key=lambda job: job["started_at"])[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job["id"], None)
+            self._events.pop(job["id"], None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Synchronisation des projets avec des dépôts git")
+    parser.add_argument("--projects-dir", default="projects", help="Répertoire des projets")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    clone_parser = subparsers.add_parser("clone", help="Cloner un dépôt dans un projet existant")
+    clone_parser.add_argument("project")
+    clone_parser.add_argument("source", help="owner/repo, URL ou chemin d'un dépôt local")
+    clone_parser.add_argument("--branch")
+    clone_parser.add_argument("--depth", type=int, default=DEFAULT_CLONE_DEPTH)
+    clone_parser.add_argument("--filter", default=DEFAULT_CLONE_FILTER)
+    pull_parser = subparsers.add_parser("pull", help="Récupérer les nouveaux commits")
+    pull_parser.add_argument("project")
+    push_parser = subparsers.add_parser("push", help="Valider et envoyer les modifications")
+    push_parser.add_argument("project")
+    push_parser.add_argument("-m", "--message", default="Mise à jour depuis Assistant IA")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # En ligne de commande, tous les dépôts locaux sont accessibles
+    connector = GitHubConnector(args.projects_dir, local_roots=[os.path.abspath(os.sep)])
+    if args.command == "clone":
+        job = connector.start_job("clone", args.project, connector.clone, args.project, args.source,
+                                  branch=args.branch, depth=args.depth, clone_filter=args.filter)
+    elif args.command == "pull":
+        job = connector.start_job("pull", args.project, connector.pull, args.project)
+    else:
+        job = connector.start_job("push", args.project, connector.push, args.project, args.message)
+
+    while job["status"] == "running":
+        job = connector.wait_job(job["id"], timeout=0.5)
+        if job["stage"]:
+            print(f"\r{job['stage']}: {job['progress'] or 0:.0f}%", end="", flush=True)
+    print()
+    print(json.dumps(job["result"] if job["status"] == "completed" else {"error": job["error"]}, indent=2))
+
+if __name__ == "__main__":
+    main()
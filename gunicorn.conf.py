@@ -0,0 +1,34 @@
+"""
+Configuration de gunicorn (serveur de production Linux/macOS).
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Les réglages sont lus dans les variables d'environnement. L'application
+garde en mémoire des états par processus (conversations de /api/chat,
+métriques, traces) : avec plusieurs processus, les conversations ne sont
+retrouvées que si les requêtes d'une même session arrivent au même
+processus. Un seul processus avec plusieurs threads est donc le réglage
+par défaut ; les threads (worker gthread) servent aussi les réponses en
+streaming sans bloquer les autres requêtes.
+"""
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_WORKERS', 1))
+threads = int(os.environ.get('WEB_THREADS', 8))
+worker_class = 'gthread'
+
+# Inférences et téléchargements de modèles longs ; le thread principal du
+# worker continue de signaler son activité pendant les requêtes longues
+timeout = int(os.environ.get('WEB_TIMEOUT', 300))
+# Arrêt propre : délai laissé aux requêtes en cours après SIGTERM
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycler les processus pour contenir une éventuelle croissance mémoire
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
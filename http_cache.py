@@ -0,0 +1,242 @@
+"""
+Compression et réponses conditionnelles de l'application Flask.
+
+- Les réponses texte (JSON, HTML, CSS, JavaScript...) de plus de
+  min_size octets sont compressées en gzip si le client l'accepte. Les
+  fichiers statiques et les réponses JSON identiques ne sont compressés
+  qu'une fois : le résultat est conservé dans un cache LRU borné en octets.
+- Les réponses JSON des requêtes GET reçoivent un ETag (faible, commun aux
+  versions compressée et non compressée) ; une requête If-None-Match dont
+  l'ETag correspond reçoit un 304 sans corps.
+- url_for('static', ...) ajoute au chemin une version calculée à partir
+  du contenu du fichier (?v=<empreinte>) ; les URLs versionnées sont servies
+  avec Cache-Control: immutable et une durée d'un an, si bien qu'un
+  navigateur ne redemande un fichier statique que lorsqu'il a changé.
+
+Les réponses en streaming (SSE, exports, documents bruts) ne sont jamais
+mises en mémoire ni compressées.
+
+Paramètres (config.json, section "server") : compression_min_size,
+compression_level, static_max_age.
+"""
+import os
+import gzip
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.security import safe_join
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Taille minimale d'une réponse compressée (en octets)
+DEFAULT_MIN_SIZE = 1024
+# Niveau de compression gzip (1 : rapide, 9 : compact)
+DEFAULT_COMPRESSION_LEVEL = 6
+# Durée de cache des fichiers statiques versionnés (en secondes)
+DEFAULT_STATIC_MAX_AGE = 365 * 24 * 3600
+# Taille maximale du cache des réponses compressées (en octets)
+COMPRESSED_CACHE_SIZE = 32 * 1024 * 1024
+# Longueur de l'empreinte des URLs statiques
+VERSION_LENGTH = 12
+# Types compressibles (en plus de text/*)
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/javascript'
+}
+
+HTTP_COMPRESSED_BYTES = REGISTRY.counter(
+    'http_compressed_bytes_total', "Octets des réponses compressées, avant et après compression", ('stage',))
+HTTP_NOT_MODIFIED = REGISTRY.counter(
+    'http_not_modified_total', "Réponses 304 envoyées grâce à If-None-Match", ('kind',))
+
+class CompressedCache:
+    """Cache LRU des contenus compressés, borné par leur taille totale"""
+
+    def __init__(self, max_bytes=COMPRESSED_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, key, data_or_loader, level):
+        """
+        Contenu compressé associé à une clé, compressé au premier appel.
+
+        Args:
+            key (tuple): Clé (empreinte du contenu, chemin et date de modification...)
+            data_or_loader (bytes | callable): Contenu, ou fonction qui le renvoie
+            level (int): Niveau de compression
+
+        Returns:
+            tuple: (contenu compressé, taille d'origine)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        data = data_or_loader() if callable(data_or_loader) else data_or_loader
+        # mtime=0 : même contenu compressé à chaque fois (pas de date dans l'en-tête gzip)
+        entry = (gzip.compress(data, compresslevel=level, mtime=0), len(data))
+        with self._lock:
+            if key not in self._entries and len(entry[0]) <= self.max_bytes:
+                self._entries[key] = entry
+                self.size += len(entry[0])
+                while self.size > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return entry
+
+class StaticVersions:
+    """Empreintes des fichiers statiques, recalculées quand un fichier change"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, filename):
+        """
+        Empreinte du contenu d'un fichier statique.
+
+        Returns:
+            str: Empreinte (VERSION_LENGTH caractères hexadécimaux) ou None si le fichier n'existe pas
+        """
+        path = safe_join(self.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._versions.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+        version = digest.hexdigest()[:VERSION_LENGTH]
+        with self._lock:
+            self._versions[path] = (signature, version)
+        return version
+
+def is_compressible(mimetype):
+    """Indique si un type de contenu gagne à être compressé"""
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+def setup_http_cache(app, config=None):
+    """
+    Active la compression, les ETags des réponses JSON et le versionnage des fichiers statiques.
+
+    Args:
+        app (Flask): Application
+        config (dict): Section "server" de config.json (compression_min_size,
+                       compression_level, static_max_age)
+
+    Returns:
+        dict: Objets partagés (cache des contenus compressés, versions des fichiers statiques)
+    """
+    config = config or {}
+    min_size = config.get('compression_min_size', DEFAULT_MIN_SIZE)
+    level = config.get('compression_level', DEFAULT_COMPRESSION_LEVEL)
+    static_max_age = config.get('static_max_age', DEFAULT_STATIC_MAX_AGE)
+
+    cache = CompressedCache()
+    versions = StaticVersions(app.static_folder)
+    # JSON compact y compris en mode debug
+    app.json.compact = True
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            version = versions.version(values['filename'])
+            if version:
+                values['v'] = version
+
+    @app.after_request
+    def compress_and_tag(response):
+        if response.status_code != 200:
+            return response
+
+        static_path = None
+        if request.endpoint == 'static':
+            filename = (request.view_args or {}).get('filename', '')
+            version = request.args.get('v')
+            if version and version == versions.version(filename):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = static_max_age
+                response.cache_control.immutable = True
+            static_path = safe_join(app.static_folder, filename)
+        elif request.method in ('GET', 'HEAD') and response.mimetype == 'application/json' \
+                and not response.is_streamed:
+            # ETag faible : identique pour les versions compressée et non compressée
+            response.add_etag(weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                HTTP_NOT_MODIFIED.inc(kind='json')
+                return response
+
+        if (response.is_streamed and static_path is None) or response.headers.get('Content-Encoding') \
+                or not is_compressible(response.mimetype) or 'Range' in request.headers \
+                or 'gzip' not in request.accept_encodings:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if static_path is not None:
+            try:
+                stat = os.stat(static_path)
+            except OSError:
+                return response
+            if stat.st_size < min_size:
+                return response
+
+            def read_file():
+                with open(static_path, 'rb') as f:
+                    return f.read()
+            compressed, original_size = cache.get_or_compress(
+                ('static', static_path, stat.st_mtime_ns, stat.st_size), read_file, level)
+            response.close()
+            response.direct_passthrough = False
+            etag, weak = response.get_etag()
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            etag, _ = response.get_etag()
+            if etag:
+                compressed, original_size = cache.get_or_compress(('etag', etag), data, level)
+            else:
+                compressed, original_size = gzip.compress(data, compresslevel=level, mtime=0), len(data)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+        HTTP_COMPRESSED_BYTES.inc(original_size, stage='original')
+        HTTP_COMPRESSED_BYTES.inc(len(compressed), stage='compressed')
+        return response
+
+    REGISTRY.register_collector(lambda: [
+        ('http_compressed_cache_bytes', 'gauge', "Taille du cache des réponses compressées",
+         [({}, cache.size)]),
+        ('http_compressed_cache_hits_total', 'counter', "Réponses compressées servies depuis le cache",
+         [({}, cache.hits)]),
+        ('http_compressed_cache_misses_total', 'counter', "Réponses compressées à la demande",
+         [({}, cache.misses)])
+    ])
+    return {'compressed_cache': cache, 'static_versions': versions}
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Historique des inférences en colonnes NumPy.
+
+Chaque inférence est un enregistrement de taille fixe (date, modèle,
+prompt, max_tokens, longueur de la réponse, durée) ajouté à la fin d'un
+fichier binaire par mois (stats/history/records-AAAA-MM.bin). Les modèles
+et les prompts sont remplacés par une empreinte de 64 bits ; le texte
+correspondant est écrit une seule fois dans une table de chaînes : les
+noms de modèles dans models.jsonl, les prompts dans la table du mois
+(prompts-AAAA-MM.jsonl). Aucun fichier n'est jamais réécrit : un ajout
+coûte une écriture de 36 octets, et la rétention, appliquée au plus une
+fois par heure, supprime les mois entiers trop anciens avec leurs prompts.
+
+En mémoire, les enregistrements sont triés par date et agrégés par minute
+et par heure (nombre, sommes et durée maximale, par modèle). Une requête
+sur une période lit le niveau d'agrégation le plus grossier compatible
+avec la résolution demandée, puis le réduit au nombre de points voulu :
+son coût dépend du nombre de points et non de la taille de l'historique.
+
+Plusieurs processus (WEB_WORKERS) peuvent écrire dans le même historique :
+chacun relit avant une requête les enregistrements ajoutés par les autres.
+
+Usage:
+    python inference_history.py import stats/inference_stats.json
+    python inference_history.py series --hours 24 --points 24
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Durée de conservation de l'historique (en jours, arrondie au mois entamé)
+DEFAULT_RETENTION_DAYS = 90
+# Nombre de points par défaut d'une série
+DEFAULT_POINTS = 100
+# Nombre maximal de points d'une série
+MAX_POINTS = 1000
+# Période par défaut d'une série (en secondes)
+DEFAULT_RANGE = 7 * 24 * 3600
+# Niveaux d'agrégation (en secondes), du plus fin au plus grossier
+ROLLUP_LEVELS = {'minute': 60, 'hour': 3600}
+# Taille maximale d'un prompt conservé
+PROMPT_MAX_CHARS = 200
+# Intervalle entre deux applications de la durée de conservation (en secondes)
+RETENTION_INTERVAL = 3600
+# Nombre d'enregistrements examinés en premier par recent() pour un modèle
+RECENT_SCAN_ROWS = 1024
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'), ('model', '<u8'), ('prompt', '<u8'),
+    ('max_tokens', '<i4'), ('output_length', '<i4'), ('execution_time', '<f4')
+])
+ROLLUP_DTYPE = np.dtype([
+    ('bucket', '<i8'), ('model', '<u8'), ('count', '<i8'),
+    ('output_length', '<f8'), ('execution_time', '<f8'), ('max_execution_time', '<f4')
+])
+SEGMENT_PATTERN = re.compile(r'^records-(\d{4})-(\d{2})\.bin$')
+MODELS_FILE = 'models.jsonl'
+# Table unique des versions précédentes, répartie au démarrage
+LEGACY_STRINGS_FILE = 'strings.jsonl'
+
+def string_key(text):
+    """Empreinte de 64 bits d'une chaîne de la table"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def segment_name(timestamp):
+    """Fichier des enregistrements du mois d'une date"""
+    return time.strftime('records-%Y-%m.bin', time.gmtime(timestamp))
+
+def prompts_name(segment):
+    """Table des prompts d'un fichier d'enregistrements"""
+    return 'prompts-' + segment[len('records-'):-len('.bin')] + '.jsonl'
+
+class _Table:
+    """Tableau structuré trié, agrandi par doublement de capacité"""
+
+    def __init__(self, dtype, key):
+        self.key = key
+        self._data = np.zeros(64, dtype=dtype)
+        self.size = 0
+
+    @property
+    def rows(self):
+        return self._data[:self.size]
+
+    def replace_tail(self, start, rows):
+        """Remplace les lignes à partir de start par rows"""
+        needed = start + len(rows)
+        if needed > len(self._data):
+            grown = np.zeros(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:start] = self._data[:start]
+            self._data = grown
+        self._data[start:needed] = rows
+        self.size = needed
+
+    def drop_before(self, value):
+        """Supprime les premières lignes, dont la clé est inférieure à value"""
+        count = int(np.searchsorted(self.rows[self.key], value, side='left'))
+        if count:
+            self.replace_tail(0, self.rows[count:].copy())
+
+    def merge(self, rows, combine=None):
+        """
+        Insère des lignes triées. Seule la fin du tableau, à partir de la
+        première clé insérée, est recopiée : un ajout dans l'ordre des dates
+        ne touche que les dernières lignes.
+        """
+        if not len(rows):
+            return
+        start = int(np.searchsorted(self.rows[self.key], rows[self.key][0], side='left'))
+        tail = np.concatenate([self.rows[start:], rows])
+        tail = tail[np.argsort(tail[self.key], kind='stable')]
+        self.replace_tail(start, combine(tail) if combine else tail)
+
+def rollup(records, seconds):
+    """Agrège des enregistrements par intervalle de seconds secondes et par modèle"""
+    buckets = (records['timestamp'] // seconds).astype(np.int64) * seconds
+    keys = np.stack([buckets.view(np.uint64), records['model']], axis=1)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    rows = np.zeros(len(unique), dtype=ROLLUP_DTYPE)
+    rows['bucket'] = unique[:, 0].view(np.int64)
+    rows['model'] = unique[:, 1]
+    rows['count'] = np.bincount(inverse, minlength=len(unique))
+    rows['output_length'] = np.bincount(inverse, weights=records['output_length'], minlength=len(unique))
+    rows['execution_time'] = np.bincount(inverse, weights=records['execution_time'], minlength=len(unique))
+    np.maximum.at(rows['max_execution_time'], inverse, records['execution_time'])
+    return rows
+
+def combine_rollups(rows):
+    """Fusionne les lignes d'agrégats de même intervalle et de même modèle (lignes triées par intervalle)"""
+    keys = np.stack([rows['bucket'].view(np.uint64), rows['model']], axis=1)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    if len(unique) == len(rows):
+        return rows
+    inverse = inverse.reshape(-1)
+    merged = np.zeros(len(unique), dtype=ROLLUP_DTYPE)
+    merged['bucket'] = unique[:, 0].view(np.int64)
+    merged['model'] = unique[:, 1]
+    for field in ('count', 'output_length', 'execution_time'):
+        merged[field] = np.bincount(inverse, weights=rows[field], minlength=len(unique))
+    np.maximum.at(merged['max_execution_time'], inverse, rows['max_execution_time'])
+    return merged
+
+class InferenceHistory:
+    """
+    Historique des inférences : enregistrements bruts et agrégats par minute et par heure.
+    """
+
+    def __init__(self, directory, retention_days=DEFAULT_RETENTION_DAYS):
+        """
+        Initialise l'historique et charge les enregistrements existants.
+
+        Args:
+            directory (str): Répertoire de l'historique (stats/history)
+            retention_days (int): Durée de conservation en jours (0 : illimitée)
+        """
+        self.directory = directory
+        self.retention_days = retention_days
+        self._records = _Table(RECORD_DTYPE, 'timestamp')
+        self._rollups = {name: _Table(ROLLUP_DTYPE, 'bucket') for name in ROLLUP_LEVELS}
+        self._models = {}
+        self._prompts = {}
+        self._string_offsets = {}
+        self._segments = {}
+        self._retention_checked = 0
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._migrate_strings()
+            self._sync()
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return self._records.size
+
+    def append(self, model, prompt, max_tokens, output_length, execution_time, timestamp=None):
+        """
+        Ajoute une inférence.
+
+        Args:
+            model (str): Modèle utilisé
+            prompt (str): Prompt (tronqué à PROMPT_MAX_CHARS caractères)
+            max_tokens (int): Nombre maximal de tokens demandé
+            output_length (int): Longueur de la réponse en mots
+            execution_time (float): Durée de l'inférence en secondes
+            timestamp (float): Date de l'inférence (maintenant par défaut)
+        """
+        if len(prompt) > PROMPT_MAX_CHARS:
+            prompt = prompt[:PROMPT_MAX_CHARS] + '...'
+        self.extend([{
+            'timestamp': time.time() if timestamp is None else timestamp,
+            'model': model, 'prompt': prompt, 'max_tokens': max_tokens,
+            'output_length': output_length, 'execution_time': execution_time
+        }])
+
+    def extend(self, records):
+        """
+        Ajoute des inférences, au format des anciennes statistiques (liste de dict).
+
+        Returns:
+            int: Nombre d'inférences ajoutées
+        """
+        rows = np.zeros(len(records), dtype=RECORD_DTYPE)
+        months = []
+        new_models = {}
+        new_prompts = {}
+        for row, record in zip(rows, records):
+            prompt = str(record.get('prompt') or '')
+            row['timestamp'] = float(record.get('timestamp') or time.time())
+            months.append(segment_name(row['timestamp']))
+            row['model'] = self._intern(str(record.get('model') or ''), self._models, new_models)
+            row['prompt'] = self._intern(prompt, self._prompts.get(months[-1], {}),
+                                         new_prompts.setdefault(months[-1], {}))
+            row['max_tokens'] = int(record.get('max_tokens') or 0)
+            row['output_length'] = int(record.get('output_length') or 0)
+            row['execution_time'] = float(record.get('execution_time') or 0)
+        if not len(rows):
+            return 0
+
+        with self._lock:
+            # Les tables de chaînes sont écrites avant les enregistrements qui y font référence
+            self._write_strings(MODELS_FILE, new_models)
+            for name, prompts in new_prompts.items():
+                self._write_strings(prompts_name(name), prompts)
+            months = np.array(months)
+            for name in np.unique(months):
+                with open(os.path.join(self.directory, name), 'ab') as f:
+                    f.write(rows[months == name].tobytes())
+            self._sync()
+        return len(rows)
+
+    def recent(self, limit=DEFAULT_POINTS, model=None):
+        """
+        Dernières inférences, de la plus récente à la plus ancienne.
+
+        Args:
+            limit (int): Nombre maximal d'inférences
+            model (str): Limiter à un modèle
+
+        Returns:
+            list: Inférences (dict : timestamp, date, model, prompt, max_tokens, output_length, execution_time)
+        """
+        limit = max(0, limit)
+        with self._lock:
+            self._sync()
+            rows = self._records.rows
+            if model is None:
+                rows = rows[::-1][:limit].copy()
+            else:
+                # Parcours depuis la fin, par blocs de taille croissante
+                key = string_key(model)
+                found = []
+                end = len(rows)
+                block = RECENT_SCAN_ROWS
+                while end > 0 and sum(map(len, found)) < limit:
+                    start = max(0, end - block)
+                    matches = rows[start:end]
+                    found.append(matches[matches['model'] == key][::-1])
+                    end = start
+                    block *= 2
+                rows = np.concatenate(found)[:limit].copy() if found else rows[:0].copy()
+            models = self._models
+            prompts = {name: self._prompts.get(name, {})
+                       for name in {segment_name(t) for t in rows['timestamp']}}
+        return [{
+            'timestamp': float(row['timestamp']),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['timestamp'])),
+            'model': models.get(int(row['model']), ''),
+            'prompt': prompts[segment_name(row['timestamp'])].get(int(row['prompt']), ''),
+            'max_tokens': int(row['max_tokens']),
+            'output_length': int(row['output_length']),
+            'execution_time': round(float(row['execution_time']), 3)
+        } for row in rows]
+
+    def series(self, start=None, end=None, points=DEFAULT_POINTS, model=None):
+        """
+        Série régulière sur une période, prête à être tracée.
+
+        Args:
+            start (float): Début de la période (end - DEFAULT_RANGE par défaut)
+            end (float): Fin de la période (maintenant par défaut)
+            points (int): Nombre de points (au plus MAX_POINTS)
+            model (str): Limiter à un modèle
+
+        Returns:
+            dict: start, end, step, resolution et une liste par mesure
+                  (timestamps, count, avg_output_length, avg_execution_time, max_execution_time)
+        """
+        end = time.time() if end is None else float(end)
+        start = end - DEFAULT_RANGE if start is None else float(start)
+        points = min(max(int(points), 1), MAX_POINTS)
+        if end <= start:
+            raise ValueError("La fin de la période doit suivre son début")
+        step = (end - start) / points
+
+        # Niveau le plus grossier dont les intervalles tiennent dans un point
+        resolution = 'raw'
+        for name, seconds in ROLLUP_LEVELS.items():
+            if seconds <= step:
+                resolution = name
+
+        with self._lock:
+            self._sync()
+            if resolution == 'raw':
+                table, times = self._records, 'timestamp'
+            else:
+                table, times = self._rollups[resolution], 'bucket'
+            rows = table.rows
+            first, last = np.searchsorted(rows[times], [start, end], side='left')
+            rows = rows[first:last].copy()
+
+        if model is not None:
+            rows = rows[rows['model'] == string_key(model)]
+        if resolution == 'raw':
+            counts = np.ones(len(rows))
+            max_times = rows['execution_time']
+        else:
+            counts = rows['count'].astype(np.float64)
+            max_times = rows['max_execution_time']
+
+        bins = np.minimum(((rows[times] - start) / step).astype(np.int64), points - 1)
+        count = np.bincount(bins, weights=counts, minlength=points)
+        output_length = np.bincount(bins, weights=rows['output_length'], minlength=points)
+        execution_time = np.bincount(bins, weights=rows['execution_time'], minlength=points)
+        max_execution_time = np.zeros(points)
+        np.maximum.at(max_execution_time, bins, max_times)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_output_length = output_length / count
+            avg_execution_time = execution_time / count
+
+        def values(array, digits):
+            return [round(float(v), digits) if c else None for v, c in zip(array, count)]
+
+        return {
+            'start': start,
+            'end': end,
+            'step': step,
+            'resolution': resolution,
+            'timestamps': [round(start + i * step, 3) for i in range(points)],
+            'count': count.astype(np.int64).tolist(),
+            'avg_output_length': values(avg_output_length, 1),
+            'avg_execution_time': values(avg_execution_time, 3),
+            'max_execution_time': values(max_execution_time, 3)
+        }
+
+    def summary(self):
+        """
+        Totaux par modèle sur tout l'historique (calculés sur les agrégats par heure).
+
+        Returns:
+            list: Modèles (dict : name, count, total_tokens, total_time, avg_tokens, avg_time),
+                  les plus utilisés en premier
+        """
+        with self._lock:
+            self._sync()
+            rows = self._rollups['hour'].rows.copy()
+            names = self._models
+
+        models, inverse = np.unique(rows['model'], return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, weights=rows['count'], minlength=len(models))
+        tokens = np.bincount(inverse, weights=rows['output_length'], minlength=len(models))
+        times = np.bincount(inverse, weights=rows['execution_time'], minlength=len(models))
+        result = [{
+            'name': names.get(int(key), ''),
+            'count': int(count),
+            'total_tokens': int(total_tokens),
+            'total_time': round(float(total_time), 3),
+            'avg_tokens': float(total_tokens / count),
+            'avg_time': float(total_time / count)
+        } for key, count, total_tokens, total_time in zip(models, counts, tokens, times) if count]
+        return sorted(result, key=lambda model: (-model['count'], model['name']))
+
+    def _intern(self, text, known, new_strings):
+        """Empreinte d'une chaîne, ajoutée à new_strings si elle n'est pas encore dans la table known"""
+        key = string_key(text)
+        if key not in known:
+            new_strings[key] = text
+        return key
+
+    def _write_strings(self, name, strings):
+        """Ajoute des chaînes à la fin d'une table (verrou déjà pris)"""
+        if strings:
+            with open(os.path.join(self.directory, name), 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps([key, text], ensure_ascii=False) + '\n'
+                                for key, text in strings.items()))
+
+    def _read_strings(self, name, table):
+        """Charge dans table les chaînes ajoutées à une table depuis la dernière lecture"""
+        offset = self._string_offsets.get(name, 0)
+        try:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Dernière ligne peut-être en cours d'écriture par un autre processus
+        complete = data[:data.rfind(b'\n') + 1]
+        for line in complete.splitlines():
+            try:
+                key, text = json.loads(line)
+                table[int(key)] = text
+            except (ValueError, TypeError):
+                logger.warning("Ligne illisible dans la table %s de l'historique", name)
+        self._string_offsets[name] = offset + len(complete)
+
+    def _sync(self):
+        """Charge les chaînes et les enregistrements ajoutés depuis la dernière lecture (verrou déjà pris)"""
+        if self._cutoff() is not None and time.time() - self._retention_checked >= RETENTION_INTERVAL:
+            self._apply_retention()
+
+        self._read_strings(MODELS_FILE, self._models)
+        new_rows = []
+        for name in sorted(os.listdir(self.directory)):
+            if not SEGMENT_PATTERN.match(name):
+                continue
+            self._read_strings(prompts_name(name), self._prompts.setdefault(name, {}))
+            path = os.path.join(self.directory, name)
+            try:
+                size = os.path.getsize(path) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            except FileNotFoundError:
+                # Supprimé entre-temps par la rétention d'un autre processus
+                continue
+            known = self._segments.get(name, 0)
+            if size > known:
+                with open(path, 'rb') as f:
+                    f.seek(known)
+                    new_rows.append(np.frombuffer(f.read(size - known), dtype=RECORD_DTYPE))
+                self._segments[name] = size
+        if not new_rows:
+            return
+
+        rows = np.concatenate(new_rows)
+        rows = rows[np.argsort(rows['timestamp'], kind='stable')]
+        cutoff = self._cutoff()
+        if cutoff is not None:
+            rows = rows[rows['timestamp'] >= cutoff]
+        self._records.merge(rows)
+        for name, seconds in ROLLUP_LEVELS.items():
+            self._rollups[name].merge(rollup(rows, seconds), combine_rollups)
+
+    def _cutoff(self):
+        """Date des plus anciennes inférences conservées, ou None"""
+        return time.time() - self.retention_days * 86400 if self.retention_days else None
+
+    def _apply_retention(self):
+        """
+        Supprime les mois entièrement antérieurs à la durée de conservation,
+        avec leurs prompts, et oublie en mémoire les inférences trop anciennes
+        (verrou déjà pris).
+        """
+        self._retention_checked = time.time()
+        cutoff = self._cutoff()
+        oldest = segment_name(cutoff)
+        for name in sorted(os.listdir(self.directory)):
+            if SEGMENT_PATTERN.match(name) and name < oldest:
+                for path in (name, prompts_name(name)):
+                    try:
+                        os.remove(os.path.join(self.directory, path))
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.warning("Impossible de supprimer %s: %s", path, e)
+                logger.info("Historique des inférences: %s supprimé (rétention)", name)
+        for name in [name for name in self._prompts if name < oldest]:
+            self._segments.pop(name, None)
+            self._prompts.pop(name, None)
+            self._string_offsets.pop(prompts_name(name), None)
+
+        self._records.drop_before(cutoff)
+        for name, seconds in ROLLUP_LEVELS.items():
+            # Un intervalle commencé avant la limite est conservé s'il la dépasse
+            self._rollups[name].drop_before(cutoff - seconds)
+
+    def _migrate_strings(self):
+        """Répartit la table de chaînes unique des versions précédentes entre modèles et prompts par mois"""
+        path = os.path.join(self.directory, LEGACY_STRINGS_FILE)
+        if not os.path.exists(path):
+            return
+        legacy = {}
+        self._read_strings(LEGACY_STRINGS_FILE, legacy)
+        models = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not SEGMENT_PATTERN.match(name):
+                continue
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                data = f.read()
+            rows = np.frombuffer(data[:len(data) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize], dtype=RECORD_DTYPE)
+            models.update((int(key), legacy[int(key)]) for key in np.unique(rows['model']) if int(key) in legacy)
+            self._write_strings(prompts_name(name), {int(key): legacy[int(key)]
+                                                     for key in np.unique(rows['prompt']) if int(key) in legacy})
+        self._write_strings(MODELS_FILE, models)
+        os.remove(path)
+        self._string_offsets.pop(LEGACY_STRINGS_FILE, None)
+        logger.info("Historique des inférences: %s réparti entre %s et les prompts par mois", LEGACY_STRINGS_FILE, MODELS_FILE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Historique des inférences")
+    parser.add_argument("--dir", default=os.path.join("stats", "history"), help="Répertoire de l'historique")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Importe des statistiques au format JSON")
+    import_parser.add_argument("file", help="Fichier JSON (liste d'inférences)")
+    series_parser = subparsers.add_parser("series", help="Affiche une série sur les dernières heures")
+    series_parser.add_argument("--hours", type=float, default=24, help="Durée de la période")
+    series_parser.add_argument("--points", type=int, default=24, help="Nombre de points")
+    series_parser.add_argument("--model", help="Limiter à un modèle")
+    args = parser.parse_args()
+
+    history = InferenceHistory(args.dir)
+    if args.command == "import":
+        with open(args.file, "r", encoding="utf-8") as f:
+            print(f"{history.extend(json.load(f))} inférences importées")
+    else:
+        end = time.time()
+        series = history.series(end - args.hours * 3600, end, args.points, args.model)
+        print(f"Résolution: {series['resolution']}, pas: {series['step']:.0f} s")
+        for t, count, avg_time in zip(series['timestamps'], series['count'], series['avg_execution_time']):
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(t))}  {count:6d}  {avg_time if avg_time is not None else '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,7 +20,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Constantes globales
-OLLAMA_API_BASE = "http://localhost:11434/api"
+OLLAMA_API_BASE = os.environ.get("OLLAMA_API_BASE", "http://localhost:11434/api")
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
 REQUEST_TIMEOUT = 5  # Augmenté de 2 à 5 secondes
 MAX_RETRIES = 3  # Nombre de tentatives pour les opérations critiques
@@ -0,0 +1,215 @@
+"""
+Métriques de l'application au format texte de Prometheus.
+
+Implémentation minimale sans dépendance : compteurs et histogrammes à
+étiquettes, plus des fonctions de collecte appelées au moment de la lecture
+pour les valeurs instantanées (profondeur des files, état des caches...).
+L'enregistrement d'une mesure ne coûte qu'un verrou et une recherche
+dichotomique ; le rendu ne parcourt que les séries existantes.
+"""
+import time
+import math
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Bornes par défaut des histogrammes de durée (en secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value):
+    """Échappe la valeur d'une étiquette"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labelnames, values, extra=None):
+    """Formate les étiquettes d'une série"""
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    """Formate une valeur numérique"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def percentile(values, p):
+    """
+    Calcule un percentile (méthode du rang le plus proche).
+
+    Args:
+        values (list): Valeurs numériques
+        p (float): Percentile souhaité (0-100)
+
+    Returns:
+        float: Valeur du percentile ou 0 si la liste est vide
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(p / 100 * len(ordered)) - 1
+    return ordered[min(max(rank, 0), len(ordered) - 1)]
+
+class Counter:
+    """Compteur croissant à étiquettes"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Incrémente la série correspondant aux étiquettes"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Histogramme à étiquettes avec bornes fixes"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Enregistre une mesure"""
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Comptes par intervalle (le dernier pour +Inf), somme
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée d'un bloc"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        """Crée (ou retrouve) un compteur"""
+        return self._register(name, lambda: Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Crée (ou retrouve) un histogramme"""
+        return self._register(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        Ajoute une fonction appelée à chaque lecture des métriques.
+
+        La fonction renvoie une liste de tuples (nom, type, description,
+        échantillons) où échantillons est une liste de (étiquettes, valeur).
+
+        Args:
+            collector (callable): Fonction de collecte
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Produit le texte au format d'exposition de Prometheus.
+
+        Returns:
+            str: Métriques
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        for collector in list(self._collectors):
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning("Erreur lors de la collecte des métriques: %s", e)
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, name, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+REGISTRY = MetricsRegistry()
+
+SUBPROCESS_STARTED = REGISTRY.counter(
+    'app_subprocess_started_total', "Nombre de processus lancés", ('command',))
+SUBPROCESS_DURATION = REGISTRY.histogram(
+    'app_subprocess_duration_seconds', "Durée d'exécution des processus lancés", ('command',))
+
+@contextmanager
+def track_subprocess(command, spawn=True):
+    """
+    Compte un lancement de processus et mesure sa durée.
+
+    Args:
+        command (str): Nom court de la commande (execute, nvidia-smi...)
+        spawn (bool): False pour une requête à un processus déjà lancé :
+            seule la durée est mesurée, le lancement étant compté à part
+    """
+    if spawn:
+        SUBPROCESS_STARTED.inc(command=command)
+    with span('subprocess', command=command), SUBPROCESS_DURATION.time(command=command):
+        yield
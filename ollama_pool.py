@@ -0,0 +1,377 @@
+"""
+Répartition des requêtes entre plusieurs serveurs Ollama.
+
+Les serveurs sont déclarés dans config.json (ollama.backends) ou dans la
+variable d'environnement OLLAMA_BACKENDS (URLs séparées par des virgules).
+Un thread vérifie périodiquement chaque serveur (/tags pour les modèles
+disponibles, /ps pour les modèles chargés en mémoire). Chaque requête est
+envoyée au serveur sain qui a le moins de requêtes en cours, en privilégiant
+ceux qui ont déjà chargé le modèle demandé ; en cas d'erreur de connexion,
+la requête est renvoyée au serveur suivant.
+"""
+import time
+import threading
+import logging
+
+import requests
+
+from metrics import REGISTRY
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux vérifications de l'état des serveurs (en secondes)
+HEALTH_CHECK_INTERVAL = 15
+# Délai d'attente des vérifications
+HEALTH_CHECK_TIMEOUT = 3
+# Étiquette des métriques pour un modèle inconnu des serveurs (nom fourni par le client)
+OTHER_MODEL_LABEL = 'other'
+
+OLLAMA_REQUEST_DURATION = REGISTRY.histogram(
+    'ollama_request_duration_seconds', "Durée des requêtes vers Ollama", ('endpoint', 'model', 'backend', 'status'))
+OLLAMA_FAILOVERS = REGISTRY.counter(
+    'ollama_failovers_total', "Bascules vers un autre serveur Ollama", ('backend', 'reason'))
+
+class OllamaBackend:
+    """État d'un serveur Ollama"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.healthy = True
+        self.outstanding = 0
+        self.available_models = set()
+        self.loaded_models = set()
+        self.failures = 0
+        self.last_check = 0
+        self.last_error = None
+
+    def has_model(self, model):
+        """Indique si le modèle est connu comme disponible sur ce serveur"""
+        return model in self.available_models or model in self.loaded_models
+
+    def to_dict(self):
+        """Représentation JSON de l'état du serveur"""
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'available_models': sorted(self.available_models),
+            'loaded_models': sorted(self.loaded_models),
+            'failures': self.failures,
+            'last_check': self.last_check,
+            'last_error': self.last_error
+        }
+
+class OllamaPool:
+    """
+    Ensemble de serveurs Ollama avec vérification de l'état et répartition.
+
+    Le choix du serveur se fait dans cet ordre de préférence : modèle chargé
+    en mémoire, puis modèle disponible, puis n'importe quel serveur sain ; à
+    préférence égale, le serveur ayant le moins de requêtes en cours est
+    choisi. Si aucun serveur n'est marqué sain, tous sont essayés.
+    """
+
+    def __init__(self, urls, health_interval=HEALTH_CHECK_INTERVAL, timeout=HEALTH_CHECK_TIMEOUT):
+        """
+        Initialise l'ensemble de serveurs.
+
+        Args:
+            urls (list): URLs des API Ollama (http://hote:11434/api)
+            health_interval (float): Intervalle entre deux vérifications
+            timeout (float): Délai d'attente des vérifications
+        """
+        if not urls:
+            raise ValueError("Aucun serveur Ollama configuré")
+
+        self.backends = [OllamaBackend(url) for url in dict.fromkeys(urls)]
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=len(self.backends), pool_maxsize=32)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    @property
+    def primary(self):
+        """URL du premier serveur sain (ou du premier serveur)"""
+        for backend in self.backends:
+            if backend.healthy:
+                return backend.url
+        return self.backends[0].url
+
+    def start(self):
+        """Démarre la vérification périodique des serveurs"""
+        if self._thread or self.health_interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête la vérification périodique"""
+        self._stopping.set()
+
+    def check_health(self, backend):
+        """
+        Vérifie un serveur et met à jour ses modèles disponibles et chargés.
+
+        Args:
+            backend (OllamaBackend): Serveur à vérifier
+
+        Returns:
+            bool: True si le serveur répond
+        """
+        try:
+            response = self._session.get(f"{backend.url}/tags", timeout=self.timeout)
+            response.raise_for_status()
+            available = {model.get('name') for model in response.json().get('models', [])}
+
+            loaded = set()
+            try:
+                ps = self._session.get(f"{backend.url}/ps", timeout=self.timeout)
+                if ps.status_code == 200:
+                    loaded = {model.get('name') for model in ps.json().get('models', [])}
+            except requests.exceptions.RequestException:
+                pass
+
+            with self._lock:
+                if not backend.healthy:
+                    logger.info("Serveur Ollama de nouveau disponible: %s", backend.url)
+                backend.available_models = available
+                backend.loaded_models = loaded
+                backend.healthy = True
+                backend.failures = 0
+                backend.last_error = None
+                backend.last_check = time.time()
+            return True
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._mark_failed(backend, e)
+            with self._lock:
+                backend.last_check = time.time()
+            return False
+
+    def check_all(self):
+        """
+        Vérifie tous les serveurs.
+
+        Returns:
+            bool: True si au moins un serveur répond
+        """
+        results = [self.check_health(backend) for backend in self.backends]
+        return any(results)
+
+    def select(self, model=None, exclude=()):
+        """
+        Choisit le serveur pour une requête.
+
+        Args:
+            model (str): Modèle demandé (optionnel)
+            exclude (iterable): Serveurs déjà essayés
+
+        Returns:
+            OllamaBackend: Serveur choisi ou None si tous ont été essayés
+        """
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                return None
+
+            healthy = [b for b in candidates if b.healthy]
+            candidates = healthy or candidates
+
+            def preference(backend):
+                if model and model in backend.loaded_models:
+                    rank = 0
+                elif model and model in backend.available_models:
+                    rank = 1
+                else:
+                    rank = 2
+                return (rank, backend.outstanding)
+
+            return min(candidates, key=preference)
+
+    def request(self, method, path, model=None, **kwargs):
+        """
+        Envoie une requête au serveur le plus adapté, avec bascule sur erreur de connexion.
+
+        Un serveur qui répond 404 pour un modèle qu'il ne possède pas est aussi
+        contourné si un autre serveur le propose.
+
+        Args:
+            method (str): Méthode HTTP
+            path (str): Chemin de l'API (par exemple '/generate')
+            model (str): Modèle concerné, pour l'affinité (optionnel)
+            **kwargs: Arguments transmis à requests (json, timeout...)
+
+        Returns:
+            requests.Response: Réponse du serveur
+
+        Raises:
+            requests.exceptions.ConnectionError: Si aucun serveur n'a pu être joint
+        """
+        tried = []
+        last_error = None
+        response = None
+
+        while True:
+            backend = self.select(model, exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            start = self._begin(backend)
+            status = 'error'
+            try:
+                with span('ollama.request', endpoint=path, model=model, backend=backend.url) as current:
+                    response = self._session.request(method, f"{backend.url}{path}", **kwargs)
+                    status = str(response.status_code)
+                    current.set(status=response.status_code)
+            except requests.exceptions.ConnectionError as e:
+                last_error = e
+                self._failover(backend, e)
+                continue
+            finally:
+                self._end(backend, start, path, model, status)
+
+            if self._should_retry(backend, tried, path, model, response.status_code):
+                continue
+            return response
+
+        if response is not None:
+            return response
+        raise last_error or requests.exceptions.ConnectionError("Aucun serveur Ollama disponible")
+
+    async def arequest(self, client, method, path, model=None, **kwargs):
+        """
+        Équivalent asynchrone de request(), avec un client httpx.AsyncClient.
+
+        Args:
+            client (httpx.AsyncClient): Client HTTP de la boucle asyncio
+            method (str): Méthode HTTP
+            path (str): Chemin de l'API (par exemple '/generate')
+            model (str): Modèle concerné, pour l'affinité (optionnel)
+            **kwargs: Arguments transmis à httpx (json, timeout...)
+
+        Returns:
+            httpx.Response: Réponse du serveur
+
+        Raises:
+            httpx.ConnectError: Si aucun serveur n'a pu être joint
+        """
+        import httpx
+
+        tried = []
+        last_error = None
+        response = None
+
+        while True:
+            backend = self.select(model, exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            start = self._begin(backend)
+            status = 'error'
+            try:
+                with span('ollama.request', endpoint=path, model=model, backend=backend.url) as current:
+                    response = await client.request(method, f"{backend.url}{path}", **kwargs)
+                    status = str(response.status_code)
+                    current.set(status=response.status_code)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                last_error = e
+                self._failover(backend, e)
+                continue
+            finally:
+                self._end(backend, start, path, model, status)
+
+            if self._should_retry(backend, tried, path, model, response.status_code):
+                continue
+            return response
+
+        if response is not None:
+            return response
+        raise last_error or httpx.ConnectError("Aucun serveur Ollama disponible")
+
+    def status(self):
+        """
+        État de tous les serveurs.
+
+        Returns:
+            list: Dictionnaires d'état des serveurs
+        """
+        with self._lock:
+            return [backend.to_dict() for backend in self.backends]
+
+    def _begin(self, backend):
+        """Compte une requête en cours sur le serveur et renvoie l'instant de début"""
+        with self._lock:
+            backend.outstanding += 1
+        return time.perf_counter()
+
+    def _end(self, backend, start, path, model, status):
+        """Termine le suivi d'une requête commencée par _begin()"""
+        with self._lock:
+            backend.outstanding -= 1
+        OLLAMA_REQUEST_DURATION.observe(
+            time.perf_counter() - start, endpoint=path, model=self._model_label(model), backend=backend.url,
+            status=status)
+
+    def _model_label(self, model):
+        """
+        Étiquette de métrique d'un modèle : le nom du modèle s'il est connu
+        d'un serveur, OTHER_MODEL_LABEL sinon, pour que des noms arbitraires
+        envoyés par les clients ne créent pas de nouvelles séries.
+        """
+        if not model:
+            return ''
+        with self._lock:
+            known = any(backend.has_model(model) for backend in self.backends)
+        return model if known else OTHER_MODEL_LABEL
+
+    def _failover(self, backend, error):
+        """Marque un serveur injoignable avant de passer au suivant"""
+        self._mark_failed(backend, error)
+        OLLAMA_FAILOVERS.inc(backend=backend.url, reason='connection')
+        logger.warning("Serveur Ollama injoignable %s, bascule vers le suivant", backend.url)
+
+    def _should_retry(self, backend, tried, path, model, status_code):
+        """
+        Met à jour les modèles connus du serveur d'après la réponse.
+
+        Returns:
+            bool: True si la requête doit être renvoyée à un autre serveur
+        """
+        if model and status_code == 404:
+            with self._lock:
+                backend.available_models.discard(model)
+                backend.loaded_models.discard(model)
+                others = any(b.has_model(model) for b in self.backends if b not in tried)
+            if others:
+                OLLAMA_FAILOVERS.inc(backend=backend.url, reason='model_not_found')
+                return True
+        elif model and status_code < 400:
+            # Ollama garde le modèle chargé après une génération
+            with self._lock:
+                backend.available_models.add(model)
+                if path in ('/generate', '/chat', '/embeddings', '/embed'):
+                    backend.loaded_models.add(model)
+        return False
+
+    def _mark_failed(self, backend, error):
+        """Marque un serveur comme indisponible jusqu'à la prochaine vérification réussie"""
+        with self._lock:
+            if backend.healthy:
+                logger.warning("Serveur Ollama indisponible: %s (%s)", backend.url, error)
+            backend.healthy = False
+            backend.failures += 1
+            backend.last_error = str(error)
+
+    def _health_loop(self):
+        """Vérification périodique de l'état des serveurs"""
+        while not self._stopping.is_set():
+            self.check_all()
+            self._stopping.wait(self.health_interval)
@@ -0,0 +1,203 @@
+"""
+Génération et extraction en streaming des archives de projets (zip et tar.gz).
+
+Les archives sont produites bloc par bloc pendant l'envoi de la réponse,
+sans fichier temporaire ni archive complète en mémoire.
+"""
+import os
+import gzip
+import tarfile
+import zipfile
+import tempfile
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs lus dans les fichiers archivés
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+# Formats d'archive pris en charge
+ARCHIVE_FORMATS = ('zip', 'tar.gz')
+# Taille en mémoire au-delà de laquelle un zip reçu est déversé sur disque
+ZIP_SPOOL_SIZE = 1024 * 1024
+
+class _StreamBuffer:
+    """Tampon d'écriture non positionnable vidé après chaque bloc produit"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(entries, stored_types=('image', 'document')):
+    """
+    Génère une archive zip bloc par bloc.
+
+    Args:
+        entries (iterable): Tuples (chemin complet, nom dans l'archive, type de fichier)
+        stored_types (tuple): Types de fichiers déjà compressés, stockés sans compression
+
+    Returns:
+        generator: Générateur de blocs d'octets
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for full_path, arcname, file_type in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(full_path, arcname)
+                info.compress_type = zipfile.ZIP_STORED if file_type in stored_types else zipfile.ZIP_DEFLATED
+                with open(full_path, 'rb') as source, archive.open(info, 'w') as target:
+                    for chunk in iter(lambda: source.read(ARCHIVE_CHUNK_SIZE), b''):
+                        target.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+            except OSError as e:
+                logger.warning("Fichier ignoré lors de l'export %s: %s", full_path, e)
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+    yield buffer.drain()
+
+def stream_tar_gz(entries):
+    """
+    Génère une archive tar.gz bloc par bloc.
+
+    Les en-têtes tar sont écrits directement dans le flux gzip, ce qui
+    permet de produire les fichiers volumineux par morceaux.
+
+    Args:
+        entries (iterable): Tuples (chemin complet, nom dans l'archive, type de fichier)
+
+    Returns:
+        generator: Générateur de blocs d'octets
+    """
+    buffer = _StreamBuffer()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as gz:
+        for full_path, arcname, _ in entries:
+            try:
+                stat = os.stat(full_path)
+                with open(full_path, 'rb') as source:
+                    info = tarfile.TarInfo(arcname)
+                    info.size = stat.st_size
+                    info.mtime = int(stat.st_mtime)
+                    info.mode = stat.st_mode & 0o777
+                    gz.write(info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape'))
+
+                    # Écrire exactement la taille annoncée, même si le fichier change
+                    remaining = info.size
+                    while remaining > 0:
+                        chunk = source.read(min(ARCHIVE_CHUNK_SIZE, remaining))
+                        if not chunk:
+                            chunk = b'\0' * remaining
+                        gz.write(chunk)
+                        remaining -= len(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+
+                    padding = info.size % tarfile.BLOCKSIZE
+                    if padding:
+                        gz.write(b'\0' * (tarfile.BLOCKSIZE - padding))
+            except OSError as e:
+                logger.warning("Fichier ignoré lors de l'export %s: %s", full_path, e)
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+        # Fin d'archive : deux blocs vides
+        gz.write(b'\0' * (tarfile.BLOCKSIZE * 2))
+
+    yield buffer.drain()
+
+def extract_archive(stream, target_dir, archive_format, accept=None):
+    """
+    Extrait une archive reçue en flux dans un répertoire.
+
+    Les archives tar.gz sont lues séquentiellement sans jamais être chargées
+    en mémoire. Le format zip plaçant son répertoire central en fin de
+    fichier, un zip est d'abord déversé dans un fichier temporaire au-delà
+    de ZIP_SPOOL_SIZE.
+
+    Args:
+        stream (file): Flux binaire de l'archive
+        target_dir (str): Répertoire de destination
+        archive_format (str): Format de l'archive ('zip' ou 'tar.gz')
+        accept (callable): Filtre optionnel sur le chemin relatif nettoyé
+
+    Returns:
+        list: Chemins relatifs des fichiers extraits
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Format d'archive non pris en charge: {archive_format}")
+
+    extracted = []
+    if archive_format == 'tar.gz':
+        with tarfile.open(fileobj=stream, mode='r|gz') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                target = _safe_target(target_dir, member.name, accept)
+                if not target:
+                    continue
+                source = archive.extractfile(member)
+                _write_stream(source, target[1])
+                extracted.append(target[0])
+    else:
+        with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE) as spool:
+            shutil.copyfileobj(stream, spool, ARCHIVE_CHUNK_SIZE)
+            spool.seek(0)
+            with zipfile.ZipFile(spool) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    target = _safe_target(target_dir, info.filename, accept)
+                    if not target:
+                        continue
+                    with archive.open(info) as source:
+                        _write_stream(source, target[1])
+                    extracted.append(target[0])
+
+    return extracted
+
+def _safe_target(target_dir, name, accept):
+    """Calcule un chemin de destination sûr, ou None si l'entrée doit être ignorée"""
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    # Refuser les remontées de répertoire et les fichiers cachés
+    if not parts or any(part == '..' or part.startswith('.') for part in parts):
+        logger.warning("Entrée d'archive ignorée: %s", name)
+        return None
+
+    rel_path = '/'.join(parts)
+    if accept and not accept(rel_path):
+        return None
+
+    full_path = os.path.join(target_dir, *parts)
+    root = os.path.realpath(target_dir)
+    if os.path.commonpath([root, os.path.realpath(full_path)]) != root:
+        logger.warning("Entrée d'archive hors du projet ignorée: %s", name)
+        return None
+
+    return rel_path, full_path
+
+def _write_stream(source, full_path):
+    """Copie un flux dans un fichier par blocs"""
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    # Ne pas écrire à travers un lien vers un blob partagé
+    if os.path.exists(full_path) and os.stat(full_path).st_nlink > 1:
+        os.remove(full_path)
+    with open(full_path, 'wb') as target:
+        shutil.copyfileobj(source, target, ARCHIVE_CHUNK_SIZE)
@@ -1,9 +1,16 @@
 import os
 import json
+import mmap
 import shutil
+import stat as stat_module
 import time
+import atexit
+import tempfile
+import threading
 from datetime import datetime
 import logging
+from blob_store import BlobStore
+import project_archive
 
 # Configuration du logging
 logging.basicConfig(
@@ -12,27 +19,248 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Taille au-delà de laquelle un document n'est plus chargé en entier (lecture paginée)
+LARGE_FILE_THRESHOLD = 2 * 1024 * 1024  # 2 MB
+# Taille par défaut d'une page en lecture par plage d'octets
+DEFAULT_CHUNK_SIZE = 256 * 1024  # 256 KB
+# Nombre de lignes par défaut d'une fenêtre de lecture par lignes
+DEFAULT_LINE_WINDOW = 1000
+# Taille maximale d'une page, en plage d'octets comme en fenêtre de lignes
+MAX_WINDOW_BYTES = 1024 * 1024  # 1 MB
+# Délai de regroupement des écritures de métadonnées (en secondes)
+METADATA_FLUSH_DELAY = 0.5
+
+class ProjectMetadataStore:
+    """
+    Couche de métadonnées des projets.
+    
+    Garde les métadonnées (metadata.json) en mémoire, regroupe les mises à
+    jour survenant dans une courte fenêtre de temps et les écrit de façon
+    atomique (fichier temporaire puis renommage) sous un verrou par projet.
+    """
+    
+    def __init__(self, projects_dir, flush_delay=METADATA_FLUSH_DELAY):
+        """
+        Initialise la couche de métadonnées.
+        
+        Args:
+            projects_dir (str): Chemin vers le répertoire des projets
+            flush_delay (float): Délai de regroupement des écritures en secondes
+        """
+        self.projects_dir = projects_dir
+        self.flush_delay = flush_delay
+        self._cache = {}
+        self._mtimes = {}
+        self._dirty = set()
+        self._timers = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        
+        # Écrire les modifications en attente à l'arrêt de l'application
+        atexit.register(self.flush)
+    
+    def get(self, project_id):
+        """
+        Récupère les métadonnées d'un projet.
+        
+        Args:
+            project_id (str): ID du projet
+            
+        Returns:
+            dict: Copie des métadonnées ou None si absentes ou illisibles
+        """
+        with self._lock(project_id):
+            metadata_path = self._metadata_path(project_id)
+            
+            # Recharger si le fichier a été modifié en dehors de cette couche
+            if project_id not in self._dirty:
+                try:
+                    mtime = os.stat(metadata_path).st_mtime
+                except OSError:
+                    self._cache.pop(project_id, None)
+                    self._mtimes.pop(project_id, None)
+                    return None
+                
+                if project_id not in self._cache or self._mtimes.get(project_id) != mtime:
+                    with open(metadata_path, 'r') as f:
+                        self._cache[project_id] = json.load(f)
+                    self._mtimes[project_id] = mtime
+            
+            return dict(self._cache[project_id])
+    
+    def update(self, project_id, changes, immediate=False):
+        """
+        Met à jour les métadonnées d'un projet.
+        
+        Args:
+            project_id (str): ID du projet
+            changes (dict): Champs à modifier
+            immediate (bool): Écrire immédiatement au lieu de regrouper l'écriture
+            
+        Returns:
+            dict: Copie des métadonnées mises à jour ou None si absentes
+        """
+        with self._lock(project_id):
+            if self.get(project_id) is None:
+                return None
+            
+            self._cache[project_id].update(changes)
+            self._dirty.add(project_id)
+            
+            if immediate:
+                self._flush_project(project_id)
+            else:
+                self._schedule_flush(project_id)
+            
+            return dict(self._cache[project_id])
+    
+    def write(self, project_id, metadata):
+        """
+        Remplace les métadonnées d'un projet et les écrit immédiatement.
+        
+        Args:
+            project_id (str): ID du projet
+            metadata (dict): Métadonnées complètes
+        """
+        with self._lock(project_id):
+            self._cache[project_id] = dict(metadata)
+            self._dirty.add(project_id)
+            self._flush_project(project_id)
+    
+    def touch(self, project_id):
+        """
+        Met à jour la date de modification d'un projet (écriture regroupée).
+        
+        Args:
+            project_id (str): ID du projet
+        """
+        self.update(project_id, {'updated_at': datetime.now().isoformat()})
+    
+    def flush(self, project_id=None):
+        """
+        Écrit les métadonnées en attente.
+        
+        Args:
+            project_id (str): ID du projet (optionnel, tous les projets par défaut)
+        """
+        project_ids = [project_id] if project_id else list(self._dirty)
+        for pid in project_ids:
+            try:
+                with self._lock(pid):
+                    self._flush_project(pid)
+            except Exception as e:
+                logger.error("Erreur lors de l'écriture des métadonnées pour %s: %s", pid, e)
+    
+    def forget(self, project_id):
+        """
+        Oublie un projet (après sa suppression) sans écrire ses métadonnées.
+        
+        Args:
+            project_id (str): ID du projet
+        """
+        with self._lock(project_id):
+            timer = self._timers.pop(project_id, None)
+            if timer:
+                timer.cancel()
+            self._dirty.discard(project_id)
+            self._cache.pop(project_id, None)
+            self._mtimes.pop(project_id, None)
+    
+    def _schedule_flush(self, project_id):
+        """Programme l'écriture d'un projet si aucune n'est déjà en attente"""
+        if project_id in self._timers:
+            return
+        
+        timer = threading.Timer(self.flush_delay, self._timer_flush, args=(project_id,))
+        timer.daemon = True
+        self._timers[project_id] = timer
+        timer.start()
+    
+    def _timer_flush(self, project_id):
+        """Callback du minuteur de regroupement"""
+        try:
+            with self._lock(project_id):
+                self._timers.pop(project_id, None)
+                self._flush_project(project_id)
+        except Exception as e:
+            logger.error("Erreur lors de l'écriture des métadonnées pour %s: %s", project_id, e)
+    
+    def _flush_project(self, project_id):
+        """Écrit atomiquement les métadonnées d'un projet (verrou déjà acquis)"""
+        timer = self._timers.pop(project_id, None)
+        if timer:
+            timer.cancel()
+        
+        if project_id not in self._dirty:
+            return
+        self._dirty.discard(project_id)
+        
+        project_path = os.path.join(self.projects_dir, project_id)
+        if not os.path.isdir(project_path):
+            return
+        
+        metadata_path = self._metadata_path(project_id)
+        fd, tmp_path = tempfile.mkstemp(prefix='.metadata.', suffix='.tmp', dir=project_path)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._cache[project_id], f, indent=2)
+            os.replace(tmp_path, metadata_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self._dirty.add(project_id)
+            raise
+        
+        self._mtimes[project_id] = os.stat(metadata_path).st_mtime
+    
+    def _metadata_path(self, project_id):
+        """Chemin du fichier de métadonnées d'un projet"""
+        return os.path.join(self.projects_dir, project_id, "metadata.json")
+    
+    def _lock(self, project_id):
+        """Verrou (réentrant) associé à un projet"""
+        with self._locks_lock:
+            lock = self._locks.get(project_id)
+            if lock is None:
+                lock = self._locks[project_id] = threading.RLock()
+            return lock
+
 class ProjectManager:
     """
     Gestionnaire de projets pour l'Assistant IA.
     Gère la création, modification et suppression des projets et documents.
     """
     
-    def __init__(self, projects_dir="projects"):
+    def __init__(self, projects_dir="projects", deduplicate=False):
         """
         Initialise le gestionnaire de projets.
         
         Args:
             projects_dir (str): Chemin vers le répertoire des projets
+            deduplicate (bool): Stocker les fichiers importés dans le stockage dédupliqué
         """
         self.projects_dir = projects_dir
+        self.metadata = ProjectMetadataStore(projects_dir)
         self.ensure_projects_dir()
+        self.blob_store = BlobStore(projects_dir) if deduplicate else None
+        
+        # Cache des listes de fichiers, actif uniquement avec un service de surveillance
+        self._watcher = None
+        self._files_cache = {}
+        # Compteurs de notifications par projet (None : tous les projets)
+        self._files_generations = {}
+        self.files_cache_hits = 0
+        self.files_cache_misses = 0
+        self._files_cache_lock = threading.Lock()
+        
+        # Index de recherche sémantique (voir attach_index)
+        self._index = None
     
     def ensure_projects_dir(self):
         """Crée le répertoire de projets s'il n'existe pas"""
         if not os.path.exists(self.projects_dir):
             os.makedirs(self.projects_dir)
-            logger.info(f"Répertoire de projets créé: {self.projects_dir}")
+            logger.info("Répertoire de projets créé: %s", self.projects_dir)
     
     def get_projects(self):
         """
@@ -47,20 +275,19 @@ class ProjectManager:
         for project_id in os.listdir(self.projects_dir):
             project_path = os.path.join(self.projects_dir, project_id)
             
-            # Ignorer .gitkeep ou autres fichiers
-            if not os.path.isdir(project_path):
+            # Ignorer .gitkeep, le stockage de blobs ou autres fichiers
+            if project_id.startswith('.') or not os.path.isdir(project_path):
                 continue
             
             # Charger les métadonnées du projet
             metadata_path = os.path.join(project_path, "metadata.json")
             if os.path.exists(metadata_path):
                 try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
+                    metadata = self.metadata.get(project_id)
                     
                     # S'assurer que les champs obligatoires sont présents
                     if not all(key in metadata for key in ['name', 'created_at']):
-                        logger.warning(f"Métadonnées incomplètes pour le projet {project_id}")
+                        logger.warning("Métadonnées incomplètes pour le projet %s", project_id)
                         continue
                     
                     # Ajouter le chemin et l'ID
@@ -73,9 +300,9 @@ class ProjectManager:
                     
                     projects.append(metadata)
                 except Exception as e:
-                    logger.error(f"Erreur lors du chargement des métadonnées pour {project_id}: {e}")
+                    logger.error("Erreur lors du chargement des métadonnées pour %s: %s", project_id, e)
             else:
-                logger.warning(f"Pas de métadonnées pour le projet {project_id}, ignoré")
+                logger.warning("Pas de métadonnées pour le projet %s, ignoré", project_id)
         
         # Trier par date de mise à jour (plus récent d'abord)
         projects.sort(key=lambda x: x.get('updated_at', ''), reverse=True)
@@ -94,10 +321,10 @@ class ProjectManager:
         if not self._project_exists(project_id):
             return None
         
-        metadata_path = os.path.join(self.projects_dir, project_id, "metadata.json")
         try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            metadata = self.metadata.get(project_id)
+            if metadata is None:
+                return None
             
             # Ajouter l'ID et le chemin
             metadata['id'] = project_id
@@ -105,7 +332,7 @@ class ProjectManager:
             
             return metadata
         except Exception as e:
-            logger.error(f"Erreur lors du chargement du projet {project_id}: {e}")
+            logger.error("Erreur lors du chargement du projet %s: %s", project_id, e)
             return None
     
     def create_project(self, name, description=""):
@@ -127,7 +354,7 @@ class ProjectManager:
             
             # Vérifier si le répertoire existe déjà
             if os.path.exists(project_path):
-                logger.error(f"Le projet {project_id} existe déjà")
+                logger.error("Le projet %s existe déjà", project_id)
                 return None
             
             # Créer le répertoire du projet
@@ -144,18 +371,16 @@ class ProjectManager:
             }
             
             # Sauvegarder les métadonnées
-            metadata_path = os.path.join(project_path, "metadata.json")
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self.metadata.write(project_id, metadata)
             
             # Ajouter l'ID et le chemin
             metadata['id'] = project_id
             metadata['path'] = project_path
             
-            logger.info(f"Projet créé: {name} ({project_id})")
+            logger.info("Projet créé: %s (%s)", name, project_id)
             return metadata
         except Exception as e:
-            logger.error(f"Erreur lors de la création du projet {name}: {e}")
+            logger.error("Erreur lors de la création du projet %s: %s", name, e)
             # Nettoyer en cas d'erreur
             if 'project_path' in locals() and os.path.exists(project_path):
                 shutil.rmtree(project_path)
@@ -176,33 +401,26 @@ class ProjectManager:
             return None
         
         try:
-            metadata_path = os.path.join(self.projects_dir, project_id, "metadata.json")
-            
-            # Lire les métadonnées existantes
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-            
             # Mettre à jour les champs autorisés
             allowed_fields = ['name', 'description', 'github_repo']
-            for field in allowed_fields:
-                if field in update_data:
-                    metadata[field] = update_data[field]
+            changes = {field: update_data[field] for field in allowed_fields if field in update_data}
             
             # Mettre à jour la date de modification
-            metadata['updated_at'] = datetime.now().isoformat()
+            changes['updated_at'] = datetime.now().isoformat()
             
             # Sauvegarder les métadonnées
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            metadata = self.metadata.update(project_id, changes, immediate=True)
+            if metadata is None:
+                return None
             
             # Ajouter l'ID et le chemin
             metadata['id'] = project_id
             metadata['path'] = os.path.join(self.projects_dir, project_id)
             
-            logger.info(f"Projet mis à jour: {project_id}")
+            logger.info("Projet mis à jour: %s", project_id)
             return metadata
         except Exception as e:
-            logger.error(f"Erreur lors de la mise à jour du projet {project_id}: {e}")
+            logger.error("Erreur lors de la mise à jour du projet %s: %s", project_id, e)
             return None
     
     def delete_project(self, project_id):
@@ -220,17 +438,29 @@ class ProjectManager:
         
         try:
             project_path = os.path.join(self.projects_dir, project_id)
+            # Blobs liés aux fichiers du projet, libérés s'ils ne sont plus référencés ailleurs
+            digests = self.blob_store.referenced_digests(project_path) if self.blob_store else ()
+            self.metadata.forget(project_id)
+            self._invalidate_files_cache(project_id)
             shutil.rmtree(project_path)
-            logger.info(f"Projet supprimé: {project_id}")
+            
+            for digest in digests:
+                self.blob_store.release(digest)
+            
+            logger.info("Projet supprimé: %s", project_id)
             return True
         except Exception as e:
-            logger.error(f"Erreur lors de la suppression du projet {project_id}: {e}")
+            logger.error("Erreur lors de la suppression du projet %s: %s", project_id, e)
             return False
     
     def get_project_files(self, project_id):
         """
         Récupère la liste des fichiers d'un projet.
         
+        Lorsqu'un service de surveillance est attaché (voir attach_watcher),
+        la liste est mise en cache et tenue à jour par ses notifications au
+        lieu de parcourir le répertoire à chaque appel.
+        
         Args:
             project_id (str): ID du projet
             
@@ -240,13 +470,26 @@ class ProjectManager:
         if not self._project_exists(project_id):
             return []
         
-        files = []
+        generation = None
+        if self._watcher and self._watcher.running:
+            with self._files_cache_lock:
+                cached = self._files_cache.get(project_id)
+                if cached is not None:
+                    self.files_cache_hits += 1
+                    return sorted(cached.values(), key=lambda x: x['name'])
+                self.files_cache_misses += 1
+                # Relevé avant le parcours : une notification reçue pendant
+                # celui-ci empêche de mettre en cache une liste déjà dépassée
+                generation = self._files_generation(project_id)
+        
+        files = {}
         project_path = os.path.join(self.projects_dir, project_id)
         
         try:
             # Parcourir récursivement le répertoire du projet
             for root, dirs, filenames in os.walk(project_path):
-                # Ignorer les fichiers cachés et les métadonnées
+                # Ignorer les fichiers et répertoires cachés (.git...) et les métadonnées
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
                 for filename in filenames:
                     if filename.startswith('.') or filename == 'metadata.json':
                         continue
@@ -254,36 +497,44 @@ class ProjectManager:
                     file_path = os.path.join(root, filename)
                     rel_path = os.path.relpath(file_path, project_path)
                     
-                    # Déterminer le type de fichier
-                    extension = os.path.splitext(filename)[1].lower()
-                    file_type = self._get_file_type(extension)
-                    
-                    # Obtenir la taille du fichier
-                    size = os.path.getsize(file_path)
-                    size_formatted = self._format_size(size)
-                    
-                    # Obtenir les dates
-                    created = datetime.fromtimestamp(os.path.getctime(file_path)).isoformat()
-                    updated = datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-                    
-                    files.append({
-                        "name": filename,
-                        "path": rel_path,
-                        "type": file_type,
-                        "extension": extension,
-                        "size": size,
-                        "size_formatted": size_formatted,
-                        "created_at": created,
-                        "updated_at": updated
-                    })
+                    files[rel_path] = self._build_document_info(rel_path, os.stat(file_path))
+            
+            if generation is not None:
+                with self._files_cache_lock:
+                    if self._files_generation(project_id) == generation:
+                        self._files_cache[project_id] = files
             
             # Trier par nom
-            files.sort(key=lambda x: x['name'])
-            return files
+            return sorted(files.values(), key=lambda x: x['name'])
         except Exception as e:
-            logger.error(f"Erreur lors de la récupération des fichiers pour {project_id}: {e}")
+            logger.error("Erreur lors de la récupération des fichiers pour %s: %s", project_id, e)
             return []
     
+    def attach_watcher(self, watcher):
+        """
+        Attache un service de surveillance des fichiers (voir project_watcher).
+        
+        Les listes de fichiers sont alors mises en cache et mises à jour de
+        façon incrémentale lors des modifications externes.
+        
+        Args:
+            watcher (ProjectWatcher): Service de surveillance démarré
+        """
+        self._watcher = watcher
+        watcher.subscribe(self._on_files_changed)
+    
+    def attach_index(self, index):
+        """
+        Attache un index de recherche sémantique (voir embedding_index).
+        
+        L'analyse d'un document cite alors les passages des autres documents
+        du projet qui lui sont proches.
+        
+        Args:
+            index (EmbeddingIndex): Index des documents des projets
+        """
+        self._index = index
+    
     def get_document(self, project_id, document_path):
         """
         Récupère les informations d'un document spécifique.
@@ -299,40 +550,22 @@ class ProjectManager:
             return None
         
         try:
-            full_path = os.path.join(self.projects_dir, project_id, document_path)
-            if not os.path.exists(full_path) or not os.path.isfile(full_path):
+            stat = self._stat_document(project_id, document_path)
+            if stat is None:
                 return None
             
-            # Obtenir les informations de base
-            filename = os.path.basename(full_path)
-            extension = os.path.splitext(filename)[1].lower()
-            file_type = self._get_file_type(extension)
-            
-            # Obtenir la taille
-            size = os.path.getsize(full_path)
-            size_formatted = self._format_size(size)
-            
-            # Obtenir les dates
-            created = datetime.fromtimestamp(os.path.getctime(full_path)).isoformat()
-            updated = datetime.fromtimestamp(os.path.getmtime(full_path)).isoformat()
-            
-            return {
-                "name": filename,
-                "path": document_path,
-                "type": file_type,
-                "extension": extension,
-                "size": size,
-                "size_formatted": size_formatted,
-                "created_at": created,
-                "updated_at": updated
-            }
+            return self._build_document_info(document_path, stat)
         except Exception as e:
-            logger.error(f"Erreur lors de la récupération du document {document_path} pour {project_id}: {e}")
+            logger.error("Erreur lors de la récupération du document %s pour %s: %s", document_path, project_id, e)
             return None
     
     def get_document_content(self, project_id, document_path):
         """
-        Récupère le contenu d'un document.
+        Récupère le contenu complet d'un document.
+        
+        Pour les documents volumineux (voir LARGE_FILE_THRESHOLD), préférer
+        read_document_range, read_document_lines ou iter_document_chunks qui
+        ne chargent qu'une partie du fichier en mémoire.
         
         Args:
             project_id (str): ID du projet
@@ -345,19 +578,200 @@ class ProjectManager:
             return None
         
         try:
-            full_path = os.path.join(self.projects_dir, project_id, document_path)
-            if not os.path.exists(full_path) or not os.path.isfile(full_path):
+            if self._stat_document(project_id, document_path) is None:
                 return None
             
+            full_path = os.path.join(self.projects_dir, project_id, document_path)
+            
             # Lire le contenu
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
             return content
         except Exception as e:
-            logger.error(f"Erreur lors de la lecture du document {document_path} pour {project_id}: {e}")
+            logger.error("Erreur lors de la lecture du document %s pour %s: %s", document_path, project_id, e)
+            return None
+    
+    def read_document_range(self, project_id, document_path, offset=0, length=DEFAULT_CHUNK_SIZE):
+        """
+        Lit une plage d'octets d'un document.
+        
+        Les fichiers volumineux sont lus via mmap afin de ne pas charger le
+        fichier entier. La plage est raccourcie si nécessaire pour ne pas
+        couper un caractère UTF-8 en deux.
+        
+        Args:
+            project_id (str): ID du projet
+            document_path (str): Chemin relatif du document
+            offset (int): Position de départ en octets
+            length (int): Nombre maximum d'octets à lire (au plus MAX_WINDOW_BYTES)
+            
+        Returns:
+            dict: Contenu de la plage et informations de pagination ou None en cas d'erreur
+        """
+        if not self._project_exists(project_id):
+            return None
+        
+        try:
+            stat = self._stat_document(project_id, document_path)
+            if stat is None:
+                return None
+            
+            size = stat.st_size
+            offset = min(max(int(offset), 0), size)
+            length = min(max(int(length), 0), MAX_WINDOW_BYTES)
+            end = min(offset + length, size)
+            
+            full_path = os.path.join(self.projects_dir, project_id, document_path)
+            with open(full_path, 'rb') as f:
+                if size > LARGE_FILE_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        data = mm[offset:end]
+                else:
+                    f.seek(offset)
+                    data = f.read(end - offset)
+            
+            # Ne pas couper un caractère multi-octets en fin de plage
+            if end < size:
+                data = data[:self._utf8_safe_end(data)]
+            next_offset = offset + len(data)
+            
+            return {
+                "content": data.decode('utf-8', errors='replace'),
+                "offset": offset,
+                "length": len(data),
+                "next_offset": next_offset,
+                "size": size,
+                "eof": next_offset >= size
+            }
+        except Exception as e:
+            logger.error("Erreur lors de la lecture partielle du document %s pour %s: %s", document_path, project_id, e)
             return None
     
+    def read_document_lines(self, project_id, document_path, start_line=0, num_lines=DEFAULT_LINE_WINDOW,
+                            max_bytes=MAX_WINDOW_BYTES):
+        """
+        Lit une fenêtre de lignes d'un document.
+        
+        Le fichier est parcouru via mmap : seules les lignes demandées sont
+        décodées, quelle que soit la taille du document. La fenêtre s'arrête
+        avant la ligne qui dépasserait max_bytes ; une première ligne plus
+        longue à elle seule est coupée et la page est marquée truncated.
+        
+        Args:
+            project_id (str): ID du projet
+            document_path (str): Chemin relatif du document
+            start_line (int): Index (à partir de 0) de la première ligne
+            num_lines (int): Nombre maximum de lignes à lire
+            max_bytes (int): Taille maximale de la fenêtre en octets
+            
+        Returns:
+            dict: Lignes lues et informations de pagination ou None en cas d'erreur
+        """
+        if not self._project_exists(project_id):
+            return None
+        
+        try:
+            stat = self._stat_document(project_id, document_path)
+            if stat is None:
+                return None
+            
+            start_line = max(int(start_line), 0)
+            num_lines = max(int(num_lines), 0)
+            max_bytes = min(max(int(max_bytes), 1), MAX_WINDOW_BYTES)
+            size = stat.st_size
+            
+            if size == 0:
+                return {
+                    "content": "",
+                    "start_line": start_line,
+                    "num_lines": 0,
+                    "next_line": start_line,
+                    "size": 0,
+                    "eof": True,
+                    "truncated": False
+                }
+            
+            full_path = os.path.join(self.projects_dir, project_id, document_path)
+            with open(full_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Avancer jusqu'à la première ligne demandée
+                    position = 0
+                    line = 0
+                    while line < start_line and position < size:
+                        newline = mm.find(b'\n', position)
+                        position = size if newline == -1 else newline + 1
+                        line += 1
+                    
+                    # Lire la fenêtre de lignes, dans la limite de max_bytes
+                    begin = position
+                    read = 0
+                    truncated = False
+                    while read < num_lines and position < size:
+                        newline = mm.find(b'\n', position)
+                        end = size if newline == -1 else newline + 1
+                        if end - begin > max_bytes:
+                            if read == 0:
+                                # Ligne plus longue que la fenêtre : seul son début est renvoyé
+                                truncated = True
+                                read = 1
+                                position = end
+                            break
+                        position = end
+                        read += 1
+                    
+                    if truncated:
+                        data = mm[begin:begin + max_bytes]
+                        data = data[:self._utf8_safe_end(data)]
+                    else:
+                        data = mm[begin:position]
+            
+            return {
+                "content": data.decode('utf-8', errors='replace'),
+                "start_line": line,
+                "num_lines": read,
+                "next_line": line + read,
+                "size": size,
+                "eof": position >= size,
+                "truncated": truncated
+            }
+        except Exception as e:
+            logger.error("Erreur lors de la lecture des lignes du document %s pour %s: %s", document_path, project_id, e)
+            return None
+    
+    def iter_document_chunks(self, project_id, document_path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Parcourt le contenu brut d'un document par blocs, pour une réponse en streaming.
+        
+        Args:
+            project_id (str): ID du projet
+            document_path (str): Chemin relatif du document
+            chunk_size (int): Taille des blocs en octets
+            
+        Returns:
+            generator: Générateur de blocs d'octets ou None si le document n'existe pas
+        """
+        if not self._project_exists(project_id):
+            return None
+        
+        if self._stat_document(project_id, document_path) is None:
+            return None
+        
+        full_path = os.path.join(self.projects_dir, project_id, document_path)
+        
+        def generate():
+            try:
+                with open(full_path, 'rb') as f:
+                    while True:
+                        chunk = f.read(chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+            except Exception as e:
+                logger.error("Erreur lors du streaming du document %s pour %s: %s", document_path, project_id, e)
+        
+        return generate()
+    
     def create_document(self, project_id, name, content="", document_type="text"):
         """
         Crée un nouveau document dans un projet.
@@ -384,7 +798,7 @@ class ProjectManager:
             
             # Vérifier si le fichier existe déjà
             if os.path.exists(full_path):
-                logger.warning(f"Le document {document_path} existe déjà pour {project_id}")
+                logger.warning("Le document %s existe déjà pour %s", document_path, project_id)
                 return None
             
             # Écrire le contenu
@@ -393,14 +807,15 @@ class ProjectManager:
             
             # Mettre à jour la date de modification du projet
             self._update_project_timestamp(project_id)
+            self._invalidate_files_cache(project_id, document_path)
             
             # Obtenir les informations du document
             document = self.get_document(project_id, document_path)
             
-            logger.info(f"Document créé: {document_path} pour {project_id}")
+            logger.info("Document créé: %s pour %s", document_path, project_id)
             return document
         except Exception as e:
-            logger.error(f"Erreur lors de la création du document {name} pour {project_id}: {e}")
+            logger.error("Erreur lors de la création du document %s pour %s: %s", name, project_id, e)
             return None
     
     def update_document(self, project_id, document_path, content):
@@ -424,19 +839,24 @@ class ProjectManager:
                 return None
             
             # Écrire le nouveau contenu
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            if os.stat(full_path).st_nlink > 1 or not os.access(full_path, os.W_OK):
+                # Fichier dédupliqué (blob en lecture seule) : le remplacer pour ne pas modifier le blob partagé
+                self._replace_file_content(full_path, content)
+            else:
+                with open(full_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
             
             # Mettre à jour la date de modification du projet
             self._update_project_timestamp(project_id)
+            self._invalidate_files_cache(project_id, document_path)
             
             # Obtenir les informations du document
             document = self.get_document(project_id, document_path)
             
-            logger.info(f"Document mis à jour: {document_path} pour {project_id}")
+            logger.info("Document mis à jour: %s pour %s", document_path, project_id)
             return document
         except Exception as e:
-            logger.error(f"Erreur lors de la mise à jour du document {document_path} pour {project_id}: {e}")
+            logger.error("Erreur lors de la mise à jour du document %s pour %s: %s", document_path, project_id, e)
             return None
     
     def delete_document(self, project_id, document_path):
@@ -458,16 +878,20 @@ class ProjectManager:
             if not os.path.exists(full_path) or not os.path.isfile(full_path):
                 return False
             
-            # Supprimer le fichier
+            # Supprimer le fichier (et son blob s'il n'est plus référencé)
+            digest = self.blob_store.digest_of(full_path) if self.blob_store else None
             os.remove(full_path)
+            if digest:
+                self.blob_store.release(digest)
             
             # Mettre à jour la date de modification du projet
             self._update_project_timestamp(project_id)
+            self._invalidate_files_cache(project_id, document_path)
             
-            logger.info(f"Document supprimé: {document_path} pour {project_id}")
+            logger.info("Document supprimé: %s pour %s", document_path, project_id)
             return True
         except Exception as e:
-            logger.error(f"Erreur lors de la suppression du document {document_path} pour {project_id}: {e}")
+            logger.error("Erreur lors de la suppression du document %s pour %s: %s", document_path, project_id, e)
             return False
     
     def import_folder(self, source_path, name, description=""):
@@ -485,7 +909,7 @@ class ProjectManager:
         try:
             # Vérifier si le dossier source existe
             if not os.path.exists(source_path) or not os.path.isdir(source_path):
-                logger.error(f"Le dossier source {source_path} n'existe pas")
+                logger.error("Le dossier source %s n'existe pas", source_path)
                 return None
             
             # Créer un nouveau projet
@@ -513,13 +937,17 @@ class ProjectManager:
                     # Créer les répertoires intermédiaires
                     os.makedirs(os.path.dirname(dst_file), exist_ok=True)
                     
-                    # Copier le fichier
-                    shutil.copy2(src_file, dst_file)
-            
-            logger.info(f"Dossier importé en tant que projet: {name} ({project_id})")
+                    # Copier le fichier (ou le lier au blob de son contenu)
+                    if self.blob_store:
+                        self.blob_store.link_into(src_file, dst_file)
+                    else:
+                        shutil.copy2(src_file, dst_file)
+            
+            self._invalidate_files_cache(project_id)
+            logger.info("Dossier importé en tant que projet: %s (%s)", name, project_id)
             return project
         except Exception as e:
-            logger.error(f"Erreur lors de l'importation du dossier {source_path}: {e}")
+            logger.error("Erreur lors de l'importation du dossier %s: %s", source_path, e)
             # Nettoyer en cas d'erreur
             if 'project' in locals() and project:
                 self.delete_project(project['id'])
@@ -543,7 +971,7 @@ class ProjectManager:
         try:
             # Vérifier si le fichier source existe
             if not os.path.exists(source_path) or not os.path.isfile(source_path):
-                logger.error(f"Le fichier source {source_path} n'existe pas")
+                logger.error("Le fichier source %s n'existe pas", source_path)
                 return None
             
             # Déterminer le chemin cible
@@ -557,21 +985,140 @@ class ProjectManager:
             # Créer les répertoires intermédiaires
             os.makedirs(os.path.dirname(full_target_path), exist_ok=True)
             
-            # Copier le fichier
-            shutil.copy2(source_path, full_target_path)
+            # Copier le fichier (ou le lier au blob de son contenu)
+            if self.blob_store:
+                self.blob_store.link_into(source_path, full_target_path)
+            else:
+                # Ne pas écrire à travers un lien vers un blob partagé
+                if os.path.exists(full_target_path) and os.stat(full_target_path).st_nlink > 1:
+                    os.remove(full_target_path)
+                shutil.copy2(source_path, full_target_path)
             
             # Mettre à jour la date de modification du projet
             self._update_project_timestamp(project_id)
+            self._invalidate_files_cache(project_id, target_path)
             
             # Obtenir les informations du document
             document = self.get_document(project_id, target_path)
             
-            logger.info(f"Fichier importé: {source_path} vers {target_path} pour {project_id}")
+            logger.info("Fichier importé: %s vers %s pour %s", source_path, target_path, project_id)
             return document
         except Exception as e:
-            logger.error(f"Erreur lors de l'importation du fichier {source_path} pour {project_id}: {e}")
+            logger.error("Erreur lors de l'importation du fichier %s pour %s: %s", source_path, project_id, e)
+            return None
+    
+    def export_project(self, project_id, archive_format="zip", file_types=None):
+        """
+        Exporte un projet sous forme d'archive générée à la volée.
+        
+        Args:
+            project_id (str): ID du projet
+            archive_format (str): Format de l'archive ('zip' ou 'tar.gz')
+            file_types (list): Types de fichiers à inclure (voir _get_file_type), tous par défaut
+            
+        Returns:
+            generator: Générateur de blocs d'octets ou None en cas d'erreur
+        """
+        if not self._project_exists(project_id):
+            return None
+        
+        if archive_format not in project_archive.ARCHIVE_FORMATS:
+            logger.error("Format d'archive non pris en charge: %s", archive_format)
+            return None
+        
+        entries = self._iter_project_entries(project_id, file_types)
+        if archive_format == 'zip':
+            return project_archive.stream_zip(entries)
+        return project_archive.stream_tar_gz(entries)
+    
+    def import_archive(self, project_id, stream, archive_format="zip", file_types=None):
+        """
+        Importe le contenu d'une archive reçue en flux dans un projet.
+        
+        Args:
+            project_id (str): ID du projet
+            stream (file): Flux binaire de l'archive
+            archive_format (str): Format de l'archive ('zip' ou 'tar.gz')
+            file_types (list): Types de fichiers à importer, tous par défaut
+            
+        Returns:
+            list: Chemins relatifs des fichiers importés ou None en cas d'erreur
+        """
+        if not self._project_exists(project_id):
+            return None
+        
+        def accept(rel_path):
+            if rel_path == 'metadata.json':
+                return False
+            if file_types:
+                extension = os.path.splitext(rel_path)[1].lower()
+                return self._get_file_type(extension) in file_types
+            return True
+        
+        try:
+            project_path = os.path.join(self.projects_dir, project_id)
+            extracted = project_archive.extract_archive(stream, project_path, archive_format, accept)
+            
+            # Lier les fichiers extraits au stockage dédupliqué
+            if self.blob_store:
+                for rel_path in extracted:
+                    self.blob_store.deduplicate(os.path.join(project_path, rel_path))
+            
+            # Mettre à jour la date de modification du projet
+            self._update_project_timestamp(project_id)
+            self._invalidate_files_cache(project_id)
+            
+            logger.info("Archive importée: %s fichier(s) pour %s", len(extracted), project_id)
+            return extracted
+        except Exception as e:
+            logger.error("Erreur lors de l'importation de l'archive pour %s: %s", project_id, e)
             return None
     
+    def deduplicate_project(self, project_id):
+        """
+        Remplace les fichiers d'un projet par des liens vers le stockage dédupliqué.
+        
+        Utilisé après une importation qui n'est pas passée par import_folder
+        (clonage GitHub par exemple).
+        
+        Args:
+            project_id (str): ID du projet
+            
+        Returns:
+            int: Nombre de fichiers dédupliqués
+        """
+        if not self.blob_store or not self._project_exists(project_id):
+            return 0
+        
+        count = 0
+        project_path = os.path.join(self.projects_dir, project_id)
+        for root, dirs, filenames in os.walk(project_path):
+            # Ne pas toucher aux répertoires cachés (.git notamment)
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            
+            for filename in filenames:
+                if filename.startswith('.') or filename == 'metadata.json':
+                    continue
+                
+                file_path = os.path.join(root, filename)
+                if not os.path.islink(file_path) and self.blob_store.deduplicate(file_path):
+                    count += 1
+        
+        self._invalidate_files_cache(project_id)
+        logger.info("%s fichier(s) dédupliqué(s) pour %s", count, project_id)
+        return count
+    
+    def collect_garbage(self):
+        """
+        Supprime les blobs qui ne sont plus référencés par aucun projet.
+        
+        Returns:
+            dict: Résultat du nettoyage ou None si la déduplication est désactivée
+        """
+        if not self.blob_store:
+            return None
+        return self.blob_store.collect_garbage()
+    
     def analyze_document(self, project_id, document_path, model=""):
         """
         Analyse un document avec l'IA.
@@ -617,10 +1164,20 @@ class ProjectManager:
             analysis += "   - Explications claires.\n"
             analysis += "   - Bonne progression logique."
         
+        # Passages proches dans les autres documents du projet (projet indexé uniquement)
+        related = []
+        if self._index and self._index.is_indexed(project_id):
+            related = self._index.search(project_id, content[:2000], k=5, exclude_document=document_path) or []
+            if related:
+                analysis += "\n\nDocuments liés:\n"
+                for passage in related:
+                    analysis += f"   - {passage['document']} (lignes {passage['start_line']}-{passage['end_line']})\n"
+        
         return {
             "document": document,
             "model": model or "default_model",
-            "analysis": analysis
+            "analysis": analysis,
+            "related": related
         }
     
     def _project_exists(self, project_id):
@@ -636,25 +1193,195 @@ class ProjectManager:
         project_path = os.path.join(self.projects_dir, project_id)
         return os.path.exists(project_path) and os.path.isdir(project_path)
     
+    def _on_files_changed(self, project_id, changes):
+        """
+        Met à jour le cache des listes de fichiers à partir des notifications.
+        
+        Args:
+            project_id (str): ID du projet (None pour tous les projets)
+            changes (dict): Chemins relatifs modifiés (None pour tout relire)
+        """
+        with self._files_cache_lock:
+            self._files_generations[project_id] = self._files_generations.get(project_id, 0) + 1
+            if project_id is None:
+                self._files_cache.clear()
+                return
+            
+            cached = self._files_cache.get(project_id)
+            if cached is None:
+                return
+            if changes is None:
+                self._files_cache.pop(project_id, None)
+                return
+            
+            project_path = os.path.join(self.projects_dir, project_id)
+            for rel_path, kind in changes.items():
+                key = rel_path.replace('/', os.sep)
+                if key == 'metadata.json':
+                    continue
+                
+                try:
+                    stat = os.stat(os.path.join(project_path, key)) if kind != 'deleted' else None
+                except OSError:
+                    stat = None
+                
+                if stat is None:
+                    cached.pop(key, None)
+                else:
+                    cached[key] = self._build_document_info(key, stat)
+    
+    def _files_generation(self, project_id):
+        """Nombre de notifications reçues pour un projet (verrou du cache déjà pris)"""
+        return self._files_generations.get(None, 0), self._files_generations.get(project_id, 0)
+    
+    def _invalidate_files_cache(self, project_id, document_path=None):
+        """
+        Invalide le cache des fichiers après une modification faite par le gestionnaire.
+        
+        Args:
+            project_id (str): ID du projet
+            document_path (str): Chemin relatif modifié (optionnel, tout le projet par défaut)
+        """
+        if document_path is None:
+            self._on_files_changed(project_id, None)
+        else:
+            self._on_files_changed(project_id, {document_path: 'modified'})
+    
+    def _iter_project_entries(self, project_id, file_types=None):
+        """
+        Parcourt les fichiers d'un projet (hors fichiers cachés et métadonnées).
+        
+        Args:
+            project_id (str): ID du projet
+            file_types (list): Types de fichiers à inclure, tous par défaut
+            
+        Returns:
+            generator: Tuples (chemin complet, chemin relatif, type de fichier)
+        """
+        project_path = os.path.join(self.projects_dir, project_id)
+        for root, dirs, filenames in os.walk(project_path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            
+            for filename in sorted(filenames):
+                if filename.startswith('.') or filename == 'metadata.json':
+                    continue
+                
+                file_type = self._get_file_type(os.path.splitext(filename)[1].lower())
+                if file_types and file_type not in file_types:
+                    continue
+                
+                file_path = os.path.join(root, filename)
+                yield file_path, os.path.relpath(file_path, project_path).replace(os.sep, '/'), file_type
+    
+    def _stat_document(self, project_id, document_path):
+        """
+        Récupère les informations système d'un document en un seul appel.
+        
+        Args:
+            project_id (str): ID du projet
+            document_path (str): Chemin relatif du document
+            
+        Returns:
+            os.stat_result: Informations du fichier ou None si ce n'est pas un fichier
+        """
+        full_path = os.path.join(self.projects_dir, project_id, document_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        
+        if not stat_module.S_ISREG(stat.st_mode):
+            return None
+        return stat
+    
+    def _build_document_info(self, document_path, stat):
+        """
+        Construit le dictionnaire d'informations d'un document.
+        
+        Args:
+            document_path (str): Chemin relatif du document
+            stat (os.stat_result): Informations système du fichier
+            
+        Returns:
+            dict: Informations du document
+        """
+        filename = os.path.basename(document_path)
+        extension = os.path.splitext(filename)[1].lower()
+        
+        return {
+            "name": filename,
+            "path": document_path,
+            "type": self._get_file_type(extension),
+            "extension": extension,
+            "size": stat.st_size,
+            "size_formatted": self._format_size(stat.st_size),
+            "created_at": datetime.fromtimestamp(stat.st_ctime).isoformat(),
+            "updated_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "large": stat.st_size > LARGE_FILE_THRESHOLD
+        }
+    
+    def _replace_file_content(self, full_path, content):
+        """
+        Écrit un contenu dans un nouveau fichier qui remplace atomiquement l'ancien.
+        
+        Args:
+            full_path (str): Chemin complet du fichier
+            content (str): Contenu à écrire
+        """
+        stat = os.stat(full_path)
+        fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=os.path.dirname(full_path))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            mode = stat.st_mode & 0o777
+            if stat.st_nlink > 1:
+                # Le fichier ne partage plus le blob (en lecture seule)
+                mode |= 0o200
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, full_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _utf8_safe_end(self, data):
+        """
+        Calcule la longueur maximale d'un bloc d'octets sans couper de caractère UTF-8.
+        
+        Args:
+            data (bytes): Bloc d'octets
+            
+        Returns:
+            int: Longueur à conserver
+        """
+        # Remonter au plus 3 octets de continuation (10xxxxxx)
+        end = len(data)
+        for i in range(1, min(4, end) + 1):
+            byte = data[end - i]
+            if byte & 0xC0 == 0x80:
+                continue
+            if byte & 0x80:
+                # Octet de tête : vérifier que la séquence est complète
+                expected = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4
+                if i < expected:
+                    return end - i
+            break
+        return end
+    
     def _update_project_timestamp(self, project_id):
         """
         Met à jour la date de modification d'un projet.
         
+        L'écriture de metadata.json est différée et regroupée par la couche de
+        métadonnées, pour éviter une réécriture complète à chaque document.
+        
         Args:
             project_id (str): ID du projet
         """
         try:
-            metadata_path = os.path.join(self.projects_dir, project_id, "metadata.json")
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                
-                metadata['updated_at'] = datetime.now().isoformat()
-                
-                with open(metadata_path, 'w') as f:
-                    json.dump(metadata, f, indent=2)
+            self.metadata.touch(project_id)
         except Exception as e:
-            logger.error(f"Erreur lors de la mise à jour du timestamp pour {project_id}: {e}")
+            logger.error("Erreur lors de la mise à jour du timestamp pour %s: %s", project_id, e)
     
     def _clean_name(self, name):
         """
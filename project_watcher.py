@@ -0,0 +1,262 @@
+"""
+Surveillance du répertoire des projets.
+
+Les fichiers des projets sont aussi modifiés hors du ProjectManager
+(commandes /execute, opérations git, éditeurs externes). Ce service observe
+le répertoire des projets avec watchdog, regroupe les événements par projet
+sur une courte fenêtre de temps et notifie les abonnés (listes de fichiers,
+index de recherche...) des changements.
+
+Les abonnés reçoivent (project_id, changes) où changes associe un chemin
+relatif à 'created', 'modified' ou 'deleted'. changes vaut None lorsque le
+projet doit être entièrement relu, et project_id vaut None lorsque ce sont
+tous les projets (file d'événements saturée).
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+import logging
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Fenêtre de regroupement des événements (en secondes)
+WATCH_DEBOUNCE_DELAY = 0.5
+# Délai maximal avant notification, même si les événements continuent
+WATCH_MAX_DELAY = 5.0
+# Taille maximale de la file d'événements
+WATCH_QUEUE_SIZE = 10000
+# Intervalle de relecture périodique quand inotify n'est pas utilisable
+WATCH_RESCAN_INTERVAL = 30
+
+class _ProjectEventHandler(FileSystemEventHandler):
+    """
+    Convertit les événements watchdog en événements de projets.
+
+    Les événements des fichiers et répertoires cachés (.git, .blobs,
+    .embeddings, fichiers temporaires...) sont écartés dès leur réception.
+    """
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+        self._prefix = watcher.projects_dir.rstrip(os.sep) + os.sep
+
+    def _hidden(self, path):
+        """Indique si un chemin est caché ou hors du répertoire des projets"""
+        if not path.startswith(self._prefix):
+            return True
+        return any(part.startswith('.') for part in path[len(self._prefix):].split(os.sep))
+
+    def on_any_event(self, event):
+        if event.event_type == 'moved':
+            if not self._hidden(event.src_path):
+                self.watcher._push(event.src_path, 'deleted', event.is_directory)
+            if not self._hidden(event.dest_path):
+                self.watcher._push(event.dest_path, 'created', event.is_directory)
+        elif event.event_type in ('created', 'modified', 'deleted') and not self._hidden(event.src_path):
+            self.watcher._push(event.src_path, event.event_type, event.is_directory)
+
+class ProjectWatcher:
+    """
+    Service de surveillance des fichiers des projets.
+
+    Les événements sont placés dans une file bornée ; si elle déborde, les
+    abonnés sont invités à tout relire. Si inotify atteint ses limites (ou
+    n'est pas disponible), au démarrage ou en cours de fonctionnement, la
+    surveillance bascule sur une relecture périodique du répertoire.
+    """
+
+    def __init__(self, projects_dir, debounce=WATCH_DEBOUNCE_DELAY, max_queue=WATCH_QUEUE_SIZE,
+                 rescan_interval=WATCH_RESCAN_INTERVAL):
+        """
+        Initialise le service de surveillance.
+
+        Args:
+            projects_dir (str): Chemin vers le répertoire des projets
+            debounce (float): Fenêtre de regroupement des événements en secondes
+            max_queue (int): Taille maximale de la file d'événements
+            rescan_interval (float): Intervalle de relecture en mode dégradé
+        """
+        self.projects_dir = os.path.abspath(projects_dir)
+        self.debounce = debounce
+        self.rescan_interval = rescan_interval
+        self.polling = False
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._overflow = threading.Event()
+        self._stopping = threading.Event()
+        self._subscribers = []
+        self._observer = None
+        self._handler = None
+        self._dispatcher = None
+
+    def subscribe(self, callback):
+        """
+        Abonne une fonction aux changements des projets.
+
+        Args:
+            callback (callable): Fonction appelée avec (project_id, changes)
+        """
+        self._subscribers.append(callback)
+
+    def start(self):
+        """
+        Démarre la surveillance.
+
+        Returns:
+            bool: True si la surveillance a démarré, False sinon
+        """
+        if not WATCHDOG_AVAILABLE:
+            logger.warning("watchdog n'est pas installé, surveillance des projets désactivée")
+            return False
+
+        if self._observer:
+            return True
+
+        self._handler = _ProjectEventHandler(self)
+        try:
+            self._observer = Observer()
+            self._observer.schedule(self._handler, self.projects_dir, recursive=True)
+            self._observer.start()
+        except OSError as e:
+            # Limite de surveillances ou d'instances inotify atteinte
+            logger.warning("Surveillance inotify impossible (%s), relecture toutes les %s s", e, self.rescan_interval)
+            self._start_polling()
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="project-watcher", daemon=True)
+        self._dispatcher.start()
+        atexit.register(self.stop)
+
+        logger.info("Surveillance des projets démarrée: %s", self.projects_dir)
+        return True
+
+    def stop(self):
+        """Arrête la surveillance"""
+        self._stopping.set()
+        if self._observer:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=2)
+            except Exception as e:
+                logger.warning("Erreur lors de l'arrêt de la surveillance: %s", e)
+            self._observer = None
+
+    def _start_polling(self):
+        """Remplace l'observateur par une relecture périodique du répertoire"""
+        self.polling = True
+        self._observer = PollingObserver(timeout=self.rescan_interval)
+        self._observer.schedule(self._handler, self.projects_dir, recursive=True)
+        self._observer.start()
+
+    def _inotify_failed(self):
+        """
+        Indique si l'observateur inotify s'est arrêté de lui-même : l'ajout
+        d'une surveillance sur un nouveau répertoire (limite atteinte) lève
+        une exception qui termine son thread.
+        """
+        observer = self._observer
+        if self.polling or observer is None or self._stopping.is_set():
+            return False
+        return any(not emitter.is_alive() for emitter in list(observer.emitters))
+
+    def _fall_back_to_polling(self):
+        """Bascule sur la relecture périodique après un arrêt d'inotify"""
+        logger.warning("Surveillance inotify interrompue (limite de surveillances atteinte ?), "
+                       "relecture toutes les %s s", self.rescan_interval)
+        failed = self._observer
+        self._start_polling()
+        try:
+            failed.stop()
+        except Exception as e:
+            logger.warning("Erreur lors de l'arrêt de la surveillance: %s", e)
+
+    @property
+    def running(self):
+        """Indique si la surveillance est active"""
+        return self._observer is not None and not self._stopping.is_set()
+
+    @property
+    def queue_depth(self):
+        """Nombre d'événements en attente de traitement"""
+        return self._queue.qsize()
+
+    def _push(self, path, kind, is_directory):
+        """Ajoute un événement à la file (appelé par les threads watchdog)"""
+        parts = os.path.relpath(path, self.projects_dir).split(os.sep)
+        project_id = parts[0]
+        rel_path = '/'.join(parts[1:])
+        if is_directory and kind == 'modified':
+            # Les modifications de répertoire (projet compris) suivent celles de leurs fichiers
+            return
+
+        try:
+            # Un répertoire créé, déplacé ou supprimé : relire tout le projet
+            self._queue.put_nowait((project_id, None if is_directory or not rel_path else rel_path, kind))
+        except queue.Full:
+            self._overflow.set()
+
+    def _dispatch_loop(self):
+        """Regroupe les événements et notifie les abonnés"""
+        pending = {}
+        first_event = None
+        deadline = None
+
+        while not self._stopping.is_set():
+            timeout = max(deadline - time.monotonic(), 0) if deadline else 1.0
+            try:
+                project_id, rel_path, kind = self._queue.get(timeout=timeout)
+                now = time.monotonic()
+                first_event = first_event or now
+                deadline = min(now + self.debounce, first_event + WATCH_MAX_DELAY)
+
+                if rel_path is None:
+                    pending[project_id] = None
+                elif pending.get(project_id, {}) is not None:
+                    pending.setdefault(project_id, {})[rel_path] = kind
+            except queue.Empty:
+                pass
+
+            if self._inotify_failed():
+                # Événements perdus depuis l'arrêt d'inotify : tout relire
+                self._fall_back_to_polling()
+                self._overflow.set()
+
+            if self._overflow.is_set():
+                # File saturée : des événements ont été perdus, tout relire
+                self._overflow.clear()
+                self._drain_queue()
+                pending = {None: None}
+                deadline = time.monotonic()
+
+            if deadline and time.monotonic() >= deadline:
+                self._notify(pending)
+                pending = {}
+                first_event = None
+                deadline = None
+
+    def _drain_queue(self):
+        """Vide la file d'événements"""
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _notify(self, pending):
+        """Notifie les abonnés des changements regroupés"""
+        for project_id, changes in pending.items():
+            for callback in list(self._subscribers):
+                try:
+                    callback(project_id, changes)
+                except Exception as e:
+                    logger.error("Erreur dans un abonné à la surveillance des projets: %s", e)
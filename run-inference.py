@@ -7,6 +7,19 @@ import argparse
 import os
 import logging
 import subprocess
+import tempfile
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import percentile
+
+# Décodeur JSON plus rapide pour les flux NDJSON, si disponible
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 # Configuration des logs
 logging.basicConfig(
@@ -20,9 +33,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Constantes pour la connexion à Ollama
-OLLAMA_API_BASE = "http://localhost:11434/api"
+OLLAMA_API_BASE = os.environ.get("OLLAMA_API_BASE", "http://localhost:11434/api")
 REQUEST_TIMEOUT = 10  # Augmenté de 2 à 10 secondes
 MAX_RETRY_ATTEMPTS = 5  # Augmenté de 3 à 5 tentatives
+BATCH_DEFAULT_CONCURRENCY = 4  # Nombre de requêtes simultanées en mode batch
+# Cache disque de l'état d'Ollama, partagé entre les invocations successives du script
+# (répertoire de cache de l'utilisateur, et non le répertoire temporaire partagé)
+HEALTH_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                                "run-inference")
+HEALTH_CACHE_FILE = os.path.join(HEALTH_CACHE_DIR, "ollama_health_cache.json")
+HEALTH_CACHE_TTL = 60  # Durée de validité du cache en secondes
 
 def ensure_ollama_running():
     """S'assure qu'Ollama est en cours d'exécution avec une logique améliorée"""
@@ -32,9 +52,9 @@ def ensure_ollama_running():
             if response.status_code == 200:
                 return True
             
-            logger.info(f"Tentative {attempt+1}/{MAX_RETRY_ATTEMPTS}: Ollama répond mais avec le code {response.status_code}")
+            logger.info("Tentative %s/%s: Ollama répond mais avec le code %s", attempt + 1, MAX_RETRY_ATTEMPTS, response.status_code)
         except requests.exceptions.ConnectionError:
-            logger.info(f"Tentative {attempt+1}/{MAX_RETRY_ATTEMPTS}: Ollama ne répond pas, essai de démarrage...")
+            logger.info("Tentative %s/%s: Ollama ne répond pas, essai de démarrage...", attempt + 1, MAX_RETRY_ATTEMPTS)
             try:
                 # Vérifier si ollama est déjà en cours d'exécution
                 try:
@@ -58,16 +78,16 @@ def ensure_ollama_running():
                 logger.info("Service Ollama démarré, attente de 5 secondes...")
                 time.sleep(5)  # Attendre 5 secondes au lieu de 3
             except Exception as e:
-                logger.error(f"Erreur lors du démarrage d'Ollama: {e}")
+                logger.error("Erreur lors du démarrage d'Ollama: %s", e)
         except requests.exceptions.Timeout:
-            logger.info(f"Tentative {attempt+1}/{MAX_RETRY_ATTEMPTS}: Timeout lors de la connexion à Ollama")
+            logger.info("Tentative %s/%s: Timeout lors de la connexion à Ollama", attempt + 1, MAX_RETRY_ATTEMPTS)
         except Exception as e:
-            logger.error(f"Erreur inattendue: {e}")
+            logger.error("Erreur inattendue: %s", e)
         
         # Si ce n'est pas la dernière tentative, attendre avant de réessayer
         if attempt < MAX_RETRY_ATTEMPTS - 1:
             wait_time = 2 * (attempt + 1)  # Attente exponentielle
-            logger.info(f"Attente de {wait_time} secondes avant la prochaine tentative...")
+            logger.info("Attente de %s secondes avant la prochaine tentative...", wait_time)
             time.sleep(wait_time)
     
     # Toutes les tentatives ont échoué
@@ -81,7 +101,7 @@ def ensure_ollama_running():
             logger.error("Ollama n'est pas installé ou n'est pas dans le PATH")
             logger.error("Installez Ollama via https://ollama.com/download")
         else:
-            logger.info(f"Ollama est installé à: {which_result.stdout.strip()}")
+            logger.info("Ollama est installé à: %s", which_result.stdout.strip())
             logger.error("Le service ne répond pas malgré l'installation")
     except Exception:
         logger.error("Impossible de vérifier si Ollama est installé")
@@ -99,27 +119,82 @@ def check_available_models():
                 print("Aucun modèle n'est installé. Vous pouvez en télécharger un avec:")
                 print("ollama pull llama3")
                 return False
+            write_health_cache([model.get("name") for model in models])
             return True
         return False
     except Exception as e:
-        logger.error(f"Erreur lors de la vérification des modèles: {e}")
+        logger.error("Erreur lors de la vérification des modèles: %s", e)
         return False
 
-def run_inference(prompt, model="llama3", max_length=500, temperature=0.7):
+def read_health_cache():
     """
-    Exécute une inférence en utilisant Ollama avec gestion améliorée des erreurs
+    Lit le cache disque de l'état d'Ollama s'il est encore valide.
+    
+    Returns:
+        dict: Contenu du cache (timestamp, api_base, models) ou None
+    """
+    try:
+        with open(HEALTH_CACHE_FILE, "r") as f:
+            cache = json.load(f)
+        if cache.get("api_base") == OLLAMA_API_BASE and time.time() - cache.get("timestamp", 0) < HEALTH_CACHE_TTL:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return None
+
+def write_health_cache(models=None):
+    """
+    Enregistre qu'Ollama a répondu correctement.
+    
+    Args:
+        models (list): Noms des modèles disponibles (optionnel, conserve les précédents)
+    """
+    try:
+        if models is None:
+            previous = read_health_cache()
+            models = previous.get("models") if previous else None
+        
+        os.makedirs(HEALTH_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".health.", suffix=".tmp", dir=HEALTH_CACHE_DIR)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"timestamp": time.time(), "api_base": OLLAMA_API_BASE, "models": models}, f)
+            os.replace(tmp_path, HEALTH_CACHE_FILE)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError as e:
+        logger.debug("Impossible d'écrire le cache d'état d'Ollama: %s", e)
+
+def invalidate_health_cache():
+    """Supprime le cache d'état d'Ollama après un échec"""
+    try:
+        os.remove(HEALTH_CACHE_FILE)
+    except OSError:
+        pass
+
+def diagnose_model_error(model):
+    """
+    Diagnostique une génération refusée (modèle introuvable par exemple).
+    
+    Args:
+        model (str): Modèle demandé
+        
+    Returns:
+        str: Message d'erreur à afficher
     """
-    if not ensure_ollama_running():
-        error_msg = "Erreur: Ollama n'est pas disponible. Vérifiez l'installation et le service."
-        logger.error(error_msg)
-        print("\033[1;31m" + error_msg + "\033[0m")  # Rouge
-        print("Pour démarrer Ollama manuellement, exécutez: ollama serve")
-        return error_msg
-    
-    # Vérifier si des modèles sont disponibles
     if not check_available_models():
         return "Erreur: Aucun modèle n'est disponible. Téléchargez-en un avec 'ollama pull llama3'."
+    return f"Erreur: Modèle '{model}' non trouvé. Téléchargez-le avec 'ollama pull {model}'."
+
+def run_inference(prompt, model="llama3", max_length=500, temperature=0.7):
+    """
+    Exécute une inférence en utilisant Ollama avec gestion améliorée des erreurs
     
+    La requête de génération est envoyée directement : l'état d'Ollama et
+    des modèles n'est vérifié qu'en cas d'échec.
+    """
     print(f"Exécution de l'inférence avec le prompt: {prompt}")
     print(f"\033[1;36mModèle sélectionné: {model}\033[0m")
     
@@ -159,6 +234,8 @@ def run_inference(prompt, model="llama3", max_length=500, temperature=0.7):
             response.raise_for_status()  # Gérer les erreurs HTTP
             result = response.json()
             
+            write_health_cache()
+            
             # Extraire le texte généré
             generated_text = result.get("response", "")
             
@@ -173,20 +250,30 @@ def run_inference(prompt, model="llama3", max_length=500, temperature=0.7):
             
             return generated_text
         
+        except requests.exceptions.HTTPError as e:
+            invalidate_health_cache()
+            if e.response is not None and e.response.status_code == 404:
+                error_text = diagnose_model_error(model)
+            else:
+                error_text = f"Erreur lors de l'inférence: {str(e)}"
+            logger.error(error_text)
+            print("\033[1;31m" + error_text + "\033[0m")  # Rouge
+            return error_text
+        
         except requests.exceptions.ConnectionError:
-            if attempt < 2:  # Si ce n'est pas la dernière tentative
-                wait_time = 2 * (attempt + 1)
-                print(f"Erreur de connexion, nouvelle tentative dans {wait_time} secondes...")
-                time.sleep(wait_time)
+            invalidate_health_cache()
+            # Diagnostic uniquement après l'échec : démarrer Ollama si nécessaire
+            if attempt < 2 and ensure_ollama_running():
+                print("Ollama est disponible, nouvelle tentative...")
             else:
-                error_text = "Erreur: Impossible de se connecter à Ollama. Vérifiez qu'Ollama est bien lancé sur http://localhost:11434"
+                error_text = f"Erreur: Impossible de se connecter à Ollama. Vérifiez qu'Ollama est bien lancé sur {OLLAMA_API_BASE}"
                 logger.error(error_text)
                 print("\033[1;31m" + error_text + "\033[0m")  # Rouge
                 print("Pour démarrer Ollama, exécutez: ollama serve")
                 return error_text
         
         except requests.exceptions.Timeout:
-            logger.warning(f"Timeout lors de la requête (tentative {attempt+1}/3)")
+            logger.warning("Timeout lors de la requête (tentative %s/3)", attempt + 1)
             if attempt < 2:
                 wait_time = 2 * (attempt + 1)
                 print(f"La requête prend plus de temps que prévu, nouvelle tentative dans {wait_time} secondes...")
@@ -203,22 +290,43 @@ def run_inference(prompt, model="llama3", max_length=500, temperature=0.7):
             print("\033[1;31m" + error_text + "\033[0m")  # Rouge
             return error_text
 
+def print_stream_stats(start_time, token_times, final_chunk=None):
+    """
+    Affiche les statistiques de latence d'une génération en streaming.
+    
+    Args:
+        start_time (float): Instant d'envoi de la requête (time.perf_counter)
+        token_times (list): Instants de réception de chaque token
+        final_chunk (dict): Dernier message d'Ollama (compteurs et durées)
+    """
+    if not token_times:
+        print("Aucun token reçu")
+        return
+    
+    time_to_first_token = token_times[0] - start_time
+    gaps = [later - earlier for earlier, later in zip(token_times, token_times[1:])]
+    
+    print(f"Temps jusqu'au premier token: {time_to_first_token * 1000:.0f} ms")
+    if gaps:
+        print(f"Latence inter-tokens: moyenne {sum(gaps) / len(gaps) * 1000:.1f} ms, "
+              f"p50 {percentile(gaps, 50) * 1000:.1f} ms, p90 {percentile(gaps, 90) * 1000:.1f} ms, "
+              f"max {max(gaps) * 1000:.1f} ms")
+    
+    final_chunk = final_chunk or {}
+    eval_count = final_chunk.get("eval_count")
+    eval_duration = final_chunk.get("eval_duration")
+    if eval_count and eval_duration:
+        print(f"Débit: {eval_count / (eval_duration / 1e9):.1f} tokens/s ({eval_count} tokens)")
+    else:
+        print(f"Tokens reçus: {len(token_times)}")
+
 def run_inference_stream(prompt, model="llama3", max_length=500, temperature=0.7):
     """
     Version alternative utilisant le streaming pour afficher les tokens en temps réel
     avec gestion améliorée des erreurs
-    """
-    if not ensure_ollama_running():
-        error_msg = "Erreur: Ollama n'est pas disponible. Vérifiez l'installation et le service."
-        logger.error(error_msg)
-        print("\033[1;31m" + error_msg + "\033[0m")  # Rouge
-        print("Pour démarrer Ollama manuellement, exécutez: ollama serve")
-        return error_msg
-    
-    # Vérifier si des modèles sont disponibles
-    if not check_available_models():
-        return "Erreur: Aucun modèle n'est disponible. Téléchargez-en un avec 'ollama pull llama3'."
     
+    Comme pour run_inference, l'état d'Ollama n'est vérifié qu'en cas d'échec.
+    """
     print(f"Exécution de l'inférence (streaming) avec le prompt: {prompt}")
     print(f"\033[1;36mModèle sélectionné: {model}\033[0m")
     
@@ -238,55 +346,75 @@ def run_inference_stream(prompt, model="llama3", max_length=500, temperature=0.7
     }
     
     print(f"Chargement du modèle {model}...")
-    start_time = time.time()
-    generated_text = ""
     
     # Tentatives de connexion avec retry
     for attempt in range(3):
         try:
+            start_time = time.perf_counter()
+            
             # Mode streaming
             response = requests.post(url, headers=headers, data=json.dumps(data), stream=True, timeout=REQUEST_TIMEOUT * 2)
             response.raise_for_status()
+            write_health_cache()
             
-            token_count = 0
+            # Les tokens sont accumulés dans une liste (concaténation en fin de génération)
+            tokens = []
+            token_times = []
+            final_chunk = {}
             
-            for line in response.iter_lines():
-                if line:
-                    chunk = json.loads(line)
-                    token = chunk.get("response", "")
-                    generated_text += token
-                    
-                    # Mise à jour de la progression
-                    token_count += 1
-                    if token_count % 5 == 0:  # Afficher tous les 5 tokens pour ne pas surcharger
-                        print(f"Génération du token {token_count}...", end="\r")
+            print("\nTexte généré:")
             
-            inference_time = time.time() - start_time
-            print(f"\nInférence terminée en {inference_time:.2f} secondes")
+            # chunk_size=None : traiter chaque ligne NDJSON dès sa réception
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                
+                chunk = json_loads(line)
+                token = chunk.get("response", "")
+                if token:
+                    token_times.append(time.perf_counter())
+                    tokens.append(token)
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+                
+                if chunk.get("done"):
+                    final_chunk = chunk
+            
+            generated_text = "".join(tokens)
+            inference_time = time.perf_counter() - start_time
+            print(f"\n\nInférence terminée en {inference_time:.2f} secondes")
+            print_stream_stats(start_time, token_times, final_chunk)
             
             # Vérifier si CUDA est disponible pour afficher l'utilisation mémoire
             if torch.cuda.is_available():
                 print(f"Utilisation mémoire GPU: {torch.cuda.memory_allocated() / 1024**2:.2f} MB")
             
-            print("\nTexte généré:")
-            print(generated_text)
-            
             return generated_text
         
+        except requests.exceptions.HTTPError as e:
+            invalidate_health_cache()
+            if e.response is not None and e.response.status_code == 404:
+                error_text = diagnose_model_error(model)
+            else:
+                error_text = f"Erreur lors de l'inférence: {str(e)}"
+            logger.error(error_text)
+            print("\033[1;31m" + error_text + "\033[0m")  # Rouge
+            return error_text
+        
         except requests.exceptions.ConnectionError:
-            if attempt < 2:  # Si ce n'est pas la dernière tentative
-                wait_time = 2 * (attempt + 1)
-                print(f"Erreur de connexion, nouvelle tentative dans {wait_time} secondes...")
-                time.sleep(wait_time)
+            invalidate_health_cache()
+            # Diagnostic uniquement après l'échec : démarrer Ollama si nécessaire
+            if attempt < 2 and ensure_ollama_running():
+                print("Ollama est disponible, nouvelle tentative...")
             else:
-                error_text = "Erreur: Impossible de se connecter à Ollama. Vérifiez qu'Ollama est bien lancé sur http://localhost:11434"
+                error_text = f"Erreur: Impossible de se connecter à Ollama. Vérifiez qu'Ollama est bien lancé sur {OLLAMA_API_BASE}"
                 logger.error(error_text)
                 print("\033[1;31m" + error_text + "\033[0m")  # Rouge
                 print("Pour démarrer Ollama, exécutez: ollama serve")
                 return error_text
         
         except requests.exceptions.Timeout:
-            logger.warning(f"Timeout lors de la requête (tentative {attempt+1}/3)")
+            logger.warning("Timeout lors de la requête (tentative %s/3)", attempt + 1)
             if attempt < 2:
                 wait_time = 2 * (attempt + 1)
                 print(f"La requête prend plus de temps que prévu, nouvelle tentative dans {wait_time} secondes...")
@@ -303,9 +431,278 @@ def run_inference_stream(prompt, model="llama3", max_length=500, temperature=0.7
             print("\033[1;31m" + error_text + "\033[0m")  # Rouge
             return error_text
 
+def generate_once(session, prompt, model, max_length=500, temperature=0.7, timeout=REQUEST_TIMEOUT * 2):
+    """
+    Envoie une requête de génération (non streaming) et mesure son exécution.
+    
+    Args:
+        session (requests.Session): Session HTTP partagée
+        prompt (str): Prompt à envoyer
+        model (str): Modèle à utiliser
+        max_length (int): Nombre maximum de tokens
+        temperature (float): Température de génération
+        timeout (float): Délai d'attente de la requête
+        
+    Returns:
+        dict: Texte généré, compteurs de tokens, durées et erreur éventuelle
+    """
+    data = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "options": {
+            "temperature": float(temperature),
+            "max_tokens": int(max_length),
+            "top_p": 0.9,
+            "seed": 42
+        }
+    }
+    
+    result = {"model": model, "response": "", "error": None, "error_type": None}
+    start_time = time.perf_counter()
+    try:
+        response = session.post(f"{OLLAMA_API_BASE}/generate", json=data, timeout=timeout)
+        response.raise_for_status()
+        body = json_loads(response.content)
+        result.update({
+            "response": body.get("response", ""),
+            "prompt_tokens": body.get("prompt_eval_count", 0),
+            "eval_tokens": body.get("eval_count", 0),
+            # Durées renvoyées par Ollama en nanosecondes
+            "total_duration": body.get("total_duration", 0) / 1e9,
+            "load_duration": body.get("load_duration", 0) / 1e9,
+            "prompt_eval_duration": body.get("prompt_eval_duration", 0) / 1e9,
+            "eval_duration": body.get("eval_duration", 0) / 1e9
+        })
+    except requests.exceptions.HTTPError as e:
+        result["error"] = str(e)
+        result["error_type"] = "not_found" if e.response is not None and e.response.status_code == 404 else "http"
+    except requests.exceptions.ConnectionError as e:
+        result["error"] = str(e)
+        result["error_type"] = "connection"
+    except requests.exceptions.Timeout as e:
+        result["error"] = str(e)
+        result["error_type"] = "timeout"
+    except requests.exceptions.RequestException as e:
+        result["error"] = str(e)
+        result["error_type"] = "request"
+    except ValueError as e:
+        result["error"] = f"Réponse invalide: {e}"
+        result["error_type"] = "invalid_response"
+    
+    result["latency"] = time.perf_counter() - start_time
+    return result
+
+def run_inference_json(session, prompt, model, max_length=500, temperature=0.7):
+    """
+    Exécute une inférence et renvoie un résultat structuré (modes --json et --worker).
+    
+    Comme pour run_inference, l'état d'Ollama n'est vérifié qu'après un échec.
+    
+    Args:
+        session (requests.Session): Session HTTP réutilisée entre les requêtes
+        prompt (str): Prompt à envoyer
+        model (str): Modèle à utiliser
+        max_length (int): Nombre maximum de tokens
+        temperature (float): Température de génération
+        
+    Returns:
+        dict: Résultat de generate_once complété par la clé "success"
+    """
+    result = generate_once(session, prompt, model, max_length, temperature, timeout=REQUEST_TIMEOUT * 6)
+    
+    if result["error_type"] == "connection":
+        invalidate_health_cache()
+        if ensure_ollama_running():
+            result = generate_once(session, prompt, model, max_length, temperature, timeout=REQUEST_TIMEOUT * 6)
+        else:
+            result["error"] = f"Impossible de se connecter à Ollama. Vérifiez qu'Ollama est bien lancé sur {OLLAMA_API_BASE}"
+    
+    if result["error_type"] == "not_found":
+        invalidate_health_cache()
+        result["error"] = diagnose_model_error(model).replace("Erreur: ", "", 1)
+    elif not result["error"]:
+        write_health_cache()
+    
+    result["success"] = result["error"] is None
+    return result
+
+def run_worker(default_model=None):
+    """
+    Boucle de service : lit des requêtes JSON (une par ligne) sur l'entrée
+    standard et écrit un résultat JSON par ligne sur la sortie standard.
+    
+    Le processus reste actif entre les requêtes, ce qui évite de réimporter
+    les dépendances et de rouvrir les connexions à chaque inférence. Chaque
+    requête contient "prompt" et optionnellement "id", "model",
+    "temperature" et "max_tokens" ; l'"id" est renvoyé tel quel.
+    
+    Args:
+        default_model (str): Modèle utilisé lorsque la requête n'en précise pas
+    """
+    output = sys.stdout
+    session = requests.Session()
+    model = default_model
+    
+    # Toute sortie informative va sur la sortie d'erreur pour ne pas corrompre le protocole
+    with contextlib.redirect_stdout(sys.stderr):
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict) or not item.get("prompt"):
+                    raise ValueError("prompt manquant")
+            except ValueError as e:
+                result = {"success": False, "error": f"Requête invalide: {e}", "error_type": "invalid_request"}
+            else:
+                if not item.get("model") and not model:
+                    model = get_default_model()
+                result = run_inference_json(
+                    session,
+                    item["prompt"],
+                    item.get("model") or model,
+                    item.get("max_tokens", 500),
+                    item.get("temperature", 0.7)
+                )
+                result["id"] = item.get("id")
+            
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    
+    session.close()
+
+def run_batch(batch_file, output_file=None, model=None, max_length=500, temperature=0.7,
+              concurrency=BATCH_DEFAULT_CONCURRENCY):
+    """
+    Exécute un lot de prompts lus au format JSONL.
+    
+    Chaque ligne est soit une chaîne JSON, soit un objet avec les clés
+    "prompt" et optionnellement "id", "model", "temperature" et "max_tokens".
+    Les vérifications préalables sont faites une seule fois et toutes les
+    requêtes partagent une même session HTTP. Les résultats sont écrits au
+    format JSONL au fur et à mesure, suivis d'un résumé sur la sortie d'erreur.
+    
+    Args:
+        batch_file (str): Chemin du fichier JSONL ou '-' pour l'entrée standard
+        output_file (str): Chemin du fichier de résultats (sortie standard par défaut)
+        model (str): Modèle par défaut des prompts
+        max_length (int): Nombre maximum de tokens par défaut
+        temperature (float): Température par défaut
+        concurrency (int): Nombre de requêtes simultanées
+        
+    Returns:
+        dict: Résumé du lot (débit, latences, erreurs)
+    """
+    # Lire les prompts
+    source = sys.stdin if batch_file == "-" else open(batch_file, "r", encoding="utf-8")
+    items = []
+    try:
+        for line_number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error("Ligne %s ignorée: JSON invalide (%s)", line_number, e)
+                continue
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or not item.get("prompt"):
+                logger.error("Ligne %s ignorée: prompt manquant", line_number)
+                continue
+            item.setdefault("id", line_number)
+            items.append(item)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    
+    if not items:
+        logger.error("Aucun prompt à exécuter")
+        return None
+    
+    # Vérifications préalables, une seule fois pour tout le lot (sauf si déjà en cache)
+    if not read_health_cache():
+        if not ensure_ollama_running():
+            logger.error("Erreur: Ollama n'est pas disponible. Vérifiez l'installation et le service.")
+            return None
+        if not check_available_models():
+            return None
+    
+    model = model or get_default_model()
+    concurrency = max(int(concurrency), 1)
+    
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    
+    output = sys.stdout if not output_file else open(output_file, "w", encoding="utf-8")
+    write_lock = threading.Lock()
+    results = []
+    
+    def process(item):
+        result = generate_once(
+            session,
+            item["prompt"],
+            item.get("model", model),
+            item.get("max_tokens", max_length),
+            item.get("temperature", temperature),
+            timeout=REQUEST_TIMEOUT * 6
+        )
+        return {"id": item["id"], **result}
+    
+    logger.info("Exécution de %s prompt(s) avec une concurrence de %s", len(items), concurrency)
+    start_time = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(process, item) for item in items]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                with write_lock:
+                    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    output.flush()
+    finally:
+        session.close()
+        if output is not sys.stdout:
+            output.close()
+    
+    elapsed = time.perf_counter() - start_time
+    succeeded = [r for r in results if not r["error"]]
+    latencies = [r["latency"] for r in succeeded]
+    eval_tokens = sum(r.get("eval_tokens", 0) for r in succeeded)
+    
+    summary = {
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "elapsed": elapsed,
+        "requests_per_second": len(results) / elapsed if elapsed > 0 else 0,
+        "tokens_per_second": eval_tokens / elapsed if elapsed > 0 else 0,
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in succeeded),
+        "eval_tokens": eval_tokens,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies) if latencies else 0
+    }
+    
+    print("\n=== Résumé du lot ===", file=sys.stderr)
+    print(f"Prompts: {summary['total']} ({summary['succeeded']} réussis, {summary['failed']} échoués)", file=sys.stderr)
+    print(f"Durée totale: {elapsed:.2f} s", file=sys.stderr)
+    print(f"Débit: {summary['requests_per_second']:.2f} requêtes/s, {summary['tokens_per_second']:.1f} tokens/s", file=sys.stderr)
+    print(f"Latence: p50 {summary['latency_p50']:.2f} s, p90 {summary['latency_p90']:.2f} s, "
+          f"p99 {summary['latency_p99']:.2f} s, max {summary['latency_max']:.2f} s", file=sys.stderr)
+    
+    return summary
+
 def get_default_model():
     """Récupère le modèle par défaut depuis la configuration avec vérification améliorée"""
-    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+    config_path = os.path.join(os.environ.get("APP_DATA_DIR", os.path.dirname(os.path.abspath(__file__))), "ollama_config.json")
     default_model = "llama3"
     
     if os.path.exists(config_path):
@@ -318,9 +715,14 @@ def get_default_model():
                 if configured_model and configured_model != "aucun_modele_disponible":
                     return configured_model
         except json.JSONDecodeError:
-            logger.error(f"Erreur: Fichier de configuration corrompu: {config_path}")
+            logger.error("Erreur: Fichier de configuration corrompu: %s", config_path)
         except Exception as e:
-            logger.error(f"Erreur lors de la lecture du modèle par défaut: {e}")
+            logger.error("Erreur lors de la lecture du modèle par défaut: %s", e)
+    
+    # Utiliser la liste des modèles en cache si elle est encore valide
+    cache = read_health_cache()
+    if cache and cache.get("models"):
+        return cache["models"][0]
     
     # Vérifier s'il y a des modèles disponibles
     try:
@@ -329,10 +731,11 @@ def get_default_model():
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 if models:
+                    write_health_cache([model.get("name") for model in models])
                     # Utiliser le premier modèle disponible
                     return models[0].get("name")
     except Exception as e:
-        logger.error(f"Erreur lors de la recherche d'un modèle disponible: {e}")
+        logger.error("Erreur lors de la recherche d'un modèle disponible: %s", e)
     
     return default_model
 
@@ -387,7 +790,7 @@ def verify_ollama_installation():
         print(f"❌ Erreur lors de la vérification du service: {e}")
     
     # Vérifier la configuration
-    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ollama_config.json")
+    config_path = os.path.join(os.environ.get("APP_DATA_DIR", os.path.dirname(os.path.abspath(__file__))), "ollama_config.json")
     if os.path.exists(config_path):
         try:
             with open(config_path, "r") as f:
@@ -410,6 +813,11 @@ def main():
     parser.add_argument("--temperature", type=float, default=0.7, help="Température pour la génération (0-1)")
     parser.add_argument("--max-tokens", type=int, default=500, help="Nombre maximum de tokens à générer")
     parser.add_argument("--verify", action="store_true", help="Vérifier l'installation d'Ollama")
+    parser.add_argument("--batch", metavar="FILE", help="Exécuter les prompts d'un fichier JSONL ('-' pour l'entrée standard)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_DEFAULT_CONCURRENCY, help="Nombre de requêtes simultanées en mode batch")
+    parser.add_argument("--output", metavar="FILE", help="Fichier de résultats JSONL du mode batch (sortie standard par défaut)")
+    parser.add_argument("--json", action="store_true", help="Écrire un unique objet JSON (texte, tokens, durées, erreur) sur la sortie standard")
+    parser.add_argument("--worker", action="store_true", help="Traiter des requêtes JSON lues ligne par ligne sur l'entrée standard")
     parser.add_argument("prompt", nargs="*", help="Prompt à envoyer au modèle")
     
     args = parser.parse_args()
@@ -419,14 +827,38 @@ def main():
         verify_ollama_installation()
         return
     
+    # Mode batch : lot de prompts JSONL
+    if args.batch:
+        summary = run_batch(args.batch, args.output, args.model, args.max_tokens, args.temperature, args.concurrency)
+        if summary is None or summary["failed"]:
+            sys.exit(1)
+        return
+    
+    # Mode service : requêtes JSON sur l'entrée standard
+    if args.worker:
+        run_worker(args.model)
+        return
+    
     # Vérifier si un prompt a été fourni
     if not args.prompt:
         parser.print_help()
         return
     
+    prompt = " ".join(args.prompt)
+    
+    # Mode JSON : seul l'objet résultat est écrit sur la sortie standard
+    if args.json:
+        with contextlib.redirect_stdout(sys.stderr):
+            model = args.model if args.model else get_default_model()
+            with requests.Session() as session:
+                result = run_inference_json(session, prompt, model, args.max_tokens, args.temperature)
+        print(json.dumps(result, ensure_ascii=False))
+        if not result["success"]:
+            sys.exit(1)
+        return
+    
     # Si aucun modèle n'est spécifié, utiliser le modèle par défaut
     model = args.model if args.model else get_default_model()
-    prompt = " ".join(args.prompt)
     use_streaming = not args.no_stream
     temperature = args.temperature
     max_tokens = args.max_tokens
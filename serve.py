@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Lancement de l'application avec un serveur de production.
+
+uvicorn est utilisé s'il est installé : les routes qui attendent Ollama sont
+alors servies de façon asynchrone (asgi.py). À défaut, gunicorn (worker
+gthread) est utilisé sous Linux et macOS et waitress sous Windows. Les
+templates sont mis en cache et le mode debug est désactivé. SIGTERM et
+Ctrl+C arrêtent le serveur proprement : les requêtes en cours se terminent,
+puis les logs et les métadonnées en attente sont écrits.
+
+Usage:
+    python serve.py
+    python serve.py --workers 2 --threads 16 --port 8000
+    python serve.py --server gunicorn
+    python serve.py --server waitress
+"""
+import os
+import sys
+import signal
+import argparse
+
+def run_gunicorn(args):
+    """Démarre gunicorn avec gunicorn.conf.py et les options de la ligne de commande"""
+    import runpy
+    from gunicorn.app.base import BaseApplication
+
+    config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    settings = runpy.run_path(config_file)
+
+    class StandaloneApplication(BaseApplication):
+        def load_config(self):
+            for key, value in settings.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set('bind', f"{args.host}:{args.port}")
+            if args.workers:
+                self.cfg.set('workers', args.workers)
+            if args.threads:
+                self.cfg.set('threads', args.threads)
+
+        def load(self):
+            from wsgi import application
+            return application
+
+    StandaloneApplication().run()
+
+def run_waitress(args):
+    """Démarre waitress et l'arrête proprement sur SIGTERM"""
+    from waitress import create_server
+    from wsgi import application
+
+    server = create_server(
+        application,
+        host=args.host,
+        port=args.port,
+        threads=args.threads or 8,
+        # Les réponses en streaming sont envoyées au fil de l'eau
+        send_bytes=1,
+        channel_timeout=300
+    )
+
+    def stop(signum, frame):
+        # La boucle de waitress est interrompue, la fermeture se fait ensuite
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Serveur waitress sur http://{args.host}:{args.port} ({args.threads or 8} threads)")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+def run_uvicorn(args):
+    """Démarre uvicorn avec l'application ASGI (routes d'inférence asynchrones)"""
+    import uvicorn
+
+    if args.threads:
+        os.environ['WEB_THREADS'] = str(args.threads)
+    uvicorn.run(
+        'asgi:application',
+        host=args.host,
+        port=args.port,
+        workers=args.workers or int(os.environ.get('WEB_WORKERS', 1)),
+        lifespan='on',
+        timeout_graceful_shutdown=int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30)),
+        access_log=bool(os.environ.get('WEB_ACCESS_LOG'))
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Lancer l'application avec un serveur de production")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress", "uvicorn"], default="auto", help="Serveur WSGI")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'), help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', 5000)), help="Port d'écoute")
+    parser.add_argument("--workers", type=int, help="Nombre de processus (gunicorn, WEB_WORKERS)")
+    parser.add_argument("--threads", type=int, help="Nombre de threads par processus (WEB_THREADS)")
+    args = parser.parse_args()
+
+    # Jamais de mode debug ni de rechargement des templates en production
+    os.environ['FLASK_DEBUG'] = '0'
+
+    server = args.server
+    if server == "auto":
+        try:
+            import uvicorn, httpx, a2wsgi  # noqa: F401
+            server = "uvicorn"
+        except ImportError:
+            server = "waitress" if sys.platform == "win32" else "gunicorn"
+        if server == "gunicorn":
+            try:
+                import gunicorn  # noqa: F401
+            except ImportError:
+                server = "waitress"
+
+    if server == "gunicorn":
+        run_gunicorn(args)
+    elif server == "uvicorn":
+        run_uvicorn(args)
+    else:
+        run_waitress(args)
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,12 @@ const TOAST_DURATION = 3000;
 const ERROR_TOAST_DURATION = 5000;
 const GPU_REFRESH_INTERVAL = 30000;
 
+// Sujets du canal d'événements du serveur (/api/events)
+const SERVER_EVENT_TOPICS = ['gpu', 'models', 'default_model', 'pull', 'jobs', 'projects', 'charts'];
+const serverEventHandlers = {};
+let serverEvents = null;
+let pollingStarted = false;
+
 // Gestion du thème (clair/sombre)
 document.addEventListener('DOMContentLoaded', function() {
     // Initialiser le thème
@@ -41,13 +47,69 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialiser les tooltips
     initTooltips();
     
-    // Charger les informations GPU
-    loadGpuInfo();
+    // Informations GPU et état d'Ollama poussés par le serveur à chaque changement
+    onServerEvent('gpu', renderGpuInfo);
+    onServerEvent('models', reportOllamaStatus);
+    onServerEvent('default_model', renderCurrentModel);
     
-    // Nouvelle fonction: vérifier l'état de la connexion à Ollama
-    checkOllamaConnection();
+    // Sans canal d'événements : interrogation périodique
+    if (!connectServerEvents()) {
+        startPolling();
+    }
 });
 
+// Abonne une fonction à un sujet du canal d'événements
+function onServerEvent(topic, handler) {
+    if (!serverEventHandlers[topic]) {
+        serverEventHandlers[topic] = [];
+    }
+    serverEventHandlers[topic].push(handler);
+}
+
+// Indique si la page reçoit les événements du serveur
+function serverEventsConnected() {
+    return serverEvents !== null && serverEvents.readyState !== EventSource.CLOSED;
+}
+
+// Ouvre l'unique connexion de la page au canal d'événements
+function connectServerEvents() {
+    if (!window.EventSource) return false;
+    
+    serverEvents = new EventSource('/api/events');
+    SERVER_EVENT_TOPICS.forEach(topic => {
+        serverEvents.addEventListener(topic, function(event) {
+            let data;
+            try {
+                data = JSON.parse(event.data);
+            } catch (error) {
+                console.error(`Événement ${topic} invalide:`, error);
+                return;
+            }
+            (serverEventHandlers[topic] || []).forEach(handler => handler(data));
+        });
+    });
+    
+    // Le navigateur se reconnecte seul après une coupure ; une connexion
+    // refusée (serveur saturé) ferme le canal
+    serverEvents.onerror = function() {
+        if (serverEvents.readyState === EventSource.CLOSED) {
+            console.warn('Canal d\'événements indisponible, interrogation périodique');
+            startPolling();
+        }
+    };
+    return true;
+}
+
+// Interrogation périodique, si le canal d'événements n'est pas disponible
+function startPolling() {
+    if (pollingStarted) return;
+    pollingStarted = true;
+    
+    loadGpuInfo();
+    checkOllamaConnection();
+    setInterval(loadGpuInfo, GPU_REFRESH_INTERVAL);
+}
+
 // Met à jour l'icône du bouton de thème
 function updateThemeIcon(theme) {
     const themeToggle = document.getElementById('themeToggle');
@@ -134,30 +196,36 @@ function loadGpuInfo() {
             }
             return response.json();
         })
-        .then(data => {
-            if (data.error) {
-                // Vérifier si l'erreur est une commande non trouvée (nvidia-smi)
-                if (data.error.includes('not found') || data.error.includes('command not found')) {
-                    gpuInfoElement.innerHTML = '<i class="fas fa-microchip"></i> GPU: Non détecté';
-                } else {
-                    gpuInfoElement.innerHTML = '<i class="fas fa-exclamation-triangle"></i> Erreur GPU: ' + truncateText(data.error, 30);
-                }
-                return;
-            }
-            
-            if (data.gpus && data.gpus.length > 0) {
-                const gpu = data.gpus[0]; // Prendre le premier GPU
-                gpuInfoElement.innerHTML = `<i class="fas fa-microchip"></i> ${gpu.name} | Utilisation: ${gpu.utilization}% | Mémoire: ${gpu.memory_used}/${gpu.memory_total} MB`;
-            } else {
-                gpuInfoElement.innerHTML = '<i class="fas fa-microchip"></i> Aucun GPU détecté';
-            }
-        })
+        .then(renderGpuInfo)
         .catch(error => {
             console.error('Erreur lors du chargement des informations GPU:', error);
             gpuInfoElement.innerHTML = '<i class="fas fa-exclamation-triangle"></i> Erreur de chargement GPU';
         });
 }
 
+// Affiche les informations GPU (réponse de /api/gpu-info ou événement gpu)
+function renderGpuInfo(data) {
+    const gpuInfoElement = document.getElementById('gpuInfo');
+    if (!gpuInfoElement) return;
+    
+    if (data.error) {
+        // Vérifier si l'erreur est une commande non trouvée (nvidia-smi)
+        if (data.error.includes('not found') || data.error.includes('command not found')) {
+            gpuInfoElement.innerHTML = '<i class="fas fa-microchip"></i> GPU: Non détecté';
+        } else {
+            gpuInfoElement.innerHTML = '<i class="fas fa-exclamation-triangle"></i> Erreur GPU: ' + truncateText(data.error, 30);
+        }
+        return;
+    }
+    
+    if (data.gpus && data.gpus.length > 0) {
+        const gpu = data.gpus[0]; // Prendre le premier GPU
+        gpuInfoElement.innerHTML = `<i class="fas fa-microchip"></i> ${gpu.name} | Utilisation: ${gpu.utilization}% | Mémoire: ${gpu.memory_used}/${gpu.memory_total} MB`;
+    } else {
+        gpuInfoElement.innerHTML = '<i class="fas fa-microchip"></i> Aucun GPU détecté';
+    }
+}
+
 // Nouvelle fonction: vérifie si Ollama est accessible
 function checkOllamaConnection() {
     fetch('/api/models')
@@ -167,30 +235,33 @@ function checkOllamaConnection() {
             }
             return response.json();
         })
-        .then(data => {
-            if (data.error) {
-                if (data.error.includes('localhost:11434') || data.error.includes('connection refused')) {
-                    console.warn('Ollama n\'est pas disponible: Service non démarré');
-                    showStatusBanner('Ollama n\'est pas en cours d\'exécution. Certaines fonctionnalités ne seront pas disponibles.', 'warning');
-                } else {
-                    console.error('Erreur Ollama:', data.error);
-                }
-                return;
-            }
-            
-            // Si nous avons des modèles, Ollama fonctionne correctement
-            if (data.models && data.models.length > 0) {
-                console.info(`Ollama est disponible: ${data.models.length} modèles trouvés`);
-            } else {
-                console.warn('Ollama est disponible mais aucun modèle n\'est installé');
-                showStatusBanner('Aucun modèle Ollama n\'est installé. Allez dans "Gestion Ollama" pour en télécharger un.', 'info');
-            }
-        })
+        .then(reportOllamaStatus)
         .catch(error => {
             console.error('Erreur lors de la vérification d\'Ollama:', error);
         });
 }
 
+// Signale un service Ollama arrêté ou sans modèle (réponse de /api/models ou événement models)
+function reportOllamaStatus(data) {
+    if (data.error) {
+        if (data.error.includes('localhost:11434') || data.error.includes('connection refused')) {
+            console.warn('Ollama n\'est pas disponible: Service non démarré');
+            showStatusBanner('Ollama n\'est pas en cours d\'exécution. Certaines fonctionnalités ne seront pas disponibles.', 'warning');
+        } else {
+            console.error('Erreur Ollama:', data.error);
+        }
+        return;
+    }
+    
+    // Si nous avons des modèles, Ollama fonctionne correctement
+    if (data.models && data.models.length > 0) {
+        console.info(`Ollama est disponible: ${data.models.length} modèles trouvés`);
+    } else {
+        console.warn('Ollama est disponible mais aucun modèle n\'est installé');
+        showStatusBanner('Aucun modèle Ollama n\'est installé. Allez dans "Gestion Ollama" pour en télécharger un.', 'info');
+    }
+}
+
 // Nouvelle fonction: affiche une bannière d'état en haut de la page
 function showStatusBanner(message, type = 'info') {
     // Vérifier si une bannière existe déjà
@@ -265,34 +336,7 @@ function loadCurrentModel() {
             }
             return response.json();
         })
-        .then(data => {
-            if (data.error) {
-                // Vérifier si l'erreur est liée à Ollama
-                if (data.error.includes('localhost:11434') || data.error.includes('connection refused')) {
-                    currentModelElement.innerHTML = '<span style="color: var(--error-color);"><i class="fas fa-exclamation-circle"></i> Modèle: Ollama non disponible</span>';
-                    console.error('Erreur: Ollama n\'est pas disponible');
-                    return;
-                }
-                
-                currentModelElement.textContent = 'Modèle: Erreur de chargement';
-                return;
-            }
-            
-            // Vérifier si le modèle est "none" (aucun modèle disponible)
-            if (data.current === 'none' || data.current === 'aucun_modele_disponible') {
-                currentModelElement.innerHTML = '<span style="color: var(--error-color);"><i class="fas fa-exclamation-triangle"></i> Aucun modèle disponible</span>';
-                return;
-            }
-            
-            // Stocker le modèle actuel dans la variable globale
-            currentModelName = data.current;
-            
-            // Mettre à jour l'affichage
-            currentModelElement.innerHTML = `<i class="fas fa-brain"></i> Modèle: ${currentModelName}`;
-            
-            // Mettre à jour le sélecteur de modèle si disponible
-            updateModelSelect(currentModelName);
-        })
+        .then(renderCurrentModel)
         .catch(error => {
             console.error('Erreur lors du chargement du modèle actuel:', error);
             currentModelElement.innerHTML = '<span style="color: var(--error-color);"><i class="fas fa-exclamation-circle"></i> Modèle: Erreur de connexion</span>';
@@ -305,6 +349,39 @@ function loadCurrentModel() {
         });
 }
 
+// Affiche le modèle actuel (réponse de /api/current-model ou événement default_model)
+function renderCurrentModel(data) {
+    const currentModelElement = document.getElementById('currentModel');
+    if (!currentModelElement) return;
+    
+    if (data.error) {
+        // Vérifier si l'erreur est liée à Ollama
+        if (data.error.includes('localhost:11434') || data.error.includes('connection refused')) {
+            currentModelElement.innerHTML = '<span style="color: var(--error-color);"><i class="fas fa-exclamation-circle"></i> Modèle: Ollama non disponible</span>';
+            console.error('Erreur: Ollama n\'est pas disponible');
+            return;
+        }
+        
+        currentModelElement.textContent = 'Modèle: Erreur de chargement';
+        return;
+    }
+    
+    // Vérifier si le modèle est "none" (aucun modèle disponible)
+    if (data.current === 'none' || data.current === 'aucun_modele_disponible') {
+        currentModelElement.innerHTML = '<span style="color: var(--error-color);"><i class="fas fa-exclamation-triangle"></i> Aucun modèle disponible</span>';
+        return;
+    }
+    
+    // Stocker le modèle actuel dans la variable globale
+    currentModelName = data.current;
+    
+    // Mettre à jour l'affichage
+    currentModelElement.innerHTML = `<i class="fas fa-brain"></i> Modèle: ${currentModelName}`;
+    
+    // Mettre à jour le sélecteur de modèle si disponible
+    updateModelSelect(currentModelName);
+}
+
 // Met à jour les sélecteurs de modèle si disponibles
 function updateModelSelect(modelName) {
     // Rechercher tous les sélecteurs de modèle dans la page
@@ -336,73 +413,7 @@ function loadModelsList(selectElementId, callback = null) {
             }
             return response.json();
         })
-        .then(data => {
-            // Vider le select
-            selectElement.innerHTML = '';
-            
-            if (data.error) {
-                // Vérifier si l'erreur est liée à Ollama
-                if (data.error.includes('localhost:11434') || data.error.includes('connection refused')) {
-                    selectElement.innerHTML = '<option value="none">Ollama non disponible</option>';
-                    console.error('Erreur: Ollama n\'est pas disponible');
-                    showErrorToast('Erreur: Ollama n\'est pas disponible. Exécutez "ollama serve" dans un terminal.');
-                } else {
-                    selectElement.innerHTML = '<option value="none">Erreur de chargement</option>';
-                    showErrorToast(`Erreur: ${data.error}`);
-                }
-                
-                // Exécuter le callback si présent
-                if (callback && typeof callback === 'function') {
-                    callback({ error: data.error, models: [] });
-                }
-                return;
-            }
-            
-            if (!data.models || data.models.length === 0) {
-                selectElement.innerHTML = '<option value="none">Aucun modèle disponible</option>';
-                
-                // Exécuter le callback si présent
-                if (callback && typeof callback === 'function') {
-                    callback({ models: [] });
-                }
-                return;
-            }
-            
-            // Ajouter les modèles au select
-            data.models.forEach(model => {
-                const option = document.createElement('option');
-                option.value = model.name;
-                option.textContent = model.name;
-                
-                // Marquer le modèle par défaut
-                if (model.name === data.default) {
-                    option.textContent += ' (défaut)';
-                    option.selected = true;
-                }
-                
-                // Si ce modèle est le même que currentModelName, le sélectionner
-                if (model.name === currentModelName) {
-                    option.selected = true;
-                }
-                
-                selectElement.appendChild(option);
-            });
-            
-            // Si aucun modèle n'est sélectionné, sélectionner le modèle par défaut
-            if (selectElement.selectedIndex < 0 && data.default) {
-                for (let i = 0; i < selectElement.options.length; i++) {
-                    if (selectElement.options[i].value === data.default) {
-                        selectElement.selectedIndex = i;
-                        break;
-                    }
-                }
-            }
-            
-            // Exécuter le callback si présent
-            if (callback && typeof callback === 'function') {
-                callback(data);
-            }
-        })
+        .then(data => fillModelsSelect(selectElement, data, callback))
         .catch(error => {
             console.error('Erreur lors du chargement des modèles:', error);
             selectElement.innerHTML = '<option value="none">Erreur de connexion</option>';
@@ -417,6 +428,77 @@ function loadModelsList(selectElementId, callback = null) {
         });
 }
 
+// Remplit un sélecteur de modèles (réponse de /api/models ou événement models)
+function fillModelsSelect(selectElement, data, callback = null) {
+    if (!selectElement) return;
+    
+    // Vider le select
+    selectElement.innerHTML = '';
+    
+    if (data.error) {
+        // Vérifier si l'erreur est liée à Ollama
+        if (data.error.includes('localhost:11434') || data.error.includes('connection refused')) {
+            selectElement.innerHTML = '<option value="none">Ollama non disponible</option>';
+            console.error('Erreur: Ollama n\'est pas disponible');
+            showErrorToast('Erreur: Ollama n\'est pas disponible. Exécutez "ollama serve" dans un terminal.');
+        } else {
+            selectElement.innerHTML = '<option value="none">Erreur de chargement</option>';
+            showErrorToast(`Erreur: ${data.error}`);
+        }
+        
+        // Exécuter le callback si présent
+        if (callback && typeof callback === 'function') {
+            callback({ error: data.error, models: [] });
+        }
+        return;
+    }
+    
+    if (!data.models || data.models.length === 0) {
+        selectElement.innerHTML = '<option value="none">Aucun modèle disponible</option>';
+        
+        // Exécuter le callback si présent
+        if (callback && typeof callback === 'function') {
+            callback({ models: [] });
+        }
+        return;
+    }
+    
+    // Ajouter les modèles au select
+    data.models.forEach(model => {
+        const option = document.createElement('option');
+        option.value = model.name;
+        option.textContent = model.name;
+        
+        // Marquer le modèle par défaut
+        if (model.name === data.default) {
+            option.textContent += ' (défaut)';
+            option.selected = true;
+        }
+        
+        // Si ce modèle est le même que currentModelName, le sélectionner
+        if (model.name === currentModelName) {
+            option.selected = true;
+        }
+        
+        selectElement.appendChild(option);
+    });
+    
+    // Si aucun modèle n'est sélectionné, sélectionner le modèle par défaut
+    if (selectElement.selectedIndex < 0 && data.default) {
+        for (let i = 0; i < selectElement.options.length; i++) {
+            if (selectElement.options[i].value === data.default) {
+                selectElement.selectedIndex = i;
+                break;
+            }
+        }
+    }
+    
+    // Exécuter le callback si présent
+    if (callback && typeof callback === 'function') {
+        callback(data);
+    }
+}
+
 // Formatage des nombres
 function formatNumber(number) {
     return new Intl.NumberFormat().format(number);
@@ -572,9 +654,6 @@ function getDiagnosticInfo() {
 
 // Initialisation automatique au chargement de la page
 document.addEventListener('DOMContentLoaded', function() {
-    // Charger le modèle actuel
+    // Charger le modèle actuel (ses changements sont ensuite poussés par le serveur)
     loadCurrentModel();
-    
-    // Rafraîchir les infos GPU toutes les 30 secondes
-    setInterval(loadGpuInfo, GPU_REFRESH_INTERVAL);
 });
\ No newline at end of file
@@ -35,7 +35,35 @@ document.addEventListener('DOMContentLoaded', function() {
     let downloadInProgress = false;
     
     // Charger les modèles avec une gestion améliorée des erreurs
-    loadModelsList('testModelSelect', function(data) {
+    loadModelsList('testModelSelect', showModels);
+    
+    // Liste des modèles poussée par le serveur à chaque changement
+    // (téléchargement, suppression, modèle par défaut, y compris depuis un autre onglet)
+    onServerEvent('models', function(data) {
+        fillModelsSelect(testModelSelect, data, showModels);
+    });
+    
+    // Avancement du téléchargement en cours
+    onServerEvent('pull', function(data) {
+        if (!downloadInProgress || data.done) return;
+        const percent = data.percent !== null ? ` ${data.percent}%` : '';
+        downloadModelBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${escapeHtml(data.model)} : ${escapeHtml(data.status || 'téléchargement')}${percent}`;
+    });
+    
+    // Graphiques redessinés après de nouvelles inférences
+    onServerEvent('charts', function(data) {
+        showCharts(data.charts);
+    });
+    
+    // Recharge la liste des modèles si le serveur ne la pousse pas
+    function refreshModels() {
+        if (!serverEventsConnected()) {
+            loadModelsList('testModelSelect', loadModelsGrid);
+        }
+    }
+    
+    // Affiche la grille des modèles ou l'état d'Ollama
+    function showModels(data) {
         // Une fois les modèles chargés, afficher un message approprié
         const modelGrid = document.getElementById('modelGrid');
         const modelLoadingSpinner = document.getElementById('modelLoadingSpinner');
@@ -101,7 +129,7 @@ document.addEventListener('DOMContentLoaded', function() {
             // Des modèles sont disponibles, continuer normalement
             loadModelsGrid(data);
         }
-    });
+    }
     
     // Fonction pour charger la grille de modèles
     function loadModelsGrid(data) {
@@ -302,7 +330,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     showToast(`Modèle ${modelName} téléchargé avec succès`);
                     
                     // Recharger la liste des modèles
-                    loadModelsList('testModelSelect', loadModelsGrid);
+                    refreshModels();
                     
                     // Vider l'input
                     modelInput.value = '';
@@ -393,7 +421,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 showToast(`Modèle ${modelName} supprimé avec succès`);
                 
                 // Recharger la liste des modèles
-                loadModelsList('testModelSelect', loadModelsGrid);
+                refreshModels();
                 
                 // Mettre à jour les statistiques
                 loadInferenceStats();
@@ -456,10 +484,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 showToast(`Modèle ${modelName} défini comme modèle par défaut`);
                 
                 // Recharger la liste des modèles
-                loadModelsList('testModelSelect', loadModelsGrid);
+                refreshModels();
                 
                 // Mettre à jour l'affichage du modèle actuel
-                loadCurrentModel();
+                if (!serverEventsConnected()) {
+                    loadCurrentModel();
+                }
             } else {
                 showErrorToast(`Erreur lors de la définition du modèle par défaut: ${data.error || 'Erreur inconnue'}`, 5000);
                 
@@ -616,7 +646,7 @@ if (data.success) {
                 showToast(`Modèle ${model} défini comme modèle par défaut`);
                 
                 // Recharger la liste des modèles pour mettre à jour l'interface
-                loadModelsList('testModelSelect', loadModelsGrid);
+                refreshModels();
             }
         })
         .catch(error => {
@@ -643,7 +673,9 @@ if (data.success) {
         avgTokens.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
         memoryUsage.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
         
-        fetch('/api/stats/inference-history')
+        // Totaux calculés par le serveur sur tout l'historique, filtré par modèle
+        const selectedModel = statsModelSelect.value;
+        fetch(`/api/stats/inference-history?model=${encodeURIComponent(selectedModel)}`)
             .then(response => {
                 if (!response.ok) {
                     throw new Error(`Erreur HTTP: ${response.status}`);
@@ -668,29 +700,19 @@ if (data.success) {
                     return;
                 }
                 
-                // Filtrer par modèle si nécessaire
-                const selectedModel = statsModelSelect.value;
-                let filteredHistory = data.history;
-                
-                if (selectedModel !== 'all') {
-                    filteredHistory = data.history.filter(entry => entry.model === selectedModel);
-                }
-                
-                // Calculer les statistiques
-                const totalCount = filteredHistory.length;
-                const totalTokens = filteredHistory.reduce((sum, entry) => sum + (entry.output_length || 0), 0);
-                const totalTime = filteredHistory.reduce((sum, entry) => sum + (entry.execution_time || 0), 0);
+                const filteredHistory = data.history;
+                const summary = data.summary;
                 
                 // Mettre à jour l'affichage
-                totalInferences.textContent = formatNumber(totalCount);
-                avgTime.textContent = (totalCount > 0 ? (totalTime / totalCount).toFixed(2) : '0');
-                avgTokens.textContent = (totalCount > 0 ? Math.round(totalTokens / totalCount) : '0');
+                totalInferences.textContent = formatNumber(summary.count);
+                avgTime.textContent = (summary.count > 0 ? summary.avg_time.toFixed(2) : '0');
+                avgTokens.textContent = (summary.count > 0 ? Math.round(summary.avg_tokens) : '0');
                 
                 // Estimation de la mémoire utilisée (valeur fictive)
-                const estimatedMemory = (totalCount > 0 ? Math.round((totalTokens / totalCount) * 1.5) : '0');
+                const estimatedMemory = (summary.count > 0 ? Math.round(summary.avg_tokens * 1.5) : '0');
                 memoryUsage.textContent = formatNumber(estimatedMemory);
                 
-                // Mettre à jour les graphiques (à implémenter)
+                // Mettre à jour les graphiques
                 updateCharts(filteredHistory);
             })
             .catch(error => {
@@ -736,10 +758,26 @@ if (data.success) {
     }
     
     // Fonction pour mettre à jour les graphiques (à implémenter)
+    // Les graphiques sont dessinés par le serveur : seule leur URL versionnée change
+    function showCharts(charts) {
+        Object.keys(charts || {}).forEach(name => {
+            const chart = charts[name];
+            if (!chart.version) return;
+            document.querySelectorAll(`img[data-chart="${name}"]`).forEach(img => {
+                if (img.getAttribute('src') !== chart.url) {
+                    img.setAttribute('src', chart.url);
+                }
+            });
+        });
+    }
+    
     function updateCharts(history) {
-        // Cette fonction pourrait être implémentée ultérieurement pour ajouter des graphiques
-        // avec une bibliothèque comme Chart.js
-        console.log('Mise à jour des graphiques avec', history.length, 'entrées d\'historique');
+        // Versions poussées par le serveur (sujet charts) ; sinon relues après chaque chargement
+        if (serverEventsConnected()) return;
+        fetch('/api/stats/charts')
+            .then(response => response.json())
+            .then(data => showCharts(data.charts))
+            .catch(error => console.error('Erreur lors du chargement des graphiques:', error));
     }
     
     // Suggérer des modèles populaires dans le champ de texte
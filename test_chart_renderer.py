@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour les images fixes et le rendu des graphiques des statistiques
+
+Usage:
+    pytest test_chart_renderer.py
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from chart_renderer import ChartRenderer, build_assets, model_usage_series, MAX_CHART_MODELS
+
+def test_build_assets_only_missing(tmp_path):
+    """Tester la génération des images fixes manquantes, identiques d'une génération à l'autre"""
+    generated = build_assets(str(tmp_path))
+    assert sorted(os.path.basename(path) for path in generated) == ["chart-placeholder.png", "favicon.ico"]
+    placeholder = (tmp_path / "chart-placeholder.png").read_bytes()
+    assert placeholder.startswith(b"\x89PNG")
+
+    assert build_assets(str(tmp_path)) == []
+    build_assets(str(tmp_path), force=True)
+    assert (tmp_path / "chart-placeholder.png").read_bytes() == placeholder
+
+def test_render_only_when_data_changes(tmp_path):
+    """Tester que les graphiques ne sont redessinés que si les données affichées changent"""
+    records = [{"model": "llama3", "output_length": 12, "timestamp": 1},
+               {"model": "mistral", "output_length": 30, "timestamp": 2}]
+
+    def load_stats():
+        counts = {}
+        for record in records:
+            counts[record["model"]] = counts.get(record["model"], 0) + 1
+        return {"models": [{"name": name, "count": count} for name, count in counts.items()],
+                "recent": list(records)}
+
+    rendered = []
+    renderer = ChartRenderer(str(tmp_path), load_stats, on_render=rendered.append)
+
+    assert sorted(renderer.render()) == ["model-usage", "output-length"]
+    first = renderer.get("model-usage")
+    assert os.path.basename(first["path"]) == f"model-usage-{first['version']}.png"
+    assert renderer.render() == []
+    assert len(rendered) == 1
+
+    records.append({"model": "llama3", "output_length": 12, "timestamp": 3})
+    assert sorted(renderer.render()) == ["model-usage", "output-length"]
+    assert renderer.get("model-usage")["version"] != first["version"]
+    assert rendered[-1] == renderer.status()
+
+    # Deux versions conservées par graphique, les plus anciennes sont supprimées
+    for i in range(3):
+        records.append({"model": "phi3", "output_length": i, "timestamp": 4 + i})
+        renderer.render()
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("model-usage-")]) == 2
+
+    # Nouveau démarrage : un rendu existant avec les mêmes données est réutilisé
+    restarted = ChartRenderer(str(tmp_path), load_stats)
+    restarted.render()
+    assert restarted.get("model-usage")["path"] == renderer.get("model-usage")["path"]
+
+def test_model_usage_groups_extra_models():
+    """Tester le regroupement des modèles les moins utilisés"""
+    models = [{"name": f"model-{i}", "count": 2 if i == 5 else 1} for i in range(MAX_CHART_MODELS + 2)]
+    series = model_usage_series({"models": models})
+    assert len(series) == MAX_CHART_MODELS
+    assert series[0] == ["model-5", 2]
+    assert series[-1] == ["autres", 3]
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le gestionnaire de conversations
+
+Usage:
+    pytest test_chat_manager.py
+"""
+
+from chat_manager import ConversationManager
+
+def test_history_truncated_by_blocks():
+    """Tester que la troncature garde un préfixe stable entre deux troncatures"""
+    manager = ConversationManager(history_limit=8, token_budget=10000)
+    conversation = manager.get(None, create=True, model="llama3")
+
+    for i in range(8):
+        manager.add_message(conversation, "user" if i % 2 == 0 else "assistant", f"message {i}")
+    assert len(conversation.messages) == 8
+
+    # Dépassement : retour à la moitié de la limite, en commençant par un message utilisateur
+    manager.add_message(conversation, "user", "message 8")
+    assert len(conversation.messages) == 3
+    assert conversation.messages[0]["content"] == "message 6"
+
+    prefix = list(conversation.messages)
+    manager.add_message(conversation, "assistant", "message 9")
+    assert conversation.messages[:len(prefix)] == prefix
+
+def test_token_budget_and_usage():
+    """Tester le budget de tokens et la prise en compte des compteurs d'Ollama"""
+    manager = ConversationManager(history_limit=200, token_budget=100)
+    conversation = manager.get("conv", create=True, system="Tu es un assistant")
+
+    manager.add_message(conversation, "user", "x" * 200)
+    manager.add_message(conversation, "assistant", "y" * 40)
+    manager.record_usage(conversation, {"prompt_eval_count": 60, "eval_count": 12})
+    assert conversation.messages[-1]["tokens"] == 12
+    assert conversation.prompt_tokens == 60
+
+    manager.add_message(conversation, "user", "z" * 200)
+    # Le dernier message est toujours conservé, même seul au-delà du budget
+    assert [m["content"] for m in conversation.messages] == ["z" * 200]
+    assert manager.build_messages(conversation)[0] == {"role": "system", "content": "Tu es un assistant"}
+
+def test_lru_eviction():
+    """Tester l'oubli des conversations les moins récemment utilisées"""
+    manager = ConversationManager(max_conversations=2)
+    manager.get("a", create=True)
+    manager.get("b", create=True)
+    manager.get("a")
+    manager.get("c", create=True)
+    assert manager.get("b") is None
+    assert manager.get("a") is not None
+    assert manager.delete("c")
+
+def test_restore_after_failed_turn():
+    """Tester le retour à l'historique complet quand l'ajout du message l'a tronqué"""
+    manager = ConversationManager(history_limit=4, token_budget=10000)
+    conversation = manager.get(None, create=True)
+    for i in range(4):
+        manager.add_message(conversation, "user" if i % 2 == 0 else "assistant", f"message {i}")
+
+    snapshot = manager.snapshot(conversation)
+    manager.add_message(conversation, "user", "message 4")
+    assert len(conversation.messages) < 4
+
+    manager.restore(conversation, snapshot)
+    assert [m["content"] for m in conversation.messages] == [f"message {i}" for i in range(4)]
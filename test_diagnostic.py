@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'exécution parallèle des vérifications de diagnostic
+
+Usage:
+    pytest test_diagnostic.py
+"""
+
+import time
+import threading
+
+import requests
+
+from diagnostic import DiagnosticRunner, create_runner, build_report
+
+def test_checks_run_concurrently_under_deadline():
+    """Tester l'exécution en parallèle et le statut timeout à l'échéance"""
+    runner = DiagnosticRunner(budget=0.3)
+    for i in range(4):
+        runner.register(f"lent{i}", lambda ctx: time.sleep(0.1) or {"valeur": 1}, "groupe")
+    runner.register("bloque", lambda ctx: time.sleep(2), "autre")
+    runner.register("echec", lambda ctx: 1 / 0, "autre")
+
+    start = time.monotonic()
+    results = runner.run()
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.6
+    assert all(results[f"lent{i}"]["status"] == "ok" for i in range(4))
+    assert results["lent0"]["details"] == {"valeur": 1}
+    assert results["lent0"]["duration_ms"] >= 100
+    assert results["bloque"]["status"] == "timeout"
+    assert results["echec"]["status"] == "error"
+    assert list(runner.run(groups=["groupe"])) == [f"lent{i}" for i in range(4)]
+
+def test_results_cached_and_slow_check_not_restarted():
+    """Tester le cache des résultats et le rattachement à une vérification en cours"""
+    calls = []
+    release = threading.Event()
+
+    def slow(ctx):
+        calls.append("slow")
+        release.wait(5)
+        return {"status": "warning"}
+
+    runner = DiagnosticRunner(budget=0.1, cache_ttl=60)
+    runner.register("rapide", lambda ctx: calls.append("rapide") or {}, "groupe")
+    runner.register("lent", slow, "groupe")
+
+    assert runner.run()["lent"]["status"] == "timeout"
+    assert runner.run()["lent"]["status"] == "timeout"
+    assert calls.count("slow") == 1
+    assert calls.count("rapide") == 1
+
+    release.set()
+    time.sleep(0.05)
+    results = runner.run()
+    assert results["lent"]["status"] == "warning"
+    assert results["lent"]["cached"] is True
+    assert len(runner.run(use_cache=False)) == 2
+    assert calls.count("rapide") == 2
+
+def test_report_keeps_api_format(tmp_path):
+    """Tester le rapport de /api/diagnostic avec un faux Ollama"""
+    class FakeResponse:
+        status_code = 200
+
+        def json(self):
+            return {"models": [{"name": "llama3", "size": 4 * 1024 * 1024}]}
+
+    config_path = tmp_path / "ollama_config.json"
+    config_path.write_text('{"default_model": "llama3"}')
+    runner = create_runner(config_path=str(config_path), request=lambda method, path, timeout=None: FakeResponse(),
+                           base_dir=str(tmp_path))
+    report = build_report(runner.run(groups=["ollama", "config"]), 0.01)
+
+    assert report["ollama"]["running"] is True
+    assert report["ollama"]["models"][0] == {"name": "llama3", "size_mb": 4, "modified": "unknown"}
+    assert report["configuration"] == {"default_model": "llama3", "config_file_exists": True}
+    assert report["checks"]["directories"]["status"] == "warning"
+
+    def unreachable(method, path, timeout=None):
+        raise requests.ConnectionError("refusé")
+
+    runner = create_runner(config_path=str(config_path), request=unreachable)
+    report = build_report(runner.run(groups=["ollama"]), 0.01)
+    assert report["ollama"]["running"] is False
+    assert "ollama_service" in report["failed_checks"]
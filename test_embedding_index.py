@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'index d'embeddings des projets
+
+Usage:
+    pytest test_embedding_index.py
+"""
+
+import os
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+from embedding_index import EmbeddingIndex, chunk_text
+
+DIMENSION = 64
+
+class FakeResponse:
+    """Réponse minimale de l'API /embed"""
+
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.text = ""
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+def bag_of_words(text):
+    """Vecteur déterministe : comptage des mots hachés"""
+    vector = np.zeros(DIMENSION)
+    for word in text.lower().split():
+        vector[zlib.crc32(word.encode()) % DIMENSION] += 1
+    return vector.tolist()
+
+@pytest.fixture
+def calls():
+    """Lots de textes envoyés au faux serveur"""
+    return []
+
+@pytest.fixture
+def index(tmp_path, calls):
+    """Fixture pour créer un index sur un répertoire de projets temporaire"""
+    def fake_request(method, path, model=None, json=None, timeout=None):
+        calls.append(list(json["input"]))
+        return FakeResponse({"embeddings": [bag_of_words(text) for text in json["input"]]})
+
+    (tmp_path / "projects" / "p1").mkdir(parents=True)
+    return EmbeddingIndex(str(tmp_path / "projects"), fake_request, model="test", batch_size=2, chunk_lines=4, chunk_overlap=1)
+
+def write(index, path, content):
+    """Écrit un document du projet p1"""
+    full_path = os.path.join(index.projects_dir, "p1", path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return full_path
+
+def test_chunk_text_overlaps():
+    """Tester le découpage en fenêtres de lignes qui se recouvrent"""
+    text = "\n".join(f"ligne {i}" for i in range(1, 11))
+    chunks = chunk_text(text, chunk_lines=4, overlap=1)
+    assert [(first, last) for first, last, _ in chunks] == [(1, 4), (4, 7), (7, 10)]
+    assert chunks[0][2].startswith("ligne 1\n")
+    assert chunk_text("") == []
+
+def test_search_ranks_relevant_passages(index, calls):
+    """Tester la construction par lots et la recherche des plus proches voisins"""
+    write(index, "cuisine.md", "recette de la tarte aux pommes\nfarine beurre sucre pommes")
+    write(index, "src/serveur.py", "def demarrer_serveur():\n    socket ecoute port reseau")
+    write(index, "image.png", "binaire")
+
+    result = index.update_project("p1")
+    assert result["documents"] == 2
+    assert result["embedded_chunks"] == 2
+    assert len(calls) == 1
+
+    results = index.search("p1", "tarte aux pommes", k=1)
+    assert [r["document"] for r in results] == ["cuisine.md"]
+    assert results[0]["start_line"] == 1
+    assert results[0]["score"] > 0.5
+
+    results = index.search("p1", "serveur reseau port", k=5, exclude_document="cuisine.md")
+    assert [r["document"] for r in results] == ["src/serveur.py"]
+
+def test_incremental_update_and_persistence(index, calls, tmp_path):
+    """Tester que seuls les documents modifiés sont réencodés et que l'index est relu du disque"""
+    write(index, "a.txt", "alpha")
+    path_b = write(index, "b.txt", "beta")
+    index.update_project("p1")
+    calls.clear()
+
+    assert index.update_project("p1")["embedded_chunks"] == 0
+    assert calls == []
+
+    write(index, "b.txt", "gamma delta")
+    os.utime(path_b, ns=(0, 10 ** 9))
+    write(index, "c.txt", "epsilon")
+    result = index.update_project("p1", paths=["b.txt", "c.txt"])
+    assert result["updated_documents"] == 2
+    assert sorted(text.split("\n")[0] for batch in calls for text in batch) == ["b.txt", "c.txt"]
+
+    os.remove(os.path.join(index.projects_dir, "p1", "a.txt"))
+    assert index.update_project("p1")["removed_documents"] == 1
+
+    reloaded = EmbeddingIndex(index.projects_dir, index.request, model="test")
+    assert reloaded.status("p1")["chunks"] == 2
+    assert reloaded.search("p1", "gamma", k=1)[0]["document"] == "b.txt"
+
+    assert reloaded.drop("p1") is True
+    assert reloaded.search("p1", "gamma") is None
+
+def test_search_refreshes_in_background(index, calls):
+    """Tester que la recherche utilise l'index existant et planifie sa mise à jour sans l'attendre"""
+    path = write(index, "a.txt", "alpha")
+    index.update_project("p1")
+    write(index, "a.txt", "omega")
+    os.utime(path, ns=(0, 10 ** 9))
+
+    assert index.search("p1", "alpha", k=1)[0]["text"] == "alpha"
+    deadline = time.monotonic() + 5
+    while index.status("p1")["updating"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.search("p1", "omega", k=1)[0]["text"] == "omega"
+
+    # Une vérification planifiée ne recrée pas un index supprimé
+    index.drop("p1")
+    index._start_worker()
+    index._pending.put(("p1", None))
+    time.sleep(0.2)
+    assert not index.is_indexed("p1")
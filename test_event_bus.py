@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le canal d'événements poussés aux pages (SSE)
+
+Usage:
+    pytest test_event_bus.py
+"""
+
+import time
+import threading
+
+from event_bus import EventBus
+
+def test_topics_state_and_reconnection():
+    """Tester le filtrage par sujet, l'état courant et la reprise avec Last-Event-ID"""
+    bus = EventBus(history_size=10, queue_size=5)
+    bus.publish("gpu", {"utilization": 10}, retain=True)
+    bus.publish("pull", {"percent": 50})
+
+    # Un nouvel abonné reçoit l'état courant, pas les événements passés
+    subscription = bus.subscribe(["gpu", "models"])
+    assert [(e.topic, e.data) for e in subscription.drain()] == [("gpu", {"utilization": 10})]
+
+    assert bus.publish("gpu", {"utilization": 10}, retain=True, only_if_changed=True) is None
+    bus.publish("pull", {"percent": 60})
+    last = bus.publish("models", {"models": []}, retain=True)
+    assert [e.id for e in subscription.get(timeout=1)] == [last.id]
+
+    # Reconnexion : événements manqués encore dans l'historique
+    missed = [bus.publish("gpu", {"utilization": i}, retain=True) for i in range(3)]
+    resumed = bus.subscribe(["gpu"], last_event_id=str(last.id))
+    assert [e.id for e in resumed.drain()] == [e.id for e in missed]
+    # Identifiant inconnu : état courant
+    assert [e.data for e in bus.subscribe(["gpu"], last_event_id="1").drain()] == [{"utilization": 2}]
+
+    # Abonné trop lent : resynchronisé avec l'état courant
+    for i in range(10):
+        bus.publish("gpu", {"utilization": 50 + i}, retain=True)
+    assert subscription.overflowed
+    assert [e.topic for e in subscription.drain()] == ["models", "gpu"]
+    assert "id: " in missed[0].encode() and "event: gpu\n" in missed[0].encode()
+
+def test_sampler_shared_and_runs_only_with_subscribers():
+    """Tester qu'une source est lue une fois pour tous les abonnés, et seulement s'il y en a"""
+    calls = []
+    value = {"models": ["llama3"]}
+
+    def fetch():
+        calls.append(time.monotonic())
+        return dict(value)
+
+    bus = EventBus()
+    bus.add_sampler("models", fetch, interval=60)
+    time.sleep(0.05)
+    assert calls == []
+
+    first = bus.subscribe(["models"])
+    second = bus.subscribe()
+    assert first.get(timeout=1)[0].data == value
+    assert len(calls) == 1
+    assert [e.data for e in second.get(timeout=1)] == [value]
+
+    # Relecture immédiate après un changement, publiée une seule fois
+    value["models"] = ["llama3", "mistral"]
+    bus.refresh("models")
+    assert first.get(timeout=1)[0].data == {"models": ["llama3", "mistral"]}
+    bus.refresh("models")
+    assert first.get(timeout=0.2) == []
+    assert len(calls) == 3
+
+    # Sans abonnés, la source s'arrête et la valeur conservée est oubliée au changement suivant
+    first.close()
+    second.close()
+    bus.refresh("models")
+    time.sleep(0.1)
+    assert len(calls) == 3
+    bus.refresh("models")
+    assert bus.snapshot() == []
+    assert bus.subscriber_count("models") == 0
+
+def test_stream_format_and_heartbeat():
+    """Tester le flux text/event-stream et la fermeture de l'abonnement"""
+    bus = EventBus()
+    subscription = bus.subscribe(["jobs"])
+    stream = bus.stream(subscription, heartbeat=0.05)
+    assert next(stream).startswith("retry: ")
+    assert next(stream) == ": ping\n\n"
+
+    threading.Timer(0.01, bus.publish, ("jobs", {"status": "completed"})).start()
+    chunk = next(stream)
+    assert chunk.startswith("id: ") and chunk.endswith('data: {"status":"completed"}\n\n')
+
+    stream.close()
+    assert subscription.closed
+    assert bus.subscriber_count() == 0
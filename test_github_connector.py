@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour la synchronisation des projets avec un dépôt git,
+à partir d'un dépôt nu local (sans accès réseau)
+
+Usage:
+    pytest test_github_connector.py
+"""
+
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from git import Repo
+
+from github_connector import GitHubConnector
+
+AUTHOR = {"GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+          "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com"}
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """API GitHub minimale : /user et /user/repos paginé, avec ETag"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        server.requests.append((url.path, self.headers.get("If-None-Match")))
+        if self.headers.get("Authorization") != "Bearer secret":
+            return self.reply(401, {"message": "Bad credentials"})
+        if url.path == "/user":
+            return self.reply(200, {"login": "octocat", "name": "Octo"})
+
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        if page > 1:
+            server.page_gate.wait(5)
+        names = server.repositories[(page - 1) * 100:page * 100]
+        links = None
+        if page * 100 < len(server.repositories):
+            links = f'<http://{self.headers["Host"]}/user/repos?page={page + 1}&per_page=100>; rel="next"'
+        self.reply(200, [{"name": name, "full_name": f"octocat/{name}"} for name in names], links)
+
+    def reply(self, status, data, links=None):
+        body = json.dumps(data).encode()
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        if links:
+            self.send_header("Link", links)
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def github_api():
+    """Serveur local tenant lieu de l'API GitHub (250 dépôts, 3 pages)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+    server.requests = []
+    server.repositories = [f"repo{i}" for i in range(250)]
+    server.page_gate = threading.Event()
+    server.page_gate.set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def api_connector(tmp_path, server, **kwargs):
+    """Connecteur relié au faux serveur"""
+    return GitHubConnector(str(tmp_path), token="secret", api_url=f"http://127.0.0.1:{server.server_port}", **kwargs)
+
+def wait_complete(connector):
+    """Attend la fin de la mise à jour des dépôts en arrière-plan"""
+    deadline = time.time() + 5
+    while connector.cache_status()["repositories"]["refreshing"] and time.time() < deadline:
+        time.sleep(0.01)
+
+def commit_files(repo, files, message):
+    """Écrit des fichiers dans une copie de travail et les valide"""
+    for name, content in files.items():
+        path = os.path.join(repo.working_tree_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    repo.git.add(A=True)
+    with repo.git.custom_environment(**AUTHOR):
+        repo.git.commit("-m", message)
+
+@pytest.fixture
+def upstream(tmp_path):
+    """Dépôt nu de trois commits (clonage partiel autorisé) et une copie de travail"""
+    work = Repo.init(tmp_path / "work", initial_branch="main")
+    for i in range(3):
+        commit_files(work, {"README.md": f"version {i}\n", f"src/module{i}.py": "x = 1\n"}, f"commit {i}")
+    bare = Repo.init(tmp_path / "remotes" / "team" / "demo.git", bare=True, initial_branch="main")
+    bare.git.config("uploadpack.allowFilter", "true")
+    work.create_remote("origin", bare.git_dir)
+    work.git.push("origin", "main")
+    return work, bare
+
+@pytest.fixture
+def connector(tmp_path):
+    """Connecteur dont les dépôts owner/repo sont dans un répertoire local"""
+    projects_dir = tmp_path / "projects"
+    (projects_dir / "demo").mkdir(parents=True)
+    (projects_dir / "demo" / "metadata.json").write_text(json.dumps({"name": "demo"}))
+    return GitHubConnector(str(projects_dir), remote_base=str(tmp_path / "remotes"))
+
+def test_shallow_partial_clone_in_background(connector, upstream):
+    """Tester le clonage superficiel et partiel d'owner/repo en tâche de fond"""
+    states = []
+    connector.subscribe_jobs(lambda job: states.append((job["status"], job["progress"])))
+    job = connector.start_job("clone", "demo", connector.clone, "demo", "team/demo")
+    job = connector.wait_job(job["id"], timeout=30)
+    assert job["status"] == "completed", job["error"]
+    assert job["progress"] == 100.0
+    assert states[0] == ("running", None)
+    assert states[-1] == ("completed", 100.0)
+    assert job["result"]["shallow"] is True
+    assert job["result"]["branch"] == "main"
+
+    project_path = os.path.join(connector.projects_dir, "demo")
+    with open(os.path.join(project_path, "README.md"), encoding="utf-8") as f:
+        assert f.read() == "version 2\n"
+    assert json.load(open(os.path.join(project_path, "metadata.json")))["name"] == "demo"
+    assert not os.path.exists(os.path.join(project_path, ".git-clone"))
+
+    status = connector.status("demo")
+    assert status["partial"] is True
+    assert status["dirty"] is False
+    assert len(list(Repo(project_path).iter_commits())) == 1
+
+def test_incremental_pull_and_push(connector, upstream):
+    """Tester qu'un pull ne récupère que les nouveaux commits et qu'un push les renvoie"""
+    work, bare = upstream
+    connector.clone("demo", bare.git_dir)
+
+    commit_files(work, {"README.md": "version 3\n"}, "commit 3")
+    work.git.push("origin", "main")
+    result = connector.pull("demo")
+    assert result["updated"] is True
+    assert result["changed_files"] == ["README.md"]
+    assert len(list(Repo(os.path.join(connector.projects_dir, "demo")).iter_commits())) == 2
+
+    assert connector.pull("demo")["updated"] is False
+
+    with open(os.path.join(connector.projects_dir, "demo", "notes.md"), "w", encoding="utf-8") as f:
+        f.write("depuis le projet\n")
+    result = connector.push("demo", "Ajout des notes")
+    assert result["committed"] is True
+    assert bare.commit("main").hexsha == result["commit"]
+    assert "metadata.json" not in bare.git.ls_tree("-r", "--name-only", "main").split()
+
+def test_clone_failure_is_reported(connector):
+    """Tester qu'une tâche en échec conserve l'erreur"""
+    job = connector.start_job("clone", "demo", connector.clone, "demo", "team/absent")
+    job = connector.wait_job(job["id"], timeout=30)
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert connector.status("demo") is None
+
+def test_connection_is_cached(tmp_path, github_api):
+    """Tester que l'état de la connexion n'est demandé qu'une fois par durée de validité"""
+    connector = api_connector(tmp_path, github_api)
+    assert connector.test_connection()["login"] == "octocat"
+    assert connector.test_connection()["login"] == "octocat"
+    assert [path for path, _ in github_api.requests] == ["/user"]
+
+    connector.save_credentials("octocat", "wrong")
+    assert connector.test_connection() is None
+    assert connector.test_connection() is None
+    assert len(github_api.requests) == 2
+
+def test_repositories_stream_into_cache_and_revalidate(tmp_path, github_api):
+    """Tester la publication de la première page puis la revalidation par ETag"""
+    connector = api_connector(tmp_path, github_api, cache_ttl=0)
+    github_api.page_gate.clear()
+    first = connector.list_repositories()
+    assert len(first) == 100
+    assert connector.cache_status()["repositories"]["complete"] is False
+
+    github_api.page_gate.set()
+    wait_complete(connector)
+    assert connector.cache_status()["repositories"]["complete"] is True
+    assert len(github_api.requests) == 3
+
+    # Cache expiré : la liste est servie immédiatement et revalidée en arrière-plan
+    repositories = connector.list_repositories()
+    assert len(repositories) == 250
+    assert repositories[-1]["full_name"] == "octocat/repo249"
+    wait_complete(connector)
+    revalidations = github_api.requests[3:]
+    assert len(revalidations) == 3
+    assert all(etag for _, etag in revalidations)
+    assert connector.cache_status()["repositories"]["count"] == 250
+
+def test_token_and_local_sources_are_restricted(tmp_path):
+    """Tester que le token ne part que vers GitHub et que les dépôts locaux sont limités aux répertoires autorisés"""
+    (tmp_path / "allowed" / "demo.git").mkdir(parents=True)
+    connector = GitHubConnector(str(tmp_path), token="secret", local_roots=[str(tmp_path / "allowed")])
+    assert "GIT_CONFIG_VALUE_0" in connector._git_env(connector.resolve_remote("team/demo"))
+    for url in ("https://attacker.example/x.git", "https://github.com@attacker.example/x.git",
+                "http://github.com/team/demo.git", "https://github.com:8443/team/demo.git"):
+        assert "GIT_CONFIG_VALUE_0" not in connector._git_env(connector.resolve_remote(url))
+
+    assert connector.resolve_remote(str(tmp_path / "allowed" / "demo.git")).startswith("file://")
+    for source in ("/etc", "file:///etc", str(tmp_path / "allowed" / ".." / "other"), "ext::sh -c id", "../x"):
+        with pytest.raises(ValueError):
+            connector.resolve_remote(source)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour la compression et les réponses conditionnelles
+
+Usage:
+    pytest test_http_cache.py
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, jsonify, url_for
+
+from http_cache import setup_http_cache
+
+@pytest.fixture
+def client(tmp_path):
+    """Application minimale : un fichier statique et deux routes JSON"""
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "app.js").write_text("console.log('ollama');\n" * 200)
+
+    app = Flask(__name__, static_folder=str(static))
+    app.config["SERVER_NAME"] = "localhost"
+    shared = setup_http_cache(app, {"compression_min_size": 512})
+
+    @app.route("/api/items")
+    def items():
+        return jsonify({"success": True, "items": [{"id": i, "name": f"élément {i}"} for i in range(100)]})
+
+    @app.route("/api/items", methods=["POST"])
+    def create_item():
+        return jsonify({"success": True, "items": list(range(500))})
+
+    client = app.test_client()
+    client.app, client.shared = app, shared
+    return client
+
+def test_versioned_static_is_immutable_and_compressed_once(client):
+    """Tester l'URL versionnée, le cache immuable et la compression mise en cache"""
+    with client.app.app_context():
+        url = url_for("static", filename="app.js")
+    assert "?v=" in url
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "no-cache" not in response.headers["Cache-Control"]
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == b"console.log('ollama');\n" * 200
+
+    client.get(url, headers={"Accept-Encoding": "gzip"})
+    cache = client.shared["compressed_cache"]
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    # Version périmée ou absente : revalidation habituelle
+    response = client.get("/static/app.js?v=000000000000")
+    assert "immutable" not in response.headers.get("Cache-Control", "")
+    assert "Content-Encoding" not in response.headers
+
+def test_json_etag_and_not_modified(client):
+    """Tester l'ETag des réponses JSON, le 304 et la compression selon Accept-Encoding"""
+    response = client.get("/api/items", headers={"Accept-Encoding": "gzip"})
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).startswith(b'{"items":[{"id":0')
+
+    plain = client.get("/api/items")
+    assert plain.headers["ETag"] == etag
+    assert "Content-Encoding" not in plain.headers
+
+    response = client.get("/api/items", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = client.post("/api/items", headers={"Accept-Encoding": "gzip"})
+    assert "ETag" not in response.headers
+    assert response.headers["Content-Encoding"] == "gzip"
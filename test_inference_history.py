@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour l'historique des inférences en colonnes NumPy
+
+Usage:
+    pytest test_inference_history.py
+"""
+
+import os
+import json
+import time
+
+from inference_history import InferenceHistory, PROMPT_MAX_CHARS, RECENT_SCAN_ROWS, string_key, segment_name, prompts_name
+
+# Début d'une heure, pour des agrégats prévisibles
+NOW = (time.time() // 3600 - 1) * 3600
+
+def test_series_resolution_and_downsampling(tmp_path):
+    """Tester le choix du niveau d'agrégation et la réduction au nombre de points demandé"""
+    history = InferenceHistory(str(tmp_path))
+    history.extend(
+        [{"timestamp": NOW - hours * 3600 + 30, "model": "llama3", "output_length": 10, "execution_time": 1.0}
+         for hours in range(48)] +
+        [{"timestamp": NOW + minutes * 60, "model": "mistral", "output_length": 30, "execution_time": 3.0}
+         for minutes in range(10)])
+
+    day = history.series(NOW - 47 * 3600, NOW + 3600, points=48)
+    assert day["resolution"] == "hour"
+    assert sum(day["count"]) == 58
+    assert day["count"][-1] == 11
+    assert day["avg_output_length"][-1] == round((10 + 10 * 30) / 11, 1)
+    assert day["max_execution_time"][-1] == 3.0
+
+    # Une heure en 10 points de 6 minutes : agrégats par minute
+    hour = history.series(NOW, NOW + 3600, points=10, model="mistral")
+    assert hour["resolution"] == "minute"
+    assert hour["count"] == [6, 4] + [0] * 8
+    assert hour["avg_execution_time"][2] is None
+
+    # Dix minutes en 100 points de 6 secondes : enregistrements bruts
+    assert history.series(NOW, NOW + 600, points=100)["resolution"] == "raw"
+
+def test_reload_and_shared_between_processes(tmp_path):
+    """Tester la relecture des fichiers et la prise en compte des ajouts d'une autre instance"""
+    first = InferenceHistory(str(tmp_path))
+    second = InferenceHistory(str(tmp_path))
+    first.append("llama3", "x" * 500, 100, 12, 0.5, timestamp=NOW)
+    second.append("phi3:mini", "bonjour", 50, 4, 0.25, timestamp=NOW + 1)
+    first.append("llama3", "bonjour", 100, 20, 1.5, timestamp=NOW + 2)
+
+    assert len(first) == len(second) == 3
+    recent = first.recent(2)
+    assert [r["model"] for r in recent] == ["llama3", "phi3:mini"]
+    assert recent[1]["prompt"] == "bonjour"
+    assert len(first.recent(model="llama3")[-1]["prompt"]) == PROMPT_MAX_CHARS + 3
+
+    reloaded = InferenceHistory(str(tmp_path))
+    assert reloaded.summary() == second.summary()
+    assert reloaded.summary()[0] == {"name": "llama3", "count": 2, "total_tokens": 32, "total_time": 2.0,
+                                     "avg_tokens": 16.0, "avg_time": 1.0}
+
+    # Enregistrement incomplet (écriture en cours) : ignoré jusqu'à ce qu'il soit complet
+    segment = next(name for name in os.listdir(tmp_path) if name.startswith("records-"))
+    with open(tmp_path / segment, "ab") as f:
+        f.write(b"\0" * 10)
+    assert len(reloaded) == 3
+
+def test_retention_drops_old_months(tmp_path):
+    """Tester la suppression des mois antérieurs à la durée de conservation"""
+    history = InferenceHistory(str(tmp_path), retention_days=0)
+    history.append("llama3", "ancien", 10, 1, 0.1, timestamp=time.time() - 400 * 86400)
+    history.append("llama3", "récent", 10, 1, 0.1)
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("records-")]) == 2
+
+    kept = InferenceHistory(str(tmp_path), retention_days=30)
+    assert [r["prompt"] for r in kept.recent()] == ["récent"]
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("records-")]) == 1
+
+def test_periodic_retention_drops_prompts(tmp_path):
+    """Tester la rétention appliquée en cours de fonctionnement, prompts du mois compris"""
+    history = InferenceHistory(str(tmp_path), retention_days=0)
+    history.append("llama3", "ancien", 10, 1, 0.1, timestamp=time.time() - 400 * 86400)
+    history.append("llama3", "récent", 10, 1, 0.1)
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("prompts-")]) == 2
+
+    history.retention_days = 30
+    history._retention_checked = 0
+    assert [r["prompt"] for r in history.recent()] == ["récent"]
+    assert history.summary()[0]["count"] == 1
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("prompts-")]) == 1
+    assert len(history._prompts) == 1
+
+def test_recent_by_model_and_legacy_strings(tmp_path):
+    """Tester la recherche d'un modèle rare depuis la fin et la reprise de l'ancienne table de chaînes"""
+    history = InferenceHistory(str(tmp_path))
+    history.append("mistral", "rare", 10, 1, 0.1, timestamp=NOW)
+    history.extend([{"timestamp": NOW + 1 + i, "model": "llama3", "prompt": "courant"}
+                    for i in range(3 * RECENT_SCAN_ROWS)])
+    assert [r["prompt"] for r in history.recent(5, model="mistral")] == ["rare"]
+    assert len(history.recent(5, model="llama3")) == 5
+
+    # Ancien format : une seule table de chaînes pour les modèles et les prompts
+    for name in os.listdir(tmp_path):
+        if not name.startswith("records-"):
+            os.remove(tmp_path / name)
+    with open(tmp_path / "strings.jsonl", "w", encoding="utf-8") as f:
+        for text in ("mistral", "llama3", "rare", "courant"):
+            f.write(json.dumps([string_key(text), text]) + "\n")
+    migrated = InferenceHistory(str(tmp_path))
+    assert not (tmp_path / "strings.jsonl").exists()
+    assert migrated.recent(1, model="mistral")[0]["prompt"] == "rare"
+    assert (tmp_path / prompts_name(segment_name(NOW))).exists()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour les métriques Prometheus
+
+Usage:
+    pytest test_metrics.py
+"""
+
+from metrics import MetricsRegistry, percentile
+
+def test_counter_and_histogram_rendering():
+    """Tester le format d'exposition des compteurs et histogrammes"""
+    registry = MetricsRegistry()
+    counter = registry.counter('test_total', "Compteur de test", ('route',))
+    histogram = registry.histogram('test_seconds', "Durées de test", ('route',), buckets=(0.1, 1))
+
+    counter.inc(route='/a')
+    counter.inc(2, route='/a')
+    histogram.observe(0.05, route='/a')
+    histogram.observe(0.5, route='/a')
+    histogram.observe(5, route='/a')
+
+    text = registry.render()
+    assert 'test_total{route="/a"} 3' in text
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'test_seconds_count{route="/a"} 3' in text
+
+def test_collectors_and_label_escaping():
+    """Tester les fonctions de collecte et l'échappement des étiquettes"""
+    registry = MetricsRegistry()
+    registry.register_collector(lambda: [('queue_depth', 'gauge', "Profondeur", [({'name': 'a"b'}, 4)])])
+    registry.register_collector(lambda: 1 / 0)
+
+    text = registry.render()
+    assert '# TYPE queue_depth gauge' in text
+    assert 'queue_depth{name="a\\"b"} 4' in text
+
+def test_percentile_nearest_rank():
+    """Tester le percentile par la méthode du rang le plus proche"""
+    assert percentile([], 50) == 0.0
+    assert percentile([2, 1], 50) == 1
+    assert percentile([1, 2, 3, 4], 90) == 4
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([3, 1, 2], 0) == 1
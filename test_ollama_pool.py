@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour la répartition entre serveurs Ollama
+
+Usage:
+    pytest test_ollama_pool.py
+"""
+
+import asyncio
+
+import pytest
+import requests
+
+from ollama_pool import OllamaPool, OTHER_MODEL_LABEL
+
+@pytest.fixture
+def pool():
+    """Fixture pour créer un ensemble de trois serveurs (sans vérification périodique)"""
+    return OllamaPool(["http://a/api", "http://b/api", "http://c/api"], health_interval=0)
+
+def test_select_prefers_loaded_model(pool):
+    """Tester l'affinité de modèle puis le nombre de requêtes en cours"""
+    a, b, c = pool.backends
+    a.outstanding = 0
+    b.outstanding = 3
+    b.loaded_models = {"llama3"}
+    c.available_models = {"mistral"}
+
+    assert pool.select("llama3") is b
+    assert pool.select("mistral") is c
+    assert pool.select("phi3") is a
+    assert pool.select("llama3", exclude=[b]) is a
+
+def test_select_skips_unhealthy(pool):
+    """Tester que les serveurs indisponibles ne sont choisis qu'en dernier recours"""
+    a, b, c = pool.backends
+    a.healthy = False
+    b.outstanding = 1
+    assert pool.select() is c
+
+    for backend in pool.backends:
+        backend.healthy = False
+    assert pool.select() is a
+
+def test_metrics_model_label_is_bounded(pool):
+    """Tester que les modèles inconnus des serveurs sont regroupés dans les métriques"""
+    pool.backends[1].available_models = {"llama3"}
+    assert pool._model_label("llama3") == "llama3"
+    assert pool._model_label("modele-invente-123") == OTHER_MODEL_LABEL
+    assert pool._model_label(None) == ""
+
+def test_request_fails_over(pool, monkeypatch):
+    """Tester la bascule vers le serveur suivant sur erreur de connexion"""
+    calls = []
+
+    class FakeResponse:
+        status_code = 200
+        ok = True
+
+    def fake_request(method, url, **kwargs):
+        calls.append(url)
+        if not url.startswith("http://c/"):
+            raise requests.exceptions.ConnectionError("refusé")
+        return FakeResponse()
+
+    monkeypatch.setattr(pool._session, "request", fake_request)
+    response = pool.request("POST", "/generate", model="llama3", json={})
+
+    assert response.status_code == 200
+    assert calls == ["http://a/api/generate", "http://b/api/generate", "http://c/api/generate"]
+    assert [backend.healthy for backend in pool.backends] == [False, False, True]
+    assert "llama3" in pool.backends[2].loaded_models
+    assert all(backend.outstanding == 0 for backend in pool.backends)
+
+def test_arequest_fails_over(pool):
+    """Tester la bascule et l'affinité de modèle avec le client asynchrone"""
+    httpx = pytest.importorskip("httpx")
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.host != "c":
+            raise httpx.ConnectError("refusé", request=request)
+        return httpx.Response(200, json={"response": "ok"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await pool.arequest(client, "POST", "/generate", model="llama3", json={})
+
+    response = asyncio.run(run())
+
+    assert response.json() == {"response": "ok"}
+    assert calls == ["http://a/api/generate", "http://b/api/generate", "http://c/api/generate"]
+    assert [backend.healthy for backend in pool.backends] == [False, False, True]
+    assert "llama3" in pool.backends[2].loaded_models
+    assert all(backend.outstanding == 0 for backend in pool.backends)
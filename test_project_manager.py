@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le gestionnaire de projets
+
+Usage:
+    pytest test_project_manager.py
+"""
+
+import pytest
+
+from project_manager import ProjectManager
+import project_manager as pm_module
+
+@pytest.fixture
+def manager(tmp_path):
+    """Fixture pour créer un gestionnaire de projets dans un répertoire temporaire"""
+    return ProjectManager(projects_dir=str(tmp_path / "projects"))
+
+@pytest.fixture
+def project(manager):
+    """Fixture pour créer un projet de test"""
+    return manager.create_project("Projet de test", "Description")
+
+# Tests des lectures partielles
+def test_get_document_single_stat(manager, project):
+    """Tester les informations d'un document"""
+    manager.create_document(project['id'], "notes.md", "# Titre\n")
+    document = manager.get_document(project['id'], "notes.md")
+    assert document["type"] == "markdown"
+    assert document["size"] == 8
+    assert document["large"] is False
+    assert manager.get_document(project['id'], "absent.md") is None
+
+def test_read_document_range_keeps_utf8_characters(manager, project):
+    """Tester qu'une plage d'octets ne coupe pas un caractère multi-octets"""
+    manager.create_document(project['id'], "accents.txt", "aé" * 10)
+    page = manager.read_document_range(project['id'], "accents.txt", 0, 2)
+    assert page["content"] == "a"
+    assert page["next_offset"] == 1
+    
+    page = manager.read_document_range(project['id'], "accents.txt", page["next_offset"], 100)
+    assert page["content"] == "é" + "aé" * 9
+    assert page["eof"] is True
+
+def test_read_document_lines_window(manager, project):
+    """Tester la lecture d'une fenêtre de lignes"""
+    content = "".join(f"ligne {i}\n" for i in range(50))
+    manager.create_document(project['id'], "log.txt", content)
+    
+    page = manager.read_document_lines(project['id'], "log.txt", 10, 3)
+    assert page["content"] == "ligne 10\nligne 11\nligne 12\n"
+    assert page["next_line"] == 13
+    assert page["eof"] is False
+    
+    page = manager.read_document_lines(project['id'], "log.txt", 48, 10)
+    assert page["num_lines"] == 2
+    assert page["eof"] is True
+
+def test_read_document_lines_byte_cap(manager, project):
+    """Tester la limite en octets d'une fenêtre de lignes"""
+    manager.create_document(project['id'], "min.js", "court\n" + "é" * 40 + "\nfin\n")
+    
+    # La fenêtre s'arrête avant la ligne qui dépasserait la limite
+    page = manager.read_document_lines(project['id'], "min.js", 0, 10, max_bytes=20)
+    assert page["content"] == "court\n"
+    assert page["next_line"] == 1
+    assert page["truncated"] is False
+    
+    # Ligne trop longue à elle seule : coupée sans couper de caractère
+    page = manager.read_document_lines(project['id'], "min.js", 1, 10, max_bytes=21)
+    assert page["content"] == "é" * 10
+    assert page["truncated"] is True
+    assert page["next_line"] == 2
+    assert manager.read_document_lines(project['id'], "min.js", 2, 10, max_bytes=21)["content"] == "fin\n"
+
+def test_large_document_uses_pagination(manager, project, monkeypatch):
+    """Tester la lecture d'un document au-delà du seuil de taille"""
+    monkeypatch.setattr(pm_module, "LARGE_FILE_THRESHOLD", 16)
+    manager.create_document(project['id'], "big.log", "x" * 64)
+    
+    assert manager.get_document(project['id'], "big.log")["large"] is True
+    page = manager.read_document_range(project['id'], "big.log", 60, 10)
+    assert page["content"] == "xxxx"
+    assert b"".join(manager.iter_document_chunks(project['id'], "big.log", 10)) == b"x" * 64
+
+# Tests de la couche de métadonnées
+def test_metadata_updates_are_coalesced(manager, project, monkeypatch):
+    """Tester que les mises à jour de documents ne réécrivent pas metadata.json à chaque fois"""
+    writes = []
+    original_flush = manager.metadata._flush_project
+    
+    def counting_flush(project_id):
+        if project_id in manager.metadata._dirty:
+            writes.append(project_id)
+        original_flush(project_id)
+    
+    monkeypatch.setattr(manager.metadata, "_flush_project", counting_flush)
+    manager.metadata.flush_delay = 60
+    
+    for i in range(10):
+        manager.create_document(project['id'], f"doc_{i}.txt", "contenu")
+    assert writes == []
+    
+    manager.metadata.flush()
+    assert writes == [project['id']]
+
+def test_metadata_flush_is_atomic_and_visible(manager, project):
+    """Tester l'écriture atomique et la relecture des métadonnées"""
+    import json
+    import os
+    
+    manager.update_project(project['id'], {"description": "Nouvelle description"})
+    metadata_path = os.path.join(manager.projects_dir, project['id'], "metadata.json")
+    with open(metadata_path) as f:
+        assert json.load(f)["description"] == "Nouvelle description"
+    
+    # Aucun fichier temporaire ne doit subsister
+    assert [f for f in os.listdir(os.path.dirname(metadata_path)) if f.endswith('.tmp')] == []
+    assert manager.get_project(project['id'])["description"] == "Nouvelle description"
+
+# Tests du stockage dédupliqué
+def test_import_folder_deduplicates_identical_files(tmp_path):
+    """Tester que deux imports d'une même arborescence partagent les blobs"""
+    import os
+    
+    source = tmp_path / "source"
+    (source / "lib").mkdir(parents=True)
+    (source / "lib" / "vendor.js").write_text("console.log('vendor');")
+    (source / "main.py").write_text("print('main')")
+    
+    manager = ProjectManager(projects_dir=str(tmp_path / "projects"), deduplicate=True)
+    first = manager.import_folder(str(source), "Premier")
+    second = manager.import_folder(str(source), "Second")
+    
+    first_file = os.path.join(first['path'], "lib", "vendor.js")
+    second_file = os.path.join(second['path'], "lib", "vendor.js")
+    # Liens physiques en lecture seule
+    assert os.path.samefile(first_file, second_file)
+    assert not os.stat(first_file).st_mode & 0o222
+    assert manager.blob_store.stats()["blobs"] == 2
+    
+    # Modifier un document ne doit pas affecter l'autre projet
+    manager.update_document(first['id'], "lib/vendor.js", "modifié")
+    assert open(second_file).read() == "console.log('vendor');"
+    
+    assert os.access(os.path.join(first['path'], "lib", "vendor.js"), os.W_OK)
+    
+    # Les blobs sont libérés quand plus aucun projet ne les référence
+    manager.delete_project(second['id'])
+    manager.delete_document(first['id'], "main.py")
+    assert manager.blob_store.stats()["blobs"] == 0
+
+def test_blob_modified_in_place_is_not_reused(tmp_path):
+    """Tester qu'un blob modifié à travers un lien physique est retiré du stockage"""
+    import os
+    
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "config.txt").write_text("valeur=1\n")
+    
+    manager = ProjectManager(projects_dir=str(tmp_path / "projects"), deduplicate=True)
+    first = manager.import_folder(str(source), "Premier")
+    
+    # Écriture sur place (shell exécuté en root, éditeur...) : contourne la lecture seule
+    linked = os.path.join(first['path'], "config.txt")
+    os.chmod(linked, 0o644)
+    with open(linked, "a") as f:
+        f.write("modifié sur place\n")
+    
+    second = manager.import_folder(str(source), "Second")
+    assert open(os.path.join(second['path'], "config.txt")).read() == "valeur=1\n"
+    assert not os.path.samefile(linked, os.path.join(second['path'], "config.txt"))
+    assert manager.blob_store.verify() == {"checked": 1, "corrupted": 0, "fixed_modes": 0}
+
+def test_deduplicated_script_keeps_exec_permission(tmp_path):
+    """Tester qu'un fichier exécutable dédupliqué reste exécutable"""
+    import os
+    
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "run.sh").write_text("echo ok\n")
+    (source / "notes.txt").write_text("echo ok\n")
+    os.chmod(source / "run.sh", 0o755)
+    
+    manager = ProjectManager(projects_dir=str(tmp_path / "projects"), deduplicate=True)
+    project = manager.import_folder(str(source), "Scripts")
+    
+    script = os.path.join(project['path'], "run.sh")
+    assert os.stat(script).st_mode & 0o777 == 0o555
+    assert os.stat(os.path.join(project['path'], "notes.txt")).st_mode & 0o777 == 0o444
+    # Même contenu, permissions différentes : deux blobs distincts
+    assert not os.path.samefile(script, os.path.join(project['path'], "notes.txt"))
+    assert manager.blob_store.verify() == {"checked": 2, "corrupted": 0, "fixed_modes": 0}
+    
+    manager.update_document(project['id'], "run.sh", "echo modifié\n")
+    assert os.stat(script).st_mode & 0o777 == 0o755
+
+# Tests de l'export et de l'import d'archives
+@pytest.mark.parametrize("archive_format", ["zip", "tar.gz"])
+def test_export_import_archive_roundtrip(manager, project, archive_format):
+    """Tester l'export en streaming puis la réimportation d'un projet"""
+    import io
+    
+    manager.create_document(project['id'], "src/main.py", "print('ok')\n" * 1000)
+    manager.create_document(project['id'], "notes.md", "# Notes")
+    
+    data = b"".join(manager.export_project(project['id'], archive_format, ["code"]))
+    target = manager.create_project("Cible")
+    imported = manager.import_archive(target['id'], io.BytesIO(data), archive_format)
+    
+    assert imported == ["src/main.py"]
+    assert manager.get_document_content(target['id'], "src/main.py") == "print('ok')\n" * 1000
+
+# Tests du cache des fichiers tenu à jour par la surveillance
+def test_files_cache_follows_watcher_notifications(manager, project):
+    """Tester la mise à jour incrémentale de la liste des fichiers"""
+    import os
+    
+    class FakeWatcher:
+        running = True
+        def subscribe(self, callback):
+            self.callback = callback
+    
+    watcher = FakeWatcher()
+    manager.attach_watcher(watcher)
+    manager.create_document(project['id'], "a.txt", "a")
+    assert [f['path'] for f in manager.get_project_files(project['id'])] == ["a.txt"]
+    
+    # Modification externe : invisible tant qu'elle n'est pas notifiée
+    project_path = os.path.join(manager.projects_dir, project['id'])
+    with open(os.path.join(project_path, "b.py"), "w") as f:
+        f.write("b")
+    assert len(manager.get_project_files(project['id'])) == 1
+    
+    watcher.callback(project['id'], {"b.py": "created"})
+    assert [f['path'] for f in manager.get_project_files(project['id'])] == ["a.txt", "b.py"]
+    
+    os.remove(os.path.join(project_path, "a.txt"))
+    watcher.callback(project['id'], {"a.txt": "deleted"})
+    assert [f['path'] for f in manager.get_project_files(project['id'])] == ["b.py"]
+
+def test_files_cache_skips_walk_overtaken_by_notification(manager, project):
+    """Tester qu'une notification reçue pendant le parcours du projet n'est pas perdue"""
+    import os
+    
+    class FakeWatcher:
+        running = True
+        def subscribe(self, callback):
+            self.callback = callback
+    
+    watcher = FakeWatcher()
+    manager.attach_watcher(watcher)
+    manager.create_document(project['id'], "a.txt", "a")
+    project_path = os.path.join(manager.projects_dir, project['id'])
+    build_document_info = manager._build_document_info
+    
+    def build_and_create(rel_path, stat):
+        # Fichier créé et notifié pendant le parcours, après la lecture du répertoire
+        if not os.path.exists(os.path.join(project_path, "c.txt")):
+            with open(os.path.join(project_path, "c.txt"), "w") as f:
+                f.write("c")
+            watcher.callback(project['id'], {"c.txt": "created"})
+        return build_document_info(rel_path, stat)
+    
+    manager._build_document_info = build_and_create
+    assert [f['path'] for f in manager.get_project_files(project['id'])] == ["a.txt"]
+    manager._build_document_info = build_document_info
+    assert [f['path'] for f in manager.get_project_files(project['id'])] == ["a.txt", "c.txt"]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le traçage des requêtes
+
+Usage:
+    pytest test_tracing.py
+"""
+
+import json
+import time
+
+from tracing import Tracer, span, traced
+
+def test_span_tree_and_ring_buffer():
+    """Tester l'arbre des étapes et le tampon circulaire"""
+    tracer = Tracer(enabled=True, buffer_size=2)
+
+    for i in range(3):
+        root = tracer.start_trace(f"GET /{i}")
+        with span("etape", index=i):
+            with span("sous-etape") as current:
+                current.set(ok=True)
+        tracer.finish_trace(root, status=200)
+
+    traces = tracer.recent()
+    assert [t["name"] for t in traces] == ["GET /2", "GET /1"]
+    child = traces[0]["children"][0]
+    assert child["attributes"] == {"index": 2}
+    assert child["children"][0]["attributes"] == {"ok": True}
+    assert tracer.get(traces[1]["id"])["name"] == "GET /1"
+
+def test_disabled_tracer_is_noop():
+    """Tester qu'aucune trace n'est produite lorsque le traçage est désactivé"""
+    tracer = Tracer(enabled=False)
+    root = tracer.start_trace("GET /")
+    assert root is None
+    with span("etape") as current:
+        current.set(ignored=True)
+    tracer.finish_trace(root)
+    assert tracer.recent() == []
+
+def test_traced_keeps_function_metadata():
+    """Tester que le décorateur conserve le nom, la documentation et la fonction d'origine"""
+    def infer(model, prompt="bonjour"):
+        """Inférence"""
+        return model, prompt
+
+    wrapped = traced("infer")(infer)
+    assert (wrapped.__name__, wrapped.__doc__, wrapped.__module__) == ("infer", "Inférence", infer.__module__)
+    assert wrapped.__wrapped__ is infer
+    assert wrapped("llama3") == ("llama3", "bonjour")
+
+def test_span_records_errors_and_export(tmp_path):
+    """Tester l'enregistrement des erreurs et l'export JSONL"""
+    export_path = tmp_path / "traces.jsonl"
+    tracer = Tracer(enabled=True, export_path=str(export_path))
+
+    root = tracer.start_trace("POST /api/test-model")
+    try:
+        with span("ollama.request"):
+            raise ConnectionError("refusé")
+    except ConnectionError:
+        pass
+    tracer.finish_trace(root, status=500)
+
+    for _ in range(50):
+        if export_path.exists() and export_path.read_text():
+            break
+        time.sleep(0.02)
+    exported = json.loads(export_path.read_text().splitlines()[0])
+    assert exported["children"][0]["error"] == "ConnectionError: refusé"
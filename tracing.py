@@ -0,0 +1,246 @@
+"""
+Traçage léger des requêtes de l'application.
+
+Chaque requête HTTP tracée produit un arbre d'étapes (spans) chronométrées :
+vérification d'Ollama, appels à l'API, processus lancés, écritures de
+statistiques... Les traces terminées sont conservées dans un tampon
+circulaire consultable via /debug/traces et peuvent être exportées dans un
+fichier JSONL par un thread d'écriture en arrière-plan.
+
+Lorsque le traçage est désactivé, ou en dehors d'une requête tracée,
+span() renvoie un objet vide partagé : le coût se limite à la lecture
+d'une variable de contexte.
+"""
+import json
+import time
+import uuid
+import queue
+import atexit
+import functools
+import threading
+import contextvars
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Nombre de traces conservées en mémoire
+DEFAULT_BUFFER_SIZE = 200
+# Nombre maximal de traces en attente d'export
+EXPORT_QUEUE_SIZE = 1000
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """Étape chronométrée d'une trace"""
+
+    __slots__ = ('name', 'attributes', 'start', 'end', 'children', 'error', '_token')
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+        self.error = None
+        self._token = None
+
+    def set(self, **attributes):
+        """Ajoute des attributs à l'étape"""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            parent.children.append(self)
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        return False
+
+    def to_dict(self, origin):
+        """Représentation JSON, les instants étant relatifs au début de la trace (en ms)"""
+        end = self.end if self.end is not None else time.perf_counter()
+        data = {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((end - self.start) * 1000, 3)
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.error:
+            data['error'] = self.error
+        if self.children:
+            data['children'] = [child.to_dict(origin) for child in self.children]
+        return data
+
+class _NoopSpan:
+    """Étape vide utilisée lorsque rien n'est tracé"""
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name, **attributes):
+    """
+    Ouvre une étape dans la trace courante.
+
+    Args:
+        name (str): Nom de l'étape
+        **attributes: Attributs de l'étape (modèle, commande...)
+
+    Returns:
+        Span: Gestionnaire de contexte (vide hors d'une requête tracée)
+    """
+    if _current_span.get() is None:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+def traced(name):
+    """Décorateur ouvrant une étape autour d'une fonction"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class Tracer:
+    """
+    Démarrage des traces, tampon circulaire et export JSONL.
+    """
+
+    def __init__(self, enabled=False, buffer_size=DEFAULT_BUFFER_SIZE, export_path=None):
+        """
+        Initialise le traceur.
+
+        Args:
+            enabled (bool): Activer le traçage
+            buffer_size (int): Nombre de traces conservées en mémoire
+            export_path (str): Fichier JSONL d'export (optionnel)
+        """
+        self.enabled = enabled
+        self.export_path = export_path
+        self._traces = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._export_queue = None
+
+        if enabled and export_path:
+            self._export_queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+            threading.Thread(target=self._export_loop, name="trace-export", daemon=True).start()
+            atexit.register(self._flush_export)
+
+    def start_trace(self, name, **attributes):
+        """
+        Démarre une trace et en fait l'étape courante.
+
+        Returns:
+            Span: Étape racine ou None si le traçage est désactivé
+        """
+        if not self.enabled:
+            return None
+        root = Span(name, attributes)
+        root.__enter__()
+        return root
+
+    def finish_trace(self, root, **attributes):
+        """
+        Termine une trace et l'enregistre.
+
+        Args:
+            root (Span): Étape racine renvoyée par start_trace
+            **attributes: Attributs ajoutés à la racine (statut HTTP...)
+        """
+        if root is None:
+            return
+        root.set(**attributes)
+        try:
+            root.__exit__(None, None, None)
+        except ValueError:
+            # Contexte différent (réponse générée en streaming) : clôturer sans restaurer
+            root.end = time.perf_counter()
+
+        trace = {
+            'id': uuid.uuid4().hex[:16],
+            'timestamp': time.time() - (root.end - root.start),
+            **root.to_dict(root.start)
+        }
+        with self._lock:
+            self._traces.append(trace)
+
+        if self._export_queue is not None:
+            try:
+                self._export_queue.put_nowait(trace)
+            except queue.Full:
+                logger.warning("File d'export des traces saturée, trace ignorée")
+
+    def recent(self, limit=50, min_duration_ms=0):
+        """
+        Traces les plus récentes.
+
+        Args:
+            limit (int): Nombre maximal de traces
+            min_duration_ms (float): Durée minimale des traces renvoyées
+
+        Returns:
+            list: Traces, la plus récente en premier
+        """
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        if min_duration_ms:
+            traces = [t for t in traces if t['duration_ms'] >= min_duration_ms]
+        return traces[:limit]
+
+    def get(self, trace_id):
+        """Trace correspondant à un identifiant, ou None"""
+        with self._lock:
+            for trace in self._traces:
+                if trace['id'] == trace_id:
+                    return trace
+        return None
+
+    def _export_loop(self):
+        """Écrit les traces terminées dans le fichier JSONL"""
+        while True:
+            trace = self._export_queue.get()
+            try:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace, ensure_ascii=False) + '\n')
+                    # Regrouper les traces déjà en attente dans la même écriture
+                    while True:
+                        try:
+                            f.write(json.dumps(self._export_queue.get_nowait(), ensure_ascii=False) + '\n')
+                        except queue.Empty:
+                            break
+            except OSError as e:
+                logger.warning("Impossible d'exporter les traces: %s", e)
+
+    def _flush_export(self):
+        """Écrit les traces restantes à l'arrêt de l'application"""
+        pending = []
+        try:
+            while True:
+                pending.append(self._export_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if pending:
+            try:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    for trace in pending:
+                        f.write(json.dumps(trace, ensure_ascii=False) + '\n')
+            except OSError:
+                pass
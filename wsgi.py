@@ -0,0 +1,10 @@
+"""
+Point d'entrée WSGI de l'application pour les serveurs de production.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+    waitress-serve --port=5000 wsgi:application
+"""
+from app import app as application
+
+# Alias usuel
+app = application